@@ -0,0 +1,421 @@
+import json
+import sqlite3
+from datetime import date
+
+# NOVO: Motor SQLite opcional para o projeto_cac.py (ativado com USAR_SQLITE).
+# Cada registro é guardado inteiro na coluna 'dados' (o mesmo dicionário do
+# JSON, então nada se perde na conversão) e os campos usados em buscas são
+# copiados para colunas próprias com índice.
+#
+# NOVO: O 'Seq' de cada registro (geração da última alteração) tem índice
+# sobre o próprio JSON (json_extract), e os CPFs excluídos ficam na tabela
+# 'removidos': a exportação para réplicas lê só o que mudou.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    cpf   TEXT PRIMARY KEY,
+    nome  TEXT,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agendamentos (
+    id             INTEGER PRIMARY KEY,
+    cpf            TEXT,
+    status         TEXT,
+    medico         TEXT,
+    especializacao TEXT,
+    data_consulta  TEXT,  -- AAAA-MM-DD (ordenável)
+    horario        TEXT,
+    dados          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ag_cpf ON agendamentos (cpf);
+CREATE INDEX IF NOT EXISTS idx_ag_status_data ON agendamentos (status, data_consulta);
+CREATE INDEX IF NOT EXISTS idx_ag_medico_status_data ON agendamentos (medico, status, data_consulta);
+CREATE INDEX IF NOT EXISTS idx_ag_especializacao_data ON agendamentos (especializacao, data_consulta);
+CREATE INDEX IF NOT EXISTS idx_ag_data ON agendamentos (data_consulta, horario);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS removidos (
+    cpf TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pac_seq ON pacientes (json_extract(dados, '$.Seq'));
+CREATE INDEX IF NOT EXISTS idx_ag_seq ON agendamentos (json_extract(dados, '$.Seq'));
+CREATE INDEX IF NOT EXISTS idx_removidos_seq ON removidos (seq);
+"""
+
+SQL_REMOVIDO = "INSERT OR REPLACE INTO removidos (cpf, seq) VALUES (?, ?)"
+SQL_INSERIR_PACIENTE = "INSERT OR REPLACE INTO pacientes (cpf, nome, dados) VALUES (?, ?, ?)"
+SQL_INSERIR_AGENDAMENTO = """
+    INSERT OR REPLACE INTO agendamentos
+        (id, cpf, status, medico, especializacao, data_consulta, horario, dados)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def abrir(caminho):
+    """Abre (e cria, se preciso) o banco SQLite da clínica."""
+    # timeout: com vários processos gravando, espera a vez em vez de falhar
+    conexao = sqlite3.connect(caminho, timeout=60)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("PRAGMA synchronous=NORMAL")
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+# --- Conversão registro <-> linha ---
+
+def data_iso(data_str):
+    """Converte 'DD/MM/AAAA' para 'AAAA-MM-DD' (ou None se o formato não bater)."""
+    if isinstance(data_str, date):
+        return data_str.strftime("%Y-%m-%d")
+    if not data_str or len(data_str) != 10:
+        return None
+    return f"{data_str[6:10]}-{data_str[3:5]}-{data_str[0:2]}"
+
+def _json(registro):
+    # default=dict: aceita também os registros compactos (Paciente/Agendamento)
+    return json.dumps(registro, ensure_ascii=False, separators=(",", ":"), default=dict)
+
+def linha_paciente(paciente):
+    return (paciente["CPF"], paciente.get("NomeCompleto"), _json(paciente))
+
+def linha_agendamento(ag):
+    return (
+        ag["ID"], ag.get("CPF"), ag.get("Status"), ag.get("Medico"),
+        ag.get("Especializacao"), data_iso(ag.get("DataConsulta")),
+        ag.get("HorarioInicio"), _json(ag),
+    )
+
+
+# --- Migração (uma vez só) ---
+
+def migrar(conexao, dados, versao=1):
+    """Importa pacientes e agendamentos (já carregados do JSON) numa única transação."""
+    with conexao:
+        conexao.execute("DELETE FROM pacientes")
+        conexao.execute("DELETE FROM agendamentos")
+        conexao.execute("DELETE FROM removidos")
+        conexao.executemany(SQL_INSERIR_PACIENTE, (linha_paciente(p) for p in dados["pacientes"]))
+        conexao.executemany(SQL_INSERIR_AGENDAMENTO, (linha_agendamento(ag) for ag in dados["agendamentos"]))
+        conexao.executemany(SQL_REMOVIDO, dados.get("removidos", {}).items())
+        # Nunca abaixo da geração do JSON: os 'Seq' dos registros continuam valendo
+        _gravar_geracao(conexao, max(ler_geracao(conexao), dados.get("geracao", 0)) + 1)
+        gravar_versao(conexao, versao)
+
+# NOVO: Versão do formato dos registros (a mesma do arquivo JSON)
+TAMANHO_LOTE_MIGRACAO = 5000
+
+def ler_versao(conexao):
+    """Versão do formato dos registros (1 em bancos criados antes dela)."""
+    linha = conexao.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+    return linha[0] if linha else 1
+
+def gravar_versao(conexao, versao):
+    conexao.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('versao', ?)", (versao,))
+
+def migrar_registros(conexao, migrar_paciente, migrar_agendamento, versao):
+    """Regrava todos os registros passando pelas funções de migração, em lotes.
+
+    Uma transação só (quem abrir o banco no meio vê tudo na versão antiga),
+    mas com no máximo TAMANHO_LOTE_MIGRACAO registros na memória por vez.
+    """
+    with conexao:
+        ultima_chave = ""
+        while True:
+            lote = conexao.execute(
+                "SELECT cpf, dados FROM pacientes WHERE cpf > ? ORDER BY cpf LIMIT ?",
+                (ultima_chave, TAMANHO_LOTE_MIGRACAO)).fetchall()
+            if not lote:
+                break
+            ultima_chave = lote[-1][0]
+            novos = [migrar_paciente(json.loads(dados)) for _, dados in lote]
+            # O CPF é a chave: a migração não muda, então cada linha só é sobrescrita
+            conexao.executemany(SQL_INSERIR_PACIENTE, (linha_paciente(p) for p in novos))
+
+        ultimo_id = -1
+        while True:
+            lote = conexao.execute(
+                "SELECT id, dados FROM agendamentos WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, TAMANHO_LOTE_MIGRACAO)).fetchall()
+            if not lote:
+                break
+            ultimo_id = lote[-1][0]
+            conexao.executemany(SQL_INSERIR_AGENDAMENTO,
+                                (linha_agendamento(migrar_agendamento(json.loads(dados))) for _, dados in lote))
+        gravar_versao(conexao, versao)
+        _gravar_geracao(conexao, ler_geracao(conexao) + 1)  # Quem já tinha carregado relê
+
+
+# --- Leitura ---
+
+def ler_geracao(conexao):
+    """Contador de gravações do banco (0 em bancos criados antes dele)."""
+    linha = conexao.execute("SELECT valor FROM meta WHERE chave = 'geracao'").fetchone()
+    return linha[0] if linha else 0
+
+def _gravar_geracao(conexao, geracao):
+    conexao.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('geracao', ?)", (geracao,))
+
+def carregar_tudo(conexao):
+    """Lê todos os registros, na ordem de inserção (mesmo formato do carregar_dados)."""
+    with conexao:
+        conexao.execute("BEGIN")  # Uma leitura só: geração e registros da mesma gravação
+        return {
+            "geracao": ler_geracao(conexao),
+            "pacientes": [json.loads(d) for (d,) in conexao.execute("SELECT dados FROM pacientes ORDER BY rowid")],
+            "agendamentos": [json.loads(d) for (d,) in conexao.execute("SELECT dados FROM agendamentos ORDER BY id")],
+            "removidos": dict(conexao.execute("SELECT cpf, seq FROM removidos")),
+        }
+
+# NOVO: O menu não carrega o banco inteiro. As consultas encerradas antes do
+# começo do mês (a mesma regra do arquivo morto do JSON) ficam só no banco e
+# são lidas pelos índices quando uma busca chega nelas (HistoricoSQLite).
+STATUS_ENCERRADOS = ("Atendimento Realizado", "Cancelado")
+
+def carregar_ativos(conexao, limite):
+    """Como carregar_tudo, sem as consultas encerradas antes de 'limite' ('AAAA-MM-DD')."""
+    with conexao:
+        conexao.execute("BEGIN")
+        # Só as linhas que ficam são decodificadas (o JSON das outras nem é lido)
+        cursor = conexao.execute(
+            "SELECT dados FROM agendamentos WHERE status IS NULL OR status NOT IN (?, ?)"
+            " OR data_consulta IS NULL OR data_consulta >= ? ORDER BY id", (*STATUS_ENCERRADOS, limite))
+        return {
+            "geracao": ler_geracao(conexao),
+            "pacientes": [json.loads(d) for (d,) in conexao.execute("SELECT dados FROM pacientes ORDER BY rowid")],
+            "agendamentos": [json.loads(d) for (d,) in cursor],
+            "removidos": dict(conexao.execute("SELECT cpf, seq FROM removidos")),
+        }
+
+# NOVO: Para as réplicas (pelos índices de Seq, sem ler o resto do banco)
+def alteracoes_desde(conexao, desde):
+    """Registros com Seq maior que 'desde' e CPFs removidos depois dela (mesmo formato do carregar_tudo)."""
+    limite = desde if desde > 0 else -1  # 0: tudo, inclusive os registros de antes do Seq (Seq 0)
+    with conexao:
+        conexao.execute("BEGIN")
+        return {
+            "geracao": ler_geracao(conexao),
+            "pacientes": [json.loads(d) for (d,) in conexao.execute(
+                "SELECT dados FROM pacientes WHERE json_extract(dados, '$.Seq') > ?", (limite,))],
+            "agendamentos": [json.loads(d) for (d,) in conexao.execute(
+                "SELECT dados FROM agendamentos WHERE json_extract(dados, '$.Seq') > ?", (limite,))],
+            "removidos": dict(conexao.execute("SELECT cpf, seq FROM removidos WHERE seq > ?", (limite,))),
+        }
+
+def buscar_paciente(conexao, cpf):
+    """Retorna o paciente com o CPF (pela chave primária), senão None."""
+    linha = conexao.execute("SELECT dados FROM pacientes WHERE cpf = ?", (cpf,)).fetchone()
+    return json.loads(linha[0]) if linha else None
+
+def agendamentos_do_cpf(conexao, cpf):
+    """Todos os agendamentos de um CPF, ordenados por data e hora."""
+    cursor = conexao.execute(
+        "SELECT dados FROM agendamentos WHERE cpf = ? ORDER BY data_consulta, horario", (cpf,)
+    )
+    return [json.loads(d) for (d,) in cursor]
+
+def agendamentos_com_status(conexao, status):
+    """Todos os agendamentos com um status, ordenados por data e hora."""
+    cursor = conexao.execute(
+        "SELECT dados FROM agendamentos WHERE status = ? ORDER BY data_consulta, horario", (status,)
+    )
+    return [json.loads(d) for (d,) in cursor]
+
+def agendamentos_do_medico(conexao, medico, data_inicio, data_fim, status=None):
+    """Agendamentos de um médico entre duas datas (inclusive), opcionalmente por status.
+
+    Ex: consultas 'Ativo' do Dr. Bruno Costa na próxima semana. Usa o índice
+    (medico, status, data_consulta).
+    """
+    sql = "SELECT dados FROM agendamentos WHERE medico = ?"
+    parametros = [medico]
+    if status is not None:
+        sql += " AND status = ?"
+        parametros.append(status)
+    sql += " AND data_consulta BETWEEN ? AND ? ORDER BY data_consulta, horario"
+    parametros += [data_iso(data_inicio), data_iso(data_fim)]
+    return [json.loads(d) for (d,) in conexao.execute(sql, parametros)]
+
+def agendamentos_do_profissional(conexao, medico=None, especializacao=None, status=None):
+    """Todos os agendamentos de um médico ou de uma especialidade (opcionalmente por status).
+
+    Usa os índices (medico, status, data_consulta) e (especializacao, data_consulta);
+    a especialidade é comparada como está gravada.
+    """
+    if medico is not None:
+        sql, parametros = "SELECT dados FROM agendamentos WHERE medico = ?", [medico]
+    else:
+        sql, parametros = "SELECT dados FROM agendamentos WHERE especializacao = ?", [especializacao]
+    if status is not None:
+        sql += " AND status = ?"
+        parametros.append(status)
+    sql += " ORDER BY data_consulta, horario, id"
+    return [json.loads(d) for (d,) in conexao.execute(sql, parametros)]
+
+def agendamentos_da_especializacao(conexao, especializacao, data_inicio, data_fim):
+    """Agendamentos de uma especialidade entre duas datas (índice especializacao, data_consulta).
+
+    A especialidade é comparada como está gravada (ex: 'Cardiologista').
+    """
+    cursor = conexao.execute(
+        "SELECT dados FROM agendamentos WHERE especializacao = ? AND data_consulta BETWEEN ? AND ?"
+        " ORDER BY data_consulta, horario, id",
+        (especializacao, data_iso(data_inicio), data_iso(data_fim)),
+    )
+    return [json.loads(d) for (d,) in cursor]
+
+def agendamentos_entre(conexao, data_inicio, data_fim):
+    """Agendamentos de todos os médicos entre duas datas (inclusive), por data e hora."""
+    cursor = conexao.execute(
+        "SELECT dados FROM agendamentos WHERE data_consulta BETWEEN ? AND ? ORDER BY data_consulta, horario, id",
+        (data_iso(data_inicio), data_iso(data_fim)),
+    )
+    return [json.loads(d) for (d,) in cursor]
+
+
+# NOVO: Mesmas consultas do RepositorioClinica, mas direto no banco. Usado pela
+# linha de comando: um 'paciente get' não precisa carregar os outros registros.
+class ConsultaSQLite:
+    """Leitura sob demanda com a mesma interface de busca do RepositorioClinica."""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def buscar_paciente(self, cpf):
+        return buscar_paciente(self.conexao, cpf)
+
+    def agendamentos_do_cpf(self, cpf, historico=True):
+        return agendamentos_do_cpf(self.conexao, cpf)  # No banco o histórico está sempre junto
+
+    def agendamentos_ordenados_por_status(self, status):
+        return agendamentos_com_status(self.conexao, status)
+
+    def agendamentos_entre(self, data_inicio, data_fim, medico=None, especializacao=None):
+        if medico is not None:
+            return agendamentos_do_medico(self.conexao, medico, data_inicio, data_fim)
+        if especializacao is not None:
+            return agendamentos_da_especializacao(self.conexao, especializacao, data_inicio, data_fim)
+        return agendamentos_entre(self.conexao, data_inicio, data_fim)
+
+    def agendamentos_do_profissional(self, medico=None, especializacao=None, status=None):
+        return agendamentos_do_profissional(self.conexao, medico, especializacao, status)
+
+
+# NOVO: O que o carregar_ativos deixou no banco, com a interface do
+# ArquivoHistorico (o RepositorioClinica junta com o que está na memória).
+class HistoricoSQLite:
+    """Consultas encerradas antes de 'limite' ('AAAA-MM-DD'), lidas do banco sob demanda."""
+
+    def __init__(self, conexao, limite):
+        self.conexao = conexao
+        self.limite = limite
+        self._meses = None
+
+    def recarregar(self):
+        self._meses = None
+
+    @property
+    def ultimo_id(self):
+        """Maior ID do banco inteiro (IDs novos nunca reaproveitam um ID do histórico)."""
+        return self.conexao.execute("SELECT COALESCE(MAX(id), 0) FROM agendamentos").fetchone()[0]
+
+    @property
+    def meses(self):
+        if self._meses is None:
+            # Só o índice (status, data_consulta), sem ler os registros
+            self._meses = [mes for (mes,) in self.conexao.execute(
+                "SELECT DISTINCT substr(data_consulta, 1, 7) FROM agendamentos"
+                " WHERE status IN (?, ?) AND data_consulta < ? ORDER BY 1", (*STATUS_ENCERRADOS, self.limite))]
+        return self._meses
+
+    def _encerrados(self, condicao, parametros):
+        cursor = self.conexao.execute(
+            "SELECT dados FROM agendamentos WHERE status IN (?, ?) AND data_consulta < ? AND " + condicao
+            + " ORDER BY data_consulta, horario, id", (*STATUS_ENCERRADOS, self.limite, *parametros))
+        return [json.loads(d) for (d,) in cursor]
+
+    def agendamentos_do_cpf(self, cpf):
+        return self._encerrados("cpf = ?", (cpf,))
+
+    def agendamentos_dos_meses(self, primeiro_mes, ultimo_mes):
+        """De 'AAAA-MM' a 'AAAA-MM' (inclusive), em ordem de data e hora."""
+        return self._encerrados("data_consulta BETWEEN ? AND ?", (primeiro_mes + "-01", ultimo_mes + "-31"))
+
+
+# --- Gravação ---
+
+def _atualizar_dados(conexao, tabela, chave, valor, campos):
+    linha = conexao.execute(f"SELECT dados FROM {tabela} WHERE {chave} = ?", (valor,)).fetchone()
+    if linha is None:
+        return None
+    registro = json.loads(linha[0])
+    registro.update(campos)
+    return registro
+
+def aplicar_alteracoes(conexao, alteracoes, geracao_lida=None):
+    """Aplica as alterações pendentes do repositório numa única transação.
+
+    Retorna (nova geração, desatualizado). 'desatualizado' indica que outro
+    processo gravou depois de geracao_lida: as alterações foram aplicadas por
+    cima do que ele gravou e quem chamou deve recarregar os dados. Sem
+    geracao_lida (réplicas), os agendamentos novos mantêm o ID que trazem.
+    """
+    with conexao:
+        # IMMEDIATE: trava a escrita já na leitura da geração (nada grava no meio)
+        conexao.execute("BEGIN IMMEDIATE")
+        geracao = ler_geracao(conexao)
+        desatualizado = geracao_lida is not None and geracao != geracao_lida
+        seq = geracao + 1  # NOVO: Seq dos registros alterados neste lote
+        novos_ids = {}
+        for alteracao in alteracoes:
+            op = alteracao["op"]
+            if op in ("+paciente", "+agendamento"):
+                alteracao["registro"]["Seq"] = seq
+            elif op in ("~paciente", "~agendamento"):
+                alteracao["campos"]["Seq"] = seq
+            if op == "+agendamento" and desatualizado:
+                # O mesmo ID pode ter sido usado por outro processo: pega o próximo livre
+                registro = alteracao["registro"]
+                if conexao.execute("SELECT 1 FROM agendamentos WHERE id = ?", (registro["ID"],)).fetchone():
+                    novos_ids[registro["ID"]] = conexao.execute("SELECT MAX(id) + 1 FROM agendamentos").fetchone()[0]
+                    registro["ID"] = novos_ids[registro["ID"]]
+            elif op == "~agendamento" and alteracao["id"] in novos_ids:
+                alteracao["id"] = novos_ids[alteracao["id"]]
+
+            if op == "+paciente":
+                conexao.execute(SQL_INSERIR_PACIENTE, linha_paciente(alteracao["registro"]))
+                conexao.execute("DELETE FROM removidos WHERE cpf = ?", (alteracao["registro"]["CPF"],))
+            elif op == "~paciente":
+                paciente = _atualizar_dados(conexao, "pacientes", "cpf", alteracao["cpf"], alteracao["campos"])
+                if paciente is not None:
+                    # UPDATE (e não REPLACE) para manter a ordem original dos registros
+                    conexao.execute(
+                        "UPDATE pacientes SET cpf = ?, nome = ?, dados = ? WHERE cpf = ?",
+                        linha_paciente(paciente) + (alteracao["cpf"],),
+                    )
+                    if paciente["CPF"] != alteracao["cpf"]:
+                        # Para as réplicas, o CPF antigo foi excluído
+                        conexao.execute(SQL_REMOVIDO, (alteracao["cpf"], seq))
+                        conexao.execute("DELETE FROM removidos WHERE cpf = ?", (paciente["CPF"],))
+            elif op == "-paciente":
+                alteracao["seq"] = seq
+                conexao.execute("DELETE FROM pacientes WHERE cpf = ?", (alteracao["cpf"],))
+                conexao.execute(SQL_REMOVIDO, (alteracao["cpf"], seq))
+            elif op == "+agendamento":
+                conexao.execute(SQL_INSERIR_AGENDAMENTO, linha_agendamento(alteracao["registro"]))
+            elif op == "~agendamento":
+                ag = _atualizar_dados(conexao, "agendamentos", "id", alteracao["id"], alteracao["campos"])
+                if ag is not None:
+                    conexao.execute(SQL_INSERIR_AGENDAMENTO, linha_agendamento(ag))
+        if alteracoes:
+            geracao += 1
+            _gravar_geracao(conexao, geracao)
+    return geracao, desatualizado
+
+
+if __name__ == "__main__":
+    # Migração manual: python armazenamento_sqlite.py
+    import projeto_cac
+    projeto_cac.migrar_para_sqlite()
@@ -0,0 +1,196 @@
+import copy
+import json
+import os
+from pathlib import Path
+
+# NOVO: Arquivo morto para o projeto_cac.py (ativado com USAR_ARQUIVO_MORTO).
+# Consultas encerradas de meses que já acabaram saem do clinica_dados.json e
+# vão para partições por mês da DataConsulta, que depois não mudam mais:
+#
+#   clinica_dados_arquivo/indice.json          {"ultimo_id": ..., "versao": 2, "meses": {"2024-05": qtd},
+#                                                "partes": {"2024-05": ["2024-05", "2024-05.2"]}}
+#   clinica_dados_arquivo/2024-05.json         agendamentos arquivados do mês
+#   clinica_dados_arquivo/2024-05.cpfs.json    CPFs que aparecem nessa partição
+#   clinica_dados_arquivo/2024-05.2.json       (+ .cpfs) o que foi arquivado do mês depois
+#
+# ALTERADO: Cada arquivamento grava partições novas (um encerramento atrasado
+# de maio vira 2024-05.2) em vez de regravar as do mês: o que está no índice
+# nunca é reescrito. Índices sem "partes" são do formato antigo (uma partição
+# por mês, com o nome do mês).
+#
+# Nada disso é lido na carga (só o indice.json, que é pequeno). Uma busca de
+# histórico por CPF lê os arquivos .cpfs.json e abre só as partições em que
+# o CPF aparece.
+#
+# NOVO: O índice guarda a versão do formato dos registros (a mesma do arquivo
+# principal); migrar() regrava as partições de uma versão antiga uma vez só.
+
+NOME_INDICE = "indice.json"
+MAXIMO_PARTICOES_EM_MEMORIA = 12
+
+
+def mes_da_consulta(ag):
+    """'DD/MM/AAAA' -> 'AAAA-MM' (o nome da partição)."""
+    data = ag["DataConsulta"]
+    return f"{data[6:10]}-{data[3:5]}"
+
+def gravar_json_atomico(caminho, objeto):
+    """Grava num temporário e troca de nome: quem lê vê o arquivo antigo ou o novo, nunca pela metade."""
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        # default=dict: aceita também os registros compactos (Paciente/Agendamento)
+        json.dump(objeto, f, ensure_ascii=False, separators=(",", ":"), default=dict)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class ArquivoHistorico:
+    """Partições mensais (só leitura depois de gravadas) com índice de CPFs por mês."""
+
+    def __init__(self, pasta, versao=1):
+        self.pasta = Path(pasta)
+        self._versao_nova = versao  # Versão de um índice criado agora (ainda sem partições)
+        self.recarregar()
+
+    def recarregar(self):
+        """Relê o índice (outro processo pode ter arquivado meses novos)."""
+        caminho = self.pasta / NOME_INDICE
+        if caminho.exists():
+            with open(caminho, "r", encoding="utf-8") as f:
+                self.indice = json.load(f)
+        else:
+            self.indice = {"ultimo_id": 0, "versao": self._versao_nova, "meses": {}}
+        self._meses_por_cpf = None  # CPF -> [meses], montado na primeira busca
+        self._particoes = {}        # mês -> (agendamentos, CPF -> [agendamentos])
+
+    @property
+    def ultimo_id(self):
+        """Maior ID já arquivado (IDs novos nunca reaproveitam um ID antigo)."""
+        return self.indice["ultimo_id"]
+
+    @property
+    def versao(self):
+        """Versão do formato dos registros arquivados (índices sem o campo são da 1)."""
+        return self.indice.get("versao", 1)
+
+    @property
+    def meses(self):
+        return sorted(self.indice["meses"])
+
+    def partes(self, mes):
+        """Nomes das partições gravadas de um mês, na ordem em que foram arquivadas."""
+        return self.indice.get("partes", {}).get(mes, [mes])
+
+    def _arquivo_particao(self, parte):
+        return self.pasta / f"{parte}.json"
+
+    def _arquivo_cpfs(self, parte):
+        return self.pasta / f"{parte}.cpfs.json"
+
+    def _ler_particao(self, parte):
+        caminho = self._arquivo_particao(parte)
+        if not caminho.exists():
+            return []
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _ler_mes(self, mes):
+        agendamentos = []
+        for parte in self.partes(mes):
+            agendamentos.extend(self._ler_particao(parte))
+        if len(self.partes(mes)) > 1:
+            agendamentos.sort(key=lambda ag: (ag["InicioTS"], ag["ID"]))
+        return agendamentos
+
+    def particao(self, mes):
+        """(agendamentos, CPF -> agendamentos) de um mês, lidos do disco uma vez só."""
+        if mes not in self._particoes:
+            if len(self._particoes) >= MAXIMO_PARTICOES_EM_MEMORIA:
+                del self._particoes[next(iter(self._particoes))]  # Descarta a mais antiga
+            agendamentos = self._ler_mes(mes)
+            por_cpf = {}
+            for ag in agendamentos:
+                por_cpf.setdefault(ag.get("CPF"), []).append(ag)
+            self._particoes[mes] = (agendamentos, por_cpf)
+        return self._particoes[mes]
+
+    def meses_do_cpf(self, cpf):
+        """Partições em que o CPF aparece (pelos índices de CPF, sem abrir as partições)."""
+        if self._meses_por_cpf is None:
+            self._meses_por_cpf = {}
+            for mes in self.meses:
+                cpfs = set()
+                for parte in self.partes(mes):
+                    with open(self._arquivo_cpfs(parte), "r", encoding="utf-8") as f:
+                        cpfs.update(json.load(f))
+                for cpf_do_mes in cpfs:
+                    self._meses_por_cpf.setdefault(cpf_do_mes, []).append(mes)
+        return self._meses_por_cpf.get(cpf, [])
+
+    # Consultas
+    def agendamentos_do_cpf(self, cpf):
+        resultado = []
+        for mes in self.meses_do_cpf(cpf):
+            resultado.extend(self.particao(mes)[1].get(cpf, []))
+        return resultado
+
+    def agendamentos_dos_meses(self, primeiro_mes, ultimo_mes):
+        """Agendamentos arquivados de 'AAAA-MM' a 'AAAA-MM' (inclusive), em ordem de data e hora."""
+        resultado = []
+        for mes in self.meses:
+            if primeiro_mes <= mes <= ultimo_mes:
+                resultado.extend(self.particao(mes)[0])
+        return resultado
+
+    # Gravação
+    def arquivar(self, agendamentos):
+        """Grava os agendamentos numa partição nova de cada mês (as já gravadas não mudam)."""
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        por_mes = {}
+        for ag in agendamentos:
+            por_mes.setdefault(mes_da_consulta(ag), []).append(ag)
+
+        # Numa cópia: se cair no meio, o índice em memória continua igual ao do disco
+        indice = copy.deepcopy(self.indice)
+        partes = indice.setdefault("partes", {})
+        for mes, novos in sorted(por_mes.items()):
+            if mes in indice["meses"]:
+                # Já arquivados (queda depois do índice e antes de limpar o arquivo principal)
+                ja_arquivados = {ag["ID"] for ag in self.particao(mes)[0]}
+                novos = [ag for ag in novos if ag["ID"] not in ja_arquivados]
+                if not novos:
+                    continue
+                nomes = partes.setdefault(mes, self.partes(mes))
+                parte = f"{mes}.{len(nomes) + 1}"
+            else:
+                nomes = partes.setdefault(mes, [])
+                parte = mes
+            # Uma partição fora do índice é sobra de uma gravação interrompida: pode ser sobrescrita
+            registros = sorted(novos, key=lambda ag: (ag["InicioTS"], ag["ID"]))
+            gravar_json_atomico(self._arquivo_particao(parte), registros)
+            gravar_json_atomico(self._arquivo_cpfs(parte), sorted({ag.get("CPF") for ag in registros if ag.get("CPF")}))
+            nomes.append(parte)
+            indice["meses"][mes] = indice["meses"].get(mes, 0) + len(registros)
+
+        # O índice por último: até aqui, uma queda deixa os registros ainda no
+        # arquivo principal (a próxima tentativa grava as mesmas partições de novo)
+        indice["ultimo_id"] = max([self.ultimo_id] + [ag["ID"] for ag in agendamentos])
+        gravar_json_atomico(self.pasta / NOME_INDICE, indice)
+        self.indice = indice
+        self._meses_por_cpf = None
+        for mes in por_mes:
+            self._particoes.pop(mes, None)
+
+    # NOVO: Migração de versão (quem chama segura a trava do arquivo de dados)
+    def migrar(self, migrar_agendamento, versao):
+        """Regrava cada partição com os agendamentos migrados e marca a versão no índice."""
+        for mes in self.meses:
+            for parte in self.partes(mes):
+                registros = [migrar_agendamento(ag) for ag in self._ler_particao(parte)]
+                gravar_json_atomico(self._arquivo_particao(parte), registros)
+        # O índice por último: uma queda no meio só faz a próxima carga migrar de novo
+        # (os passos aceitam registros que já estão na versão nova)
+        self.indice["versao"] = versao
+        gravar_json_atomico(self.pasta / NOME_INDICE, self.indice)
+        self._particoes = {}
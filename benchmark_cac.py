@@ -0,0 +1,377 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+
+import projeto_cac
+
+# NOVO: Benchmark da clínica com dados sintéticos (sempre os mesmos para a
+# mesma semente). Passa pelas funções de verdade do projeto_cac.py e grava
+# tempo e pico de memória de cada operação num JSON, para comparar versões.
+#
+# Uso: python benchmark_cac.py [--escalas 10000 100000 1000000] [--semente 42]
+#                              [--saida resultados.json] [--comparar anterior.json]
+#                              [--sem-memoria]
+
+ESCALAS_PADRAO = (10_000, 100_000, 1_000_000)
+SEMENTE_PADRAO = 42
+AGENDAMENTOS_POR_PACIENTE = 4
+PROPORCAO_LEGADO = 0.05    # registros antigos, só com 'Especialista'
+PROPORCAO_AVULSOS = 0.05   # agendamentos de quem não tem cadastro
+BUSCAS_NA_LISTA = 100      # a busca linear é lenta, então poucas chamadas
+BUSCAS_NO_INDICE = 10_000
+LIMITE_REGRESSAO = 1.20    # 20% mais lento já é sinalizado na comparação
+
+NOMES = [
+    "Ana", "Bruno", "Carla", "Diogo", "Eduarda", "Felipe", "Gabriela", "Heitor",
+    "Isabela", "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael",
+    "Sofia", "Thiago", "Valéria", "Wesley",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Ferreira",
+    "Almeida", "Gonçalves", "Ribeiro", "Carvalho", "Mendes", "Nunes", "Rocha", "Paulista",
+]
+# (Estado, Cidade, DDD)
+CIDADES = [
+    ("SP", "São Paulo", "11"), ("SP", "Campinas", "19"), ("RJ", "Rio De Janeiro", "21"),
+    ("MG", "Belo Horizonte", "31"), ("PR", "Curitiba", "41"), ("PR", "Maringá", "44"),
+    ("PR", "Corumbataí Do Sul", "44"), ("SC", "Florianópolis", "48"), ("RS", "Porto Alegre", "51"),
+    ("BA", "Salvador", "71"), ("PE", "Recife", "81"), ("CE", "Fortaleza", "85"),
+    ("GO", "Goiânia", "62"), ("DF", "Brasília", "61"), ("AM", "Manaus", "92"), ("PA", "Belém", "91"),
+]
+RUAS = ["Rua Das Flores", "Avenida Brasil", "Rua XV De Novembro", "Estrada Paraíso", "Rua Sete De Setembro"]
+# Status com pesos parecidos com os de uma clínica real
+STATUS = ["Ativo", "Atendimento Realizado", "Cancelado"]
+PESOS_STATUS = [50, 35, 15]
+
+
+# --- Gerador de dados sintéticos ---
+
+def gerar_cpf(rng):
+    """CPF aleatório com dígitos verificadores válidos."""
+    digitos = [rng.randrange(10) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * (tamanho + 1 - i) for i, d in enumerate(digitos))
+        digitos.append(soma * 10 % 11 % 10)
+    return "".join(map(str, digitos))
+
+def gerar_cpfs_unicos(quantidade, rng):
+    cpfs = set()
+    while len(cpfs) < quantidade:
+        cpf = gerar_cpf(rng)
+        if len(set(cpf)) > 1:  # Descarta 000.000.000-00, 111.111.111-11, ...
+            cpfs.add(cpf)
+    return sorted(cpfs, key=lambda _: rng.random())
+
+def gerar_nome(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+def gerar_data(rng, inicio, dias):
+    return date.fromordinal(inicio.toordinal() + rng.randrange(dias)).strftime("%d/%m/%Y")
+
+def gerar_carimbo(rng, inicio, dias):
+    """Data e hora no formato das colunas DataCadastro/DataAgendamento."""
+    return f"{gerar_data(rng, inicio, dias)} às {rng.randrange(8, 19):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+
+def gerar_pacientes(cpfs, rng):
+    pacientes = []
+    for cpf in cpfs:
+        estado, cidade, ddd = rng.choice(CIDADES)
+        pacientes.append({
+            "NomeCompleto": gerar_nome(rng),
+            "CPF": cpf,
+            "Data de Nascimento": gerar_data(rng, date(1940, 1, 1), 365 * 80),
+            "Estado": estado,
+            "Cidade": cidade,
+            "Endereço": f"{rng.choice(RUAS)}, {rng.randrange(1, 3000)}",
+            "DDD": ddd,
+            "Telefone": f"9{rng.randrange(10 ** 8):08d}",
+            "DataCadastro": gerar_carimbo(rng, date(2024, 1, 1), 365),
+            "UltimaModificacao": gerar_carimbo(rng, date(2025, 1, 1), 365),
+        })
+    return pacientes
+
+def gerar_agendamentos(quantidade, pacientes, cpfs_avulsos, rng):
+    """Agendamentos misturando status, pacientes avulsos e registros antigos."""
+    abertura = projeto_cac.minutos_do_dia(projeto_cac.HORARIO_ABERTURA)
+    fechamento = projeto_cac.minutos_do_dia(projeto_cac.HORARIO_FECHAMENTO)
+    passo = projeto_cac.GRANULARIDADE_MINUTOS
+    agendamentos = []
+    for i in range(quantidade):
+        if cpfs_avulsos and rng.random() < PROPORCAO_AVULSOS:
+            nome, cpf, cadastrado = gerar_nome(rng), rng.choice(cpfs_avulsos), False
+        else:
+            paciente = rng.choice(pacientes)
+            nome, cpf, cadastrado = paciente["NomeCompleto"], paciente["CPF"], True
+        inicio = rng.randrange(abertura, fechamento - projeto_cac.DURACAO_PADRAO_MINUTOS, passo)
+        status = rng.choices(STATUS, PESOS_STATUS)[0]
+        if status == "Atendimento Realizado":
+            fim = inicio + rng.randrange(15, 61, passo)
+            hora_final = f"{fim // 60:02d}:{fim % 60:02d}"
+        else:
+            hora_final = "N/A"
+        profissional = rng.choice(projeto_cac.PROFISSIONAIS)
+
+        ag = {
+            "NomeCompleto": nome,
+            "CPF": cpf,
+            "PacienteCadastrado": cadastrado,
+            "DataConsulta": gerar_data(rng, date(2025, 1, 1), 730),
+        }
+        if rng.random() < PROPORCAO_LEGADO:
+            # Formato antigo: só a especialidade, sem médico
+            ag["Especialista"] = profissional["especializacao"]
+        else:
+            ag["Medico"] = profissional["nome"]
+            ag["Especializacao"] = profissional["especializacao"]
+        ag["HorarioInicio"] = f"{inicio // 60:02d}:{inicio % 60:02d}"
+        ag["HoraFinal"] = hora_final
+        ag["DataAgendamento"] = gerar_carimbo(rng, date(2024, 6, 1), 365)
+        ag["Status"] = status
+        ag["ID"] = i + 1
+        agendamentos.append(ag)
+    return agendamentos
+
+def gerar_dados(quantidade_agendamentos, semente=SEMENTE_PADRAO):
+    """Pacientes e agendamentos sintéticos, no mesmo formato do clinica_dados.json."""
+    rng = random.Random(semente)
+    quantidade_pacientes = max(1, quantidade_agendamentos // AGENDAMENTOS_POR_PACIENTE)
+    quantidade_avulsos = int(quantidade_pacientes * PROPORCAO_AVULSOS)
+    cpfs = gerar_cpfs_unicos(quantidade_pacientes + quantidade_avulsos, rng)
+    pacientes = gerar_pacientes(cpfs[:quantidade_pacientes], rng)
+    agendamentos = gerar_agendamentos(quantidade_agendamentos, pacientes, cpfs[quantidade_pacientes:], rng)
+    return {"pacientes": pacientes, "agendamentos": agendamentos}
+
+
+# --- Medição ---
+
+def medir(executar, preparar=None, chamadas=1, memoria=True):
+    """Roda 'executar' e devolve (resultado, {segundos, pico_mb, ...}).
+
+    O pico de memória (tracemalloc) é medido numa rodada separada, antes da
+    cronometrada, porque o rastreamento deixa o Python bem mais lento.
+    'preparar' monta a entrada de novo para cada rodada (para operações que
+    alteram os registros, como montar o repositório).
+    """
+    medida = {"chamadas": chamadas}
+    if memoria:
+        entrada = preparar() if preparar else None
+        gc.collect()
+        tracemalloc.start()
+        resultado = executar(entrada) if preparar else executar()
+        atual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del resultado, entrada
+        medida["pico_mb"] = round(pico / 1024 ** 2, 2)
+        medida["retido_mb"] = round(atual / 1024 ** 2, 2)
+
+    entrada = preparar() if preparar else None
+    gc.collect()
+    inicio = time.perf_counter()
+    resultado = executar(entrada) if preparar else executar()
+    segundos = time.perf_counter() - inicio
+    medida["segundos"] = round(segundos, 6)
+    if chamadas > 1:
+        medida["por_chamada_us"] = round(segundos / chamadas * 1e6, 3)
+    return resultado, medida
+
+def cpfs_para_busca(pacientes, quantidade, rng):
+    """CPFs para buscar: 90% existentes e 10% que não estão cadastrados."""
+    cpfs = [rng.choice(pacientes)["CPF"] for _ in range(quantidade)]
+    for i in range(0, quantidade, 10):
+        cpfs[i] = gerar_cpf(rng)
+    return cpfs
+
+@contextlib.contextmanager
+def configuracao(**valores):
+    """Troca constantes do projeto_cac durante o bloco (e restaura depois)."""
+    antigos = {nome: getattr(projeto_cac, nome) for nome in valores}
+    for nome, valor in valores.items():
+        setattr(projeto_cac, nome, valor)
+    try:
+        yield
+    finally:
+        for nome, valor in antigos.items():
+            setattr(projeto_cac, nome, valor)
+
+def executar_escala(quantidade, semente, pasta, memoria=True):
+    """Roda todas as operações numa escala e devolve as medidas."""
+    operacoes = {}
+    rng = random.Random(semente + 1)
+
+    inicio = time.perf_counter()
+    dados = gerar_dados(quantidade, semente)
+    geracao = time.perf_counter() - inicio
+    resumo = {"pacientes": len(dados["pacientes"]), "agendamentos": len(dados["agendamentos"]),
+              "geracao_segundos": round(geracao, 3)}
+
+    arquivo = Path(pasta) / f"clinica_{quantidade}.json"
+    with configuracao(ARQUIVO_DADOS=arquivo, USAR_JOURNAL=False, USAR_SQLITE=False,
+                      USAR_REGISTROS_COMPACTOS=False):
+        # ALTERADO: Os dados gerados estão no formato antigo (versão 1, sem
+        # "versao"): mede a migração do arquivo, que roda uma vez só
+        def gravar_versao_antiga():
+            with open(arquivo, "w", encoding="utf-8") as f:
+                json.dump({"geracao": 0, **dados}, f, ensure_ascii=False, indent=4)
+        def migrar(_):
+            with contextlib.redirect_stdout(io.StringIO()):
+                projeto_cac.migrar_arquivo_de_dados()
+        _, operacoes["migrar_dados"] = medir(migrar, preparar=gravar_versao_antiga, memoria=memoria)
+        del dados
+
+        dados, operacoes["carregar_dados"] = medir(projeto_cac.carregar_dados, memoria=memoria)
+        _, operacoes["salvar_dados"] = medir(
+            lambda: projeto_cac.salvar_dados(dados["pacientes"], dados["agendamentos"]), memoria=memoria)
+        resumo["arquivo_mb"] = round(arquivo.stat().st_size / 1024 ** 2, 2)
+
+        # Ordenação com as datas ainda em texto (como antes da normalização)
+        _, operacoes["ordenar_agendamentos_texto"] = medir(
+            lambda: sorted(dados["agendamentos"], key=projeto_cac.get_sort_key_agendamento), memoria=memoria)
+        del dados
+
+        def montar(dados_carregados):
+            return projeto_cac.RepositorioClinica(dados_carregados["pacientes"], dados_carregados["agendamentos"])
+        repo, operacoes["montar_repositorio"] = medir(montar, preparar=projeto_cac.carregar_dados, memoria=memoria)
+
+        _, operacoes["ordenar_agendamentos"] = medir(
+            lambda: sorted(repo.agendamentos, key=projeto_cac.get_sort_key_agendamento), memoria=memoria)
+
+        cpfs = cpfs_para_busca(repo.pacientes, BUSCAS_NA_LISTA, rng)
+        _, operacoes["buscar_paciente_por_cpf_lista"] = medir(
+            lambda: [projeto_cac.buscar_paciente_por_cpf(cpf, repo.pacientes) for cpf in cpfs],
+            chamadas=len(cpfs), memoria=memoria)
+        cpfs = cpfs_para_busca(repo.pacientes, BUSCAS_NO_INDICE, rng)
+        _, operacoes["buscar_paciente_por_cpf_indice"] = medir(
+            lambda: [projeto_cac.buscar_paciente_por_cpf(cpf, repo) for cpf in cpfs],
+            chamadas=len(cpfs), memoria=memoria)
+
+        def listar(status, tamanho_pagina):
+            # A saída vai para um buffer: mede a montagem do texto, não o terminal
+            with contextlib.redirect_stdout(io.StringIO()) as saida:
+                projeto_cac.listar_agendamentos_por_status(repo, status, tamanho_pagina=tamanho_pagina, navegar=False)
+            return len(saida.getvalue())
+        for status in STATUS:
+            chave = status.lower().replace(" ", "_")
+            _, operacoes[f"listar_agendamentos_por_status_{chave}"] = medir(
+                lambda: listar(status, projeto_cac.TAMANHO_PAGINA), memoria=memoria)
+        # Listagem inteira de uma vez (o comportamento antigo, sem paginação)
+        _, operacoes["listar_agendamentos_por_status_ativo_completo"] = medir(
+            lambda: listar("Ativo", max(1, len(repo.agendamentos_ordenados_por_status("Ativo")))), memoria=memoria)
+        del repo
+
+    with configuracao(ARQUIVO_DADOS=arquivo, USAR_JOURNAL=False, USAR_SQLITE=False,
+                      USAR_REGISTROS_COMPACTOS=True):
+        _, operacoes["carregar_dados_registros_compactos"] = medir(projeto_cac.carregar_dados, memoria=memoria)
+
+    # NOVO: Snapshot binário (mesmos registros, mesmo arquivo)
+    with configuracao(ARQUIVO_DADOS=arquivo, USAR_JOURNAL=False, USAR_SQLITE=False,
+                      USAR_REGISTROS_COMPACTOS=False, USAR_SNAPSHOT_BINARIO=True):
+        for comprimir, sufixo in ((False, ""), (True, "_comprimido")):
+            with configuracao(COMPRIMIR_SNAPSHOT=comprimir):
+                dados = projeto_cac.carregar_dados()
+                _, operacoes[f"salvar_dados_binario{sufixo}"] = medir(
+                    lambda: projeto_cac.salvar_dados(dados["pacientes"], dados["agendamentos"]), memoria=memoria)
+                resumo[f"arquivo_binario{sufixo}_mb"] = round(arquivo.stat().st_size / 1024 ** 2, 2)
+                del dados
+                _, operacoes[f"carregar_dados_binario{sufixo}"] = medir(projeto_cac.carregar_dados, memoria=memoria)
+
+    for sobra in arquivo.parent.glob(arquivo.name + ".*"):
+        sobra.unlink()  # Cópias de segurança deixadas pela migração e pelo salvar_dados
+    arquivo.unlink()
+    resumo["operacoes"] = operacoes
+    return resumo
+
+
+# --- Resultados ---
+
+def versao_do_codigo():
+    """Commit atual do git (ou None fora de um repositório)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir_escala(quantidade, resumo):
+    print(f"\n📊 {quantidade} agendamentos / {resumo['pacientes']} pacientes "
+          f"(arquivo: {resumo['arquivo_mb']} MB, geração: {resumo['geracao_segundos']} s)")
+    for nome, medida in resumo["operacoes"].items():
+        memoria = ""
+        if "pico_mb" in medida:
+            memoria = f" pico {medida['pico_mb']:9.2f} MB  retido {medida['retido_mb']:9.2f} MB"
+        extra = f"  ({medida['por_chamada_us']} µs/chamada)" if "por_chamada_us" in medida else ""
+        print(f"  {nome:<52} {medida['segundos']:10.4f} s{memoria}{extra}")
+
+def comparar_resultados(atual, anterior):
+    """Mostra quanto cada operação mudou em relação a um resultado anterior."""
+    print(f"\n--- Comparação com {anterior.get('versao') or 'resultado anterior'} ---")
+    regressoes = 0
+    for escala, resumo in atual["resultados"].items():
+        antigo = anterior.get("resultados", {}).get(escala)
+        if not antigo:
+            continue
+        print(f"\n{escala} agendamentos")
+        for nome, medida in resumo["operacoes"].items():
+            medida_antiga = antigo["operacoes"].get(nome)
+            if not medida_antiga or not medida_antiga["segundos"]:
+                continue
+            razao = medida["segundos"] / medida_antiga["segundos"]
+            aviso = ""
+            if razao > LIMITE_REGRESSAO:
+                aviso = "  ⚠️ regressão"
+                regressoes += 1
+            print(f"  {nome:<52} {razao:6.2f}x{aviso}")
+    return regressoes
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Benchmark do sistema da clínica com dados sintéticos.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS_PADRAO),
+                        help="quantidades de agendamentos (padrão: 10000 100000 1000000)")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO, help="semente do gerador (padrão: 42)")
+    parser.add_argument("--saida", type=Path, default=Path("benchmark_resultados.json"),
+                        help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", type=Path, help="resultado anterior (JSON) para comparar")
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (mais rápido)")
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    resultado = {
+        "versao": versao_do_codigo(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semente": args.semente,
+        "resultados": {},
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        for quantidade in args.escalas:
+            resumo = executar_escala(quantidade, args.semente, pasta, memoria=not args.sem_memoria)
+            resultado["resultados"][str(quantidade)] = resumo
+            imprimir_escala(quantidade, resumo)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=4, ensure_ascii=False)
+    print(f"\n✅ Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar_resultados(resultado, json.load(f))
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
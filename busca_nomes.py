@@ -0,0 +1,145 @@
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+# NOVO: Busca por nome para o projeto_cac.py, sem acento e sem diferenciar
+# maiúsculas ("goncalves" acha "Gonçalves"), por pedaço ("gon") e tolerando
+# erro de digitação ("goncalvez").
+#
+# O índice tem dois níveis:
+#   - palavra -> chaves dos registros com essa palavra no nome;
+#   - vocabulário (palavras distintas, bem menos que os nomes) ordenado, para
+#     prefixos, e trigrama -> palavras, para a busca aproximada.
+# Uma consulta primeiro acha as palavras do vocabulário parecidas com cada
+# termo e só depois junta os registros, com operações de conjunto.
+#
+# Chave de cada registro: o CPF (str) para pacientes e o ID (int) para
+# agendamentos de quem não tem cadastro.
+
+SIMILARIDADE_MINIMA = 0.4  # Trigramas em comum (Jaccard) para aceitar um erro de digitação
+_SEPARADORES = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto):
+    """Minúsculas, sem acento: 'Gonçalves' -> 'goncalves'."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+def palavras(texto):
+    """Palavras normalizadas de um nome (sem repetir)."""
+    return set(_SEPARADORES.split(normalizar(texto))) - {""}
+
+def trigramas(palavra):
+    marcada = f"${palavra}$"
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+class IndiceNomes:
+    """Índice de nomes com busca por palavra, prefixo e trigramas, ranqueada por semelhança."""
+
+    def __init__(self):
+        self.registros_por_palavra = {}   # palavra -> {chave}
+        self.vocabulario = []             # palavras em ordem (prefixos por busca binária)
+        self.palavras_por_trigrama = {}   # trigrama -> {palavra}
+
+    def __len__(self):
+        return len(self.vocabulario)
+
+    # Manutenção
+    def adicionar(self, chave, nome):
+        for palavra in palavras(nome):
+            registros = self.registros_por_palavra.get(palavra)
+            if registros is None:
+                registros = self.registros_por_palavra[palavra] = set()
+                insort(self.vocabulario, palavra)
+                for trigrama in trigramas(palavra):
+                    self.palavras_por_trigrama.setdefault(trigrama, set()).add(palavra)
+            registros.add(chave)
+
+    def remover(self, chave, nome):
+        for palavra in palavras(nome):
+            registros = self.registros_por_palavra.get(palavra)
+            if registros is None:
+                continue
+            registros.discard(chave)
+            if not registros:
+                # Palavra que ninguém mais usa sai do vocabulário
+                del self.registros_por_palavra[palavra]
+                del self.vocabulario[bisect_left(self.vocabulario, palavra)]
+                for trigrama in trigramas(palavra):
+                    grupo = self.palavras_por_trigrama[trigrama]
+                    grupo.discard(palavra)
+                    if not grupo:
+                        del self.palavras_por_trigrama[trigrama]
+
+    # Busca
+    def semelhantes(self, termo):
+        """{palavra do vocabulário: semelhança de 0 a 1} para um termo da busca."""
+        encontradas = {}
+        # Prefixo: 'gon' -> 'goncalves' (quanto mais do nome foi digitado, maior a nota)
+        i = bisect_left(self.vocabulario, termo)
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(termo):
+            palavra = self.vocabulario[i]
+            encontradas[palavra] = 1.0 if palavra == termo else 0.5 + 0.4 * len(termo) / len(palavra)
+            i += 1
+        # Aproximada: palavras com trigramas suficientes em comum
+        if len(termo) >= 3:
+            do_termo = trigramas(termo)
+            em_comum = {}
+            for trigrama in do_termo:
+                for palavra in self.palavras_por_trigrama.get(trigrama, ()):
+                    em_comum[palavra] = em_comum.get(palavra, 0) + 1
+            for palavra, comuns in em_comum.items():
+                jaccard = comuns / (len(do_termo) + len(palavra) - comuns)  # 'palavra' tem len() trigramas
+                if jaccard >= SIMILARIDADE_MINIMA:
+                    encontradas[palavra] = max(encontradas.get(palavra, 0), 0.8 * jaccard)
+        return encontradas
+
+    def buscar(self, consulta, limite=20):
+        """Até 'limite' (nota, chave), da mais parecida para a menos.
+
+        Todos os termos precisam bater com alguma palavra do nome. A nota é a
+        média da semelhança de cada termo.
+        """
+        termos = palavras(consulta)
+        if not termos:
+            return []
+        # Por termo: faixas (nota, registros), da maior nota para a menor
+        faixas_por_termo = []
+        for termo in termos:
+            por_nota = {}
+            for palavra, nota in self.semelhantes(termo).items():
+                por_nota.setdefault(nota, []).append(self.registros_por_palavra[palavra])
+            if not por_nota:
+                return []
+            faixas_por_termo.append([(nota, set().union(*grupos)) for nota, grupos in sorted(por_nota.items(), reverse=True)])
+
+        # Começa pelo termo mais seletivo e divide os candidatos em grupos de
+        # mesma nota (um registro fica só na melhor faixa de cada termo); tudo
+        # com operações de conjunto, nada registro a registro
+        faixas_por_termo.sort(key=lambda faixas: sum(len(registros) for _, registros in faixas))
+        grupos = [(0.0, set().union(*(registros for _, registros in faixas_por_termo[0])))]
+        for faixas in faixas_por_termo:
+            novos_grupos = []
+            for nota_grupo, registros_grupo in grupos:
+                restantes = registros_grupo
+                for nota, registros in faixas:
+                    batem = restantes & registros
+                    if batem:
+                        novos_grupos.append((nota_grupo + nota, batem))
+                        restantes = restantes - batem
+                        if not restantes:
+                            break
+            grupos = novos_grupos
+
+        resultado = []
+        for nota, registros in sorted(grupos, key=lambda grupo: grupo[0], reverse=True):
+            falta = limite - len(resultado)
+            if falta <= 0:
+                break
+            # Empate: pacientes (CPF) antes dos agendamentos avulsos (ID), em ordem
+            cpfs = heapq.nsmallest(falta, (chave for chave in registros if isinstance(chave, str)))
+            ids = heapq.nsmallest(falta - len(cpfs), (chave for chave in registros if isinstance(chave, int)))
+            resultado.extend((round(nota / len(termos), 3), chave) for chave in cpfs + ids)
+        return resultado
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import json
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+import benchmark_cac
+import projeto_cac
+
+# NOVO: Teste de carga do servidor_cac.py. Sobe o servidor com dados sintéticos
+# (gerador do benchmark_cac.py) e simula várias recepções ao mesmo tempo, cada
+# uma com a sua conexão, fazendo o que uma recepção faz: buscar paciente,
+# consultar agenda, procurar horário livre, marcar e cancelar consultas.
+# Mostra requisições por segundo e latência (p50/p95/p99) por operação.
+#
+# Uso: python carga_servidor_cac.py [--mesas 50] [--segundos 10] [--agendamentos 10000]
+#                                   [--escritas 0.2] [--porta 8765] [--sem-journal]
+#                                   [--saida carga.json]
+
+# Leituras: (peso, operação)
+LEITURAS = [
+    (35, "buscar_paciente"),
+    (20, "agendamentos_do_cpf"),
+    (15, "listar_ativos"),
+    (10, "horarios_livres"),
+]
+TEMPO_MAXIMO_SUBIDA = 120  # segundos esperando o servidor carregar os dados
+
+
+class Conexao:
+    """Cliente HTTP/1.1 mínimo com keep-alive (uma por recepção)."""
+
+    def __init__(self, host, porta):
+        self.host = host
+        self.porta = porta
+
+    async def abrir(self):
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def pedir(self, metodo, caminho, dados=None):
+        corpo = json.dumps(dados).encode("utf-8") if dados is not None else b""
+        self.escritor.write(
+            f"{metodo} {caminho} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(corpo)}\r\n\r\n"
+            .encode("latin-1") + corpo
+        )
+        await self.escritor.drain()
+        status = int((await self.leitor.readline()).split()[1])
+        tamanho = 0
+        while True:
+            linha = await self.leitor.readline()
+            if linha in (b"\r\n", b"\n", b""):
+                break
+            nome, _, valor = linha.decode("latin-1").partition(":")
+            if nome.strip().lower() == "content-length":
+                tamanho = int(valor)
+        return status, await self.leitor.readexactly(tamanho)
+
+    def fechar(self):
+        self.escritor.close()
+
+
+def escolher_operacao(rng, cpfs, total_agendamentos, proporcao_escritas):
+    """Sorteia a próxima requisição de uma recepção: (nome, método, caminho, corpo)."""
+    if rng.random() < proporcao_escritas:
+        if rng.random() < 0.5:
+            dia = date.today() + timedelta(days=rng.randrange(1, 90))
+            minuto = rng.randrange(8 * 60, 17 * 60, projeto_cac.GRANULARIDADE_MINUTOS)
+            return "agendar", "POST", "/agendamentos", {
+                "CPF": rng.choice(cpfs),
+                "DataConsulta": dia.strftime("%d/%m/%Y"),
+                "HorarioInicio": f"{minuto // 60:02d}:{minuto % 60:02d}",
+                "Medico": rng.choice(projeto_cac.PROFISSIONAIS)["nome"],
+            }
+        return "cancelar", "PATCH", f"/agendamentos/{rng.randrange(1, total_agendamentos + 1)}", {"Status": "Cancelado"}
+
+    operacao = rng.choices([nome for _, nome in LEITURAS], [peso for peso, _ in LEITURAS])[0]
+    if operacao == "buscar_paciente":
+        return operacao, "GET", f"/pacientes/{rng.choice(cpfs)}", None
+    if operacao == "agendamentos_do_cpf":
+        return operacao, "GET", "/agendamentos?" + urlencode({"cpf": rng.choice(cpfs)}), None
+    if operacao == "listar_ativos":
+        return operacao, "GET", "/agendamentos?" + urlencode({"status": "Ativo", "pagina": rng.randrange(1, 50)}), None
+    especializacao = rng.choice(projeto_cac.PROFISSIONAIS)["especializacao"]
+    return operacao, "GET", "/horarios-livres?" + urlencode({"quantidade": 5, "especializacao": especializacao}), None
+
+async def recepcao(numero, host, porta, fim, cpfs, total_agendamentos, proporcao_escritas, latencias, codigos):
+    """Uma recepção: faz requisições sem parar (uma de cada vez) até o fim do teste."""
+    rng = random.Random(numero)
+    conexao = Conexao(host, porta)
+    await conexao.abrir()
+    try:
+        while time.perf_counter() < fim:
+            nome, metodo, caminho, corpo = escolher_operacao(rng, cpfs, total_agendamentos, proporcao_escritas)
+            inicio = time.perf_counter()
+            try:
+                status, _ = await conexao.pedir(metodo, caminho, corpo)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                codigos["falha de conexão"] += 1
+                conexao.fechar()
+                await conexao.abrir()
+                continue
+            latencias.setdefault(nome, []).append(time.perf_counter() - inicio)
+            codigos[status] += 1
+    finally:
+        conexao.fechar()
+
+def percentil(valores_ordenados, fracao):
+    if not valores_ordenados:
+        return 0.0
+    return valores_ordenados[min(len(valores_ordenados) - 1, round(fracao * (len(valores_ordenados) - 1)))]
+
+def resumir(latencias):
+    resumo = {}
+    todas = []
+    for nome, valores in sorted(latencias.items()):
+        valores.sort()
+        todas.extend(valores)
+        resumo[nome] = {
+            "requisicoes": len(valores),
+            "p50_ms": round(percentil(valores, 0.50) * 1000, 2),
+            "p95_ms": round(percentil(valores, 0.95) * 1000, 2),
+            "p99_ms": round(percentil(valores, 0.99) * 1000, 2),
+        }
+    todas.sort()
+    resumo["todas"] = {
+        "requisicoes": len(todas),
+        "p50_ms": round(percentil(todas, 0.50) * 1000, 2),
+        "p95_ms": round(percentil(todas, 0.95) * 1000, 2),
+        "p99_ms": round(percentil(todas, 0.99) * 1000, 2),
+    }
+    return resumo
+
+async def esperar_servidor(host, porta, processo):
+    limite = time.perf_counter() + TEMPO_MAXIMO_SUBIDA
+    while time.perf_counter() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("o servidor terminou antes de começar a atender")
+        try:
+            conexao = Conexao(host, porta)
+            await conexao.abrir()
+            status, _ = await conexao.pedir("GET", "/saude")
+            conexao.fechar()
+            if status == 200:
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("o servidor não respondeu a tempo")
+
+async def executar_carga(args, cpfs, total_agendamentos):
+    latencias = {}
+    codigos = Counter()
+    inicio = time.perf_counter()
+    fim = inicio + args.segundos
+    await asyncio.gather(*(
+        recepcao(numero, args.host, args.porta, fim, cpfs, total_agendamentos, args.escritas, latencias, codigos)
+        for numero in range(args.mesas)
+    ))
+    return latencias, codigos, time.perf_counter() - inicio
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor da clínica.")
+    parser.add_argument("--mesas", type=int, default=50, help="recepções simultâneas (padrão: 50)")
+    parser.add_argument("--segundos", type=float, default=10, help="duração do teste (padrão: 10)")
+    parser.add_argument("--agendamentos", type=int, default=10_000, help="tamanho dos dados sintéticos")
+    parser.add_argument("--escritas", type=float, default=0.2, help="fração de requisições que alteram dados")
+    parser.add_argument("--semente", type=int, default=benchmark_cac.SEMENTE_PADRAO)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--sem-journal", action="store_true", help="servidor regrava o arquivo inteiro a cada lote")
+    parser.add_argument("--saida", type=Path, help="salva o resultado em JSON")
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    dados = benchmark_cac.gerar_dados(args.agendamentos, args.semente)
+    cpfs = [paciente["CPF"] for paciente in dados["pacientes"]]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = Path(pasta) / "clinica_dados.json"
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+        del dados
+
+        comando = [sys.executable, str(Path(__file__).with_name("servidor_cac.py")),
+                   "--host", args.host, "--porta", str(args.porta), "--arquivo", str(arquivo)]
+        if not args.sem_journal:
+            comando.append("--journal")
+        servidor = subprocess.Popen(comando, stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(esperar_servidor(args.host, args.porta, servidor))
+            latencias, codigos, duracao = asyncio.run(executar_carga(args, cpfs, args.agendamentos))
+        finally:
+            servidor.send_signal(signal.SIGINT)
+            try:
+                servidor.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                servidor.kill()
+
+    resumo = resumir(latencias)
+    total = resumo["todas"]["requisicoes"]
+    falhas = sum(qtd for codigo, qtd in codigos.items() if not isinstance(codigo, int) or codigo >= 500)
+    resultado = {
+        "mesas": args.mesas, "segundos": round(duracao, 2), "agendamentos": args.agendamentos,
+        "escritas": args.escritas, "journal": not args.sem_journal,
+        "requisicoes_por_segundo": round(total / duracao, 1), "falhas": falhas,
+        "codigos_http": {str(codigo): qtd for codigo, qtd in sorted(codigos.items(), key=str)},
+        "operacoes": resumo,
+    }
+
+    print(f"\n🧪 {args.mesas} recepções por {duracao:.1f} s, {args.agendamentos} agendamentos "
+          f"({'journal' if resultado['journal'] else 'regravando o arquivo'})")
+    print(f"  {total} requisições, {resultado['requisicoes_por_segundo']} req/s, falhas: {falhas}")
+    print(f"  códigos HTTP: {resultado['codigos_http']}\n")
+    print(f"  {'operação':<22} {'qtd':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for nome, medida in resumo.items():
+        print(f"  {nome:<22} {medida['requisicoes']:>8} {medida['p50_ms']:>9} {medida['p95_ms']:>9} {medida['p99_ms']:>9}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=4, ensure_ascii=False)
+        print(f"\n✅ Resultado salvo em {args.saida}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
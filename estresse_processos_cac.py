@@ -0,0 +1,158 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+import benchmark_cac
+import projeto_cac
+
+# NOVO: Teste de vários processos gravando no mesmo arquivo ao mesmo tempo
+# (vários terminais com o menu aberto, sem o servidor_cac.py). Cada processo
+# carrega os dados uma vez e depois, em rodadas, cadastra um paciente, marca
+# uma consulta para ele, cancela metade delas e grava — quase sempre com dados
+# que outro processo já alterou. No fim confere se nenhuma gravação se perdeu,
+# se os IDs dos agendamentos continuam únicos e se cada lote ficou com o seu
+# próprio Seq (a geração em que foi gravado).
+#
+# Uso: python estresse_processos_cac.py [--processos 16] [--rodadas 25]
+#                                       [--agendamentos 2000] [--modo json|journal|sqlite|binario]
+
+MODOS = ("json", "journal", "sqlite", "binario")
+
+
+def configurar(arquivo, modo):
+    projeto_cac.ARQUIVO_DADOS = Path(arquivo)
+    projeto_cac.USAR_JOURNAL = modo == "journal"
+    projeto_cac.USAR_SQLITE = modo == "sqlite"
+    projeto_cac.USAR_SNAPSHOT_BINARIO = modo == "binario"
+
+def trabalhador(numero, arquivo, modo, cpfs, rodadas, barreira):
+    """Um processo: carrega uma vez e grava a cada rodada, sem recarregar por conta própria."""
+    configurar(arquivo, modo)
+    rng = random.Random(numero)
+    repo = projeto_cac.abrir_repositorio()
+    barreira.wait()  # Todos começam com a mesma geração (e ficam desatualizados juntos)
+
+    # Agendamento antigo que só este processo altera (ID = número + 1)
+    projeto_cac.mudar_status_agendamento(repo, numero + 1, "Cancelado", encaixe=True)
+    for rodada, paciente in enumerate(benchmark_cac.gerar_pacientes(cpfs, rng)):
+        repo.inserir_paciente(paciente)
+        ag = projeto_cac.registrar_agendamento(repo, {
+            "CPF": paciente["CPF"],
+            "DataConsulta": (date.today() + timedelta(days=rng.randrange(1, 60))).strftime("%d/%m/%Y"),
+            "HorarioInicio": f"{rng.randrange(8, 17):02d}:00",
+            "Medico": rng.choice(projeto_cac.PROFISSIONAIS)["nome"],
+        }, encaixe=True)
+        if rodada % 2 == 0:
+            # Mesmo lote do '+agendamento': se o ID mudar na mescla, esta alteração acompanha
+            projeto_cac.mudar_status_agendamento(repo, ag["ID"], "Cancelado")
+        projeto_cac.persistir_alteracoes(repo)
+        time.sleep(rng.random() * 0.005)
+
+def conferir(dados, cpfs_por_processo, agendamentos_iniciais):
+    """Lista de problemas encontrados no arquivo final (vazia se está tudo certo)."""
+    problemas = []
+    ids = Counter(ag["ID"] for ag in dados["agendamentos"])
+    repetidos = [id_ag for id_ag, qtd in ids.items() if qtd > 1]
+    if repetidos:
+        problemas.append(f"IDs de agendamento repetidos: {repetidos[:10]}")
+
+    pacientes = {p["CPF"]: p for p in dados["pacientes"]}
+    seqs = []
+    por_cpf = {}
+    for ag in dados["agendamentos"]:
+        por_cpf.setdefault(ag["CPF"], []).append(ag)
+    por_id = {ag["ID"]: ag for ag in dados["agendamentos"]}
+
+    for numero, cpfs in enumerate(cpfs_por_processo):
+        if por_id.get(numero + 1, {}).get("Status") != "Cancelado":
+            problemas.append(f"processo {numero}: cancelamento do agendamento {numero + 1} perdido")
+        for rodada, cpf in enumerate(cpfs):
+            if cpf not in pacientes:
+                problemas.append(f"processo {numero}: paciente {cpf} perdido")
+            consultas = por_cpf.get(cpf, [])
+            esperado = "Cancelado" if rodada % 2 == 0 else "Ativo"
+            if [ag["Status"] for ag in consultas] != [esperado]:
+                problemas.append(f"processo {numero}: agendamento de {cpf} = "
+                                 f"{[ag['Status'] for ag in consultas]}, esperado [{esperado!r}]")
+            if cpf in pacientes:
+                # Paciente e consulta da rodada saem no mesmo lote
+                seqs.append(pacientes[cpf]["Seq"])
+                if any(ag["Seq"] != seqs[-1] for ag in consultas):
+                    problemas.append(f"processo {numero}: Seq de {cpf} diferente do da consulta")
+
+    if len(set(seqs)) != len(seqs) or max(seqs, default=0) > dados["geracao"]:
+        problemas.append("lotes diferentes com o mesmo Seq (ou Seq maior que a geração final)")
+
+    total_esperado = agendamentos_iniciais + sum(len(cpfs) for cpfs in cpfs_por_processo)
+    if len(dados["agendamentos"]) != total_esperado:
+        problemas.append(f"{len(dados['agendamentos'])} agendamentos no arquivo, esperado {total_esperado}")
+    return problemas
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Vários processos gravando no mesmo arquivo da clínica.")
+    parser.add_argument("--processos", type=int, default=16, help="processos simultâneos (padrão: 16)")
+    parser.add_argument("--rodadas", type=int, default=25, help="gravações por processo (padrão: 25)")
+    parser.add_argument("--agendamentos", type=int, default=2000, help="tamanho dos dados iniciais")
+    parser.add_argument("--modo", choices=MODOS, default="journal")
+    parser.add_argument("--semente", type=int, default=benchmark_cac.SEMENTE_PADRAO)
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    dados = benchmark_cac.gerar_dados(args.agendamentos, args.semente)
+    existentes = {p["CPF"] for p in dados["pacientes"]}
+    rng = random.Random(args.semente + 1)
+    novos = [cpf for cpf in benchmark_cac.gerar_cpfs_unicos(
+        len(existentes) + args.processos * args.rodadas, rng) if cpf not in existentes]
+    cpfs_por_processo = [novos[i * args.rodadas:(i + 1) * args.rodadas] for i in range(args.processos)]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = Path(pasta) / "clinica_dados.json"
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+        configurar(arquivo, args.modo)
+        if args.modo == "sqlite":
+            projeto_cac.migrar_para_sqlite()
+
+        # spawn: cada processo começa do zero, como um terminal novo (e funciona no Windows)
+        contexto = multiprocessing.get_context("spawn")
+        barreira = contexto.Barrier(args.processos)
+        processos = [
+            contexto.Process(target=trabalhador,
+                             args=(numero, str(arquivo), args.modo, cpfs, args.rodadas, barreira))
+            for numero, cpfs in enumerate(cpfs_por_processo)
+        ]
+        inicio = time.perf_counter()
+        for processo in processos:
+            processo.start()
+        for processo in processos:
+            processo.join()
+        duracao = time.perf_counter() - inicio
+
+        falhas = [numero for numero, processo in enumerate(processos) if processo.exitcode != 0]
+        final = projeto_cac.carregar_dados()
+        problemas = conferir(final, cpfs_por_processo, len(dados["agendamentos"]))
+
+    gravacoes = args.processos * args.rodadas
+    print(f"\n🧪 {args.processos} processos x {args.rodadas} rodadas no modo {args.modo} "
+          f"({args.agendamentos} agendamentos iniciais)")
+    print(f"  {gravacoes} gravações em {duracao:.1f} s ({gravacoes / duracao:.1f}/s), "
+          f"geração final: {final.get('geracao', 0)}")
+    if falhas:
+        print(f"❌ Processos que terminaram com erro: {falhas}")
+    for problema in problemas:
+        print(f"❌ {problema}")
+    if not falhas and not problemas:
+        print("✅ Nenhuma gravação perdida, IDs únicos, um Seq por lote.")
+    return 1 if falhas or problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import contextlib
+import threading
+import time
+
+# NOVO: Gravação em segundo plano para o menu do projeto_cac.py. Antes, cada
+# opção que alterava algo só voltava ao menu depois de regravar o arquivo
+# inteiro; agora a opção só avisa o gravador, que espera ATRASO_PADRAO
+# segundos sem novas alterações e grava tudo de uma vez numa thread própria.
+#
+# A thread e o menu nunca mexem no repositório ao mesmo tempo: os dois usam
+# a mesma 'trava'. ALTERADO: O gravador só a segura para separar o lote de
+# alterações (a serialização e a escrita ficam fora), e o menu a solta
+# enquanto espera o usuário digitar (esperando_usuario()). Ao sair (opção 9, Ctrl+C),
+# encerrar() grava o que ainda estiver pendente.
+
+ATRASO_PADRAO = 0.5  # segundos sem alterações antes de gravar
+
+
+class GravadorSegundoPlano:
+    """Junta alterações seguidas numa gravação só, fora da thread do menu."""
+
+    def __init__(self, gravar, atraso=ATRASO_PADRAO, em_segundo_plano=True):
+        self.gravar = gravar
+        self.atraso = atraso
+        self.trava = threading.RLock()  # Quem lê ou altera o repositório segura esta trava
+        self._gravando = threading.Lock()  # NOVO: Uma gravação por vez (ver pausado())
+        self.erro = None                # Falha da última gravação (None se deu certo)
+        self._erro_novo = None          # Falha ainda não mostrada ao usuário
+        self._condicao = threading.Condition()
+        self._pendente = False
+        self._ultimo_aviso = 0.0
+        self._encerrando = False
+        self._thread = None
+        if em_segundo_plano:
+            self._thread = threading.Thread(target=self._laco, name="gravador", daemon=True)
+            self._thread.start()
+
+    def agendar(self):
+        """Há alterações para gravar (grava na hora se não houver thread)."""
+        if self._thread is None:
+            self._executar()
+            return
+        with self._condicao:
+            self._pendente = True
+            self._ultimo_aviso = time.monotonic()
+            self._condicao.notify()
+
+    def novo_erro(self):
+        """A última falha de gravação ainda não mostrada (ou None)."""
+        erro, self._erro_novo = self._erro_novo, None
+        return erro
+
+    def descarregar(self):
+        """Grava agora o que estiver pendente, na thread de quem chamou."""
+        with self._condicao:
+            pendente, self._pendente = self._pendente, False
+        if pendente or self.erro is not None:
+            self._executar()
+
+    def encerrar(self):
+        """Para a thread e grava o que faltar (chamado na saída do menu)."""
+        if self._thread is not None:
+            with self._condicao:
+                self._encerrando = True
+                self._condicao.notify()
+            self._thread.join()
+            self._thread = None
+        self.descarregar()
+
+    # NOVO
+    @contextlib.contextmanager
+    def opcao(self):
+        """Segura a trava durante uma opção do menu (ver esperando_usuario())."""
+        with self.trava:
+            yield
+
+    # ALTERADO: A trava é solta explicitamente por quem pergunta (antes o
+    # builtins.input era trocado durante a opção)
+    @contextlib.contextmanager
+    def esperando_usuario(self):
+        """Solta a trava de opcao() enquanto o bloco espera o usuário digitar."""
+        self.trava.release()
+        try:
+            yield
+        finally:
+            self.trava.acquire()
+
+    # NOVO
+    @contextlib.contextmanager
+    def pausado(self):
+        """Nenhuma gravação em andamento enquanto o bloco roda (ex: para recarregar do disco)."""
+        with self._gravando:
+            yield
+
+    def _laco(self):
+        while True:
+            with self._condicao:
+                while not self._pendente and not self._encerrando:
+                    self._condicao.wait()
+                if self._encerrando:
+                    return  # O que sobrou fica para encerrar() -> descarregar()
+                # Espera 'atraso' segundos sem avisos novos (uma rajada vira uma gravação)
+                while not self._encerrando:
+                    falta = self._ultimo_aviso + self.atraso - time.monotonic()
+                    if falta <= 0:
+                        break
+                    self._condicao.wait(falta)
+                if self._encerrando:
+                    return
+                self._pendente = False
+            self._executar()
+
+    def _executar(self):
+        try:
+            # ALTERADO: Sem a trava aqui: a gravação a segura só para separar o lote
+            with self._gravando:
+                self.gravar()
+            self.erro = None
+        except Exception as erro:
+            # As alterações continuam pendentes no repositório: a próxima
+            # gravação (ou a da saída) tenta de novo
+            self.erro = self._erro_novo = erro
@@ -0,0 +1,118 @@
+import heapq
+import json
+import os
+from datetime import datetime
+
+# NOVO: Lembretes de consulta para o projeto_cac.py (ativados com
+# USAR_LEMBRETES). Cada agendamento 'Ativo' entra numa fila de prioridade
+# (heap) uma vez por antecedência (ex: 48 h e 24 h antes), ordenada pelo
+# instante de envio:
+#
+#   (quando_enviar, ID, InicioTS, antecedencia_horas)
+#
+# Ver o próximo lembrete é O(1) e tirar um da fila é O(log n): ninguém
+# percorre nem reordena a lista de agendamentos. Cancelar ou remarcar não
+# mexe na fila; a entrada antiga é descartada quando sai dela (o agendamento
+# não está mais 'Ativo' ou o InicioTS mudou) e a remarcação entra de novo.
+#
+# Os lembretes "enviados" vão para a caixa de saída, um JSON por linha (o
+# lugar de um gateway de SMS). A chave "ID:InicioTS:antecedência" de cada
+# linha é o que garante o envio uma vez só, mesmo depois de reiniciar o
+# programa ou com outro processo enviando ao mesmo tempo (quem chama segura
+# a trava do arquivo de dados enquanto envia).
+
+SEGUNDOS_POR_HORA = 3600
+
+
+def chave_lembrete(id_agendamento, inicio_ts, antecedencia):
+    return f"{id_agendamento}:{inicio_ts}:{antecedencia}"
+
+
+class FilaLembretes:
+    """Heap de lembretes pendentes, por instante de envio."""
+
+    def __init__(self, antecedencias, agendamentos=()):
+        self.antecedencias = sorted(antecedencias)  # em horas, da menor para a maior
+        self._fila = [entrada for ag in agendamentos for entrada in self._entradas(ag)]
+        heapq.heapify(self._fila)  # O(n), uma vez só
+
+    def __len__(self):
+        return len(self._fila)
+
+    def _entradas(self, ag):
+        inicio_ts = ag.get("InicioTS")
+        if ag.get("Status") != "Ativo" or inicio_ts is None:
+            return []
+        return [(inicio_ts - horas * SEGUNDOS_POR_HORA, ag["ID"], inicio_ts, horas) for horas in self.antecedencias]
+
+    def adicionar(self, ag):
+        """Agendamento novo, remarcado ou reativado."""
+        for entrada in self._entradas(ag):
+            heapq.heappush(self._fila, entrada)
+
+    def proximo_envio(self):
+        """Instante (timestamp) do próximo lembrete, ou None com a fila vazia."""
+        return self._fila[0][0] if self._fila else None
+
+    def devidos(self, agora, agendamento_por_id):
+        """Tira da fila os lembretes com envio até 'agora' -> [(agendamento, antecedência)]."""
+        resultado = []
+        while self._fila and self._fila[0][0] <= agora:
+            _, id_agendamento, inicio_ts, horas = heapq.heappop(self._fila)
+            ag = agendamento_por_id.get(id_agendamento)
+            if ag is None or ag.get("Status") != "Ativo" or ag.get("InicioTS") != inicio_ts:
+                continue  # Cancelado, encerrado ou remarcado depois de entrar na fila
+            if inicio_ts <= agora:
+                continue  # A consulta já começou
+            if any(menor < horas and agora >= inicio_ts - menor * SEGUNDOS_POR_HORA for menor in self.antecedencias):
+                continue  # Um lembrete mais próximo da consulta também já venceu: vai só ele
+            resultado.append((ag, horas))
+        return resultado
+
+
+class CaixaDeSaida:
+    """Arquivo JSON-lines com os lembretes enviados (lido só no trecho novo)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.enviados = set()  # chaves já na caixa de saída
+        self._lido = 0         # bytes já lidos (outro processo pode ter anexado mais)
+
+    def atualizar(self):
+        """Lê as linhas anexadas desde a última leitura."""
+        if not self.caminho.exists():
+            return
+        with open(self.caminho, "rb") as f:
+            f.seek(self._lido)
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break  # Linha pela metade (queda no meio da gravação): fica para depois
+                self._lido += len(linha)
+                try:
+                    self.enviados.add(json.loads(linha)["chave"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+
+    def enviar(self, mensagens):
+        """Anexa as mensagens (cada uma com 'chave') de uma vez, com fsync."""
+        if not mensagens:
+            return
+        conteudo = "".join(json.dumps(mensagem, ensure_ascii=False) + "\n" for mensagem in mensagens)
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        self.enviados.update(mensagem["chave"] for mensagem in mensagens)
+
+
+def montar_mensagem(ag, horas, telefone, clinica):
+    profissional = ag.get("Medico") or ag.get("Especializacao") or "a clínica"
+    return {
+        "chave": chave_lembrete(ag["ID"], ag["InicioTS"], horas),
+        "telefone": telefone,
+        "mensagem": (f"{clinica}: lembrete da sua consulta com {profissional} em "
+                     f"{ag['DataConsulta']} às {ag['HorarioInicio']}."),
+        "agendamento": ag["ID"],
+        "antecedencia_horas": horas,
+        "enviado_em": datetime.now().isoformat(timespec="seconds"),
+    }
@@ -0,0 +1,226 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+
+# NOVO: Medição de desempenho para o projeto_cac.py (ativada com
+# USAR_METRICAS). Cada operação medida (ação do menu, carregar_dados,
+# salvar_dados...) guarda:
+#   - tempo (histograma com FAIXAS_SEGUNDOS, soma e maior tempo);
+#   - bytes lidos e gravados e registros percorridos;
+#   - quantas passaram do limite de operação lenta.
+# As lentas também vão, uma por linha (JSON), para o log de lentas.
+#
+# Nas ações do menu o tempo esperando o usuário digitar é descontado (quem
+# pergunta avisa com esperando_usuario()): o que sobra é o tempo do sistema. Operações dentro de outras (ex: salvar_dados
+# dentro de persistir_alteracoes) somam bytes e registros também na de fora.
+#
+# exportar() grava tudo em formato Prometheus (ou JSON, se o arquivo terminar
+# em .json), trocando o arquivo de uma vez, para ser lido por um coletor.
+
+FAIXAS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PREFIXO = "clinica_"
+
+
+class Operacao:
+    """Contadores de uma execução em andamento (devolvida pelo 'with')."""
+
+    __slots__ = ("nome", "inicio", "espera", "descontar_entrada", "registros", "bytes_lidos", "bytes_gravados")
+
+    def __init__(self, nome, descontar_entrada=False):
+        self.nome = nome
+        self.inicio = time.perf_counter()
+        self.espera = 0.0
+        self.descontar_entrada = descontar_entrada
+        self.registros = self.bytes_lidos = self.bytes_gravados = 0
+
+
+class _Estatistica:
+    """Totais acumulados de uma operação (todas as execuções)."""
+
+    __slots__ = ("faixas", "quantidade", "soma", "maior", "espera", "registros",
+                 "bytes_lidos", "bytes_gravados", "lentas")
+
+    def __init__(self):
+        self.faixas = [0] * (len(FAIXAS_SEGUNDOS) + 1)  # a última é "acima de todas"
+        self.quantidade = self.registros = self.bytes_lidos = self.bytes_gravados = self.lentas = 0
+        self.soma = self.maior = self.espera = 0.0
+
+
+class Coletor:
+    """Histogramas e contadores por operação (pode ser usado por várias threads)."""
+
+    def __init__(self):
+        self._estatisticas = {}
+        self._trava = threading.Lock()
+        self._local = threading.local()  # pilha de operações em andamento, por thread
+
+    def _pilha(self):
+        pilha = getattr(self._local, "pilha", None)
+        if pilha is None:
+            pilha = self._local.pilha = []
+        return pilha
+
+    def operacao(self, nome, limite_lenta=None, log_lentas=None, descontar_entrada=False):
+        """Context manager que mede 'nome'. limite_lenta em segundos (None = sem log)."""
+        return _Medicao(self, nome, limite_lenta, log_lentas, descontar_entrada)
+
+    # ALTERADO: Sem trocar o builtins.input: quem espera o usuário usa este 'with'
+    @contextlib.contextmanager
+    def esperando_usuario(self):
+        """O tempo do bloco (o usuário digitando) sai das operações com descontar_entrada desta thread."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            espera = time.perf_counter() - inicio
+            for op in self._pilha():
+                if op.descontar_entrada:
+                    op.espera += espera
+
+    def contar(self, registros=0, bytes_lidos=0, bytes_gravados=0):
+        """Soma na operação em andamento desta thread (fora de operação: ignora)."""
+        pilha = self._pilha()
+        if pilha:
+            atual = pilha[-1]
+            atual.registros += registros
+            atual.bytes_lidos += bytes_lidos
+            atual.bytes_gravados += bytes_gravados
+
+    def _registrar(self, op, duracao, lenta):
+        with self._trava:
+            est = self._estatisticas.get(op.nome)
+            if est is None:
+                est = self._estatisticas[op.nome] = _Estatistica()
+            est.faixas[bisect_left(FAIXAS_SEGUNDOS, duracao)] += 1
+            est.quantidade += 1
+            est.soma += duracao
+            est.maior = max(est.maior, duracao)
+            est.espera += op.espera
+            est.registros += op.registros
+            est.bytes_lidos += op.bytes_lidos
+            est.bytes_gravados += op.bytes_gravados
+            est.lentas += lenta
+
+    # Exportação
+    def resumo(self):
+        """{operação: totais} (o formato do JSON exportado)."""
+        with self._trava:
+            itens = sorted(self._estatisticas.items())
+            return {
+                nome: {
+                    "quantidade": est.quantidade,
+                    "segundos": round(est.soma, 6),
+                    "maior_segundos": round(est.maior, 6),
+                    "media_ms": round(est.soma / est.quantidade * 1000, 3) if est.quantidade else None,
+                    "espera_usuario_segundos": round(est.espera, 3),
+                    "registros": est.registros,
+                    "bytes_lidos": est.bytes_lidos,
+                    "bytes_gravados": est.bytes_gravados,
+                    "lentas": est.lentas,
+                    "faixas": {
+                        **{str(limite): qtd for limite, qtd in zip(FAIXAS_SEGUNDOS, est.faixas)},
+                        "+Inf": est.faixas[-1],
+                    },
+                }
+                for nome, est in itens
+            }
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus."""
+        resumo = self.resumo()
+        linhas = [
+            f"# HELP {PREFIXO}operacao_segundos Tempo de cada operação (sem a espera pelo usuário).",
+            f"# TYPE {PREFIXO}operacao_segundos histogram",
+        ]
+        for nome, est in resumo.items():
+            rotulo = f'operacao="{_escapar(nome)}"'
+            acumulado = 0
+            for limite, qtd in est["faixas"].items():
+                acumulado += qtd
+                linhas.append(f'{PREFIXO}operacao_segundos_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+            linhas.append(f"{PREFIXO}operacao_segundos_sum{{{rotulo}}} {est['segundos']}")
+            linhas.append(f"{PREFIXO}operacao_segundos_count{{{rotulo}}} {est['quantidade']}")
+        contadores = (
+            ("bytes_lidos", "Bytes lidos do disco."),
+            ("bytes_gravados", "Bytes gravados no disco."),
+            ("registros", "Registros percorridos."),
+            ("lentas", "Execuções acima do limite de operação lenta."),
+            ("espera_usuario_segundos", "Tempo esperando o usuário digitar (descontado do tempo)."),
+        )
+        for campo, ajuda in contadores:
+            metrica = f"{PREFIXO}operacao_{campo}_total"
+            linhas.append(f"# HELP {metrica} {ajuda}")
+            linhas.append(f"# TYPE {metrica} counter")
+            linhas.extend(f'{metrica}{{operacao="{_escapar(nome)}"}} {est[campo]}' for nome, est in resumo.items())
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, caminho):
+        """Grava as métricas (JSON se o nome terminar em .json, senão Prometheus)."""
+        caminho = Path(caminho)
+        if caminho.suffix == ".json":
+            conteudo = json.dumps(self.resumo(), ensure_ascii=False, indent=2)
+        else:
+            conteudo = self.prometheus()
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        temporario.write_text(conteudo, encoding="utf-8")
+        os.replace(temporario, caminho)  # Quem coleta nunca lê o arquivo pela metade
+
+    def zerar(self):
+        with self._trava:
+            self._estatisticas.clear()
+
+
+class _Medicao:
+    """O 'with' de Coletor.operacao()."""
+
+    def __init__(self, coletor, nome, limite_lenta, log_lentas, descontar_entrada):
+        self.coletor = coletor
+        self.nome = nome
+        self.limite_lenta = limite_lenta
+        self.log_lentas = log_lentas
+        self.descontar_entrada = descontar_entrada
+
+    def __enter__(self):
+        self.op = Operacao(self.nome, self.descontar_entrada)
+        self.coletor._pilha().append(self.op)
+        return self.op
+
+    def __exit__(self, *exc):
+        op = self.op
+        duracao = max(0.0, time.perf_counter() - op.inicio - op.espera)
+        pilha = self.coletor._pilha()
+        pilha.pop()
+        if pilha:
+            # A operação de fora também leu/gravou/percorreu isso
+            pilha[-1].registros += op.registros
+            pilha[-1].bytes_lidos += op.bytes_lidos
+            pilha[-1].bytes_gravados += op.bytes_gravados
+        lenta = self.limite_lenta is not None and duracao >= self.limite_lenta
+        self.coletor._registrar(op, duracao, lenta)
+        if lenta and self.log_lentas is not None:
+            _anotar_lenta(self.log_lentas, op, duracao)
+        return False
+
+
+def _anotar_lenta(caminho, op, duracao):
+    linha = {
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "operacao": op.nome,
+        "ms": round(duracao * 1000, 1),
+        "registros": op.registros,
+        "bytes_lidos": op.bytes_lidos,
+        "bytes_gravados": op.bytes_gravados,
+    }
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+
+def _escapar(texto):
+    return texto.replace("\\", "\\\\").replace('"', '\\"')
+
+
+COLETOR = Coletor()  # O do processo (o projeto_cac.py usa sempre este)
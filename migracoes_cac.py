@@ -0,0 +1,221 @@
+import json
+import re
+
+# NOVO: Migração do arquivo de dados do projeto_cac.py, registro a registro,
+# sem carregar o arquivo inteiro na memória. O arquivo guarda a versão do
+# formato logo depois da 'geracao':
+#
+#   {"geracao": 12, "versao": 2, "pacientes": [...], "agendamentos": [...]}
+#
+# (sem "versao" é a 1; uma lista solta de pacientes é a 0). Cada passo da
+# migração é (versão, descrição, {"pacientes": funcao, "agendamentos": funcao});
+# o projeto_cac.py define os passos e este módulo só lê, aplica e grava.
+#
+# A leitura usa o próprio decodificador do json (raw_decode) sobre blocos de
+# TAMANHO_BLOCO caracteres: na memória fica só o bloco atual e um registro.
+# A gravação sai com um registro por linha (separadores compactos).
+
+TAMANHO_BLOCO = 1 << 20
+LISTAS = ("pacientes", "agendamentos")
+CAMPOS_COPIADOS = ("removidos",)  # Copiados como estão, depois das listas
+_ESPACOS = re.compile(r"\s*")
+_CABECALHO = re.compile(rb'\s*\{\s*(?:"geracao"\s*:\s*-?\d+\s*,\s*)?"versao"\s*:\s*(\d+)')
+_DECODIFICADOR = json.JSONDecoder()
+_CODIFICADOR = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))  # um só, para todos os registros
+
+
+def versao_do_arquivo(caminho):
+    """Versão gravada no começo do arquivo (1 sem o campo, 0 no formato de lista)."""
+    with open(caminho, "rb") as f:
+        inicio = f.read(256)
+    encontrada = _CABECALHO.match(inicio)
+    if encontrada:
+        return int(encontrada.group(1))
+    return 0 if inicio.lstrip().startswith(b"[") else 1
+
+def maior_inteiro(caminho, chave):
+    """Maior valor inteiro de '"chave": N' no arquivo (lendo em blocos, sem decodificar o JSON)."""
+    padrao = re.compile(rb'"' + re.escape(chave.encode()) + rb'"\s*:\s*(\d+)')
+    maior, resto = 0, b""
+    with open(caminho, "rb") as f:
+        while True:
+            bloco = f.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            texto = resto + bloco
+            # Os últimos bytes podem ser uma chave ou um número cortado: ficam
+            # para o próximo bloco (ALTERADO: desde o começo do '"chave": N'
+            # que chega ao fim do bloco, já que o número pode continuar)
+            corte = max(0, len(texto) - 64)
+            for encontrado in padrao.finditer(texto):
+                if encontrado.end() == len(texto):
+                    corte = min(corte, encontrado.start())
+                else:
+                    maior = max(maior, int(encontrado.group(1)))
+            resto = texto[corte:]
+    for encontrado in padrao.finditer(resto):
+        maior = max(maior, int(encontrado.group(1)))
+    return maior
+
+
+class _Leitor:
+    """Lê valores JSON de um arquivo de texto, um de cada vez, em blocos."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.texto = ""
+        self.pos = 0
+        self.acabou = False
+
+    def _encher(self):
+        bloco = self.arquivo.read(TAMANHO_BLOCO)
+        if not bloco:
+            self.acabou = True
+            return False
+        self.texto = self.texto[self.pos:] + bloco
+        self.pos = 0
+        return True
+
+    def proximo_caractere(self):
+        while True:
+            self.pos = _ESPACOS.match(self.texto, self.pos).end()
+            if self.pos < len(self.texto):
+                return self.texto[self.pos]
+            if not self._encher():
+                return ""
+
+    def esperar(self, caractere):
+        encontrado = self.proximo_caractere()
+        if encontrado != caractere:
+            raise ValueError(f"JSON inválido: esperado {caractere!r}, encontrado {encontrado!r}")
+        self.pos += 1
+
+    def valor(self):
+        self.proximo_caractere()
+        while True:
+            try:
+                valor, fim = _DECODIFICADOR.raw_decode(self.texto, self.pos)
+            except json.JSONDecodeError:
+                if not self._encher():
+                    raise  # Fim do arquivo no meio de um valor
+                continue
+            if fim == len(self.texto) and not self.acabou and self._encher():
+                continue  # Um número no fim do bloco pode continuar no próximo
+            self.pos = fim
+            return valor
+
+    def itens(self):
+        """Elementos de uma lista JSON, um de cada vez."""
+        self.esperar("[")
+        if self.proximo_caractere() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.valor()
+            separador = self.proximo_caractere()
+            self.pos += 1
+            if separador == "]":
+                return
+            if separador != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou ']', encontrado {separador!r}")
+
+
+def ler_em_fluxo(arquivo):
+    """Percorre o arquivo de dados gerando ("campo", chave, valor) e ("registro", lista, registro)."""
+    leitor = _Leitor(arquivo)
+    if leitor.proximo_caractere() == "[":
+        # Versão 0: a lista era só de pacientes
+        for registro in leitor.itens():
+            yield "registro", "pacientes", registro
+        return
+    leitor.esperar("{")
+    if leitor.proximo_caractere() == "}":
+        return
+    while True:
+        chave = leitor.valor()
+        leitor.esperar(":")
+        if chave in LISTAS and leitor.proximo_caractere() == "[":
+            for registro in leitor.itens():
+                yield "registro", chave, registro
+        else:
+            yield "campo", chave, leitor.valor()
+        separador = leitor.proximo_caractere()
+        leitor.pos += 1
+        if separador == "}":
+            return
+        if separador != ",":
+            raise ValueError(f"JSON inválido: esperado ',' ou '}}', encontrado {separador!r}")
+
+
+def passos_a_aplicar(passos, versao_origem):
+    """Só os passos de versões depois da do arquivo, em ordem."""
+    return [funcoes for versao, _, funcoes in sorted(passos, key=lambda passo: passo[0]) if versao > versao_origem]
+
+def migrar_registro(registro, lista, funcoes_por_passo):
+    for funcoes in funcoes_por_passo:
+        funcao = funcoes.get(lista)
+        if funcao is not None:
+            registro = funcao(registro)
+    return registro
+
+def migrar_arquivo(origem, destino, passos, versao_origem, versao_destino):
+    """Lê 'origem', aplica os passos a cada registro e grava em 'destino' (arquivos de texto abertos).
+
+    Retorna {"pacientes": qtd, "agendamentos": qtd}. Dos campos soltos, só a
+    'geracao' e os de CAMPOS_COPIADOS são copiados.
+    """
+    funcoes_por_passo = passos_a_aplicar(passos, versao_origem)
+    totais = {lista: 0 for lista in LISTAS}
+    geracao = 0
+    lista_aberta = None
+    copiados = {}
+
+    def abrir_lista(lista):
+        nonlocal lista_aberta
+        if lista_aberta is None:
+            destino.write(f'{{"geracao": {geracao}, "versao": {versao_destino}')
+        else:
+            destino.write("\n    ]")
+        destino.write(f',\n    "{lista}": [')
+        lista_aberta = lista
+
+    for tipo, chave, valor in ler_em_fluxo(origem):
+        if tipo == "campo":
+            if chave == "geracao" and lista_aberta is None:
+                geracao = valor
+            elif chave in CAMPOS_COPIADOS:
+                copiados[chave] = valor
+            continue
+        if chave != lista_aberta:
+            if totais[chave]:
+                raise ValueError(f"JSON inválido: lista {chave!r} aparece duas vezes")
+            abrir_lista(chave)
+        destino.write((",\n        " if totais[chave] else "\n        ")
+                      + _CODIFICADOR.encode(migrar_registro(valor, chave, funcoes_por_passo)))
+        totais[chave] += 1
+
+    # Listas que não apareceram entram vazias (o formato novo sempre tem as duas)
+    for lista in LISTAS:
+        if not totais[lista] and lista != lista_aberta:
+            abrir_lista(lista)
+    destino.write("\n    ]")
+    for chave, valor in copiados.items():
+        destino.write(f',\n    "{chave}": ' + _CODIFICADOR.encode(valor))
+    destino.write("\n}\n")
+    return totais
+
+def migrar_journal(origem, destino, passos, versao_origem):
+    """Migra os registros das linhas '+paciente'/'+agendamento' do journal (as outras são copiadas)."""
+    funcoes_por_passo = passos_a_aplicar(passos, versao_origem)
+    for linha in origem:
+        try:
+            alteracao = json.loads(linha)
+        except json.JSONDecodeError:
+            destino.write(linha)  # Linha incompleta: quem lê o journal já sabe ignorar
+            continue
+        lista = {"+paciente": "pacientes", "+agendamento": "agendamentos"}.get(alteracao.get("op"))
+        if lista is None:
+            destino.write(linha)
+            continue
+        alteracao["registro"] = migrar_registro(alteracao["registro"], lista, funcoes_por_passo)
+        destino.write(_CODIFICADOR.encode(alteracao) + "\n")
@@ -0,0 +1,119 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from arquivo_historico import gravar_json_atomico
+from busca_nomes import normalizar
+
+# NOVO: Cadastro de profissionais para o projeto_cac.py (antes era só a lista
+# fixa PROFISSIONAIS no código, que agora serve de cadastro inicial). Fica
+# num arquivo próprio, ao lado do ARQUIVO_DADOS:
+#
+#   clinica_dados_profissionais.json
+#   {"ultimo_id": 4, "profissionais": [{"ID": 1, "Nome": "Dr. Mwltynho",
+#     "Especializacao": "Psicólogo", "HorarioAbertura": "08:00",
+#     "HorarioFechamento": "18:00", "DiasDeAtendimento": [0, 1, 2, 3, 4],
+#     "Ativo": true}, ...]}
+#
+# O ID nunca muda nem é reaproveitado; os agendamentos guardam esse ID em
+# 'ProfissionalID'. Nome e especialidade ficam fixos depois do cadastro (são
+# a cópia que vai em cada agendamento); horários, dias e 'Ativo' podem mudar.
+# Desativar tira o profissional das listas de escolha sem apagar o histórico.
+#
+# Índices: ID, nome e especialidade (sem acento e sem diferenciar maiúsculas).
+
+CAMPOS_EDITAVEIS = ("HorarioAbertura", "HorarioFechamento", "DiasDeAtendimento", "Ativo")
+
+
+@lru_cache(maxsize=None)
+def chave_especialidade(especializacao):
+    """'Psicólogo' e 'psicologo' são a mesma especialidade."""
+    return " ".join(normalizar(especializacao).split())
+
+
+class CadastroProfissionais:
+    """Profissionais por ID, por nome e por especialidade."""
+
+    def __init__(self, caminho=None, iniciais=(), abertura="08:00", fechamento="18:00", dias=range(5)):
+        # Sem caminho, fica só em memória (testes e benchmark)
+        self.caminho = Path(caminho) if caminho else None
+        self._iniciais = [
+            {"Nome": prof["nome"], "Especializacao": prof["especializacao"],
+             "HorarioAbertura": abertura, "HorarioFechamento": fechamento,
+             "DiasDeAtendimento": sorted(dias), "Ativo": True}
+            for prof in iniciais
+        ]
+        self.recarregar()
+
+    def recarregar(self):
+        """Relê o arquivo (outro processo pode ter cadastrado alguém)."""
+        if self.caminho is not None and self.caminho.exists():
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        elif hasattr(self, "profissionais"):
+            return  # Nada gravado ainda: vale o que já está em memória
+        else:
+            dados = {"ultimo_id": 0, "profissionais": []}
+            for registro in self._iniciais:
+                dados["ultimo_id"] += 1
+                dados["profissionais"].append({"ID": dados["ultimo_id"], **registro})
+        self.ultimo_id = dados["ultimo_id"]
+        self.profissionais = dados["profissionais"]
+        self._indexar()
+
+    def _indexar(self):
+        self._por_id = {}
+        self._por_nome = {}
+        self._por_especialidade = {}  # chave_especialidade -> [profissionais]
+        for prof in self.profissionais:
+            self._por_id[prof["ID"]] = prof
+            self._por_nome[prof["Nome"]] = prof
+            self._por_especialidade.setdefault(chave_especialidade(prof["Especializacao"]), []).append(prof)
+
+    def __len__(self):
+        return len(self.profissionais)
+
+    def __iter__(self):
+        return iter(self.profissionais)
+
+    # Consultas
+    def por_id(self, id_profissional):
+        return self._por_id.get(id_profissional)
+
+    def por_nome(self, nome):
+        return self._por_nome.get(nome)
+
+    def da_especialidade(self, especializacao):
+        return list(self._por_especialidade.get(chave_especialidade(especializacao or ""), []))
+
+    def ativos(self):
+        return [prof for prof in self.profissionais if prof["Ativo"]]
+
+    def especialidades(self):
+        """Especialidades com algum profissional ativo (como foram cadastradas)."""
+        return sorted({prof["Especializacao"] for prof in self.ativos()}, key=chave_especialidade)
+
+    # Alterações (quem chama já validou os campos e segura a trava do arquivo)
+    def adicionar(self, nome, especializacao, abertura, fechamento, dias):
+        if nome in self._por_nome:
+            raise ValueError(f"já existe um profissional chamado {nome!r}")
+        self.ultimo_id += 1
+        prof = {
+            "ID": self.ultimo_id, "Nome": nome, "Especializacao": especializacao,
+            "HorarioAbertura": abertura, "HorarioFechamento": fechamento,
+            "DiasDeAtendimento": sorted(dias), "Ativo": True,
+        }
+        self.profissionais.append(prof)
+        self._indexar()
+        return prof
+
+    def atualizar(self, prof, campos):
+        fixos = set(campos) - set(CAMPOS_EDITAVEIS)
+        if fixos:
+            raise ValueError(f"campos que não podem ser alterados: {', '.join(sorted(fixos))}")
+        prof.update(campos)
+
+    def gravar(self):
+        if self.caminho is None:
+            return
+        gravar_json_atomico(self.caminho, {"ultimo_id": self.ultimo_id, "profissionais": self.profissionais})
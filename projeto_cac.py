@@ -1,70 +1,1167 @@
+import argparse
+import contextlib
+import functools
+import io
 import json
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from collections.abc import MutableMapping
 from pathlib import Path
-from datetime import datetime
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+
+from gravador_cac import GravadorSegundoPlano
+from profissionais_cac import CadastroProfissionais, chave_especialidade
 
 # NOVO: O arquivo agora guarda um dicionário com pacientes E agendamentos
 ARQUIVO_DADOS = Path("clinica_dados.json")
 
+# NOVO: Modo journal. Cada alteração vira UMA linha JSON compacta anexada ao
+# arquivo '.journal' (ao lado do ARQUIVO_DADOS). Quando o journal passa do
+# limite abaixo, ele é compactado: o snapshot completo é regravado e o
+# journal é zerado. Com False, mantém o comportamento antigo (salva tudo).
+USAR_JOURNAL = False
+LIMITE_JOURNAL_BYTES = 1_000_000
+
+# NOVO: Motor SQLite opcional (armazenamento_sqlite.py). Com True, os dados
+# ficam num banco '.db' ao lado do ARQUIVO_DADOS; na primeira execução o
+# JSON existente é migrado automaticamente. ALTERADO: O menu carrega só o
+# que não é histórico (consultas encerradas de meses passados ficam no banco).
+USAR_SQLITE = False
+
+# NOVO: Arquivo morto (arquivo_historico.py). Com True, consultas encerradas
+# ('Atendimento Realizado'/'Cancelado') de meses que já acabaram saem do
+# ARQUIVO_DADOS e vão para uma partição por mês, lida só quando uma busca de
+# histórico precisa dela. Não se aplica ao SQLite (que já lê sob demanda).
+USAR_ARQUIVO_MORTO = False
+
+# NOVO: Snapshot binário (snapshot_binario_cac.py). Com True, o salvar_dados
+# grava o ARQUIVO_DADOS num formato binário com CRC32, que carrega bem mais
+# rápido que o JSON com indent=4. A carga reconhece os dois formatos pelo
+# começo do arquivo, então dá para trocar a opção a qualquer momento (o nome
+# do arquivo pode mudar também, ex: Path("clinica_dados.cacb")). Com
+# COMPRIMIR_SNAPSHOT o corpo vai com zlib (arquivo ~3x menor, carga mais
+# lenta). Para outros programas: comandos 'exportar-json' e 'importar-json'.
+USAR_SNAPSHOT_BINARIO = False
+COMPRIMIR_SNAPSHOT = False
+
+# NOVO: Medição de desempenho (metricas_cac.py). Com True, cada ação do menu
+# e cada carga/gravação é cronometrada (tempo, bytes, registros percorridos).
+# As que passarem de LIMITE_OPERACAO_LENTA_MS vão para o log de lentas, ao
+# lado do ARQUIVO_DADOS. Com ARQUIVO_METRICAS, as métricas são exportadas
+# para ele a cada ação (Prometheus, ou JSON se o nome terminar em .json).
+USAR_METRICAS = False
+LIMITE_OPERACAO_LENTA_MS = 500
+ARQUIVO_METRICAS = None  # ex: Path("clinica_metricas.prom")
+
+# NOVO: Lembretes de consulta (lembretes_cac.py). Com True, cada consulta
+# 'Ativo' ganha um lembrete ANTECEDENCIAS_LEMBRETE_HORAS antes, enviado
+# (uma vez só) para a caixa de saída ao lado do ARQUIVO_DADOS, com o DDD e o
+# telefone do cadastro. O menu envia os que vencerem; fora dele (ex: cron):
+# python projeto_cac.py lembretes
+USAR_LEMBRETES = False
+ANTECEDENCIAS_LEMBRETE_HORAS = (48, 24)
+
 # NOVO: Informações da Clínica (Conforme solicitado)
 NOME_CLINICA = "Clinica Mwltynho"
 ENDERECO_CLINICA = "Avenida Tharzam, 371 Escoob City - PM"
 
+# NOVO: Duração assumida de uma consulta enquanto ela não tem Hora Final
+# (usada para detectar horários em conflito)
+DURACAO_PADRAO_MINUTOS = 30
+
+# NOVO: Consultas recorrentes (ex: terapia toda semana no mesmo horário).
+# Todas as consultas de uma série são marcadas de uma vez e guardam o mesmo
+# 'Serie', para cancelar ou remarcar as seguintes juntas.
+INTERVALOS_SERIE = {"S": ("semanal", 7), "Q": ("quinzenal", 14)}
+MAXIMO_CONSULTAS_SERIE = 52
+
+# NOVO: Expediente usado na busca de horários livres. A ocupação de cada
+# profissional é guardada em blocos de GRANULARIDADE_MINUTOS minutos.
+HORARIO_ABERTURA = "08:00"
+HORARIO_FECHAMENTO = "18:00"
+DIAS_DE_ATENDIMENTO = {0, 1, 2, 3, 4}  # segunda (0) a sexta (4)
+GRANULARIDADE_MINUTOS = 5
+
 # NOVO: Lista de Profissionais Pré-Definidos
+# ALTERADO: Agora é só o cadastro inicial. Os profissionais (com ID, horário
+# e dias de atendimento) ficam no arquivo de caminho_profissionais(), criado
+# na primeira alteração pelo menu (opção 13) ou pela linha de comando.
 PROFISSIONAIS = [
     {"nome": "Dr. Mwltynho", "especializacao": "Psicólogo"},
     {"nome": "Dra. Ana Silva", "especializacao": "Dentista"},
     {"nome": "Dr. Bruno Costa", "especializacao": "Cardiologista"},
     {"nome": "Dra. Carla Mendes", "especializacao": "Dermatologista"},
 ]
+MAXIMO_LISTA_PROFISSIONAIS = 15  # Com mais que isso, o menu pede a especialidade antes
+DIAS_SEMANA = ("seg", "ter", "qua", "qui", "sex", "sáb", "dom")
 
 
 # --- Funções utilitárias ---
 
-# ALTERADO: Carrega o novo formato de dados (dicionário)
-def carregar_dados():
-    """Carrega pacientes e agendamentos do arquivo JSON."""
-    dados_padrao = {"pacientes": [], "agendamentos": []}
-    if not ARQUIVO_DADOS.exists():
-        return dados_padrao # Retorna estrutura padrão se o arquivo não existe
+# --- Medição de desempenho (NOVO) ---
+
+_SEM_MEDICAO = contextlib.nullcontext()
+
+def medir(nome, descontar_entrada=False):
+    """'with' que mede a operação (desligado, não faz nada)."""
+    if not USAR_METRICAS:
+        return _SEM_MEDICAO
+    import metricas_cac
+    return metricas_cac.COLETOR.operacao(nome, LIMITE_OPERACAO_LENTA_MS / 1000, caminho_log_lentas(),
+                                         descontar_entrada)
+
+def medido(nome):
+    """Decorador: mede cada chamada da função como a operação 'nome'."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not USAR_METRICAS:
+                return funcao(*args, **kwargs)
+            with medir(nome):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+def contar_metricas(registros=0, bytes_lidos=0, bytes_gravados=0):
+    """Soma registros percorridos e bytes na operação medida em andamento."""
+    if USAR_METRICAS:
+        import metricas_cac
+        metricas_cac.COLETOR.contar(registros, bytes_lidos, bytes_gravados)
+
+def exportar_metricas():
+    if USAR_METRICAS and ARQUIVO_METRICAS is not None:
+        import metricas_cac
+        metricas_cac.COLETOR.exportar(ARQUIVO_METRICAS)
+
+def caminho_log_lentas():
+    """Uma linha JSON por operação lenta (ex: clinica_dados_lentas.log)."""
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.stem + "_lentas.log")
+
+# NOVO: Toda pergunta ao usuário passa por aqui (em vez de input() direto):
+# durante uma opção do menu a trava do gravador fica solta enquanto o usuário
+# digita, e esse tempo não conta nas medições com descontar_entrada.
+_gravador_da_opcao = None
+
+@contextlib.contextmanager
+def opcao_do_menu(gravador):
+    """Uma opção do menu: segura a trava do gravador (perguntar() a solta só enquanto espera)."""
+    global _gravador_da_opcao
+    with gravador.opcao():
+        _gravador_da_opcao = gravador
+        try:
+            yield
+        finally:
+            _gravador_da_opcao = None
+
+def perguntar(texto=""):
+    """perguntar() do programa, soltando a trava da opção e descontando a espera da medição."""
+    gravador = _gravador_da_opcao
+    with gravador.esperando_usuario() if gravador is not None else contextlib.nullcontext():
+        if not USAR_METRICAS:
+            return input(texto)
+        import metricas_cac
+        with metricas_cac.COLETOR.esperando_usuario():
+            return input(texto)
 
-    if ARQUIVO_DADOS.stat().st_size == 0:
-        return dados_padrao # Retorna estrutura padrão se o arquivo está vazio
+# ALTERADO: Escolhe o motor de armazenamento (JSON ou SQLite)
+@medido("carregar_dados")
+def carregar_dados(historico=None):
+    """Carrega pacientes e agendamentos do armazenamento configurado.
+
+    ALTERADO: No SQLite, com um HistoricoSQLite, deixa no banco as consultas dele.
+    """
+    dados = carregar_dados_sqlite(historico) if USAR_SQLITE else carregar_dados_json()
+    contar_metricas(registros=len(dados["pacientes"]) + len(dados["agendamentos"]))
+    if USAR_REGISTROS_COMPACTOS:
+        converter_para_registros(dados)
+    return dados
+
+# NOVO: Carrega o snapshot e reaplica o journal por cima
+def carregar_dados_json():
+    """Carrega pacientes e agendamentos (snapshot JSON + journal, se existir)."""
+    # NOVO: Arquivo de uma versão anterior é migrado uma vez só (trava
+    # exclusiva; quem chegar depois já encontra o arquivo na versão nova)
+    if precisa_migrar():
+        with trava_dados():
+            if precisa_migrar():
+                migrar_arquivo_de_dados()
+    # Trava compartilhada: nunca lê um arquivo que outro processo está gravando
+    with trava_dados(compartilhada=True):
+        return ler_dados_json()
+
+def ler_dados_json():
+    """Mesmo que carregar_dados_json(), para quem já está com a trava."""
+    dados = carregar_snapshot()
+    garantir_ids_agendamentos(dados["agendamentos"])
+    if caminho_journal().exists():
+        reaplicar_journal(dados)
+    return dados
+
+# ALTERADO: Carrega o novo formato de dados (dicionário)
+def carregar_snapshot():
+    """Carrega pacientes e agendamentos do arquivo JSON (ou binário)."""
+    dados_padrao = {"geracao": 0, "pacientes": [], "agendamentos": [], "removidos": {}}
+    if not ARQUIVO_DADOS.exists() or ARQUIVO_DADOS.stat().st_size == 0:
+        # NOVO: Sem arquivo mas com cópias: a gravação parou entre as trocas de nome
+        return recuperar_copia() or dados_padrao # Retorna estrutura padrão se não há nada
 
     try:
-        with open(ARQUIVO_DADOS, "r", encoding="utf-8") as f:
-            dados = json.load(f)
-            
-            # NOVO: Tentativa de migrar dados do formato antigo (lista)
-            if isinstance(dados, list):
-                print("!! Aviso: Detectado formato de arquivo antigo (lista).")
-                print("!! Movendo dados antigos para a lista de 'pacientes'.")
-                print("!! Por favor, recadastre os agendamentos.")
-                # Migra os dados antigos, assumindo que eram pacientes
-                migrados = {"pacientes": dados, "agendamentos": []}
-                # Garante que o campo 'NomeCompleto' exista
-                for p in migrados["pacientes"]:
-                    if "Nome" in p and "NomeCompleto" not in p:
-                        p["NomeCompleto"] = f"{p.get('Nome', '')} {p.get('Sobrenome', '')}".strip()
-                return migrados
-
-            # Carrega o formato de dicionário esperado
-            return {
-                "pacientes": dados.get("pacientes", []),
-                "agendamentos": dados.get("agendamentos", [])
-            }
-    except json.JSONDecodeError:
-        print(f"\n!! Erro: O arquivo {ARQUIVO_DADOS} está corrompido. Iniciando com dados limpos.\n")
+        return ler_snapshot(ARQUIVO_DADOS)
+    except ValueError as erro:  # JSON inválido ou snapshot binário corrompido
+        print(f"\n!! Erro: O arquivo {ARQUIVO_DADOS} está corrompido ({erro}).")
+        # NOVO: Guarda o arquivo estragado antes que a próxima gravação o descarte
+        corrompido = ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.name + ".corrompido")
+        if not corrompido.exists():
+            shutil.copyfile(ARQUIVO_DADOS, corrompido)
+            print(f"!! Uma cópia dele foi guardada em {corrompido}.")
+        # NOVO: Antes de começar do zero, tenta as cópias de segurança
+        recuperados = recuperar_copia()
+        if recuperados is not None:
+            return recuperados
+        print("!! Nenhuma cópia de segurança legível. Iniciando com dados limpos.\n")
         return dados_padrao
 
+# NOVO: JSON ou binário, conforme o começo do arquivo
+def ler_snapshot(caminho):
+    """Lê um snapshot (JSON ou binário) -> {'geracao', 'pacientes', 'agendamentos', 'removidos'} na VERSAO_DADOS."""
+    import snapshot_binario_cac
+    with open(caminho, "rb") as f:
+        contar_metricas(bytes_lidos=os.fstat(f.fileno()).st_size)
+        if snapshot_binario_cac.eh_binario(f.read(len(snapshot_binario_cac.MAGICO))):
+            f.seek(0)
+            return interpretar_snapshot(snapshot_binario_cac.ler(f))
+        f.seek(0)
+        return interpretar_snapshot(json.load(io.TextIOWrapper(f, encoding="utf-8")))
+
+def interpretar_snapshot(dados):
+    """Conteúdo lido do JSON -> {'geracao', 'pacientes', 'agendamentos', 'removidos'} na VERSAO_DADOS."""
+    # NOVO: Tentativa de migrar dados do formato antigo (lista)
+    if isinstance(dados, list):
+        print("!! Aviso: Detectado formato de arquivo antigo (lista).")
+        print("!! Movendo dados antigos para a lista de 'pacientes'.")
+        print("!! Por favor, recadastre os agendamentos.")
+        # Migra os dados antigos, assumindo que eram pacientes
+        versao, dados = 0, {"pacientes": dados}
+    else:
+        versao = dados.get("versao", 1)
+
+    # Carrega o formato de dicionário esperado
+    resultado = {
+        "geracao": dados.get("geracao", 0),
+        "pacientes": dados.get("pacientes", []),
+        "agendamentos": dados.get("agendamentos", []),
+        "removidos": dados.get("removidos", {}),  # NOVO: CPF -> Seq dos pacientes excluídos
+    }
+    # NOVO: Normalmente o arquivo já foi migrado na carga (migrar_arquivo_de_dados);
+    # aqui chegam só cópias de segurança e arquivos que não puderam ser regravados
+    if versao < VERSAO_DADOS:
+        migrar_dados_carregados(resultado, versao)
+    return resultado
+
 # ALTERADO: Salva o novo formato de dados (dicionário)
-def salvar_dados(pacientes, agendamentos):
-    """Salva as listas de pacientes e agendamentos no arquivo JSON."""
+@medido("salvar_dados")
+def salvar_dados(pacientes, agendamentos, geracao=0, removidos=None):
+    """Salva as listas de pacientes e agendamentos no arquivo JSON (ou binário)."""
+    if USAR_SNAPSHOT_BINARIO:
+        salvar_dados_binario(pacientes, agendamentos, geracao, removidos)
+        return
     dados_completos = {
+        # NOVO: Contador de gravações, sempre no começo do arquivo (ver ler_geracao)
+        "geracao": geracao,
+        "versao": VERSAO_DADOS,  # NOVO: Formato dos registros (ver migracoes())
         "pacientes": pacientes,
-        "agendamentos": agendamentos
+        "agendamentos": agendamentos,
+        "removidos": removidos or {},  # NOVO: CPF -> Seq (para as réplicas)
     }
-    with open(ARQUIVO_DADOS, "w", encoding="utf-8") as f:
-        json.dump(dados_completos, f, indent=4, ensure_ascii=False)
+    # NOVO: Grava num temporário e só depois troca de nome: uma queda no meio
+    # da gravação nunca deixa o ARQUIVO_DADOS pela metade
+    temporario = caminho_temporario()
+    with open(temporario, "w", encoding="utf-8") as f:
+        # default=dict: registros compactos viram o mesmo dicionário do JSON
+        json.dump(dados_completos, f, indent=4, ensure_ascii=False, default=dict)
+        f.flush()
+        os.fsync(f.fileno())
+        contar_metricas(registros=len(pacientes) + len(agendamentos), bytes_gravados=f.tell())
+    rotacionar_copias()
+    os.replace(temporario, ARQUIVO_DADOS)
+
+def salvar_dados_binario(pacientes, agendamentos, geracao=0, removidos=None):
+    """O mesmo que salvar_dados, no formato do snapshot_binario_cac.py."""
+    import snapshot_binario_cac
+    temporario = caminho_temporario()
+    with open(temporario, "wb") as f:
+        gravados = snapshot_binario_cac.gravar(f, geracao, VERSAO_DADOS, pacientes, agendamentos, removidos,
+                                               comprimir=COMPRIMIR_SNAPSHOT)
+        f.flush()
+        os.fsync(f.fileno())
+        contar_metricas(registros=len(pacientes) + len(agendamentos), bytes_gravados=gravados)
+    rotacionar_copias()
+    os.replace(temporario, ARQUIVO_DADOS)
+
+
+# --- Cópias de segurança (NOVO) ---
+
+# A cada gravação completa o arquivo anterior vira clinica_dados.json.bak1, o
+# .bak1 vira .bak2 e assim por diante, até COPIAS_DE_SEGURANCA (só trocas de
+# nome, sem copiar nada). Se o ARQUIVO_DADOS sumir ou estiver corrompido, a
+# carga usa a cópia legível com a maior 'geracao'.
+COPIAS_DE_SEGURANCA = 3
+
+def caminho_temporario():
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.name + ".tmp")
+
+def caminho_copia(numero):
+    return ARQUIVO_DADOS.with_name(f"{ARQUIVO_DADOS.name}.bak{numero}")
+
+def rotacionar_copias():
+    """.bak2 -> .bak3, .bak1 -> .bak2, ARQUIVO_DADOS -> .bak1."""
+    if COPIAS_DE_SEGURANCA <= 0:
+        return
+    for numero in range(COPIAS_DE_SEGURANCA, 1, -1):
+        if caminho_copia(numero - 1).exists():
+            os.replace(caminho_copia(numero - 1), caminho_copia(numero))
+    if ARQUIVO_DADOS.exists():
+        os.replace(ARQUIVO_DADOS, caminho_copia(1))
+
+def recuperar_copia():
+    """Dados da cópia legível mais nova (o .tmp conta se estiver completo), ou None."""
+    candidatos = [caminho_temporario()] + [caminho_copia(n) for n in range(1, COPIAS_DE_SEGURANCA + 1)]
+    melhor, origem = None, None
+    for caminho in candidatos:
+        if not caminho.exists():
+            continue
+        try:
+            dados = ler_snapshot(caminho)
+        except (ValueError, AttributeError):  # JSON/binário inválido (UnicodeDecodeError também)
+            continue  # Gravação interrompida ou cópia estragada
+        if melhor is None or dados["geracao"] > melhor["geracao"]:
+            melhor, origem = dados, caminho
+    if melhor is not None:
+        print(f"!! Usando a cópia de segurança {origem} (geração {melhor['geracao']}).\n")
+    return melhor
+
+
+# --- Versões do formato dos registros (NOVO) ---
+
+# Cada registro é normalizado uma vez só: na migração (registros antigos) ou
+# ao ser inserido (completar_paciente/completar_agendamento). Daí em diante
+# todos têm os mesmos campos, e quem lê usa ag["Medico"] direto, sem
+# .get(..., 'N/A') nem conversões a cada exibição.
+#
+# O arquivo guarda "versao". Um arquivo de versão anterior passa pelos passos
+# de migracoes() na carga, registro a registro (migracoes_cac.py, sem ler o
+# arquivo inteiro na memória), e é regravado; o journal, o arquivo morto e o
+# banco SQLite passam pelos mesmos passos. Um passo novo entra no fim da
+# lista, com VERSAO_DADOS + 1. Os passos podem rodar de novo sobre registros
+# já migrados sem mudar nada (uma migração interrompida é só repetida).
+#
+# NOVO: "Seq" é a geração da gravação que alterou o registro por último (0 nos
+# registros de antes dele), e "removidos" guarda CPF -> Seq dos pacientes
+# excluídos. Com os dois, uma réplica pede só o que mudou (ver "Réplicas").
+VERSAO_DADOS = 3
+
+PADRAO_PACIENTE = {
+    "NomeCompleto": "N/A", "CPF": "N/A", "Data de Nascimento": "N/A", "Estado": "N/A",
+    "Cidade": "N/A", "Endereço": "N/A", "DDD": "", "Telefone": "",
+    "DataCadastro": "N/A", "UltimaModificacao": "N/A", "Seq": 0,
+}
+PADRAO_AGENDAMENTO = {
+    "NomeCompleto": "N/A", "CPF": "N/A", "PacienteCadastrado": False, "DataConsulta": "N/A",
+    "Medico": "", "Especializacao": "", "ProfissionalID": None,  # vazio: registro antigo, sem médico
+    "HorarioInicio": "N/A", "HoraFinal": "N/A", "DataAgendamento": "N/A", "Status": "N/A", "Serie": None,
+    "Seq": 0,
+}
+
+def completar_paciente(paciente):
+    """Preenche os campos que faltam; DDD e telefone viram texto (com os zeros à esquerda)."""
+    for campo, padrao in PADRAO_PACIENTE.items():
+        if campo not in paciente:
+            paciente[campo] = padrao
+    paciente["DDD"] = str(paciente["DDD"])
+    telefone = str(paciente["Telefone"])
+    paciente["Telefone"] = telefone.zfill(9) if telefone else ""
+    return paciente
+
+def completar_agendamento(ag):
+    """Preenche os campos que faltam; o antigo 'Especialista' (só a especialidade) vira 'Especializacao'."""
+    if "Especialista" in ag:
+        especialista = ag.pop("Especialista")
+        if not ag.get("Especializacao"):
+            ag["Especializacao"] = especialista
+    for campo, padrao in PADRAO_AGENDAMENTO.items():
+        if campo not in ag:
+            ag[campo] = padrao
+    return ag
+
+def migracoes(maior_id=0, cadastro=None):
+    """Passos de migração (versão, descrição, {lista: função}), em ordem.
+
+    maior_id: maior ID de agendamento já usado (os que não têm ID ganham os
+    seguintes); cadastro: profissionais, para achar o ProfissionalID pelo nome.
+    """
+    ultimo_id = maior_id
+
+    def paciente_v1(paciente):
+        # Garante que o campo 'NomeCompleto' exista
+        if "Nome" in paciente and "NomeCompleto" not in paciente:
+            paciente["NomeCompleto"] = f"{paciente.get('Nome', '')} {paciente.get('Sobrenome', '')}".strip()
+        return paciente
+
+    def paciente_v2(paciente):
+        completar_paciente(paciente)
+        normalizar_tempos_paciente(paciente)
+        return paciente
+
+    def agendamento_v2(ag):
+        nonlocal ultimo_id
+        completar_agendamento(ag)
+        if "ID" not in ag:
+            ultimo_id += 1
+            ag["ID"] = ultimo_id
+        if ag["ProfissionalID"] is None and ag["Medico"] and cadastro is not None:
+            profissional = cadastro.por_nome(ag["Medico"])
+            if profissional is not None:
+                ag["ProfissionalID"] = profissional["ID"]
+        normalizar_tempos_agendamento(ag)
+        return ag
+
+    return [
+        (1, "lista de pacientes -> {'pacientes', 'agendamentos'}", {"pacientes": paciente_v1}),
+        (2, "campos completos, telefone como texto, datas convertidas, ID e profissional",
+         {"pacientes": paciente_v2, "agendamentos": agendamento_v2}),
+        (3, "Seq (geração da última alteração)",
+         {"pacientes": completar_paciente, "agendamentos": completar_agendamento}),
+    ]
+
+def funcoes_de_migracao(versao, maior_id=0):
+    """As funções dos passos posteriores a 'versao', na ordem (para migracoes_cac.migrar_registro)."""
+    import migracoes_cac
+    return migracoes_cac.passos_a_aplicar(
+        migracoes(maior_id, abrir_cadastro_profissionais(caminho_profissionais())), versao)
+
+def versao_do_snapshot():
+    """Versão dos registros do ARQUIVO_DADOS (lida do cabeçalho, JSON ou binário)."""
+    import migracoes_cac
+    import snapshot_binario_cac
+    with open(ARQUIVO_DADOS, "rb") as f:
+        cabecalho = snapshot_binario_cac.ler_cabecalho(f.read(snapshot_binario_cac.CABECALHO.size))
+    if cabecalho is not None:
+        return cabecalho["versao"]
+    return migracoes_cac.versao_do_arquivo(ARQUIVO_DADOS)
+
+def precisa_migrar():
+    if not ARQUIVO_DADOS.exists() or ARQUIVO_DADOS.stat().st_size == 0:
+        return False
+    return versao_do_snapshot() < VERSAO_DADOS
+
+def migrar_arquivo_de_dados():
+    """Passa o ARQUIVO_DADOS (e o journal) para a VERSAO_DADOS, registro a registro. Quem chama segura a trava."""
+    import migracoes_cac
+    versao = versao_do_snapshot()
+    passos = migracoes(migracoes_cac.maior_inteiro(ARQUIVO_DADOS, "ID"),
+                       abrir_cadastro_profissionais(caminho_profissionais()))
+    # Primeiro o journal: se cair antes do snapshot, a próxima carga migra os dois de novo
+    if caminho_journal().exists():
+        temporario = caminho_journal().with_name(caminho_journal().name + ".tmp")
+        with open(caminho_journal(), "r", encoding="utf-8") as origem, \
+                open(temporario, "w", encoding="utf-8") as destino:
+            migracoes_cac.migrar_journal(origem, destino, passos, versao)
+            destino.flush()
+            os.fsync(destino.fileno())
+        os.replace(temporario, caminho_journal())
+
+    import snapshot_binario_cac
+    with open(ARQUIVO_DADOS, "rb") as f:
+        binario = snapshot_binario_cac.eh_binario(f.read(len(snapshot_binario_cac.MAGICO)))
+    if binario:
+        # NOVO: O snapshot binário não é lido em partes: carrega (interpretar_snapshot
+        # migra na memória) e grava de novo, no mesmo formato
+        try:
+            dados = ler_snapshot(ARQUIVO_DADOS)
+        except ValueError:
+            return  # Corrompido: a carga tenta as cópias de segurança
+        salvar_dados_binario(dados["pacientes"], dados["agendamentos"], dados["geracao"], dados["removidos"])
+        print(f"🔧 {ARQUIVO_DADOS} atualizado da versão {versao} para a {VERSAO_DADOS}.")
+        return
+
+    temporario = caminho_temporario()
+    try:
+        with open(ARQUIVO_DADOS, "r", encoding="utf-8") as origem, open(temporario, "w", encoding="utf-8") as destino:
+            totais = migracoes_cac.migrar_arquivo(origem, destino, passos, versao, VERSAO_DADOS)
+            destino.flush()
+            os.fsync(destino.fileno())
+    except ValueError:  # json.JSONDecodeError também
+        # Arquivo corrompido: fica como está (a carga tenta as cópias de segurança)
+        temporario.unlink(missing_ok=True)
+        return
+    rotacionar_copias()  # O arquivo na versão antiga fica no .bak1
+    os.replace(temporario, ARQUIVO_DADOS)
+    print(f"🔧 {ARQUIVO_DADOS} atualizado da versão {versao} para a {VERSAO_DADOS} "
+          f"({totais['pacientes']} paciente(s), {totais['agendamentos']} agendamento(s)).")
+
+def migrar_dados_carregados(dados, versao):
+    """Mesmos passos de migracoes(), sobre listas já carregadas na memória."""
+    import migracoes_cac
+    maior_id = max((ag.get("ID", 0) for ag in dados["agendamentos"]), default=0)
+    funcoes_por_passo = funcoes_de_migracao(versao, maior_id)
+    for lista in migracoes_cac.LISTAS:
+        dados[lista] = [migracoes_cac.migrar_registro(registro, lista, funcoes_por_passo)
+                        for registro in dados[lista]]
+    return dados
+
+
+# --- Journal (gravação incremental) ---
+
+def caminho_journal():
+    """Arquivo de journal que acompanha o ARQUIVO_DADOS atual."""
+    return ARQUIVO_DADOS.with_suffix(".journal")
+
+# NOVO: Agendamentos antigos não tinham ID; numera na ordem do arquivo
+def garantir_ids_agendamentos(agendamentos):
+    """Dá um ID sequencial aos agendamentos que ainda não têm."""
+    ultimo_id = max((ag.get("ID", 0) for ag in agendamentos), default=0)
+    for ag in agendamentos:
+        if "ID" not in ag:
+            ultimo_id += 1
+            ag["ID"] = ultimo_id
+
+def aplicar_alteracao(alteracao, pacientes, agendamentos, removidos):
+    """Aplica uma linha do journal nos dicionários CPF->paciente, ID->agendamento e CPF->Seq (removidos)."""
+    # Todas as operações são idempotentes: reaplicar o journal depois de uma
+    # compactação interrompida não duplica nada.
+    op = alteracao["op"]
+    if op == "+paciente":
+        pacientes[alteracao["registro"]["CPF"]] = alteracao["registro"]
+        removidos.pop(alteracao["registro"]["CPF"], None)
+    elif op == "~paciente":
+        paciente = pacientes.get(alteracao["cpf"])
+        if paciente is not None:
+            paciente.update(alteracao["campos"])
+            if paciente["CPF"] != alteracao["cpf"]:
+                del pacientes[alteracao["cpf"]]
+                pacientes[paciente["CPF"]] = paciente
+                # NOVO: Para as réplicas, o CPF antigo foi excluído
+                removidos[alteracao["cpf"]] = paciente["Seq"]
+                removidos.pop(paciente["CPF"], None)
+    elif op == "-paciente":
+        pacientes.pop(alteracao["cpf"], None)
+        removidos[alteracao["cpf"]] = alteracao.get("seq", 0)  # NOVO: Sem "seq": journal antigo
+    elif op == "+agendamento":
+        agendamentos[alteracao["registro"]["ID"]] = alteracao["registro"]
+    elif op == "~agendamento":
+        ag = agendamentos.get(alteracao["id"])
+        if ag is not None:
+            ag.update(alteracao["campos"])
+
+def reaplicar_journal(dados):
+    """Reaplica o journal em cima dos dados carregados do snapshot."""
+    pacientes = {p["CPF"]: p for p in dados["pacientes"]}
+    agendamentos = {ag["ID"]: ag for ag in dados["agendamentos"]}
+
+    with open(caminho_journal(), "r", encoding="utf-8") as f:
+        contar_metricas(bytes_lidos=os.fstat(f.fileno()).st_size)
+        for linha in f:
+            try:
+                alteracao = json.loads(linha)
+            except json.JSONDecodeError:
+                # Última linha incompleta (queda no meio de uma gravação): ignora
+                print(f"!! Aviso: linha incompleta ignorada no journal {caminho_journal()}.")
+                break
+            if alteracao["op"] == "geracao":
+                dados["geracao"] = alteracao["valor"]  # Fim de um lote gravado
+            else:
+                aplicar_alteracao(alteracao, pacientes, agendamentos, dados["removidos"])
+
+    dados["pacientes"] = list(pacientes.values())
+    dados["agendamentos"] = list(agendamentos.values())
+
+def anexar_journal(alteracoes):
+    """Anexa as alterações ao journal, uma linha JSON compacta por alteração."""
+    linhas = "".join(
+        json.dumps(alt, ensure_ascii=False, separators=(",", ":"), default=dict) + "\n"
+        for alt in alteracoes
+    )
+    with open(caminho_journal(), "a", encoding="utf-8") as f:
+        tamanho = f.tell()
+        try:
+            f.write(linhas)
+            f.flush()
+            os.fsync(f.fileno())
+        except OSError:
+            # NOVO: Lote pela metade (ex: disco cheio) sai do journal: ou entra inteiro, ou nada
+            with contextlib.suppress(OSError):
+                f.truncate(tamanho)
+            raise
+    contar_metricas(registros=len(alteracoes), bytes_gravados=len(linhas.encode("utf-8")))
+
+def compactar_journal(pacientes, agendamentos, geracao=0, removidos=None):
+    """Grava o snapshot completo e descarta o journal (que já está nele)."""
+    salvar_dados(pacientes, agendamentos, geracao, removidos)
+    caminho_journal().unlink(missing_ok=True)
+
+# --- Vários processos no mesmo arquivo (NOVO) ---
+
+# Sem servidor, dois terminais podem rodar o menu com o mesmo arquivo. Cada
+# gravação aumenta a "geracao" guardada no arquivo; quem for gravar com uma
+# geração velha (outro processo gravou depois da sua carga) primeiro relê o
+# disco e reaplica as próprias alterações por cima, em vez de sobrescrever.
+
+def caminho_trava():
+    """Arquivo usado só para a trava entre processos (nunca é apagado)."""
+    return ARQUIVO_DADOS.with_suffix(".lock")
+
+@contextlib.contextmanager
+def trava_dados(compartilhada=False):
+    """Trava (advisory) entre processos: exclusiva para gravar, compartilhada para ler."""
+    with open(caminho_trava(), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:  # LK_LOCK desiste depois de ~10 s; tenta de novo
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if compartilhada else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def ler_geracao():
+    """Geração atual no disco, lendo só o começo do snapshot e o último lote do journal."""
+    geracao = 0
+    if ARQUIVO_DADOS.exists():
+        with open(ARQUIVO_DADOS, "rb") as f:
+            inicio = f.read(64)
+        import snapshot_binario_cac
+        if snapshot_binario_cac.eh_binario(inicio):
+            cabecalho = snapshot_binario_cac.ler_cabecalho(inicio)  # NOVO
+            geracao = cabecalho["geracao"] if cabecalho else 0
+        else:
+            encontrada = re.match(rb'\s*\{\s*"geracao"\s*:\s*(\d+)', inicio)
+            if encontrada:
+                geracao = int(encontrada.group(1))
+    if caminho_journal().exists():
+        with open(caminho_journal(), "rb") as f:
+            conteudo = f.read()  # Pequeno: é compactado ao passar de LIMITE_JOURNAL_BYTES
+        posicao = conteudo.rfind(b'{"op":"geracao"')
+        if posicao >= 0:
+            fim = conteudo.find(b"\n", posicao)
+            geracao = json.loads(conteudo[posicao:fim if fim >= 0 else None])["valor"]
+    return geracao
+
+# NOVO: O Seq é a geração da gravação. O repositório já marca os registros
+# com a geração seguinte à que leu; se outro processo gravou antes, o lote
+# sai numa geração maior e as marcas são corrigidas aqui.
+def carimbar_alteracoes(alteracoes, seq):
+    """Marca as alterações (e os registros novos) com o Seq do lote em que serão gravadas."""
+    for alteracao in alteracoes:
+        op = alteracao["op"]
+        if op in ("+paciente", "+agendamento"):
+            alteracao["registro"]["Seq"] = seq
+        elif op in ("~paciente", "~agendamento"):
+            alteracao["campos"]["Seq"] = seq
+        elif op == "-paciente":
+            alteracao["seq"] = seq
+
+def mesclar_alteracoes(dados, alteracoes, ultimo_id_arquivado=0):
+    """Reaplica alterações pendentes por cima do estado mais novo do disco.
+
+    Campo a campo vale a última gravação. Agendamento novo cujo ID já foi
+    usado por outro processo ganha um ID novo (e as alterações seguintes dele
+    acompanham).
+    """
+    pacientes = {p["CPF"]: p for p in dados["pacientes"]}
+    agendamentos = {ag["ID"]: ag for ag in dados["agendamentos"]}
+    ultimo_id = max(max(agendamentos, default=0), ultimo_id_arquivado)
+    novos_ids = {}
+    for alteracao in alteracoes:
+        if alteracao["op"] == "+agendamento":
+            registro = alteracao["registro"]
+            if registro["ID"] in agendamentos or registro["ID"] <= ultimo_id_arquivado:
+                ultimo_id += 1
+                novos_ids[registro["ID"]] = ultimo_id
+                registro["ID"] = ultimo_id
+            ultimo_id = max(ultimo_id, registro["ID"])
+        elif alteracao["op"] == "~agendamento" and alteracao["id"] in novos_ids:
+            alteracao["id"] = novos_ids[alteracao["id"]]
+        aplicar_alteracao(alteracao, pacientes, agendamentos, dados["removidos"])
+    dados["pacientes"] = list(pacientes.values())
+    dados["agendamentos"] = list(agendamentos.values())
+    return dados
+
+def recarregar_repositorio(repo, dados):
+    """Troca o conteúdo do repositório pelos dados (mantendo as mesmas listas)."""
+    if USAR_REGISTROS_COMPACTOS:
+        converter_para_registros(dados)
+    repo.pacientes[:] = dados["pacientes"]
+    repo.agendamentos[:] = dados["agendamentos"]
+    repo.geracao = dados.get("geracao", 0)
+    repo.removidos = dados.get("removidos", {})
+    if repo.arquivo is not None:
+        repo.arquivo.recarregar()
+    repo.profissionais.recarregar()
+    repo.reindexar()
+
+# --- Arquivo morto (opcional) ---
+
+STATUS_ENCERRADOS = ("Atendimento Realizado", "Cancelado")
+
+def caminho_arquivo_morto():
+    """Pasta das partições mensais ao lado do ARQUIVO_DADOS."""
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.stem + "_arquivo")
+
+def abrir_arquivo_historico():
+    """Arquivo morto do ARQUIVO_DADOS atual (ou None, se desligado)."""
+    if not USAR_ARQUIVO_MORTO or USAR_SQLITE:
+        return None
+    import arquivo_historico
+    arquivo = arquivo_historico.ArquivoHistorico(caminho_arquivo_morto(), VERSAO_DADOS)
+    # NOVO: Partições gravadas numa versão antiga são migradas uma vez só
+    if arquivo.versao < VERSAO_DADOS and arquivo.meses:
+        with trava_dados():
+            arquivo.recarregar()
+            if arquivo.versao < VERSAO_DADOS:
+                import migracoes_cac
+                funcoes_por_passo = funcoes_de_migracao(arquivo.versao, arquivo.ultimo_id)
+                arquivo.migrar(lambda ag: migracoes_cac.migrar_registro(ag, "agendamentos", funcoes_por_passo),
+                               VERSAO_DADOS)
+    return arquivo
+
+def arquivar_historico(repo, hoje=None):
+    """Move para o arquivo morto as consultas encerradas de meses que já acabaram.
+
+    Retorna quantos agendamentos foram movidos.
+    """
+    if repo.arquivo is None or USAR_SQLITE:  # No SQLite o histórico já fica no banco
+        return 0
+    hoje = hoje or date.today()
+    limite = para_timestamp(f"01/{hoje.month:02d}/{hoje.year}")
+
+    def encerrado(ag):
+        ts = ag.get("InicioTS")
+        return ag.get("Status") in STATUS_ENCERRADOS and ts is not None and ts < limite
+
+    if not any(encerrado(ag) for ag in repo.agendamentos):
+        return 0
+    if repo.alteracoes:
+        persistir_alteracoes(repo)
+    with trava_dados():
+        if ler_geracao() != repo.geracao:
+            recarregar_repositorio(repo, ler_dados_json())
+        antigos = [ag for ag in repo.agendamentos if encerrado(ag)]
+        if not antigos:
+            return 0
+        # Primeiro as partições: se cair no meio, os registros continuam no
+        # ARQUIVO_DADOS e são arquivados de novo na próxima vez
+        repo.arquivo.arquivar(antigos)
+        repo.agendamentos[:] = [ag for ag in repo.agendamentos if not encerrado(ag)]
+        repo.reindexar()
+        repo.geracao += 1
+        compactar_journal(repo.pacientes, repo.agendamentos, repo.geracao, repo.removidos)
+    return len(antigos)
+
+# --- Lembretes de consulta (NOVO) ---
+
+def caminho_caixa_de_saida():
+    """Lembretes enviados, um JSON por linha (ex: clinica_dados_lembretes.jsonl)."""
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.stem + "_lembretes.jsonl")
+
+_caixa_de_saida = None
+
+def caixa_de_saida():
+    """A caixa de saída do ARQUIVO_DADOS atual (as chaves enviadas ficam em memória)."""
+    global _caixa_de_saida
+    if _caixa_de_saida is None or _caixa_de_saida.caminho != caminho_caixa_de_saida():
+        import lembretes_cac
+        _caixa_de_saida = lembretes_cac.CaixaDeSaida(caminho_caixa_de_saida())
+    return _caixa_de_saida
+
+def telefone_do_agendamento(repo, ag):
+    """'+55DDDNÚMERO' do cadastro do paciente (None para quem não tem cadastro ou telefone)."""
+    paciente = repo.buscar_paciente(ag["CPF"])
+    if paciente is None or not paciente["Telefone"]:
+        return None
+    return f"+55{paciente['DDD']}{paciente['Telefone']}"
+
+@medido("enviar_lembretes")
+def enviar_lembretes(repo, agora=None):
+    """Manda para a caixa de saída os lembretes vencidos. Retorna as mensagens enviadas."""
+    if agora is None:
+        agora = texto_para_timestamp(datetime.now().strftime("%d/%m/%Y às %H:%M:%S"))
+    proximo = repo.fila_lembretes().proximo_envio()
+    if proximo is None or proximo > agora:
+        return []  # O caso comum: só olha o topo da fila
+    import lembretes_cac
+    caixa = caixa_de_saida()
+    mensagens = []
+    with trava_dados():  # Dois processos nunca mandam o mesmo lembrete
+        # Decide com os dados do disco (outro processo pode ter cancelado ou
+        # remarcado a consulta). ALTERADO: O que está pendente entra por cima
+        # (como em sincronizar_com_disco) e continua pendente: quem grava é o
+        # gravador, sem regravar o arquivo aqui só para poder reler
+        if USAR_SQLITE:
+            import armazenamento_sqlite
+            desatualizado = armazenamento_sqlite.ler_geracao(conexao_sqlite()) != repo.geracao
+        else:
+            desatualizado = ler_geracao() != repo.geracao
+        if desatualizado:
+            if repo.arquivo is not None:
+                repo.arquivo.recarregar()
+            ultimo_id_arquivado = repo.arquivo.ultimo_id if repo.arquivo is not None else 0
+            if not USAR_SQLITE:
+                dados = ler_dados_json()
+            elif repo.arquivo is not None:
+                # Sem carregar_dados_sqlite: a trava compartilhada dele esperaria por esta
+                dados = armazenamento_sqlite.carregar_ativos(conexao_sqlite(), repo.arquivo.limite)
+            else:
+                dados = armazenamento_sqlite.carregar_tudo(conexao_sqlite())
+            recarregar_repositorio(repo, mesclar_alteracoes(dados, repo.alteracoes, ultimo_id_arquivado))
+            repo.recarregar_pendente = False
+        caixa.atualizar()
+        for ag, horas in repo.fila_lembretes().devidos(agora, repo.agendamento_por_id):
+            if lembretes_cac.chave_lembrete(ag["ID"], ag["InicioTS"], horas) in caixa.enviados:
+                continue  # Já enviado (antes de reiniciar ou por outro processo)
+            telefone = telefone_do_agendamento(repo, ag)
+            if telefone is None:
+                continue
+            mensagens.append(lembretes_cac.montar_mensagem(ag, horas, telefone, NOME_CLINICA))
+        caixa.enviar(mensagens)
+    contar_metricas(registros=len(mensagens))
+    return mensagens
+
+# --- Cadastro de profissionais (NOVO) ---
+
+def caminho_profissionais():
+    """Cadastro de profissionais, ao lado do ARQUIVO_DADOS (ex: clinica_dados_profissionais.json)."""
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.stem + "_profissionais.json")
+
+def abrir_cadastro_profissionais(caminho=None):
+    """Cadastro de profissionais (sem arquivo ainda, começa com PROFISSIONAIS). caminho=None: só em memória."""
+    return CadastroProfissionais(
+        caminho, PROFISSIONAIS, HORARIO_ABERTURA, HORARIO_FECHAMENTO, DIAS_DE_ATENDIMENTO,
+    )
+
+# --- SQLite (opcional) ---
+
+def caminho_sqlite():
+    """Banco SQLite que acompanha o ARQUIVO_DADOS atual."""
+    return ARQUIVO_DADOS.with_suffix(".db")
+
+_conexao_sqlite = None
+
+def conexao_sqlite():
+    """Abre o banco SQLite uma única vez (o módulo só é importado se for usado)."""
+    global _conexao_sqlite
+    if _conexao_sqlite is None:
+        import armazenamento_sqlite
+        # ALTERADO: Sem banco, ele é criado já com os dados do JSON
+        if not caminho_sqlite().exists():
+            migrar_para_sqlite()
+        _conexao_sqlite = armazenamento_sqlite.abrir(caminho_sqlite())
+    return _conexao_sqlite
+
+def migrar_para_sqlite():
+    """Cria o banco importando o clinica_dados.json (inclusive o formato antigo em lista)."""
+    import armazenamento_sqlite
+    # Trava exclusiva: outro processo abrindo o banco agora espera a migração acabar
+    with trava_dados():
+        if caminho_sqlite().exists():
+            return  # Outro processo já criou
+        # ALTERADO: Importa num banco temporário e só então troca de nome: um
+        # banco com o nome certo sempre tem a importação completa (uma falha
+        # no meio deixa só o temporário, e a próxima abertura tenta de novo)
+        temporario = caminho_sqlite().with_name(caminho_sqlite().name + ".tmp")
+        for sobra in (temporario, Path(f"{temporario}-wal"), Path(f"{temporario}-shm")):
+            sobra.unlink(missing_ok=True)
+        if precisa_migrar():
+            migrar_arquivo_de_dados()  # NOVO: O banco já nasce na VERSAO_DADOS
+        dados = ler_dados_json()  # Sem JSON: banco vazio, já na VERSAO_DADOS
+        conexao = armazenamento_sqlite.abrir(temporario)
+        try:
+            armazenamento_sqlite.migrar(conexao, dados, VERSAO_DADOS)
+        finally:
+            conexao.close()
+        os.replace(temporario, caminho_sqlite())
+    if dados["pacientes"] or dados["agendamentos"]:
+        print(f"✅ Migrados {len(dados['pacientes'])} paciente(s) e "
+              f"{len(dados['agendamentos'])} agendamento(s) para {caminho_sqlite()}.")
+
+def carregar_dados_sqlite(historico=None):
+    """Carrega do SQLite, migrando o JSON automaticamente na primeira vez.
+
+    ALTERADO: Com um HistoricoSQLite, deixa no banco as consultas dele.
+    """
+    import armazenamento_sqlite
+    preparar_sqlite()
+    with trava_dados(compartilhada=True):
+        if historico is not None:
+            return armazenamento_sqlite.carregar_ativos(conexao_sqlite(), historico.limite)
+        return armazenamento_sqlite.carregar_tudo(conexao_sqlite())
+
+def abrir_historico_sqlite(hoje=None):
+    """Consultas encerradas de meses que já acabaram, lidas do banco só quando pedidas (para o menu)."""
+    import armazenamento_sqlite
+    hoje = hoje or date.today()
+    return armazenamento_sqlite.HistoricoSQLite(conexao_sqlite(), f"{hoje.year:04d}-{hoje.month:02d}-01")
+
+def preparar_sqlite():
+    """Cria o banco a partir do JSON na primeira vez e migra bancos de versões anteriores."""
+    import armazenamento_sqlite
+    # NOVO: Banco de uma versão anterior: migra os registros uma vez só
+    if armazenamento_sqlite.ler_versao(conexao_sqlite()) < VERSAO_DADOS:
+        with trava_dados():
+            conexao = conexao_sqlite()
+            versao = armazenamento_sqlite.ler_versao(conexao)
+            if versao < VERSAO_DADOS:
+                import migracoes_cac
+                maior_id = conexao.execute("SELECT COALESCE(MAX(id), 0) FROM agendamentos").fetchone()[0]
+                funcoes_por_passo = funcoes_de_migracao(versao, maior_id)
+                armazenamento_sqlite.migrar_registros(
+                    conexao,
+                    lambda p: migracoes_cac.migrar_registro(p, "pacientes", funcoes_por_passo),
+                    lambda ag: migracoes_cac.migrar_registro(ag, "agendamentos", funcoes_por_passo),
+                    VERSAO_DADOS)
+                print(f"🔧 {caminho_sqlite()} atualizado da versão {versao} para a {VERSAO_DADOS}.")
+
+# NOVO: Ponto único de gravação usado pelo main()
+@medido("persistir_alteracoes")
+def persistir_alteracoes(repo, trava=None):
+    """Grava as alterações pendentes do repositório no disco.
+
+    ALTERADO: Com 'trava' (a do gravador do menu), ela só é segurada para
+    separar o lote; ver persistir_lote().
+    """
+    if USAR_SQLITE:
+        # Só as alterações, numa única transação (o SQLite já trava o banco)
+        import armazenamento_sqlite
+        with trava or contextlib.nullcontext():
+            geracao, desatualizado = armazenamento_sqlite.aplicar_alteracoes(
+                conexao_sqlite(), repo.alteracoes, repo.geracao)
+            repo.alteracoes.clear()
+            if desatualizado:
+                recarregar_repositorio(repo, carregar_dados_sqlite(repo.arquivo))
+            repo.geracao = geracao
+        return
+    if trava is not None:
+        persistir_lote(repo, trava)
+        return
+
+    if USAR_JOURNAL and not repo.alteracoes:
+        return
+    # ALTERADO: Trava exclusiva + controle otimista pela geração
+    with trava_dados():
+        geracao_disco = ler_geracao()
+        carimbar_alteracoes(repo.alteracoes, geracao_disco + 1)
+        if geracao_disco != repo.geracao:
+            # Outro processo gravou depois da nossa carga: relê e reaplica por cima
+            if repo.arquivo is not None:
+                repo.arquivo.recarregar()
+            ultimo_id_arquivado = repo.arquivo.ultimo_id if repo.arquivo is not None else 0
+            recarregar_repositorio(repo, mesclar_alteracoes(ler_dados_json(), repo.alteracoes, ultimo_id_arquivado))
+        # ALTERADO: A geração só avança depois que o lote foi gravado
+        geracao = geracao_disco + 1
+
+        if USAR_JOURNAL:
+            # A linha 'geracao' fecha o lote (e é o que ler_geracao() procura)
+            anexar_journal(repo.alteracoes + [{"op": "geracao", "valor": geracao}])
+            if caminho_journal().stat().st_size > LIMITE_JOURNAL_BYTES:
+                # O lote já está no journal: se compactar falhar, a próxima gravação tenta de novo
+                with contextlib.suppress(OSError):
+                    compactar_journal(repo.pacientes, repo.agendamentos, geracao, repo.removidos)
+        else:
+            # Modo antigo: regrava tudo (e absorve um journal que tenha sobrado)
+            compactar_journal(repo.pacientes, repo.agendamentos, geracao, repo.removidos)
+        repo.geracao = geracao
+    repo.alteracoes.clear()
+
+# NOVO: Gravação do servidor, que responde leituras do repositório enquanto
+# grava: aqui só se mexe em cópias do lote. Se outro processo gravou antes,
+# o lote entra por cima do que ele gravou e volta um repositório novo,
+# montado nesta thread, para o servidor trocar pelo seu de uma vez só.
+def persistir_copias(copias, geracao_lida):
+    """Grava cópias de um lote feito sobre a geracao_lida -> (geração gravada, repositório novo ou None).
+
+    Agendamentos novos cujo ID outro processo já usou ganham um ID novo nas cópias.
+    """
+    if USAR_SQLITE:
+        import armazenamento_sqlite
+        geracao, desatualizado = armazenamento_sqlite.aplicar_alteracoes(conexao_sqlite(), copias, geracao_lida)
+        return geracao, (abrir_repositorio(arquivar=False) if desatualizado else None)
+    with trava_dados():
+        geracao = ler_geracao() + 1
+        carimbar_alteracoes(copias, geracao)
+        if geracao - 1 == geracao_lida:
+            gravar_lote(copias, geracao)
+            return geracao, None
+        arquivo = None
+        if USAR_ARQUIVO_MORTO:
+            # Sem abrir_arquivo_historico(): a migração dele pegaria esta trava de
+            # novo (e quem chega aqui já abriu o arquivo morto, migrado, antes)
+            import arquivo_historico
+            arquivo = arquivo_historico.ArquivoHistorico(caminho_arquivo_morto(), VERSAO_DADOS)
+        dados = mesclar_alteracoes(ler_dados_json(), copias, arquivo.ultimo_id if arquivo is not None else 0)
+        gravar_lote(copias, geracao)
+    dados["geracao"] = geracao
+    if USAR_REGISTROS_COMPACTOS:
+        converter_para_registros(dados)
+    return geracao, montar_repositorio(dados, arquivo)
+
+# NOVO: Gravação do menu sem segurar o repositório. Com a trava só se tira o
+# lote de repo.alteracoes (cópias dos registros); ler o disco, aplicar o lote
+# e gravar acontece depois, com o menu livre. Se outro processo gravou desde
+# a nossa carga, o lote volta para repo.alteracoes e o repositório fica
+# marcado para recarregar: isso só é feito no começo do menu
+# (sincronizar_com_disco), nunca no meio de uma opção que ainda segura
+# registros do repositório.
+
+def copiar_alteracao(alteracao):
+    """Cópia que a gravação pode serializar enquanto o menu altera os registros originais."""
+    copia = dict(alteracao)
+    for campo in ("registro", "campos"):
+        if campo in copia:
+            copia[campo] = dict(copia[campo])
+    return copia
+
+def gravar_lote(alteracoes, geracao):
+    """Grava um lote por cima do que está no disco (quem chama segura trava_dados())."""
+    if USAR_JOURNAL:
+        anexar_journal(alteracoes + [{"op": "geracao", "valor": geracao}])
+        if caminho_journal().stat().st_size <= LIMITE_JOURNAL_BYTES:
+            return
+        # O lote já está no journal: se compactar falhar, a próxima gravação tenta de novo
+        with contextlib.suppress(OSError):
+            dados = ler_dados_json()
+            compactar_journal(dados["pacientes"], dados["agendamentos"], geracao, dados["removidos"])
+        return
+    dados = ler_dados_json()
+    pacientes = {p["CPF"]: p for p in dados["pacientes"]}
+    agendamentos = {ag["ID"]: ag for ag in dados["agendamentos"]}
+    for alteracao in alteracoes:
+        aplicar_alteracao(alteracao, pacientes, agendamentos, dados["removidos"])
+    dados["pacientes"] = list(pacientes.values())
+    dados["agendamentos"] = list(agendamentos.values())
+    compactar_journal(dados["pacientes"], dados["agendamentos"], geracao, dados["removidos"])
+
+def persistir_lote(repo, trava):
+    """Separa o lote segurando 'trava' e o grava sem ela."""
+    with trava:
+        if not repo.alteracoes:
+            return
+        lote = repo.alteracoes[:]
+        repo.alteracoes.clear()
+        copias = [copiar_alteracao(alteracao) for alteracao in lote]
+        geracao_lida = repo.geracao
+    try:
+        with trava_dados():
+            geracao = ler_geracao() + 1
+            atual = geracao - 1 == geracao_lida
+            if atual:
+                carimbar_alteracoes(copias, geracao)
+                gravar_lote(copias, geracao)
+    except BaseException:
+        with trava:
+            repo.alteracoes[:0] = lote  # Continua pendente para a próxima tentativa
+        raise
+    with trava:
+        if atual:
+            repo.geracao = geracao
+        else:
+            repo.alteracoes[:0] = lote
+            repo.recarregar_pendente = True
+
+def sincronizar_com_disco(repo, gravador):
+    """Recarrega o repositório do disco com as alterações pendentes por cima (fora das opções do menu)."""
+    with gravador.pausado(), trava_dados(compartilhada=True):
+        if repo.arquivo is not None:
+            repo.arquivo.recarregar()
+        ultimo_id_arquivado = repo.arquivo.ultimo_id if repo.arquivo is not None else 0
+        recarregar_repositorio(repo, mesclar_alteracoes(ler_dados_json(), repo.alteracoes, ultimo_id_arquivado))
+        repo.recarregar_pendente = False
+
+# --- Réplicas (exportação incremental) (NOVO) ---
+
+# A origem exporta só o que mudou depois da geração que a réplica já tem
+# (replicacao_cac.py). No SQLite a exportação lê só os registros alterados
+# (índice do Seq); no JSON o arquivo é lido inteiro e filtrado. Na réplica,
+# as alterações entram numa gravação só: no journal e no SQLite o tempo é o
+# das alterações, não o do tamanho dos dados. A réplica é só para leitura
+# (os agendamentos chegam com o ID da origem). O arquivo morto não é exportado.
+
+TIPO_ALTERACAO_REPLICA = {"+paciente": "pacientes", "+agendamento": "agendamentos", "-paciente": "removidos"}
+
+def caminho_cursor_replica():
+    """Geração da origem já aplicada nesta réplica (ex: clinica_dados.replica)."""
+    return ARQUIVO_DADOS.with_suffix(".replica")
+
+@medido("exportar_alteracoes")
+def exportar_alteracoes(saida, desde=0):
+    """Grava em 'saida' as alterações depois da geração 'desde'. Retorna os totais."""
+    import replicacao_cac
+    if USAR_SQLITE:
+        import armazenamento_sqlite
+        preparar_sqlite()
+        dados = armazenamento_sqlite.alteracoes_desde(conexao_sqlite(), desde)
+    else:
+        dados = carregar_dados_json()
+    totais = replicacao_cac.escrever(saida, dados, desde, VERSAO_DADOS)
+    contar_metricas(registros=sum(totais.values()))
+    return totais
+
+@medido("aplicar_alteracoes")
+def aplicar_alteracoes_replica(arquivo):
+    """Aplica um arquivo de alterações (aberto em modo texto) nesta réplica.
+
+    Retorna (cabeçalho, totais por tipo). ValueError se o arquivo estiver
+    incompleto ou não continuar de onde a réplica parou.
+    """
+    import replicacao_cac
+    cabecalho, alteracoes = replicacao_cac.ler(arquivo)
+    if cabecalho["versao"] > VERSAO_DADOS:
+        raise ValueError(f"alterações na versão {cabecalho['versao']}: esta réplica lê até a {VERSAO_DADOS}")
+    import migracoes_cac
+    funcoes_por_passo = funcoes_de_migracao(cabecalho["versao"])  # Origem numa versão anterior
+    totais = {"pacientes": 0, "agendamentos": 0, "removidos": 0}
+    for alteracao in alteracoes:
+        tipo = TIPO_ALTERACAO_REPLICA[alteracao["op"]]
+        totais[tipo] += 1
+        if funcoes_por_passo and tipo != "removidos":
+            alteracao["registro"] = migracoes_cac.migrar_registro(alteracao["registro"], tipo, funcoes_por_passo)
+    contar_metricas(registros=len(alteracoes))
+
+    if USAR_SQLITE:
+        preparar_sqlite()  # Antes da trava (a migração também trava)
+    with trava_dados():
+        cursor = replicacao_cac.ler_cursor(caminho_cursor_replica())
+        if cursor is not None and cabecalho["ate"] <= cursor:
+            return cabecalho, dict.fromkeys(totais, 0)  # Já aplicado (ou mais antigo que o que a réplica tem)
+        if cabecalho["desde"] > (cursor or 0):
+            raise ValueError(f"faltam as alterações entre as gerações {cursor or 0} e {cabecalho['desde']} "
+                             f"da origem: exporte com --desde {cursor or 0}")
+        if USAR_SQLITE:
+            import armazenamento_sqlite
+            # Sem geracao_lida: cada agendamento fica com o ID da origem
+            armazenamento_sqlite.aplicar_alteracoes(conexao_sqlite(), alteracoes)
+        else:
+            geracao = ler_geracao() + 1
+            carimbar_alteracoes(alteracoes, geracao)
+            gravar_lote(alteracoes, geracao)
+        replicacao_cac.gravar_cursor(caminho_cursor_replica(), cabecalho["ate"])
+    return cabecalho, totais
 
 # Funções de validação (sem alteração)
 def validar_data(data_str):
@@ -79,9 +1176,84 @@ def validar_horario(hora_str):
     except ValueError:
         return None
 
+# NOVO: Regras de validação que antes ficavam só dentro dos loops de input()
+# (agora são as mesmas para o menu e para a importação em lote)
+def validar_cpf(cpf):
+    return cpf.isdigit() and len(cpf) == 11
+
+def validar_estado(estado):
+    return len(estado) == 2 and estado.isalpha()
+
+def validar_ddd(ddd):
+    return ddd.isdigit() and len(ddd) == 2
+
+def validar_celular(numero):
+    return numero.isdigit() and len(numero) == 9 and numero.startswith("9")
+
+
+# --- Campos de tempo normalizados ---
+
+# NOVO: As datas continuam guardadas como texto para exibição ('DD/MM/AAAA',
+# 'HH:MM', 'DD/MM/AAAA às HH:MM:SS'), mas cada registro também carrega o
+# mesmo instante em segundos desde 01/01/1970 (inteiro, ordenável). Eles são
+# calculados UMA vez, ao carregar ou inserir, e não a cada ordenação.
+_ORDINAL_EPOCH = date(1970, 1, 1).toordinal()
+
+# Chave usada para datas inválidas (vão para o topo, como o antigo datetime.min)
+TS_INVALIDO = -(2 ** 62)
+
+def minutos_do_dia(hora_str):
+    """Converte 'HH:MM' em minutos desde 00:00 (ou None se inválido)."""
+    if not isinstance(hora_str, str) or len(hora_str) != 5 or hora_str[2] != ":":
+        return None
+    try:
+        horas, minutos = int(hora_str[0:2]), int(hora_str[3:5])
+    except ValueError:
+        return None
+    if 0 <= horas < 24 and 0 <= minutos < 60:
+        return horas * 60 + minutos
+    return None
+
+def para_timestamp(data_str, hora_str="00:00", segundos=0):
+    """Converte 'DD/MM/AAAA' + 'HH:MM' em segundos desde 01/01/1970 (ou None se inválido)."""
+    if not isinstance(data_str, str) or len(data_str) != 10 or data_str[2] != "/" or data_str[5] != "/":
+        return None
+    minutos = minutos_do_dia(hora_str)
+    if minutos is None:
+        return None
+    try:
+        dia = date(int(data_str[6:10]), int(data_str[3:5]), int(data_str[0:2]))
+    except ValueError:
+        return None
+    return (dia.toordinal() - _ORDINAL_EPOCH) * 86400 + minutos * 60 + segundos
+
+def texto_para_timestamp(texto):
+    """Converte 'DD/MM/AAAA às HH:MM:SS' (DataCadastro, DataAgendamento...) em timestamp."""
+    if not isinstance(texto, str) or len(texto) != 22:
+        return None  # 'N/A' ou formato desconhecido
+    try:
+        segundos = int(texto[20:22])
+    except ValueError:
+        return None
+    return para_timestamp(texto[0:10], texto[14:19], segundos)
+
+def normalizar_tempos_paciente(paciente):
+    """Preenche CadastroTS/ModificacaoTS a partir dos textos de data."""
+    paciente["CadastroTS"] = texto_para_timestamp(paciente.get("DataCadastro"))
+    paciente["ModificacaoTS"] = texto_para_timestamp(paciente.get("UltimaModificacao"))
+
+def normalizar_tempos_agendamento(ag):
+    """Preenche InicioTS/FimTS/AgendadoTS a partir dos textos de data e hora."""
+    ag["InicioTS"] = para_timestamp(ag.get("DataConsulta"), ag.get("HorarioInicio", "00:00"))
+    ag["FimTS"] = para_timestamp(ag.get("DataConsulta"), ag.get("HoraFinal"))
+    ag["AgendadoTS"] = texto_para_timestamp(ag.get("DataAgendamento"))
+
 # NOVO: Função helper para buscar um paciente pelo CPF na lista de pacientes
 def buscar_paciente_por_cpf(cpf, pacientes):
     """Retorna o dicionário do paciente se encontrado, senão None."""
+    # NOVO: Se receber o repositório, usa o índice por CPF (sem varrer a lista)
+    if isinstance(pacientes, RepositorioClinica):
+        return pacientes.buscar_paciente(cpf)
     for paciente in pacientes:
         if paciente["CPF"] == cpf:
             return paciente
@@ -90,51 +1262,127 @@ def buscar_paciente_por_cpf(cpf, pacientes):
 # NOVO: Função helper para imprimir dados de um PACIENTE (registro)
 def imprimir_paciente_registro(paciente, indice=None):
     """Imprime um bloco formatado com os dados de registro de um paciente."""
+    print(formatar_paciente_registro(paciente, indice), end="")
+
+# NOVO: Monta o bloco do paciente como texto (uma única escrita no terminal)
+def formatar_paciente_registro(paciente, indice=None, incluir_clinica=True):
+    """Retorna o bloco formatado com os dados de registro de um paciente."""
+    largura_label = 21
+    linhas = []
     if indice:
-        print(f" PACIENTE #{indice}\n")
+        linhas.append(f" PACIENTE #{indice}\n")
     
-    largura_label = 21
-    print(f" {'Nome Completo:':<{largura_label}} {paciente.get('NomeCompleto', 'N/A')}")
-    print(f" {'CPF:':<{largura_label}} {paciente.get('CPF', 'N/A')}")
-    print(f" {'Nascimento:':<{largura_label}} {paciente.get('Data de Nascimento', 'N/A')}")
-    print(f" {'Contato:':<{largura_label}} {formatar_telefone(paciente.get('DDD', ''), paciente.get('Telefone', ''))}")
-    print(f" {'Endereço:':<{largura_label}} {paciente.get('Endereço', 'N/A')}")
-    print(f" {'Local:':<{largura_label}} {paciente.get('Cidade', 'N/A')} - {paciente.get('Estado', 'N/A')}")
-    print(f" {'Data de Cadastro:':<{largura_label}} {paciente.get('DataCadastro', 'N/A')}")
-    print(f" {'Última Modificação:':<{largura_label}} {paciente.get('UltimaModificacao', 'N/A')}")
+    # ALTERADO: Registros sempre completos (ver completar_paciente): sem .get(..., 'N/A')
+    linhas.append(f" {'Nome Completo:':<{largura_label}} {paciente['NomeCompleto']}")
+    linhas.append(f" {'CPF:':<{largura_label}} {paciente['CPF']}")
+    linhas.append(f" {'Nascimento:':<{largura_label}} {paciente['Data de Nascimento']}")
+    linhas.append(f" {'Contato:':<{largura_label}} {formatar_telefone(paciente['DDD'], paciente['Telefone'])}")
+    linhas.append(f" {'Endereço:':<{largura_label}} {paciente['Endereço']}")
+    linhas.append(f" {'Local:':<{largura_label}} {paciente['Cidade']} - {paciente['Estado']}")
+    linhas.append(f" {'Data de Cadastro:':<{largura_label}} {paciente['DataCadastro']}")
+    linhas.append(f" {'Última Modificação:':<{largura_label}} {paciente['UltimaModificacao']}")
     
     # ALTERAÇÃO AQUI: Adiciona info da clínica na listagem
-    print(f" {'Local:':<{largura_label}} {NOME_CLINICA}")
-    print(f" {'Endereço:':<{largura_label}} {ENDERECO_CLINICA}")
+    if incluir_clinica:
+        linhas.append(f" {'Local:':<{largura_label}} {NOME_CLINICA}")
+        linhas.append(f" {'Endereço:':<{largura_label}} {ENDERECO_CLINICA}")
+    return "\n".join(linhas) + "\n"
 
 
 # NOVO: Função helper para imprimir dados de um AGENDAMENTO (ALTERADA)
-def imprimir_agendamento_detalhado(ag, indice=None):
+def imprimir_agendamento_detalhado(ag, indice=None, nome=None):
     """Imprime um bloco formatado com os dados de um agendamento."""
+    print(formatar_agendamento_detalhado(ag, indice, nome=nome), end="")
+
+# NOVO: Monta o bloco do agendamento como texto (uma única escrita no terminal)
+def formatar_agendamento_detalhado(ag, indice=None, incluir_clinica=True, nome=None):
+    """Retorna o bloco formatado com os dados de um agendamento.
+
+    'nome' substitui o nome gravado no agendamento (ver RepositorioClinica.nome_exibido).
+    """
+    largura_label = 18
+    linhas = []
     if indice:
-        print(f" AGENDAMENTO #{indice}\n")
+        linhas.append(f" AGENDAMENTO #{indice}\n")
     
-    largura_label = 18
-    print(f" {'Data:':<{largura_label}} {ag.get('DataConsulta', 'N/A')}")
-    print(f" {'Horário Início:':<{largura_label}} {ag.get('HorarioInicio', 'N/A')}")
-    print(f" {'Status:':<{largura_label}} {ag.get('Status', 'N/A')}")
-    print(f" {'Paciente:':<{largura_label}} {ag.get('NomeCompleto', 'N/A')}")
-    print(f" {'CPF:':<{largura_label}} {ag.get('CPF', 'N/A')}")
-    # ALTERAÇÃO AQUI: Mostra Especializacao e Medico
-    print(f" {'Especialidade:':<{largura_label}} {ag.get('Especializacao', 'N/A')}")
-    print(f" {'Médico:':<{largura_label}} {ag.get('Medico', 'N/A')}")
-    print(f" {'Horário Final:':<{largura_label}} {ag.get('HoraFinal', 'N/A')}")
+    # ALTERADO: Registros sempre completos (ver completar_agendamento): sem .get(..., 'N/A')
+    linhas.append(f" {'Data:':<{largura_label}} {ag['DataConsulta']}")
+    linhas.append(f" {'Horário Início:':<{largura_label}} {ag['HorarioInicio']}")
+    linhas.append(f" {'Status:':<{largura_label}} {ag['Status']}")
+    linhas.append(f" {'Paciente:':<{largura_label}} {nome or ag['NomeCompleto']}")
+    linhas.append(f" {'CPF:':<{largura_label}} {ag['CPF']}")
+    # ALTERAÇÃO AQUI: Mostra Especializacao e Medico (vazios nos registros antigos)
+    linhas.append(f" {'Especialidade:':<{largura_label}} {ag['Especializacao'] or 'N/A'}")
+    linhas.append(f" {'Médico:':<{largura_label}} {ag['Medico'] or 'N/A'}")
+    linhas.append(f" {'Horário Final:':<{largura_label}} {ag['HoraFinal']}")
 
     # ALTERAÇÃO AQUI: Adiciona info da clínica na listagem
-    print(f" {'Local:':<{largura_label}} {NOME_CLINICA}")
-    print(f" {'Endereço:':<{largura_label}} {ENDERECO_CLINICA}")
+    if incluir_clinica:
+        linhas.append(f" {'Local:':<{largura_label}} {NOME_CLINICA}")
+        linhas.append(f" {'Endereço:':<{largura_label}} {ENDERECO_CLINICA}")
+    return "\n".join(linhas) + "\n"
+
+def formatador_agendamentos(repo):
+    """formatar_agendamento_detalhado com o nome atual do paciente (para exibir_paginado)."""
+    def formatar(ag, indice=None, incluir_clinica=True):
+        return formatar_agendamento_detalhado(ag, indice, incluir_clinica, repo.nome_exibido(ag))
+    return formatar
+
+
+# --- Listagem paginada ---
+
+# NOVO: Quantos registros por página nas listagens
+TAMANHO_PAGINA = 20
+
+def gerar_paginas(registros, tamanho_pagina=TAMANHO_PAGINA, pagina=1):
+    """Gera (número, registros) página a página a partir da página pedida.
+
+    'registros' pode ser qualquer sequência fatiável (lista, VisaoAgendamentos);
+    só a fatia de cada página é lida, então pular direto para a página K não
+    percorre as anteriores.
+    """
+    for inicio in range((pagina - 1) * tamanho_pagina, len(registros), tamanho_pagina):
+        yield inicio // tamanho_pagina + 1, registros[inicio:inicio + tamanho_pagina]
+
+def renderizar_pagina(registros, formatar, separador, primeiro_indice=1):
+    """Monta o texto de uma página inteira (cabeçalho da clínica uma vez só)."""
+    partes = [f" {NOME_CLINICA} - {ENDERECO_CLINICA}\n", separador, "\n"]
+    for i, registro in enumerate(registros, start=primeiro_indice):
+        partes.append(formatar(registro, i, incluir_clinica=False))
+        partes.append(separador)
+        partes.append("\n")
+    return "".join(partes)
+
+def exibir_paginado(registros, formatar, separador, tamanho_pagina=TAMANHO_PAGINA, pagina=1, navegar=True):
+    """Mostra a listagem página por página, com uma única escrita por página.
+
+    Com navegar=False mostra só a página pedida (sem perguntar nada).
+    """
+    total_paginas = max(1, -(-len(registros) // tamanho_pagina))
+    pagina = min(max(pagina, 1), total_paginas)
+    while True:
+        for numero, bloco in gerar_paginas(registros, tamanho_pagina, pagina):
+            texto = renderizar_pagina(bloco, formatar, separador, (numero - 1) * tamanho_pagina + 1)
+            contar_metricas(registros=len(bloco))  # NOVO: Só a página exibida é lida
+            sys.stdout.write(f"{texto} Página {numero}/{total_paginas}\n")
+            sys.stdout.flush()
+            if not navegar or total_paginas == 1:
+                return
+            resposta = perguntar("[Enter] próxima | nº da página | S = sair: ").strip().upper()
+            if resposta == "S":
+                return
+            if resposta.isdigit() and 1 <= int(resposta) <= total_paginas:
+                pagina = int(resposta)
+                break  # Recomeça o gerador direto na página pedida
+            if numero == total_paginas:
+                return
+        else:
+            return
 
 # (Função formatar_telefone não precisa de mudanças)
 def formatar_telefone(ddd, telefone):
-    # Converte para string e zfill para o caso de dados antigos
-    ddd = str(ddd)
-    telefone = str(telefone).zfill(9) 
-    
+    # ALTERADO: DDD e telefone já são texto com os zeros (a migração converteu
+    # os dados antigos uma vez, em completar_paciente)
     if not ddd and not telefone:
         return "N/A"
         
@@ -143,28 +1391,836 @@ def formatar_telefone(ddd, telefone):
     return f"({ddd}) 9 {parte1}-{parte2}"
 
 
+# --- Agenda dos profissionais (detecção de conflitos) ---
+
+# NOVO: Índice de intervalos ocupados, por profissional e por dia. Cada dia
+# guarda uma lista pequena e ordenada de (inicio_ts, fim_ts, ID), então
+# achar o dia é O(1) e achar os vizinhos de um horário é busca binária.
+class AgendaProfissionais:
+    """Intervalos ocupados por (profissional, dia), usados para evitar dois pacientes no mesmo horário.
+
+    A chave é o ProfissionalID do cadastro (o nome é só para exibir).
+    """
+
+    def __init__(self):
+        self.intervalos = {}  # (ProfissionalID, dia) -> [(inicio_ts, fim_ts, ID)] ordenada
+        # NOVO: Mapa de bits do dia: o bit i ligado = bloco de GRANULARIDADE_MINUTOS ocupado
+        self.ocupacao = {}    # (ProfissionalID, dia) -> int
+        self.maior_duracao = DURACAO_PADRAO_MINUTOS * 60
+
+    @staticmethod
+    def ocupa_horario(ag):
+        """Agendamentos cancelados (ou antigos, sem profissional/horário) não ocupam a agenda."""
+        return ag.get("ProfissionalID") is not None and ag.get("InicioTS") is not None and ag.get("Status") != "Cancelado"
+
+    @staticmethod
+    def fim_previsto(inicio_ts, fim_ts=None, duracao=None):
+        """Fim real (Hora Final) se houver, senão início + duração padrão."""
+        if fim_ts is not None and fim_ts > inicio_ts:
+            return fim_ts
+        return inicio_ts + (duracao or DURACAO_PADRAO_MINUTOS) * 60
+
+    def adicionar(self, ag):
+        if not self.ocupa_horario(ag):
+            return
+        inicio = ag["InicioTS"]
+        fim = self.fim_previsto(inicio, ag.get("FimTS"))
+        self.maior_duracao = max(self.maior_duracao, fim - inicio)
+        chave = (ag["ProfissionalID"], inicio // 86400)
+        insort(self.intervalos.setdefault(chave, []), (inicio, fim, ag["ID"]))
+        self.ocupacao[chave] = self.ocupacao.get(chave, 0) | self.mascara(inicio % 86400 // 60, (fim - inicio) // 60)
+
+    def remover(self, id_ag, profissional_id, inicio_ts):
+        if profissional_id is None or inicio_ts is None:
+            return
+        chave = (profissional_id, inicio_ts // 86400)
+        do_dia = self.intervalos.get(chave, [])
+        for i, intervalo in enumerate(do_dia):
+            if intervalo[2] == id_ag:
+                del do_dia[i]
+                break
+        if not do_dia:
+            self.intervalos.pop(chave, None)
+            self.ocupacao.pop(chave, None)
+        else:
+            # Refaz o mapa do dia (pode haver encaixes sobrepostos usando os mesmos blocos)
+            bits = 0
+            for inicio, fim, _ in do_dia:
+                bits |= self.mascara(inicio % 86400 // 60, (fim - inicio) // 60)
+            self.ocupacao[chave] = bits
+
+    @staticmethod
+    def mascara(inicio_min, duracao_min):
+        """Bits dos blocos cobertos por [inicio, inicio + duração) dentro do dia."""
+        primeiro = inicio_min // GRANULARIDADE_MINUTOS
+        ultimo = -(-min(inicio_min + duracao_min, 24 * 60) // GRANULARIDADE_MINUTOS)  # arredonda p/ cima
+        return ((1 << max(ultimo - primeiro, 0)) - 1) << primeiro
+
+    def horarios_livres_no_dia(self, profissional_id, dia, duracao, a_partir_min=0,
+                               abertura=HORARIO_ABERTURA, fechamento=HORARIO_FECHAMENTO):
+        """Inícios (em minutos do dia) de consultas que cabem no expediente sem conflito."""
+        ocupado = self.ocupacao.get((profissional_id, dia), 0)
+        # ALTERADO: Candidatos a cada GRANULARIDADE_MINUTOS (não a cada 'duracao'): uma
+        # consulta que termina fora da grade da duração não esconde o encaixe logo depois
+        inicio = max(minutos_do_dia(abertura), a_partir_min)
+        inicio = -(-inicio // GRANULARIDADE_MINUTOS) * GRANULARIDADE_MINUTOS  # arredonda p/ cima
+        fechamento = minutos_do_dia(fechamento)
+        livres = []
+        while inicio + duracao <= fechamento:
+            if not ocupado & self.mascara(inicio, duracao):
+                livres.append(inicio)
+            inicio += GRANULARIDADE_MINUTOS
+        return livres
+
+    def conflitos(self, profissional_id, inicio_ts, fim_ts, ignorar_id=None):
+        """IDs dos agendamentos do profissional que se sobrepõem a [inicio_ts, fim_ts)."""
+        do_dia = self.intervalos.get((profissional_id, inicio_ts // 86400), [])
+        # Só quem começa antes do fim pode se sobrepor; volta a partir daí até
+        # onde nem a consulta mais longa alcançaria o início pedido.
+        j = bisect_left(do_dia, (fim_ts,))
+        encontrados = []
+        for inicio, fim, id_ag in reversed(do_dia[:j]):
+            if inicio + self.maior_duracao <= inicio_ts:
+                break
+            if fim > inicio_ts and id_ag != ignorar_id:
+                encontrados.append(id_ag)
+        encontrados.reverse()
+        return encontrados
+
+    # NOVO: Várias consultas do mesmo médico (uma série) conferidas de uma vez
+    def conflitos_em_lote(self, profissional_id, intervalos, ignorar_ids=()):
+        """Para cada (inicio_ts, fim_ts), os IDs que se sobrepõem a ele (na mesma ordem).
+
+        O mapa de bits do dia descarta na hora as datas livres; só as que têm
+        algum bloco ocupado no horário passam pela busca binária de conflitos().
+        """
+        resultado = []
+        for inicio_ts, fim_ts in intervalos:
+            ocupado = self.ocupacao.get((profissional_id, inicio_ts // 86400), 0)
+            if ocupado & self.mascara(inicio_ts % 86400 // 60, (fim_ts - inicio_ts) // 60):
+                resultado.append([id_ag for id_ag in self.conflitos(profissional_id, inicio_ts, fim_ts)
+                                  if id_ag not in ignorar_ids])
+            else:
+                resultado.append([])
+        return resultado
+
+
+# NOVO: Verificação reutilizável (usada pelo menu, mas serve para qualquer rotina)
+def verificar_conflitos(repo, profissional_id, data_consulta, horario_inicio, duracao=None, ignorar_id=None):
+    """Retorna os agendamentos do profissional que chocam com o horário pedido (lista vazia = livre)."""
+    inicio_ts = para_timestamp(data_consulta, horario_inicio)
+    if inicio_ts is None:
+        return []
+    fim_ts = AgendaProfissionais.fim_previsto(inicio_ts, duracao=duracao)
+    ids = repo.agenda.conflitos(profissional_id, inicio_ts, fim_ts, ignorar_id)
+    return [repo.agendamento_por_id[id_ag] for id_ag in ids]
+
+
+# NOVO: Séries de consultas recorrentes
+def datas_recorrentes(data_inicial, intervalo_dias, vezes=None, ate=None):
+    """Datas 'DD/MM/AAAA' a cada 'intervalo_dias' dias, a partir de data_inicial (inclusive).
+
+    Para em 'vezes' consultas ou na data 'ate', o que vier primeiro (no
+    máximo MAXIMO_CONSULTAS_SERIE).
+    """
+    if not vezes and not ate:
+        raise ValueError("informe o número de consultas ou a data final da série")
+    if vezes is not None and vezes < 1:
+        raise ValueError("o número de consultas da série deve ser pelo menos 1")
+    if ate and not validar_data(ate):
+        raise ValueError(f"data final inválida: {ate!r} (use DD/MM/AAAA)")
+    dia = datetime.strptime(data_inicial, "%d/%m/%Y").date()
+    ultimo_dia = datetime.strptime(ate, "%d/%m/%Y").date() if ate else None
+    quantidade = min(vezes or MAXIMO_CONSULTAS_SERIE, MAXIMO_CONSULTAS_SERIE)
+    datas = []
+    while len(datas) < quantidade and (ultimo_dia is None or dia <= ultimo_dia):
+        datas.append(dia.strftime("%d/%m/%Y"))
+        dia += timedelta(days=intervalo_dias)
+    if not datas:
+        raise ValueError("a data final é anterior à primeira consulta")
+    return datas
+
+def verificar_conflitos_serie(repo, profissional_id, datas, horario_inicio, duracao=None, ignorar_ids=()):
+    """{data: [agendamentos em conflito]} só das datas ocupadas (vazio = todas livres)."""
+    validas, intervalos = [], []
+    for data in datas:
+        inicio_ts = para_timestamp(data, horario_inicio)
+        if inicio_ts is not None:
+            validas.append(data)
+            intervalos.append((inicio_ts, AgendaProfissionais.fim_previsto(inicio_ts, duracao=duracao)))
+    ids_por_data = repo.agenda.conflitos_em_lote(profissional_id, intervalos, set(ignorar_ids))
+    return {
+        data: [repo.agendamento_por_id[id_ag] for id_ag in ids]
+        for data, ids in zip(validas, ids_por_data) if ids
+    }
+
+def inserir_serie(repo, modelo, datas):
+    """Insere uma cópia do agendamento 'modelo' por data (com o mesmo 'Serie', se forem várias)."""
+    serie = uuid.uuid4().hex[:12] if len(datas) > 1 else None
+    inseridos = []
+    for data in datas:
+        ag = dict(modelo, DataConsulta=data)
+        if serie:
+            ag["Serie"] = serie
+        inseridos.append(repo.inserir_agendamento(ag))
+    return inseridos
+
+def ocorrencias_seguintes(repo, ag):
+    """O agendamento e as consultas 'Ativo' seguintes da mesma série."""
+    if not ag.get("Serie"):
+        return [ag]
+    serie = repo.agendamentos_da_serie(ag["Serie"])
+    posicao = next(i for i, outro in enumerate(serie) if outro is ag)
+    return [ag] + [outro for outro in serie[posicao + 1:] if outro.get("Status") == "Ativo"]
+
+
+# NOVO: Próximos horários livres, usando os mapas de ocupação por dia
+def buscar_horarios_livres(repo, quantidade=5, a_partir_de=None, especializacao=None,
+                           medico=None, duracao=None, dias_max=365):
+    """Retorna os primeiros horários livres (em ordem de data/hora) entre os profissionais.
+
+    Filtra por especialização ou por médico, se informados. 'a_partir_de' é
+    uma data 'DD/MM/AAAA' (padrão: hoje, a partir do horário atual). Cada
+    profissional só aparece nos seus dias e horários de atendimento.
+    """
+    duracao = duracao or DURACAO_PADRAO_MINUTOS
+    # ALTERADO: Pelos índices do cadastro, não comparando texto profissional a profissional
+    if medico is not None:
+        profissionais = [prof for prof in [repo.profissionais.por_nome(medico)] if prof is not None]
+    elif especializacao is not None:
+        profissionais = repo.profissionais.da_especialidade(especializacao)
+    else:
+        profissionais = list(repo.profissionais)
+    profissionais = [prof for prof in profissionais if prof["Ativo"]]
+    if not profissionais:
+        return []
+    agora = datetime.now()
+    hoje = para_timestamp(agora.strftime("%d/%m/%Y")) // 86400
+    primeiro_dia = hoje if a_partir_de is None else para_timestamp(a_partir_de) // 86400
+    primeiro_dia = max(primeiro_dia, hoje)  # nunca oferece datas passadas
+
+    encontrados = []
+    for dia in range(primeiro_dia, primeiro_dia + dias_max):
+        data_dia = date.fromordinal(dia + _ORDINAL_EPOCH)
+        dia_da_semana = data_dia.weekday()
+        a_partir_min = agora.hour * 60 + agora.minute + 1 if dia == hoje else 0
+
+        do_dia = []
+        for prof in profissionais:
+            if dia_da_semana not in prof["DiasDeAtendimento"]:
+                continue
+            for inicio in repo.agenda.horarios_livres_no_dia(prof["ID"], dia, duracao, a_partir_min,
+                                                             prof["HorarioAbertura"], prof["HorarioFechamento"]):
+                do_dia.append((inicio, prof["Nome"], prof["Especializacao"]))
+        do_dia.sort()
+
+        for inicio, nome, especialidade in do_dia:
+            encontrados.append({
+                "DataConsulta": data_dia.strftime("%d/%m/%Y"),
+                "HorarioInicio": f"{inicio // 60:02d}:{inicio % 60:02d}",
+                "Medico": nome,
+                "Especializacao": especialidade,
+            })
+            if len(encontrados) >= quantidade:
+                return encontrados
+    return encontrados
+
+
+# --- Registros compactos (opcional) ---
+
+# NOVO: Em vez de um dicionário por registro (com as chaves longas repetidas
+# em cada um), Paciente e Agendamento guardam os campos em __slots__. Eles se
+# comportam como o dicionário do JSON (registro["CPF"], .get, .update, "in"),
+# então o resto do programa não muda. Campos com poucos valores distintos
+# (status, médico, cidade...) são internados: milhares de registros apontam
+# para a mesma string. Nome, CPF e datas não (quase todo valor é único e só
+# encheria a tabela de internadas). Chaves desconhecidas (ex: 'Especialista' dos registros antigos)
+# vão para 'extras', então a conversão de/para JSON não perde nada.
+USAR_REGISTROS_COMPACTOS = False
+
+_AUSENTE = object()  # Diferencia "campo não existe" de "campo vale None"
+
+class RegistroCompacto(MutableMapping):
+    """Base dos registros com __slots__ que imitam o dicionário do JSON."""
+    __slots__ = ("extras",)
+    CAMPOS = {}             # chave do JSON -> nome do slot (na ordem do arquivo)
+    INTERNADOS = frozenset()
+
+    def __init__(self, dados=()):
+        for atributo in self.CAMPOS.values():
+            setattr(self, atributo, _AUSENTE)
+        self.extras = None
+        self.update(dados)
+
+    def __getitem__(self, chave):
+        atributo = self.CAMPOS.get(chave)
+        if atributo is None:
+            if self.extras is None:
+                raise KeyError(chave)
+            return self.extras[chave]
+        valor = getattr(self, atributo)
+        if valor is _AUSENTE:
+            raise KeyError(chave)
+        return valor
+
+    def __setitem__(self, chave, valor):
+        if chave in self.INTERNADOS and type(valor) is str:
+            valor = sys.intern(valor)
+        atributo = self.CAMPOS.get(chave)
+        if atributo is None:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[chave] = valor
+        else:
+            setattr(self, atributo, valor)
+
+    def __delitem__(self, chave):
+        atributo = self.CAMPOS.get(chave)
+        if atributo is None:
+            if self.extras is None:
+                raise KeyError(chave)
+            del self.extras[chave]
+        elif getattr(self, atributo) is _AUSENTE:
+            raise KeyError(chave)
+        else:
+            setattr(self, atributo, _AUSENTE)
+
+    def __iter__(self):
+        for chave, atributo in self.CAMPOS.items():
+            if getattr(self, atributo) is not _AUSENTE:
+                yield chave
+        if self.extras:
+            yield from self.extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    # Atalhos mais rápidos que os genéricos do MutableMapping
+    def __contains__(self, chave):
+        atributo = self.CAMPOS.get(chave)
+        if atributo is None:
+            return self.extras is not None and chave in self.extras
+        return getattr(self, atributo) is not _AUSENTE
+
+    def get(self, chave, padrao=None):
+        atributo = self.CAMPOS.get(chave)
+        if atributo is None:
+            return padrao if self.extras is None else self.extras.get(chave, padrao)
+        valor = getattr(self, atributo)
+        return padrao if valor is _AUSENTE else valor
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def para_dict(self):
+        """Dicionário no mesmo formato do JSON (também é o que json.dump(default=dict) usa)."""
+        return dict(self)
+
+
+class Paciente(RegistroCompacto):
+    CAMPOS = {
+        "NomeCompleto": "nome_completo",
+        "CPF": "cpf",
+        "Data de Nascimento": "data_nascimento",
+        "Estado": "estado",
+        "Cidade": "cidade",
+        "Endereço": "endereco",
+        "DDD": "ddd",
+        "Telefone": "telefone",
+        "DataCadastro": "data_cadastro",
+        "UltimaModificacao": "ultima_modificacao",
+        "CadastroTS": "cadastro_ts",
+        "ModificacaoTS": "modificacao_ts",
+        "Seq": "seq",
+    }
+    INTERNADOS = frozenset({"Estado", "Cidade", "DDD"})
+    __slots__ = tuple(CAMPOS.values())
+
+
+class Agendamento(RegistroCompacto):
+    CAMPOS = {
+        "NomeCompleto": "nome_completo",
+        "CPF": "cpf",
+        "PacienteCadastrado": "paciente_cadastrado",
+        "DataConsulta": "data_consulta",
+        "Medico": "medico",
+        "Especializacao": "especializacao",
+        "ProfissionalID": "profissional_id",
+        "HorarioInicio": "horario_inicio",
+        "HoraFinal": "hora_final",
+        "DataAgendamento": "data_agendamento",
+        "Status": "status",
+        "Serie": "serie",
+        "ID": "id",
+        "InicioTS": "inicio_ts",
+        "FimTS": "fim_ts",
+        "AgendadoTS": "agendado_ts",
+        "Seq": "seq",
+    }
+    # Status e profissional funcionam como "enums": poucas strings, compartilhadas
+    INTERNADOS = frozenset({"Medico", "Especializacao", "Status"})
+    __slots__ = tuple(CAMPOS.values())
+
+
+def converter_para_registros(dados):
+    """Troca os dicionários carregados do arquivo por Paciente/Agendamento (no lugar)."""
+    dados["pacientes"] = [p if isinstance(p, Paciente) else Paciente(p) for p in dados["pacientes"]]
+    dados["agendamentos"] = [ag if isinstance(ag, Agendamento) else Agendamento(ag) for ag in dados["agendamentos"]]
+    return dados
+
+
+# --- Repositório em memória (índices secundários) ---
+
+# NOVO: Sequência "preguiçosa" sobre uma linha do tempo de (ts, ID): só os
+# agendamentos da fatia pedida são buscados, o resto nunca é copiado.
+class VisaoAgendamentos:
+    """Acesso por posição/fatia a agendamentos já ordenados por data e hora."""
+
+    def __init__(self, chaves, agendamento_por_id):
+        self.chaves = chaves
+        self.agendamento_por_id = agendamento_por_id
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def __getitem__(self, posicao):
+        if isinstance(posicao, slice):
+            return [self.agendamento_por_id[id_ag] for _, id_ag in self.chaves[posicao]]
+        return self.agendamento_por_id[self.chaves[posicao][1]]
+
+
+# NOVO: Camada que fica por cima das listas carregadas por carregar_dados().
+# As listas continuam sendo a fonte de verdade (é o que vai para o arquivo),
+# mas todas as buscas passam pelos índices abaixo em vez de varrer tudo.
+class RepositorioClinica:
+    """Guarda pacientes e agendamentos com índices por CPF, Status, profissional e data."""
+
+    def __init__(self, pacientes, agendamentos, geracao=0, arquivo=None, profissionais=None, removidos=None):
+        self.pacientes = pacientes
+        self.agendamentos = agendamentos
+        # NOVO: CPF -> Seq dos pacientes excluídos (para as réplicas)
+        self.removidos = removidos if removidos is not None else {}
+        # NOVO: Cadastro de profissionais (profissionais_cac.CadastroProfissionais)
+        self.profissionais = profissionais if profissionais is not None else abrir_cadastro_profissionais()
+        # NOVO: Geração do arquivo quando estes dados foram lidos (ver persistir_alteracoes)
+        self.geracao = geracao
+        # NOVO: Arquivo morto (ArquivoHistorico) com as consultas antigas, ou None
+        self.arquivo = arquivo
+        # NOVO: Alterações ainda não gravadas (usadas pelo journal)
+        self.alteracoes = []
+        # NOVO: Outro processo gravou antes do gravador do menu (ver persistir_lote)
+        self.recarregar_pendente = False
+        self.reindexar()
+
+    @medido("reindexar")
+    def reindexar(self):
+        """Reconstrói todos os índices a partir das listas."""
+        garantir_ids_agendamentos(self.agendamentos)
+        self.paciente_por_cpf = {}          # CPF -> paciente
+        self.agendamentos_por_cpf = {}      # CPF -> [agendamentos]
+        self.agendamentos_por_status = {}   # Status -> {ID: agendamento}
+        # ALTERADO: Por ProfissionalID (o nome para exibir vem do cadastro de profissionais)
+        self.agendamentos_por_profissional = {}  # ProfissionalID -> {ID: agendamento}
+        self.agendamento_por_id = {}        # ID -> agendamento
+        self.agendamentos_por_serie = {}    # NOVO: Serie -> {ID: agendamento}
+        # NOVO: Linhas do tempo ordenadas de (InicioTS, ID), geral, por profissional
+        # e por status, para buscas por período e listagens paginadas
+        self.linha_do_tempo = []
+        self.linha_do_tempo_por_profissional = {}  # ProfissionalID -> [(ts, ID)]
+        self.linha_do_tempo_por_status = {}
+        self.linha_do_tempo_por_especialidade = {}  # NOVO: chave_especialidade -> [(ts, ID)]
+        # NOVO: Intervalos ocupados por profissional e dia (detecção de conflitos)
+        self.agenda = AgendaProfissionais()
+        # NOVO: Índice de nomes (busca_nomes.py), montado só na primeira busca por nome
+        self._indice_nomes = None
+        # NOVO: Colunas para relatórios (relatorios_cac.py), montadas no primeiro relatório
+        self._colunas = None
+        # NOVO: Fila de lembretes (lembretes_cac.py), montada no primeiro envio
+        self._lembretes = None
+
+        # ALTERADO: Os registros já chegam completos (datas convertidas, ID,
+        # profissional): a migração de versão faz isso uma vez, na carga
+        for paciente in self.pacientes:
+            self.paciente_por_cpf[paciente["CPF"]] = paciente
+        for ag in self.agendamentos:
+            self._indexar_agendamento(ag)
+            self.agenda.adicionar(ag)
+            chave = (get_sort_key_agendamento(ag), ag["ID"])  # A mesma tupla em todas as linhas
+            for linha in self._linhas_do_tempo(ag.get("ProfissionalID"), ag.get("Status"), ag.get("Especializacao")):
+                linha.append(chave)
+        self.linha_do_tempo.sort()
+        for linhas in (self.linha_do_tempo_por_profissional, self.linha_do_tempo_por_status,
+                       self.linha_do_tempo_por_especialidade):
+            for linha in linhas.values():
+                linha.sort()
+        self.ultimo_id_agendamento = max((ag.get("ID", 0) for ag in self.agendamentos), default=0)
+        contar_metricas(registros=len(self.pacientes) + len(self.agendamentos))
+        if self.arquivo is not None:
+            # IDs arquivados nunca são reaproveitados
+            self.ultimo_id_agendamento = max(self.ultimo_id_agendamento, self.arquivo.ultimo_id)
+
+    # Índices de agendamento (uso interno)
+    def _indexar_agendamento(self, ag):
+        self.agendamento_por_id[ag["ID"]] = ag
+        if ag.get("Serie"):
+            self.agendamentos_por_serie.setdefault(ag["Serie"], {})[ag["ID"]] = ag
+        self.agendamentos_por_cpf.setdefault(ag.get("CPF"), []).append(ag)
+        self.agendamentos_por_status.setdefault(ag.get("Status"), {})[ag["ID"]] = ag
+        # Registros antigos (só com a especialidade) não têm ProfissionalID e ficam fora deste índice
+        if ag["ProfissionalID"] is not None:
+            self.agendamentos_por_profissional.setdefault(ag["ProfissionalID"], {})[ag["ID"]] = ag
+
+    def _remover_do_indice_cpf(self, ag, cpf):
+        do_cpf = self.agendamentos_por_cpf.get(cpf, [])
+        for i, existente in enumerate(do_cpf):
+            if existente is ag:
+                del do_cpf[i]
+                break
+        if not do_cpf:
+            self.agendamentos_por_cpf.pop(cpf, None)
+
+    def _remover_do_grupo(self, indice, chave, ag):
+        grupo = indice.get(chave)
+        if grupo is not None:
+            grupo.pop(ag["ID"], None)
+            if not grupo:
+                del indice[chave]
+
+    def _linhas_do_tempo(self, profissional_id, status, especializacao):
+        """Linhas do tempo em que um agendamento com esse profissional/status/especialidade aparece."""
+        linhas = [self.linha_do_tempo, self.linha_do_tempo_por_status.setdefault(status, [])]
+        if profissional_id is not None:
+            linhas.append(self.linha_do_tempo_por_profissional.setdefault(profissional_id, []))
+        if especializacao:
+            linhas.append(self.linha_do_tempo_por_especialidade.setdefault(chave_especialidade(especializacao), []))
+        return linhas
+
+    def _inserir_na_linha_do_tempo(self, ag):
+        # Datas inválidas entram com TS_INVALIDO (ficam no topo das listagens)
+        chave = (get_sort_key_agendamento(ag), ag["ID"])
+        for linha in self._linhas_do_tempo(ag.get("ProfissionalID"), ag.get("Status"), ag.get("Especializacao")):
+            insort(linha, chave)
+
+    def _remover_da_linha_do_tempo(self, ag, inicio_ts, profissional_id, status, especializacao):
+        chave = (TS_INVALIDO if inicio_ts is None else inicio_ts, ag["ID"])
+        for linha in self._linhas_do_tempo(profissional_id, status, especializacao):
+            i = bisect_left(linha, chave)
+            if i < len(linha) and linha[i] == chave:
+                del linha[i]
+
+    # Consultas
+    def buscar_paciente(self, cpf):
+        """Retorna o paciente com o CPF informado, senão None."""
+        return self.paciente_por_cpf.get(cpf)
+
+    def agendamentos_do_cpf(self, cpf, historico=False):
+        """Retorna todos os agendamentos (qualquer status) de um CPF.
+
+        Com historico=True inclui os do arquivo morto (só leitura), abrindo
+        apenas as partições em que o CPF aparece.
+        """
+        agendamentos = list(self.agendamentos_por_cpf.get(cpf, []))
+        if historico and self.arquivo is not None:
+            agendamentos += self.sem_duplicados(self.arquivo.agendamentos_do_cpf(cpf))
+        contar_metricas(registros=len(agendamentos))
+        return agendamentos
+
+    def agendamentos_com_status(self, status):
+        """Retorna todos os agendamentos com o status informado."""
+        return list(self.agendamentos_por_status.get(status, {}).values())
+
+    def _id_do_profissional(self, medico):
+        """ProfissionalID do nome (como vem do menu, da linha de comando ou do HTTP), ou None."""
+        profissional = self.profissionais.por_nome(medico)
+        return profissional["ID"] if profissional is not None else None
+
+    def agendamentos_do_medico(self, medico):
+        """Retorna todos os agendamentos de um médico."""
+        return list(self.agendamentos_por_profissional.get(self._id_do_profissional(medico), {}).values())
+
+    def agendamentos_da_serie(self, serie):
+        """Consultas de uma série recorrente, em ordem de data e hora."""
+        return sorted(self.agendamentos_por_serie.get(serie, {}).values(),
+                      key=lambda ag: (get_sort_key_agendamento(ag), ag["ID"]))
+
+    # NOVO: Busca por período usando busca binária na linha do tempo
+    def agendamentos_entre(self, data_inicio, data_fim, medico=None, especializacao=None):
+        """Agendamentos entre duas datas 'DD/MM/AAAA' (inclusive), em ordem de data e hora.
+
+        Filtra por médico ou especialidade pela linha do tempo de cada um.
+        """
+        inicio = para_timestamp(data_inicio)
+        fim = para_timestamp(data_fim)
+        if inicio is None or fim is None:
+            return []
+        profissional_id = None if medico is None else self._id_do_profissional(medico)
+        if medico is not None:
+            linha = self.linha_do_tempo_por_profissional.get(profissional_id, [])
+        elif especializacao is not None:
+            linha = self.linha_do_tempo_por_especialidade.get(chave_especialidade(especializacao), [])
+        else:
+            linha = self.linha_do_tempo
+        # (ts,) fica antes de qualquer (ts, ID); o fim é o começo do dia seguinte
+        i = bisect_left(linha, (inicio,))
+        j = bisect_left(linha, (fim + 86400,))
+        encontrados = [self.agendamento_por_id[id_ag] for _, id_ag in linha[i:j]]
+        contar_metricas(registros=j - i)
+        if self.arquivo is not None:
+            # Partições dos meses do período (só leitura), já em ordem de data e hora
+            arquivados = [
+                ag for ag in self.arquivo.agendamentos_dos_meses(data_inicio[6:] + "-" + data_inicio[3:5],
+                                                                 data_fim[6:] + "-" + data_fim[3:5])
+                if inicio <= ag["InicioTS"] < fim + 86400
+                and (medico is None or (profissional_id is not None and ag.get("ProfissionalID") == profissional_id))
+                and (especializacao is None or chave_especialidade(ag["Especializacao"]) == chave_especialidade(especializacao))
+            ]
+            contar_metricas(registros=len(arquivados))
+            if arquivados:
+                encontrados = sorted(encontrados + self.sem_duplicados(arquivados),
+                                     key=lambda ag: (get_sort_key_agendamento(ag), ag["ID"]))
+        return encontrados
+
+    # NOVO: Sem período: a linha do tempo inteira do médico (ou da especialidade)
+    def agendamentos_do_profissional(self, medico=None, especializacao=None, status=None):
+        """Agendamentos do médico ou da especialidade (opcionalmente de um status), em ordem de data e hora.
+
+        Como agendamentos_ordenados_por_status, não inclui o arquivo morto.
+        """
+        if medico is not None:
+            linha = self.linha_do_tempo_por_profissional.get(self._id_do_profissional(medico), [])
+        else:
+            linha = self.linha_do_tempo_por_especialidade.get(chave_especialidade(especializacao), [])
+        contar_metricas(registros=len(linha))
+        encontrados = [self.agendamento_por_id[id_ag] for _, id_ag in linha]
+        if status is not None:
+            encontrados = [ag for ag in encontrados if ag.get("Status") == status]
+        return encontrados
+
+    def sem_duplicados(self, arquivados):
+        # Um registro arquivado que ainda está no ARQUIVO_DADOS (arquivamento
+        # interrompido) aparece uma vez só: vale o do arquivo principal
+        return [ag for ag in arquivados if ag["ID"] not in self.agendamento_por_id]
+
+    # NOVO: Busca por nome (sem acento, por pedaço, tolerando erro de digitação)
+    def indice_nomes(self):
+        """Índice de nomes de pacientes e de agendamentos sem cadastro (montado uma vez)."""
+        if self._indice_nomes is None:
+            import busca_nomes
+            indice = busca_nomes.IndiceNomes()
+            for paciente in self.pacientes:
+                indice.adicionar(paciente["CPF"], paciente.get("NomeCompleto"))
+            for ag in self.agendamentos:
+                if not ag.get("PacienteCadastrado"):
+                    indice.adicionar(ag["ID"], ag.get("NomeCompleto"))
+            self._indice_nomes = indice
+        return self._indice_nomes
+
+    # NOVO: Consultas 'Ativo' de paciente cadastrado não guardam uma cópia
+    # própria do nome: ele vem do cadastro (o índice por CPF é o cache da
+    # junção). O NomeCompleto gravado no agendamento vale como registro
+    # histórico e é fixado quando a consulta é encerrada ou o cadastro some.
+    def nome_exibido(self, ag):
+        """Nome a mostrar para um agendamento."""
+        if ag.get("PacienteCadastrado") and ag.get("Status") == "Ativo":
+            paciente = self.paciente_por_cpf.get(ag.get("CPF"))
+            if paciente is not None:
+                return paciente.get("NomeCompleto")
+        return ag["NomeCompleto"]
+
+    def _fixar_nomes(self, cpf):
+        """Grava o nome atual nos agendamentos 'Ativo' do CPF (antes de o cadastro sair do índice)."""
+        for ag in list(self.agendamentos_por_cpf.get(cpf, [])):
+            nome = self.nome_exibido(ag)
+            if nome != ag.get("NomeCompleto"):
+                self.atualizar_agendamento(ag, {"NomeCompleto": nome})
+
+    def buscar_por_nome(self, consulta, limite=20):
+        """Até 'limite' (nota, tipo, registro) parecidos com a consulta, do mais parecido ao menos.
+
+        tipo é 'paciente' ou, para quem não tem cadastro, 'agendamento'.
+        """
+        resultado = []
+        for nota, chave in self.indice_nomes().buscar(consulta, limite):
+            # CPF (str) é de paciente; ID (int) é de agendamento sem cadastro
+            if isinstance(chave, str):
+                resultado.append((nota, "paciente", self.paciente_por_cpf[chave]))
+            else:
+                resultado.append((nota, "agendamento", self.agendamento_por_id[chave]))
+        return resultado
+
+    def colunas_relatorio(self):
+        """Agendamentos em colunas (relatorios_cac.ColunasAgendamentos), montadas uma vez."""
+        if self._colunas is None:
+            import relatorios_cac
+            self._colunas = relatorios_cac.montar_colunas(self.agendamentos)
+        return self._colunas
+
+    def _indexar_nome_agendamento(self, ag, nome_antigo=None, cadastrado_antes=True):
+        if self._indice_nomes is None:
+            return
+        if not cadastrado_antes:
+            self._indice_nomes.remover(ag["ID"], nome_antigo)
+        if not ag.get("PacienteCadastrado"):
+            self._indice_nomes.adicionar(ag["ID"], ag.get("NomeCompleto"))
+
+    def fila_lembretes(self):
+        """Lembretes pendentes dos agendamentos 'Ativo' (lembretes_cac.FilaLembretes), montada uma vez."""
+        if self._lembretes is None:
+            import lembretes_cac
+            self._lembretes = lembretes_cac.FilaLembretes(
+                ANTECEDENCIAS_LEMBRETE_HORAS, self.agendamentos_por_status.get("Ativo", {}).values())
+        return self._lembretes
+
+    # NOVO: Visão ordenada por data/hora, sem copiar (para listagens paginadas)
+    def agendamentos_ordenados_por_status(self, status):
+        """Agendamentos de um status em ordem de data e hora, como uma sequência fatiável."""
+        return VisaoAgendamentos(self.linha_do_tempo_por_status.get(status, []), self.agendamento_por_id)
+
+    # Alterações (mantêm os índices sempre atualizados)
+    # NOVO: Alterações pendentes saem na próxima gravação (persistir_alteracoes
+    # corrige o Seq se outro processo gravar antes)
+    def proximo_seq(self):
+        return self.geracao + 1
+
+    def inserir_paciente(self, paciente):
+        """Insere o paciente e retorna o registro guardado."""
+        if USAR_REGISTROS_COMPACTOS and not isinstance(paciente, Paciente):
+            paciente = Paciente(paciente)
+        completar_paciente(paciente)  # NOVO: Mesmos campos dos registros migrados
+        normalizar_tempos_paciente(paciente)
+        paciente["Seq"] = self.proximo_seq()
+        self.removidos.pop(paciente["CPF"], None)  # CPF excluído e cadastrado de novo
+        self.pacientes.append(paciente)
+        self.paciente_por_cpf[paciente["CPF"]] = paciente
+        if self._indice_nomes is not None:
+            self._indice_nomes.adicionar(paciente["CPF"], paciente.get("NomeCompleto"))
+        self.alteracoes.append({"op": "+paciente", "registro": paciente})
+        return paciente
+
+    def atualizar_paciente(self, paciente, alteracoes):
+        """Aplica um dicionário de campos alterados ao paciente."""
+        cpf_antigo, nome_antigo = paciente["CPF"], paciente.get("NomeCompleto")
+        if alteracoes.get("CPF", cpf_antigo) != cpf_antigo:
+            self._fixar_nomes(cpf_antigo)  # Os agendamentos continuam no CPF antigo
+        paciente.update(alteracoes)
+        alteracoes = dict(alteracoes)
+        if "DataCadastro" in alteracoes or "UltimaModificacao" in alteracoes:
+            normalizar_tempos_paciente(paciente)
+            alteracoes["CadastroTS"] = paciente["CadastroTS"]
+            alteracoes["ModificacaoTS"] = paciente["ModificacaoTS"]
+        paciente["Seq"] = alteracoes["Seq"] = self.proximo_seq()
+        if paciente["CPF"] != cpf_antigo:
+            self.paciente_por_cpf.pop(cpf_antigo, None)
+            self.paciente_por_cpf[paciente["CPF"]] = paciente
+            self.removidos[cpf_antigo] = paciente["Seq"]  # Para as réplicas, o CPF antigo foi excluído
+            self.removidos.pop(paciente["CPF"], None)
+        if self._indice_nomes is not None and (paciente["CPF"], paciente.get("NomeCompleto")) != (cpf_antigo, nome_antigo):
+            self._indice_nomes.remover(cpf_antigo, nome_antigo)
+            self._indice_nomes.adicionar(paciente["CPF"], paciente.get("NomeCompleto"))
+        self.alteracoes.append({"op": "~paciente", "cpf": cpf_antigo, "campos": alteracoes})
+
+    def remover_paciente(self, paciente):
+        self._fixar_nomes(paciente["CPF"])  # Os agendamentos ficam no histórico com o nome de agora
+        self.pacientes.remove(paciente)
+        self.paciente_por_cpf.pop(paciente["CPF"], None)
+        if self._indice_nomes is not None:
+            self._indice_nomes.remover(paciente["CPF"], paciente.get("NomeCompleto"))
+        self.removidos[paciente["CPF"]] = self.proximo_seq()  # NOVO: A exclusão também vai para as réplicas
+        self.alteracoes.append({"op": "-paciente", "cpf": paciente["CPF"], "seq": self.proximo_seq()})
+
+    def inserir_agendamento(self, ag):
+        """Insere o agendamento e retorna o registro guardado."""
+        if USAR_REGISTROS_COMPACTOS and not isinstance(ag, Agendamento):
+            ag = Agendamento(ag)
+        # NOVO: Todo agendamento ganha um ID estável (o journal referencia por ele)
+        if "ID" not in ag:
+            self.ultimo_id_agendamento += 1
+            ag["ID"] = self.ultimo_id_agendamento
+        completar_agendamento(ag)  # NOVO: Mesmos campos dos registros migrados
+        normalizar_tempos_agendamento(ag)
+        ag["Seq"] = self.proximo_seq()
+        self.agendamentos.append(ag)
+        self._indexar_agendamento(ag)
+        self._inserir_na_linha_do_tempo(ag)
+        self.agenda.adicionar(ag)
+        self._indexar_nome_agendamento(ag)
+        if self._colunas is not None:
+            self._colunas.adicionar(ag)
+        if self._lembretes is not None:
+            self._lembretes.adicionar(ag)
+        self.alteracoes.append({"op": "+agendamento", "registro": ag})
+        return ag
+
+    def atualizar_agendamento(self, ag, alteracoes):
+        """Aplica campos alterados (ex: Status, HoraFinal) e reindexa o agendamento."""
+        cpf, status, profissional_id, especializacao = (ag.get("CPF"), ag.get("Status"), ag.get("ProfissionalID"),
+                                                        ag.get("Especializacao"))
+        inicio_ts, fim_ts = ag["InicioTS"], ag["FimTS"]
+        nome, cadastrado = ag.get("NomeCompleto"), ag.get("PacienteCadastrado")
+        if status == "Ativo" and alteracoes.get("Status", status) != status:
+            # Consulta encerrada: o nome do cadastro passa a valer como histórico
+            nome_atual = self.nome_exibido(ag)
+            if nome_atual != nome and "NomeCompleto" not in alteracoes:
+                alteracoes = {**alteracoes, "NomeCompleto": nome_atual}
+        ag.update(alteracoes)
+        alteracoes = dict(alteracoes)
+        if alteracoes.keys() & {"DataConsulta", "HorarioInicio", "HoraFinal", "DataAgendamento"}:
+            normalizar_tempos_agendamento(ag)
+            for campo in ("InicioTS", "FimTS", "AgendadoTS"):
+                alteracoes[campo] = ag[campo]
+        ag["Seq"] = alteracoes["Seq"] = self.proximo_seq()
+        self.alteracoes.append({"op": "~agendamento", "id": ag["ID"], "campos": alteracoes})
+
+        if ((ag["InicioTS"], ag.get("ProfissionalID"), ag.get("Status"), ag.get("Especializacao"))
+                != (inicio_ts, profissional_id, status, especializacao)):
+            self._remover_da_linha_do_tempo(ag, inicio_ts, profissional_id, status, especializacao)
+            self._inserir_na_linha_do_tempo(ag)
+        if (ag["InicioTS"], ag["FimTS"], ag.get("ProfissionalID"), ag.get("Status")) != (inicio_ts, fim_ts, profissional_id, status):
+            self.agenda.remover(ag["ID"], profissional_id, inicio_ts)
+            self.agenda.adicionar(ag)
+
+        # Só mexe nos índices cuja chave realmente mudou
+        if (ag.get("NomeCompleto"), ag.get("PacienteCadastrado")) != (nome, cadastrado):
+            self._indexar_nome_agendamento(ag, nome, cadastrado)
+        if self._colunas is not None:
+            self._colunas.atualizar(ag)
+        # Remarcado ou reativado: lembretes novos (os antigos são descartados ao sair da fila)
+        if self._lembretes is not None and (ag["InicioTS"], ag.get("Status")) != (inicio_ts, status):
+            self._lembretes.adicionar(ag)
+        if ag.get("CPF") != cpf:
+            self._remover_do_indice_cpf(ag, cpf)
+            self.agendamentos_por_cpf.setdefault(ag.get("CPF"), []).append(ag)
+        if ag.get("Status") != status:
+            self._remover_do_grupo(self.agendamentos_por_status, status, ag)
+            self.agendamentos_por_status.setdefault(ag.get("Status"), {})[ag["ID"]] = ag
+        if ag.get("ProfissionalID") != profissional_id:
+            self._remover_do_grupo(self.agendamentos_por_profissional, profissional_id, ag)
+            if ag.get("ProfissionalID") is not None:
+                self.agendamentos_por_profissional.setdefault(ag["ProfissionalID"], {})[ag["ID"]] = ag
+
+
 # --- 1. Cadastrar Paciente (ALTERADO) ---
-def cadastrar_paciente(pacientes):
+def cadastrar_paciente(repo):
     print("\n1️⃣  Novo Cadastro de Paciente")
     print("📑 Insira os dados de registro do paciente. (Isso não cria um agendamento).")
 
     # ALTERADO: Pede Nome Completo
     while True:
-        nome_completo = input("Nome Completo: ").title().strip()
+        nome_completo = perguntar("Nome Completo: ").title().strip()
         if nome_completo: break
         print("❌ Erro: o nome completo não pode ficar em branco!")
 
     # Loop de validação de CPF (checa duplicidade na lista de PACIENTES)
     while True:
-        cpf = input("CPF (somente números, 11 dígitos): ").strip()
-        if not cpf.isdigit() or len(cpf) != 11:
+        cpf = perguntar("CPF (somente números, 11 dígitos): ").strip()
+        if not validar_cpf(cpf):
             print("❌ Erro: CPF deve conter exatamente 11 números!")
             continue
         
-        if buscar_paciente_por_cpf(cpf, pacientes):
+        if repo.buscar_paciente(cpf):
             print("❌ Erro: Já existe um paciente cadastrado com este CPF.")
             # Pergunta se quer parar o cadastro
-            if input("Deseja cancelar o cadastro? (S/N): ").strip().upper() == 'S':
+            if perguntar("Deseja cancelar o cadastro? (S/N): ").strip().upper() == 'S':
                 return False # Retorna ao menu principal
             else:
                 continue # Pede o CPF novamente
@@ -173,29 +2229,29 @@ def cadastrar_paciente(pacientes):
 
     # Loops de validação (semelhantes a antes)
     while True:
-        data_nasc_str = input("Data de nascimento (DD/MM/AAAA): ").strip()
+        data_nasc_str = perguntar("Data de nascimento (DD/MM/AAAA): ").strip()
         data_nasc_valida = validar_data(data_nasc_str)
         if data_nasc_valida: break
         print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
     while True:
-        estado = input("Estado (sigla, ex: PR): ").upper().strip()
-        if len(estado) == 2 and estado.isalpha(): break
+        estado = perguntar("Estado (sigla, ex: PR): ").upper().strip()
+        if validar_estado(estado): break
         print("❌ Erro: estado inválido! Digite apenas a sigla de 2 letras.")
     while True:
-        cidade = input("Cidade: ").title().strip()
+        cidade = perguntar("Cidade: ").title().strip()
         if cidade: break
         print("❌ Erro: cidade não pode ficar em branco!")
     while True:
-        endereco = input("Endereço: ").title().strip()
+        endereco = perguntar("Endereço: ").title().strip()
         if endereco: break
         print("❌ Erro: endereço não pode ficar em branco!")
     while True:
-        ddd = input("DDD (2 dígitos): ").strip()
-        if ddd.isdigit() and len(ddd) == 2: break
+        ddd = perguntar("DDD (2 dígitos): ").strip()
+        if validar_ddd(ddd): break
         print("❌ Erro: DDD inválido! Digite 2 números.")
     while True:
-        numero = input("Número de celular (9 dígitos, ex: 9XXXXXXX): ").strip()
-        if numero.isdigit() and len(numero) == 9 and numero.startswith("9"): break
+        numero = perguntar("Número de celular (9 dígitos, ex: 9XXXXXXX): ").strip()
+        if validar_celular(numero): break
         print("❌ Erro: número inválido! Deve ter 9 dígitos e começar com 9.")
     telefone = numero
 
@@ -214,7 +2270,7 @@ def cadastrar_paciente(pacientes):
         "DataCadastro": data_cadastro_str, 
         "UltimaModificacao": "N/A"
     }
-    pacientes.append(paciente_novo)
+    repo.inserir_paciente(paciente_novo)
     
     print("\n✅ Paciente cadastrado com sucesso!")
     
@@ -226,7 +2282,7 @@ def cadastrar_paciente(pacientes):
     return True # Sinaliza sucesso
 
 # --- 2. Realizar Agendamento (NOVO E ALTERADO) ---
-def realizar_agendamento(pacientes, agendamentos):
+def realizar_agendamento(repo):
     print("\n2️⃣  Realizar Novo Agendamento")
     
     nome_paciente = None
@@ -234,7 +2290,7 @@ def realizar_agendamento(pacientes, agendamentos):
     paciente_cadastrado = False
 
     while True:
-        resposta = input("O agendamento é para um paciente já cadastrado? (S/N): ").strip().upper()
+        resposta = perguntar("O agendamento é para um paciente já cadastrado? (S/N): ").strip().upper()
         if resposta in ('S', 'N'):
             break
         print("❕Opção inválida.")
@@ -242,8 +2298,8 @@ def realizar_agendamento(pacientes, agendamentos):
     if resposta == 'S':
         # Loop para encontrar o paciente cadastrado
         while True:
-            cpf_busca = input("Digite o CPF do paciente (11 dígitos): ").strip()
-            paciente_encontrado = buscar_paciente_por_cpf(cpf_busca, pacientes)
+            cpf_busca = perguntar("Digite o CPF do paciente (11 dígitos): ").strip()
+            paciente_encontrado = repo.buscar_paciente(cpf_busca)
             
             if paciente_encontrado:
                 print(f"Paciente encontrado: {paciente_encontrado['NomeCompleto']}")
@@ -253,7 +2309,7 @@ def realizar_agendamento(pacientes, agendamentos):
                 break # Sai do loop de busca
             else:
                 print("🔻Paciente não cadastrado com este CPF.")
-                if input("🪪 Tentar outro CPF? (S/N): ").strip().upper() == 'N':
+                if perguntar("🪪 Tentar outro CPF? (S/N): ").strip().upper() == 'N':
                     print("◌ Cancelando. Por favor, cadastre o paciente primeiro (Opção 1) ou faça um agendamento não cadastrado.")
                     return False # Cancela o agendamento
     
@@ -261,12 +2317,12 @@ def realizar_agendamento(pacientes, agendamentos):
         print("Agendamento para paciente não cadastrado.")
         # Pede os dados mínimos para o agendamento
         while True:
-            nome_paciente = input("Nome Completo do paciente: ").title().strip()
+            nome_paciente = perguntar("Nome Completo do paciente: ").title().strip()
             if nome_paciente: break
             print("❌ Erro: o nome completo não pode ficar em branco!")
         while True:
-            cpf_paciente = input("CPF do paciente (11 dígitos, para controle): ").strip()
-            if cpf_paciente.isdigit() and len(cpf_paciente) == 11: break
+            cpf_paciente = perguntar("CPF do paciente (11 dígitos, para controle): ").strip()
+            if validar_cpf(cpf_paciente): break
             print("❌ Erro: CPF inválido!")
 
     # Se não definimos um paciente (cancelou a busca 'S' ou é 'N' e falhou)
@@ -279,7 +2335,7 @@ def realizar_agendamento(pacientes, agendamentos):
     
     # NOVO: Pede a data da consulta
     while True:
-        data_consulta_str = input("Data da Consulta (DD/MM/AAAA): ").strip()
+        data_consulta_str = perguntar("Data da Consulta (DD/MM/AAAA): ").strip()
         data_consulta_valida = validar_data(data_consulta_str)
         if data_consulta_valida:
             # Validação bônus: não agendar no passado
@@ -291,27 +2347,42 @@ def realizar_agendamento(pacientes, agendamentos):
         
     # ALTERAÇÃO AQUI: Menu de seleção de profissional
     print("\nEscolha o profissional:")
-    for i, prof in enumerate(PROFISSIONAIS, start=1):
-        print(f"  {i}) {prof['nome']} - {prof['especializacao']}")
-    
-    escolha_prof = None
-    while True:
-        try:
-            escolha_num = int(input("Digite o número do profissional: "))
-            if 1 <= escolha_num <= len(PROFISSIONAIS):
-                escolha_prof = PROFISSIONAIS[escolha_num - 1]
-                break
-            else:
-                print(f"❌ Erro: Escolha um número entre 1 e {len(PROFISSIONAIS)}.")
-        except ValueError:
-            print("❌ Erro: Por favor, digite um número.")
+    escolha_prof = escolher_profissional(repo)
+    if escolha_prof is None:
+        print("Agendamento cancelado.")
+        return False
+
+    # NOVO: Consulta recorrente (mesmo dia da semana e horário)
+    datas = perguntar_recorrencia(data_consulta_valida)
     
     # Pede o horário
     while True:
-        horario_str = input("Horário de Início (HH:MM): ").strip()
+        horario_str = perguntar("Horário de Início (HH:MM): ").strip()
         horario_valido = validar_horario(horario_str)
-        if horario_valido: break
-        print("❌ Erro: horário inválido! Use o formato HH:MM (ex: 14:30).")
+        if not horario_valido:
+            print("❌ Erro: horário inválido! Use o formato HH:MM (ex: 14:30).")
+            continue
+
+        # NOVO: Não deixa marcar dois pacientes no mesmo horário do profissional
+        # (numa série, todas as datas são conferidas de uma vez)
+        conflitos_por_data = verificar_conflitos_serie(repo, escolha_prof["ID"], datas, horario_valido)
+        if not conflitos_por_data:
+            break
+        print(f"⚠️  Conflito: {escolha_prof['Nome']} já tem consulta neste horário:")
+        for data, conflitos in conflitos_por_data.items():
+            for ag in conflitos:
+                prefixo = f"{data} " if len(datas) > 1 else ""
+                print(f"   - {prefixo}{ag['HorarioInicio']} | {repo.nome_exibido(ag)} | Status: {ag['Status']}")
+        if perguntar("Escolher outro horário? (S/N): ").strip().upper() != 'N':
+            continue
+        if len(datas) > 1 and perguntar("Pular as datas com conflito? (S = pular, N = marcar como encaixe): ").strip().upper() == 'S':
+            datas = [data for data in datas if data not in conflitos_por_data]
+            if not datas:
+                print("🔻Todas as datas estão ocupadas. Agendamento cancelado.")
+                return False
+            break
+        print("Agendando como encaixe, mesmo com conflito.")
+        break
 
     data_agendamento_str = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
 
@@ -322,16 +2393,20 @@ def realizar_agendamento(pacientes, agendamentos):
         "PacienteCadastrado": paciente_cadastrado, # Guarda se o CPF é de um registro
         "DataConsulta": data_consulta_valida,
         # ALTERAÇÃO AQUI: Salva os novos campos
-        "Medico": escolha_prof["nome"],
-        "Especializacao": escolha_prof["especializacao"],
+        "Medico": escolha_prof["Nome"],
+        "Especializacao": escolha_prof["Especializacao"],
+        "ProfissionalID": escolha_prof["ID"],
         "HorarioInicio": horario_valido, # Nome do campo mudado de 'Horário'
         "HoraFinal": "N/A",
         "DataAgendamento": data_agendamento_str, # Quando foi marcado
         "Status": "Ativo"
     }
-    agendamentos.append(novo_agendamento)
+    # NOVO: Uma data ou a série inteira, gravadas juntas
+    inseridos = inserir_serie(repo, novo_agendamento, datas)
     
     print("\n✅ Agendamento realizado com sucesso!")
+    if len(inseridos) > 1:
+        print(f"🔁 {len(inseridos)} consultas marcadas: {', '.join(ag['DataConsulta'] for ag in inseridos)}")
     
     # NOVO: Adiciona informações da clínica
     largura_label = 15 # Mesma largura da função de imprimir agendamento
@@ -340,73 +2415,117 @@ def realizar_agendamento(pacientes, agendamentos):
     
     return True # Sinaliza sucesso
 
+# NOVO: Escolha de profissional usada pelos menus (só os ativos do cadastro)
+def escolher_profissional(repo, permitir_vazio=False):
+    """Lista os profissionais e devolve o escolhido (None se permitir_vazio e ficar em branco,
+    ou se não houver nenhum profissional ativo)."""
+    profissionais = repo.profissionais.ativos()
+    # NOVO: Sem ninguém ativo não há o que escolher (senão pediria um número entre 1 e 0 para sempre)
+    if not profissionais:
+        print("🔻Nenhum profissional ativo no cadastro (ative ou cadastre um na opção 13).")
+        return None
+    if len(profissionais) > MAXIMO_LISTA_PROFISSIONAIS:
+        especialidade = perguntar("Especialidade (Enter para ver todos): ").strip()
+        if especialidade:
+            da_especialidade = [prof for prof in repo.profissionais.da_especialidade(especialidade) if prof["Ativo"]]
+            if da_especialidade:
+                profissionais = da_especialidade
+            else:
+                print("🔻Nenhum profissional ativo com essa especialidade; mostrando todos.")
+    for i, prof in enumerate(profissionais, start=1):
+        print(f"  {i}) {prof['Nome']} - {prof['Especializacao']}")
+    while True:
+        escolha = perguntar("Digite o número do profissional: ").strip()
+        if not escolha and permitir_vazio:
+            return None
+        if escolha.isdigit() and 1 <= int(escolha) <= len(profissionais):
+            return profissionais[int(escolha) - 1]
+        print(f"❌ Erro: Escolha um número entre 1 e {len(profissionais)}.")
+
+def perguntar_recorrencia(data_inicial):
+    """Pergunta se a consulta se repete. Retorna as datas a marcar (só a inicial, se não)."""
+    opcoes = ", ".join(f"{letra} = {nome}" for letra, (nome, _) in INTERVALOS_SERIE.items())
+    while True:
+        resposta = perguntar(f"Repetir a consulta? (N = não, {opcoes}): ").strip().upper()
+        if resposta in ("", "N"):
+            return [data_inicial]
+        if resposta in INTERVALOS_SERIE:
+            break
+        print("❕Opção inválida.")
+
+    nome, intervalo = INTERVALOS_SERIE[resposta]
+    while True:
+        limite = perguntar(f"Quantas consultas no total (até {MAXIMO_CONSULTAS_SERIE}) ou data final (DD/MM/AAAA): ").strip()
+        try:
+            if limite.isdigit():
+                datas = datas_recorrentes(data_inicial, intervalo, vezes=int(limite))
+            else:
+                datas = datas_recorrentes(data_inicial, intervalo, ate=limite)
+        except ValueError as erro:
+            print(f"❌ Erro: {erro}.")
+            continue
+        print(f"Série {nome}: {len(datas)} consulta(s), de {datas[0]} a {datas[-1]}.")
+        return datas
+
 # --- 3. Listar Pacientes (ALTERADO) ---
-def listar_pacientes(pacientes):
+def listar_pacientes(repo, pagina=1, tamanho_pagina=TAMANHO_PAGINA, navegar=True):
     print("\n3️⃣  Pacientes Cadastrados")
+    pacientes = repo.pacientes
     if not pacientes:
         print("\n❌ Nenhum paciente cadastrado ainda.\n")
         return
 
     separador = "-" * 63 
-    print(separador)
-
-    for i, paciente in enumerate(pacientes, start=1):
-        # Chama a função helper de impressão de PACIENTE
-        imprimir_paciente_registro(paciente, indice=i)
-        print(separador)
+    # ALTERADO: Paginado, uma escrita por página (a lista já está em ordem de cadastro)
+    exibir_paginado(pacientes, formatar_paciente_registro, separador, tamanho_pagina, pagina, navegar)
     print()
 
 # --- 4. Listar Agendamentos (FUNÇÕES ALTERADAS/ADICIONADAS) ---
 
 def get_sort_key_agendamento(ag):
     """Helper para ordenar agendamentos por data e hora."""
-    data_consulta = ag.get("DataConsulta", "")
-    hora_inicio = ag.get("HorarioInicio", "00:00")
-    
-    data_obj = datetime.min # Padrão para dados inválidos (coloca no topo)
-    try:
-        data_obj = datetime.strptime(f"{data_consulta} {hora_inicio}", '%d/%m/%Y %H:%M')
-    except (ValueError, TypeError):
-        pass # Usa datetime.min se houver erro
-        
-    return data_obj
+    # ALTERADO: Usa o InicioTS já calculado na carga (sem strptime a cada ordenação)
+    if "InicioTS" in ag:
+        ts = ag["InicioTS"]
+    else:
+        ts = para_timestamp(ag.get("DataConsulta", ""), ag.get("HorarioInicio", "00:00"))
+
+    if ts is None:
+        return TS_INVALIDO # Padrão para dados inválidos (coloca no topo)
+    return ts
 
 # *** NOVA FUNÇÃO HELPER 1 ***
-def listar_agendamentos_por_status(agendamentos, status_desejado):
+def listar_agendamentos_por_status(repo, status_desejado, pagina=1, tamanho_pagina=TAMANHO_PAGINA, navegar=True):
     """Filtra, ordena e imprime agendamentos por um status específico."""
     print(f"\n--- Listando Agendamentos '{status_desejado}' ---")
     
-    # Filtra
-    agendamentos_filtrados = [ag for ag in agendamentos if ag.get("Status") == status_desejado]
+    # ALTERADO: Filtro e ordenação já vêm prontos da linha do tempo por Status
+    # (nada é copiado nem reordenado; só a página exibida é lida)
+    agendamentos_ordenados = repo.agendamentos_ordenados_por_status(status_desejado)
     
-    if not agendamentos_filtrados:
+    if not agendamentos_ordenados:
         print(f"\n🔻Nenhum agendamento '{status_desejado}' encontrado.\n")
         return
 
-    # Ordena (usando a chave existente)
-    agendamentos_ordenados = sorted(agendamentos_filtrados, key=get_sort_key_agendamento)
-    
     print(f"📆 Mostrando {len(agendamentos_ordenados)} agendamento(s) '{status_desejado}' ordenados por data e hora")
+    if repo.arquivo is not None and repo.arquivo.meses and status_desejado in STATUS_ENCERRADOS:
+        print("ℹ️  Meses anteriores estão no arquivo morto: use a busca por CPF ou por período.")
     separador = "-" * 60 
-    print(separador)
-    
-    for i, ag in enumerate(agendamentos_ordenados, start=1):
-        imprimir_agendamento_detalhado(ag, indice=i)
-        print(separador)
+    exibir_paginado(agendamentos_ordenados, formatador_agendamentos(repo), separador, tamanho_pagina, pagina, navegar)
     print()
 
 # *** NOVA FUNÇÃO HELPER 2 ***
-def buscar_agendamentos_por_cpf(agendamentos):
+def buscar_agendamentos_por_cpf(repo):
     """Busca e lista todos os agendamentos (qualquer status) para um CPF."""
     print("\n--- Buscar Agendamentos por CPF ---")
-    cpf = input("Digite o CPF (11 dígitos) do paciente: ").strip()
+    cpf = perguntar("Digite o CPF (11 dígitos) do paciente: ").strip()
 
-    if not cpf.isdigit() or len(cpf) != 11:
+    if not validar_cpf(cpf):
         print("Erro: Formato de CPF inválido.")
         return
 
-    # Filtra por CPF (todos os status)
-    agendamentos_do_paciente = [ag for ag in agendamentos if ag.get("CPF") == cpf]
+    # Filtra por CPF (todos os status) - ALTERADO: usa o índice por CPF (e o arquivo morto)
+    agendamentos_do_paciente = repo.agendamentos_do_cpf(cpf, historico=True)
 
     if not agendamentos_do_paciente:
         print(f"\n🔻Nenhum agendamento (em qualquer status) encontrado para o CPF {cpf}.\n")
@@ -420,14 +2539,62 @@ def buscar_agendamentos_por_cpf(agendamentos):
     print(separador)
 
     for ag in agendamentos_ordenados:
-        imprimir_agendamento_detalhado(ag) # Imprime sem índice
+        imprimir_agendamento_detalhado(ag, nome=repo.nome_exibido(ag)) # Imprime sem índice
         print(separador)
     print()
 
+# *** NOVA FUNÇÃO HELPER 3 ***
+def listar_agendamentos_por_periodo(repo):
+    """Lista os agendamentos entre duas datas, opcionalmente de um profissional."""
+    print("\n--- Buscar Agendamentos por Período ---")
+    while True:
+        data_inicio = validar_data(perguntar("Data inicial (DD/MM/AAAA): ").strip())
+        if data_inicio: break
+        print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
+    while True:
+        data_fim = validar_data(perguntar("Data final (DD/MM/AAAA): ").strip())
+        if data_fim: break
+        print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
+
+    # ALTERADO: Também por especialidade (cada uma tem a sua linha do tempo)
+    print("\nFiltrar por: 1) Profissional  2) Especialidade  (deixe em branco para todos)")
+    filtro = perguntar("Escolha uma opção: ").strip()
+    medico = especializacao = None
+    if filtro == "1":
+        profissional = escolher_profissional(repo, permitir_vazio=True)
+        medico = profissional["Nome"] if profissional else None
+    elif filtro == "2":
+        especializacao = escolher_especialidade(repo)
+
+    # Já vem em ordem de data e hora (busca binária na linha do tempo)
+    encontrados = repo.agendamentos_entre(data_inicio, data_fim, medico, especializacao)
+    if not encontrados:
+        print(f"\n🔻Nenhum agendamento encontrado entre {data_inicio} e {data_fim}.\n")
+        return
+
+    print(f"\n📆 Mostrando {len(encontrados)} agendamento(s) entre {data_inicio} e {data_fim}"
+          + (f" ({medico or especializacao})" if medico or especializacao else ""))
+    separador = "-" * 60
+    exibir_paginado(encontrados, formatador_agendamentos(repo), separador)
+    print()
+
+def escolher_especialidade(repo):
+    """Lista as especialidades do cadastro e devolve a escolhida (None se ficar em branco)."""
+    especialidades = repo.profissionais.especialidades()
+    for i, especialidade in enumerate(especialidades, start=1):
+        print(f"  {i}) {especialidade}")
+    while True:
+        escolha = perguntar("Digite o número da especialidade: ").strip()
+        if not escolha:
+            return None
+        if escolha.isdigit() and 1 <= int(escolha) <= len(especialidades):
+            return especialidades[int(escolha) - 1]
+        print(f"❌ Erro: Escolha um número entre 1 e {len(especialidades)}.")
+
 # *** FUNÇÃO PRINCIPAL DA OPÇÃO 4 (AGORA É UM SUBMENU) ***
-def listar_agendamentos(agendamentos):
+def listar_agendamentos(repo):
     print("\n4️⃣  Agendamentos")
-    if not agendamentos:
+    if not repo.agendamentos and not (repo.arquivo is not None and repo.arquivo.meses):
         print("\n❌ Nenhum agendamento encontrado.\n")
         return
 
@@ -436,16 +2603,19 @@ def listar_agendamentos(agendamentos):
         print("1 - Listar Agendamentos Ativos")
         print("2 - Listar Agendamentos Cancelados")
         print("3 - Buscar Agendamentos por CPF")
-        print("4 - Voltar ao Menu Principal")
-        opcao_submenu = input("∷ Escolha uma opção: ").strip()
+        print("4 - Buscar Agendamentos por Período")
+        print("5 - Voltar ao Menu Principal")
+        opcao_submenu = perguntar("∷ Escolha uma opção: ").strip()
 
         if opcao_submenu == "1":
-            listar_agendamentos_por_status(agendamentos, "Ativo")
+            listar_agendamentos_por_status(repo, "Ativo")
         elif opcao_submenu == "2":
-            listar_agendamentos_por_status(agendamentos, "Cancelado")
+            listar_agendamentos_por_status(repo, "Cancelado")
         elif opcao_submenu == "3":
-            buscar_agendamentos_por_cpf(agendamentos)
+            buscar_agendamentos_por_cpf(repo)
         elif opcao_submenu == "4":
+            listar_agendamentos_por_periodo(repo)
+        elif opcao_submenu == "5":
             print("Voltando ao menu principal...")
             break # Sai do loop do submenu
         else:
@@ -453,11 +2623,11 @@ def listar_agendamentos(agendamentos):
 
 
 # --- 5. Editar Paciente (LÓGICA DO TIMESTAMP ALTERADA) ---
-def editar_paciente(pacientes, agendamentos):
+def editar_paciente(repo):
     print("\n5️⃣  Editar Paciente")
-    cpf = input("Digite o CPF (11 dígitos) do paciente a editar: ").strip()
+    cpf = perguntar("Digite o CPF (11 dígitos) do paciente a editar: ").strip()
     
-    paciente_encontrado = buscar_paciente_por_cpf(cpf, pacientes)
+    paciente_encontrado = repo.buscar_paciente(cpf)
             
     if not paciente_encontrado:
         print("🔻Paciente não cadastrado.")
@@ -466,135 +2636,116 @@ def editar_paciente(pacientes, agendamentos):
     print(f"Editando paciente: {paciente_encontrado['NomeCompleto']}")
     print("Deixe o campo em branco (pressione Enter) para manter o valor atual.")
     
-    # *** ALTERAÇÃO AQUI ***
-    # Flag para rastrear se o usuário realmente mudou algum dado
-    houve_alteracao = False 
-    # Guarda o nome antigo APENAS para a lógica de sincronização
-    nome_antigo_para_sinc = paciente_encontrado['NomeCompleto']
+    # ALTERADO: Em vez de uma flag, junta os campos alterados num dicionário.
+    # Eles só são aplicados no final, pelo repositório (que registra a alteração).
+    alteracoes = {}
 
     # 1. Loop para Nome Completo
     while True:
-        novo_nome = input(f"Nome Completo ({paciente_encontrado['NomeCompleto']}): ").title().strip()
+        novo_nome = perguntar(f"Nome Completo ({paciente_encontrado['NomeCompleto']}): ").title().strip()
         if not novo_nome: 
             break # Mantém o antigo
         
         # Só marca a alteração se o nome for NOVO
         if novo_nome != paciente_encontrado['NomeCompleto']:
-            paciente_encontrado['NomeCompleto'] = novo_nome
-            houve_alteracao = True
+            alteracoes['NomeCompleto'] = novo_nome
         break
 
     # 2. Loop para Data de Nascimento
     while True:
-        nova_data_str = input(f"Data de nascimento ({paciente_encontrado['Data de Nascimento']}): ").strip()
+        nova_data_str = perguntar(f"Data de nascimento ({paciente_encontrado['Data de Nascimento']}): ").strip()
         if not nova_data_str:
             break # Mantém o antigo
         data_nasc_valida = validar_data(nova_data_str)
         if data_nasc_valida:
             # Só marca a alteração se a data for NOVA
             if data_nasc_valida != paciente_encontrado['Data de Nascimento']:
-                paciente_encontrado['Data de Nascimento'] = data_nasc_valida
-                houve_alteracao = True
+                alteracoes['Data de Nascimento'] = data_nasc_valida
             break
         print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
 
     # 3. Loop para Estado
     while True:
-        novo_estado = input(f"Estado ({paciente_encontrado['Estado']}): ").upper().strip()
+        novo_estado = perguntar(f"Estado ({paciente_encontrado['Estado']}): ").upper().strip()
         if not novo_estado:
             break # Mantém o antigo
-        if len(novo_estado) == 2 and novo_estado.isalpha():
+        if validar_estado(novo_estado):
             # Só marca a alteração se o estado for NOVO
             if novo_estado != paciente_encontrado['Estado']:
-                paciente_encontrado['Estado'] = novo_estado
-                houve_alteracao = True
+                alteracoes['Estado'] = novo_estado
             break
         print("❌ Erro: estado inválido! Digite apenas a sigla de 2 letras.")
 
     # 4. Loop para Cidade
     while True:
-        nova_cidade = input(f"Cidade ({paciente_encontrado['Cidade']}): ").title().strip()
+        nova_cidade = perguntar(f"Cidade ({paciente_encontrado['Cidade']}): ").title().strip()
         if not nova_cidade:
             break # Mantém o antigo
         if nova_cidade:
             # Só marca a alteração se a cidade for NOVA
             if nova_cidade != paciente_encontrado['Cidade']:
-                paciente_encontrado['Cidade'] = nova_cidade
-                houve_alteracao = True
+                alteracoes['Cidade'] = nova_cidade
             break
         print("❌ Erro: cidade não pode ficar em branco!")
 
     # 5. Loop para Endereço
     while True:
-        novo_endereco = input(f"Endereço ({paciente_encontrado['Endereço']}): ").title().strip()
+        novo_endereco = perguntar(f"Endereço ({paciente_encontrado['Endereço']}): ").title().strip()
         if not novo_endereco: 
             break # Mantém o antigo
         # Só marca a alteração se o endereço for NOVO
         if novo_endereco != paciente_encontrado['Endereço']:
-            paciente_encontrado['Endereço'] = novo_endereco
-            houve_alteracao = True
+            alteracoes['Endereço'] = novo_endereco
         break
 
     # 6. Loop para DDD
     while True:
-        novo_ddd = input(f"DDD ({paciente_encontrado['DDD']}): ").strip()
+        novo_ddd = perguntar(f"DDD ({paciente_encontrado['DDD']}): ").strip()
         if not novo_ddd:
             break # Mantém o antigo
-        if novo_ddd.isdigit() and len(novo_ddd) == 2:
+        if validar_ddd(novo_ddd):
             # Só marca a alteração se o DDD for NOVO
             if novo_ddd != paciente_encontrado['DDD']:
-                paciente_encontrado['DDD'] = novo_ddd
-                houve_alteracao = True
+                alteracoes['DDD'] = novo_ddd
             break
         print("❌ Erro: DDD inválido! Digite 2 números.")
 
     # 7. Loop para Telefone
     while True:
-        novo_numero = input(f"Número de celular ({paciente_encontrado['Telefone']}): ").strip()
+        novo_numero = perguntar(f"Número de celular ({paciente_encontrado['Telefone']}): ").strip()
         if not novo_numero:
             break # Mantém o antigo
-        if novo_numero.isdigit() and len(novo_numero) == 9 and novo_numero.startswith("9"):
+        if validar_celular(novo_numero):
             # Só marca a alteração se o número for NOVO
             if novo_numero != paciente_encontrado['Telefone']:
-                paciente_encontrado['Telefone'] = novo_numero
-                houve_alteracao = True
+                alteracoes['Telefone'] = novo_numero
             break
         print("❌ Erro: número inválido! Deve ter 9 dígitos e começar com 9.")
 
-    # Sincroniza agendamentos ativos SE o nome mudou
-    if paciente_encontrado['NomeCompleto'] != nome_antigo_para_sinc:
-        print("\nDetectada alteração de nome. Sincronizando agendamentos 'Ativos'...")
-        agendamentos_atualizados = 0
-        for ag in agendamentos:
-            # Atualiza apenas agendamentos do mesmo CPF E que estejam "Ativo"
-            if ag.get("CPF") == cpf and ag.get("Status") == "Ativo":
-                ag["NomeCompleto"] = paciente_encontrado['NomeCompleto']
-                agendamentos_atualizados += 1
-        
-        if agendamentos_atualizados > 0:
-            print(f"{agendamentos_atualizados} agendamento(s) 'Ativo(s)' foram atualizados com o novo nome.")
-        else:
-            print("📑 Nenhum agendamento 'Ativo' precisou ser atualizado.")
-
     # *** ALTERAÇÃO AQUI ***
     # Só atualiza o timestamp e retorna True (para salvar) se algo MUDOU
-    if houve_alteracao:
-        paciente_encontrado["UltimaModificacao"] = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
-        print("\n✅ Paciente atualizado com sucesso!")
-        return True # Sinaliza sucesso (e necessidade de salvar)
-    else:
+    if not alteracoes:
         print("\nℹ️ Nenhuma alteração foi feita.")
         return False # Sinaliza que NADA mudou (e não precisa salvar)
 
+    alteracoes["UltimaModificacao"] = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
+    repo.atualizar_paciente(paciente_encontrado, alteracoes)
+
+    # ALTERADO: Os agendamentos 'Ativo' buscam o nome no cadastro (nada a sincronizar)
+    if "NomeCompleto" in alteracoes:
+        print("\nℹ️ Os agendamentos 'Ativo' deste paciente já mostram o novo nome.")
+
+    print("\n✅ Paciente atualizado com sucesso!")
+    return True # Sinaliza sucesso (e necessidade de salvar)
+
+# NOVO: Usado pelo menu e pela linha de comando
 # --- 6. Alterar Status do Agendamento (ALTERADO) ---
-def alterar_status_agendamento(agendamentos):
+def alterar_status_agendamento(repo):
     print("\n6️⃣  Alterar Status do Agendamento")
-    cpf = input("Digite o CPF do paciente para buscar agendamentos: ").strip()
+    cpf = perguntar("Digite o CPF do paciente para buscar agendamentos: ").strip()
     
-    # Encontra TODOS os agendamentos para este CPF
-    agendamentos_do_paciente = [
-        ag for ag in agendamentos if ag.get("CPF") == cpf
-    ]
+    # Encontra TODOS os agendamentos para este CPF (ALTERADO: via índice)
+    agendamentos_do_paciente = repo.agendamentos_do_cpf(cpf)
     
     if not agendamentos_do_paciente:
         print("🔻Nenhum agendamento encontrado para este CPF.")
@@ -603,16 +2754,17 @@ def alterar_status_agendamento(agendamentos):
     # Se houver mais de um, o usuário deve escolher
     if len(agendamentos_do_paciente) == 1:
         agendamento_alvo = agendamentos_do_paciente[0]
-        print(f"Agendamento encontrado para {agendamento_alvo['NomeCompleto']} em {agendamento_alvo['DataConsulta']}.")
+        print(f"Agendamento encontrado para {repo.nome_exibido(agendamento_alvo)} em {agendamento_alvo['DataConsulta']}.")
     else:
         print("Múltiplos agendamentos encontrados para este CPF:")
         for i, ag in enumerate(agendamentos_do_paciente):
             # ALTERAÇÃO AQUI: Mostra os campos corretos
-            print(f"  {i+1}) Data: {ag['DataConsulta']} | Hora: {ag['HorarioInicio']} | Status: {ag['Status']} | Médico: {ag.get('Medico', 'N/A')} ({ag.get('Especializacao', 'N/A')})")
+            serie = " | 🔁 Série" if ag.get("Serie") else ""
+            print(f"  {i+1}) Data: {ag['DataConsulta']} | Hora: {ag['HorarioInicio']} | Status: {ag['Status']} | Médico: {ag['Medico'] or 'N/A'} ({ag['Especializacao'] or 'N/A'}){serie}")
         
         while True:
             try:
-                escolha = int(input("Qual agendamento você quer alterar (digite o número)? "))
+                escolha = int(perguntar("Qual agendamento você quer alterar (digite o número)? "))
                 if 1 <= escolha <= len(agendamentos_do_paciente):
                     agendamento_alvo = agendamentos_do_paciente[escolha - 1]
                     break
@@ -628,33 +2780,59 @@ def alterar_status_agendamento(agendamentos):
     print("1 - Cancelado")
     print("2 - Atendimento Realizado")
     print("3 - Ativo")
-    opcao = input("Escolha o novo status (ou deixe em branco para cancelar): ")
-    
+    print("4 - Remarcar (nova data e horário)")
+    opcao = perguntar("Escolha o novo status (ou deixe em branco para cancelar): ")
+
+    # NOVO: Consultas seguintes da mesma série podem ser canceladas/remarcadas juntas
+    seguintes = ocorrencias_seguintes(repo, agendamento_alvo) if agendamento_alvo["Status"] == "Ativo" else [agendamento_alvo]
+    em_serie = False
+    if opcao in ("1", "4") and len(seguintes) > 1:
+        em_serie = perguntar(f"Aplicar também às próximas {len(seguintes) - 1} consulta(s) da série? (S/N): ").strip().upper() == 'S'
+
     novo_status = None
-    if opcao == "1":
+    hora_final = "N/A"
+    if opcao == "1" and em_serie:
+        for ag in seguintes:
+            repo.atualizar_agendamento(ag, {"Status": "Cancelado", "HoraFinal": "N/A"})
+        print(f"✅ {len(seguintes)} consulta(s) da série canceladas!")
+        return True
+    elif opcao == "4":
+        return remarcar_pelo_menu(repo, agendamento_alvo, em_serie)
+    elif opcao == "1":
         novo_status = "Cancelado"
-        agendamento_alvo["HoraFinal"] = "N/A"
     elif opcao == "2":
         novo_status = "Atendimento Realizado"
         # Pede a hora final
         while True:
-            hora_final_str = input("Digite a HORA FINAL da consulta (HH:MM): ").strip()
+            hora_final_str = perguntar("Digite a HORA FINAL da consulta (HH:MM): ").strip()
             if not hora_final_str:
                 print("❌ Erro: A hora final é obrigatória.")
                 continue
             hora_final_valida = validar_horario(hora_final_str)
             if hora_final_valida:
-                if hora_final_valida <= agendamento_alvo['HorarioInicio']:
+                # ALTERADO: Compara em minutos (inteiros), não como texto
+                minutos_inicio = minutos_do_dia(agendamento_alvo['HorarioInicio'])
+                if minutos_inicio is not None and minutos_do_dia(hora_final_valida) <= minutos_inicio:
                     print(f"Erro: A hora final ({hora_final_valida}) deve ser DEPOIS da hora inicial ({agendamento_alvo['HorarioInicio']}).")
                 else:
-                    agendamento_alvo["HoraFinal"] = hora_final_valida
+                    hora_final = hora_final_valida
                     break
             else:
                 print("❌ Erro: horário inválido (formato HH:MM).")
                 
     elif opcao == "3":
         novo_status = "Ativo"
-        agendamento_alvo["HoraFinal"] = "N/A"
+        # NOVO: Reativar pode chocar com alguém que pegou o horário nesse meio tempo
+        if agendamento_alvo.get("ProfissionalID") is not None and agendamento_alvo['Status'] == "Cancelado":
+            conflitos = verificar_conflitos(
+                repo, agendamento_alvo["ProfissionalID"], agendamento_alvo["DataConsulta"],
+                agendamento_alvo["HorarioInicio"], ignorar_id=agendamento_alvo["ID"],
+            )
+            if conflitos:
+                print(f"⚠️  Conflito: {agendamento_alvo['Medico']} já tem {len(conflitos)} consulta(s) neste horário.")
+                if perguntar("Reativar mesmo assim? (S/N): ").strip().upper() != 'S':
+                    print("Alteração de status cancelada.")
+                    return False
     elif not opcao:
         print("Alteração de status cancelada.")
         return False
@@ -662,24 +2840,55 @@ def alterar_status_agendamento(agendamentos):
         print("Opção inválida.")
         return False
 
-    agendamento_alvo["Status"] = novo_status
+    # ALTERADO: Passa pelo repositório para manter o índice por Status em dia
+    repo.atualizar_agendamento(agendamento_alvo, {"Status": novo_status, "HoraFinal": hora_final})
     # (Não atualizamos 'UltimaModificacao' do paciente, pois isso é um agendamento)
     print("✅ Status do agendamento atualizado com sucesso!")
     return True # Sinaliza sucesso
 
+def remarcar_pelo_menu(repo, agendamento_alvo, em_serie):
+    if agendamento_alvo["Status"] != "Ativo":
+        print("❌ Erro: só consultas com status 'Ativo' podem ser remarcadas.")
+        return False
+    while True:
+        nova_data = perguntar("Nova data da consulta (DD/MM/AAAA): ").strip()
+        if validar_data(nova_data):
+            break
+        print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
+    while True:
+        novo_horario = perguntar("Novo horário de início (HH:MM): ").strip()
+        if validar_horario(novo_horario):
+            break
+        print("❌ Erro: horário inválido! Use o formato HH:MM (ex: 14:30).")
+
+    try:
+        try:
+            remarcados = remarcar_agendamento(repo, agendamento_alvo["ID"], nova_data, novo_horario, em_serie)
+        except Conflito as erro:
+            print(f"⚠️  Conflito: {erro}")
+            if perguntar("Remarcar mesmo assim (encaixe)? (S/N): ").strip().upper() != 'S':
+                print("Remarcação cancelada.")
+                return False
+            remarcados = remarcar_agendamento(repo, agendamento_alvo["ID"], nova_data, novo_horario, em_serie, encaixe=True)
+    except ValueError as erro:
+        print(f"❌ Erro: {erro}.")
+        return False
+    print(f"✅ {len(remarcados)} consulta(s) remarcada(s): {', '.join(ag['DataConsulta'] + ' ' + ag['HorarioInicio'] for ag in remarcados)}")
+    return True
+
 # --- 7. Buscar Consulta Realizada (ALTERADO) ---
-def buscar_consultas_realizadas(agendamentos):
+def buscar_consultas_realizadas(repo):
     print("\n--- 7. Buscar Consultas Realizadas por CPF ---")
-    cpf = input("Digite o CPF (11 dígitos) do paciente: ").strip()
+    cpf = perguntar("Digite o CPF (11 dígitos) do paciente: ").strip()
     
-    if not cpf.isdigit() or len(cpf) != 11:
+    if not validar_cpf(cpf):
         print("Erro: Formato de CPF inválido.")
         return
 
-    # Filtra agendamentos realizados para o CPF
+    # Filtra agendamentos realizados para o CPF (ALTERADO: parte do índice por CPF)
     consultas_realizadas = [
-        ag for ag in agendamentos 
-        if ag.get("CPF") == cpf and ag.get("Status") == "Atendimento Realizado"
+        ag for ag in repo.agendamentos_do_cpf(cpf, historico=True)
+        if ag.get("Status") == "Atendimento Realizado"
     ]
     
     if not consultas_realizadas:
@@ -695,11 +2904,11 @@ def buscar_consultas_realizadas(agendamentos):
         print(separador)
 
 # --- 8. Excluir Paciente (ALTERADO) ---
-def excluir_paciente(pacientes, agendamentos):
+def excluir_paciente(repo):
     print("\n8️⃣  Excluir Paciente (Registro)")
-    cpf = input("Digite o CPF (11 dígitos) do paciente a excluir: ").strip()
+    cpf = perguntar("Digite o CPF (11 dígitos) do paciente a excluir: ").strip()
     
-    paciente_encontrado = buscar_paciente_por_cpf(cpf, pacientes)
+    paciente_encontrado = repo.buscar_paciente(cpf)
             
     if not paciente_encontrado:
         print("🔻Paciente não cadastrado.")
@@ -709,24 +2918,449 @@ def excluir_paciente(pacientes, agendamentos):
     print(f"Você está prestes a excluir o registro do paciente: {paciente_encontrado['NomeCompleto']}")
     print("Isso NÃO excluirá os agendamentos dele (eles permanecerão no histórico).")
     
-    if input("❗Confirmar exclusão? (S/N): ").strip().upper() != 'S':
+    if perguntar("❗Confirmar exclusão? (S/N): ").strip().upper() != 'S':
         print("Exclusão cancelada.")
         return False
 
-    pacientes.remove(paciente_encontrado)
+    repo.remover_paciente(paciente_encontrado)
     print("✅ Paciente (registro) excluído com sucesso!")
     return True # Sinaliza sucesso
 
+# --- 10. Próximos Horários Livres (NOVO) ---
+def mostrar_horarios_livres(repo):
+    print("\n🔟 Próximos Horários Livres")
+    print("Filtrar por:")
+    print("  1) Especialidade")
+    print("  2) Profissional")
+    print("  3) Todos os profissionais")
+    filtro = perguntar("Escolha uma opção: ").strip()
+
+    especializacao = None
+    medico = None
+    if filtro == "1":
+        especializacao = escolher_especialidade(repo)
+        if especializacao is None:
+            return
+    elif filtro == "2":
+        profissional = escolher_profissional(repo)
+        if profissional is None:
+            return
+        medico = profissional["Nome"]
+    elif filtro != "3":
+        print("Opção inválida.")
+        return
+
+    data_str = perguntar("A partir da data (DD/MM/AAAA, Enter para hoje): ").strip()
+    a_partir_de = None
+    if data_str:
+        a_partir_de = validar_data(data_str)
+        if not a_partir_de:
+            print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
+            return
+
+    quantidade = perguntar("Quantos horários mostrar? (Enter para 5): ").strip()
+    quantidade = int(quantidade) if quantidade.isdigit() and int(quantidade) > 0 else 5
+
+    livres = buscar_horarios_livres(repo, quantidade, a_partir_de, especializacao, medico)
+    if not livres:
+        print("\n🔻Nenhum horário livre encontrado no período.\n")
+        return
+
+    print(f"\n📆 {len(livres)} horário(s) livre(s) de {DURACAO_PADRAO_MINUTOS} min:")
+    for livre in livres:
+        print(f"  {livre['DataConsulta']} às {livre['HorarioInicio']} | {livre['Medico']} ({livre['Especializacao']})")
+    print()
+
+# --- 11. Buscar por Nome (NOVO) ---
+def buscar_por_nome(repo):
+    print("\n🔎 Buscar por Nome")
+    consulta = perguntar("Nome ou parte do nome (acentos e maiúsculas não importam): ").strip()
+    if not consulta:
+        print("❌ Erro: digite ao menos uma parte do nome.")
+        return
+
+    encontrados = repo.buscar_por_nome(consulta)
+    if not encontrados:
+        print(f"\n🔻Nenhum nome parecido com '{consulta}'.\n")
+        return
+
+    print(f"\n📇 {len(encontrados)} resultado(s) para '{consulta}' (do mais parecido ao menos):")
+    vistos = set()
+    for nota, tipo, registro in encontrados:
+        # Sem cadastro, a mesma pessoa pode ter vários agendamentos: mostra uma vez
+        if (registro["CPF"], registro.get("NomeCompleto")) in vistos:
+            continue
+        vistos.add((registro["CPF"], registro.get("NomeCompleto")))
+        origem = "paciente" if tipo == "paciente" else "sem cadastro"
+        print(f"  {nota:.0%} | {registro.get('NomeCompleto')} | CPF: {registro['CPF']} | {origem}")
+    print()
+
+# --- 12. Relatórios (NOVO) ---
+def relatorio_operacional(repo, de=None, ate=None):
+    """Ocupação, cancelamentos, duração das consultas e agendamentos por dia/especialidade.
+
+    'de' e 'ate' são datas DD/MM/AAAA (sem elas, todo o período dos dados).
+    Inclui os meses do arquivo morto que caem no período.
+    """
+    import relatorios_cac
+    limites = []
+    for data_str in (de, ate):
+        ts = para_timestamp(data_str) if data_str else None
+        if data_str and ts is None:
+            raise ValueError(f"data inválida: {data_str!r} (use DD/MM/AAAA)")
+        limites.append(None if ts is None else ts // 86400)
+
+    colunas = repo.colunas_relatorio()
+    if repo.arquivo is not None and repo.arquivo.meses:
+        primeiro_mes = f"{de[6:]}-{de[3:5]}" if de else "0000-00"
+        ultimo_mes = f"{ate[6:]}-{ate[3:5]}" if ate else "9999-99"
+        arquivados = [ag for ag in repo.arquivo.agendamentos_dos_meses(primeiro_mes, ultimo_mes)
+                      if ag["ID"] not in repo.agendamento_por_id]
+        if arquivados:
+            colunas = relatorios_cac.juntar_colunas(colunas, relatorios_cac.montar_colunas(arquivados))
+    contar_metricas(registros=len(colunas))
+
+    # ALTERADO: Ocupação de cada profissional sobre o seu próprio expediente (cadastro);
+    # o da clínica fica para os nomes que não estão no cadastro
+    expedientes = {
+        prof["Nome"]: (prof["DiasDeAtendimento"],
+                       minutos_do_dia(prof["HorarioFechamento"]) - minutos_do_dia(prof["HorarioAbertura"]))
+        for prof in repo.profissionais
+    }
+    return relatorios_cac.gerar_relatorio(
+        colunas, limites[0], limites[1], DIAS_DE_ATENDIMENTO,
+        minutos_do_dia(HORARIO_FECHAMENTO) - minutos_do_dia(HORARIO_ABERTURA), DURACAO_PADRAO_MINUTOS,
+        expedientes,
+    )
+
+def mostrar_relatorios(repo):
+    print("\n📊 Relatórios")
+    datas = []
+    for rotulo in ("Data inicial", "Data final"):
+        data_str = perguntar(f"{rotulo} (DD/MM/AAAA, Enter para todo o período): ").strip()
+        if data_str and not validar_data(data_str):
+            print("❌ Erro: data inválida! Use o formato DD/MM/AAAA.")
+            return
+        datas.append(data_str or None)
+
+    relatorio = relatorio_operacional(repo, *datas)
+    if not relatorio["agendamentos"]:
+        print("\n🔻Nenhum agendamento no período.\n")
+        return
+
+    periodo = relatorio["periodo"]
+    print(f"\n📆 {periodo['de']} a {periodo['ate']} ({periodo['dias_de_atendimento']} dia(s) de atendimento)")
+    print(f"  {relatorio['agendamentos']} agendamento(s): "
+          + ", ".join(f"{qtd} {status}" for status, qtd in relatorio["por_status"].items()))
+    print(f"  Taxa de cancelamento: {relatorio['taxa_cancelamento']:.1%}")
+
+    print(f"\n  {'Profissional':<24} {'Agend.':>7} {'Cancel.':>8} {'Ocupação':>9}")
+    for prof in relatorio["profissionais"]:
+        ocupacao = f"{prof['ocupacao']:.1%}" if prof["ocupacao"] is not None else "N/A"
+        print(f"  {prof['profissional']:<24} {prof['agendamentos']:>7} "
+              f"{prof['taxa_cancelamento']:>8.1%} {ocupacao:>9}")
+
+    duracao = relatorio["duracao_minutos"]
+    if duracao["consultas"]:
+        print(f"\n  Duração das consultas realizadas ({duracao['consultas']}): média {duracao['media']} min, "
+              f"mediana {duracao['p50']} min, 90% até {duracao['p90']} min")
+        print("  " + " | ".join(f"{faixa} min: {qtd}" for faixa, qtd in duracao["faixas"].items()))
+
+    print("\n  Por especialidade: " + ", ".join(f"{nome} {qtd}" for nome, qtd in relatorio["por_especialidade"].items()))
+    mais_cheios = sorted(relatorio["por_dia"].items(), key=lambda item: item[1], reverse=True)[:5]
+    print("  Dias com mais agendamentos: " + ", ".join(f"{dia} ({qtd})" for dia, qtd in mais_cheios))
+    print()
+
+# --- 13. Profissionais (NOVO) ---
+def gerenciar_profissionais(repo):
+    cadastro = repo.profissionais
+    while True:
+        print("\n--- Profissionais ---")
+        print("1 - Listar Profissionais")
+        print("2 - Cadastrar Profissional")
+        print("3 - Alterar Horário de Atendimento")
+        print("4 - Ativar/Desativar Profissional")
+        print("5 - Voltar ao Menu Principal")
+        opcao = perguntar("∷ Escolha uma opção: ").strip()
+
+        try:
+            if opcao == "1":
+                print(f"\n{'ID':>4}  {'Nome':<24} {'Especialidade':<18} {'Atendimento':<26} Situação")
+                for prof in cadastro:
+                    expediente = (f"{prof['HorarioAbertura']}-{prof['HorarioFechamento']} "
+                                  f"{formatar_dias_atendimento(prof['DiasDeAtendimento'])}")
+                    print(f"{prof['ID']:>4}  {prof['Nome']:<24} {prof['Especializacao']:<18} {expediente:<26} "
+                          + ("Ativo" if prof["Ativo"] else "Inativo"))
+            elif opcao == "2":
+                nome = perguntar("Nome do profissional (ex: Dra. Ana Silva): ")
+                especializacao = perguntar("Especialidade: ").strip().title()
+                abertura = perguntar(f"Início do atendimento (HH:MM, Enter para {HORARIO_ABERTURA}): ").strip() or HORARIO_ABERTURA
+                fechamento = perguntar(f"Fim do atendimento (HH:MM, Enter para {HORARIO_FECHAMENTO}): ").strip() or HORARIO_FECHAMENTO
+                dias = perguntar("Dias de atendimento (0 = segunda ... 6 = domingo; ex: 0-4 ou 0,2,4; Enter para 0-4): ").strip() or "0-4"
+                prof = cadastrar_profissional(cadastro, nome, especializacao, abertura, fechamento, dias)
+                print(f"✅ {prof['Nome']} cadastrado(a) com o ID {prof['ID']}.")
+            elif opcao in ("3", "4"):
+                id_prof = perguntar("ID do profissional: ").strip()
+                prof = cadastro.por_id(int(id_prof)) if id_prof.isdigit() else None
+                if prof is None:
+                    print("🔻Profissional não encontrado.")
+                    continue
+                if opcao == "3":
+                    campos = {
+                        "HorarioAbertura": perguntar(f"Início do atendimento (Enter para manter {prof['HorarioAbertura']}): ").strip() or prof["HorarioAbertura"],
+                        "HorarioFechamento": perguntar(f"Fim do atendimento (Enter para manter {prof['HorarioFechamento']}): ").strip() or prof["HorarioFechamento"],
+                        "DiasDeAtendimento": perguntar("Dias de atendimento (Enter para manter "
+                                                   f"{formatar_dias_atendimento(prof['DiasDeAtendimento'])}): ").strip() or prof["DiasDeAtendimento"],
+                    }
+                else:
+                    campos = {"Ativo": not prof["Ativo"]}
+                prof = alterar_profissional(cadastro, prof["ID"], campos)
+                print(f"✅ {prof['Nome']}: {prof['HorarioAbertura']}-{prof['HorarioFechamento']} "
+                      f"{formatar_dias_atendimento(prof['DiasDeAtendimento'])}, " + ("ativo." if prof["Ativo"] else "inativo."))
+            elif opcao == "5":
+                print("Voltando ao menu principal...")
+                break
+            else:
+                print("Opção inválida, tente novamente.")
+        except ValueError as erro:
+            print(f"❌ Erro: {erro}.")
+
+# --- Importação em lote (NOVO) ---
+
+# NOVO: Quantas linhas válidas são aplicadas ao repositório de cada vez
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+def ler_linhas_arquivo(caminho):
+    """Gera (número da linha, dicionário) de um CSV ou JSON-lines, sem ler tudo na memória."""
+    caminho = Path(caminho)
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        if caminho.suffix.lower() == ".csv":
+            import csv  # Só a importação usa (não pesa no início dos outros comandos)
+            # Planilhas brasileiras costumam exportar com ';'
+            amostra = f.read(4096)
+            f.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;")
+            except csv.Error:
+                dialeto = csv.excel
+            for numero, linha in enumerate(csv.DictReader(f, dialect=dialeto), start=2):
+                yield numero, {chave.strip(): (valor or "").strip() for chave, valor in linha.items() if chave}
+        else:
+            for numero, texto in enumerate(f, start=1):
+                if not texto.strip():
+                    continue
+                try:
+                    yield numero, json.loads(texto)
+                except json.JSONDecodeError:
+                    yield numero, texto.strip()  # Rejeitada adiante, com o texto original
+
+def validar_linha_paciente(linha):
+    """Monta um paciente a partir de uma linha importada (ValueError se inválida)."""
+    nome = str(linha.get("NomeCompleto", "")).title().strip()
+    cpf = str(linha.get("CPF", "")).strip()
+    data_nasc = validar_data(str(linha.get("Data de Nascimento", "")).strip())
+    estado = str(linha.get("Estado", "")).upper().strip()
+    cidade = str(linha.get("Cidade", "")).title().strip()
+    endereco = str(linha.get("Endereço", "")).title().strip()
+    ddd = str(linha.get("DDD", "")).strip()
+    telefone = str(linha.get("Telefone", "")).strip()
+
+    if not nome: raise ValueError("nome completo em branco")
+    if not validar_cpf(cpf): raise ValueError("CPF deve conter exatamente 11 números")
+    if not data_nasc: raise ValueError("data de nascimento inválida (DD/MM/AAAA)")
+    if not validar_estado(estado): raise ValueError("estado inválido (sigla de 2 letras)")
+    if not cidade: raise ValueError("cidade em branco")
+    if not endereco: raise ValueError("endereço em branco")
+    if not validar_ddd(ddd): raise ValueError("DDD inválido (2 números)")
+    if not validar_celular(telefone): raise ValueError("celular inválido (9 dígitos começando com 9)")
+
+    return {
+        "NomeCompleto": nome,
+        "CPF": cpf,
+        "Data de Nascimento": data_nasc,
+        "Estado": estado,
+        "Cidade": cidade,
+        "Endereço": endereco,
+        "DDD": ddd,
+        "Telefone": telefone,
+        "DataCadastro": linha.get("DataCadastro") or datetime.now().strftime("%d/%m/%Y às %H:%M:%S"),
+        "UltimaModificacao": linha.get("UltimaModificacao") or "N/A",
+    }
+
+def validar_linha_agendamento(linha, repo):
+    """Monta um agendamento a partir de uma linha importada (ValueError se inválida)."""
+    nome = str(linha.get("NomeCompleto", "")).title().strip()
+    cpf = str(linha.get("CPF", "")).strip()
+    data_consulta = validar_data(str(linha.get("DataConsulta", "")).strip())
+    horario = validar_horario(str(linha.get("HorarioInicio", "")).strip())
+    medico = str(linha.get("Medico", "")).strip()
+    status = str(linha.get("Status", "")).strip() or "Ativo"
+    hora_final = str(linha.get("HoraFinal", "")).strip() or "N/A"
+
+    if not validar_cpf(cpf): raise ValueError("CPF deve conter exatamente 11 números")
+    if not data_consulta: raise ValueError("data da consulta inválida (DD/MM/AAAA)")
+    if not horario: raise ValueError("horário de início inválido (HH:MM)")
+    profissional = repo.profissionais.por_nome(medico)
+    if profissional is None: raise ValueError(f"profissional desconhecido: {medico!r}")
+    if status not in ("Ativo", "Cancelado", "Atendimento Realizado"): raise ValueError(f"status inválido: {status!r}")
+    if hora_final != "N/A" and not validar_horario(hora_final): raise ValueError("hora final inválida (HH:MM)")
+
+    paciente = repo.buscar_paciente(cpf)
+    if paciente:
+        nome = paciente["NomeCompleto"]
+    elif not nome:
+        raise ValueError("nome completo em branco (CPF não cadastrado)")
+
+    return {
+        "NomeCompleto": nome,
+        "CPF": cpf,
+        "PacienteCadastrado": paciente is not None,
+        "DataConsulta": data_consulta,
+        "Medico": profissional["Nome"],
+        "Especializacao": profissional["Especializacao"],
+        "ProfissionalID": profissional["ID"],
+        "HorarioInicio": horario,
+        "HoraFinal": validar_horario(hora_final) or "N/A",
+        "DataAgendamento": linha.get("DataAgendamento") or datetime.now().strftime("%d/%m/%Y às %H:%M:%S"),
+        "Status": status,
+    }
+
+# NOVO: A importação não pode marcar dois pacientes no mesmo horário (como o menu e o servidor)
+def conferir_horario_importado(repo, agenda_lote, registro, numero):
+    """ValueError se o agendamento choca com a agenda ou com uma linha aceita antes no arquivo.
+
+    Retorna o intervalo ocupado pela linha, para entrar em 'agenda_lote'.
+    """
+    horario = {
+        "ID": numero,
+        "ProfissionalID": registro["ProfissionalID"],
+        "Status": registro["Status"],
+        "InicioTS": para_timestamp(registro["DataConsulta"], registro["HorarioInicio"]),
+        "FimTS": para_timestamp(registro["DataConsulta"], registro["HoraFinal"]),
+    }
+    if not AgendaProfissionais.ocupa_horario(horario):
+        return horario
+    inicio = horario["InicioTS"]
+    fim = AgendaProfissionais.fim_previsto(inicio, horario["FimTS"])
+    ids = repo.agenda.conflitos(registro["ProfissionalID"], inicio, fim)
+    if ids:
+        raise ValueError(f"conflito de horário com o(s) agendamento(s) {', '.join(map(str, ids))}")
+    linhas = agenda_lote.conflitos(registro["ProfissionalID"], inicio, fim)
+    if linhas:
+        raise ValueError(f"conflito de horário com a(s) linha(s) {', '.join(map(str, sorted(linhas)))} deste arquivo")
+    return horario
+
+def importar_arquivo(repo, caminho, tipo):
+    """Importa pacientes ou agendamentos de um CSV/JSON-lines para o repositório.
+
+    As linhas rejeitadas (com o motivo) vão para '<arquivo>.rejeitados.jsonl'.
+    Retorna (quantidade importada, quantidade rejeitada). Não salva: quem chama
+    faz um único persistir_alteracoes() no final.
+    """
+    caminho = Path(caminho)
+    arquivo_rejeitados = caminho.with_name(caminho.name + ".rejeitados.jsonl")
+    # CPFs já cadastrados + os que já vieram neste arquivo (conjunto, sem varrer a lista)
+    cpfs_vistos = set(repo.paciente_por_cpf)
+    lote = []
+    # NOVO: Horários das linhas aceitas que ainda não entraram no repositório (ID = nº da linha)
+    agenda_lote = AgendaProfissionais()
+    importados = rejeitados = 0
+
+    def aplicar_lote():
+        nonlocal agenda_lote
+        for registro in lote:
+            if tipo == "pacientes":
+                repo.inserir_paciente(registro)
+            else:
+                repo.inserir_agendamento(registro)
+        lote.clear()
+        agenda_lote = AgendaProfissionais()  # daqui em diante estão em repo.agenda
+
+    with open(arquivo_rejeitados, "w", encoding="utf-8") as saida_rejeitados:
+        for numero, linha in ler_linhas_arquivo(caminho):
+            try:
+                if not isinstance(linha, dict):
+                    raise ValueError("linha não é um objeto JSON válido")
+                if tipo == "pacientes":
+                    registro = validar_linha_paciente(linha)
+                    if registro["CPF"] in cpfs_vistos:
+                        raise ValueError("CPF duplicado")
+                    cpfs_vistos.add(registro["CPF"])
+                else:
+                    registro = validar_linha_agendamento(linha, repo)
+                    horario = conferir_horario_importado(repo, agenda_lote, registro, numero)
+            except ValueError as erro:
+                rejeitados += 1
+                saida_rejeitados.write(json.dumps(
+                    {"linha": numero, "motivo": str(erro), "registro": linha}, ensure_ascii=False
+                ) + "\n")
+                continue
+
+            lote.append(registro)
+            if tipo != "pacientes":
+                agenda_lote.adicionar(horario)
+            importados += 1
+            if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+                aplicar_lote()
+        aplicar_lote()
+
+    if not rejeitados:
+        arquivo_rejeitados.unlink()
+    return importados, rejeitados
+
+
 # --- Programa principal (COM A ALTERAÇÃO) ---
 def main():
+    # ALTERADO: No SQLite, as consultas encerradas de meses passados ficam no
+    # banco (como no arquivo morto) e a carga lê só o resto
+    arquivo = abrir_historico_sqlite() if USAR_SQLITE else abrir_arquivo_historico()
     # Carrega ambas as listas no início
-    dados = carregar_dados()
+    dados = carregar_dados(arquivo)
     pacientes = dados["pacientes"]
     agendamentos = dados["agendamentos"]
-    
+    # NOVO: Todas as opções do menu consultam através do repositório indexado
+    repo = RepositorioClinica(pacientes, agendamentos, dados.get("geracao", 0), arquivo,
+                              abrir_cadastro_profissionais(caminho_profissionais()), dados.get("removidos"))
+    # NOVO: Consultas encerradas de meses passados vão para o arquivo morto
+    arquivados = arquivar_historico(repo)
+    if arquivados:
+        print(f"🗄️  {arquivados} consulta(s) encerrada(s) movida(s) para {caminho_arquivo_morto()}.")
+    # NOVO: A gravação é feita em segundo plano (gravador_cac.py), juntando
+    # alterações seguidas; o menu volta sem esperar o disco. No SQLite só as
+    # alterações são gravadas (rápido), então continua na hora, nesta thread.
+    gravador = GravadorSegundoPlano(lambda: persistir_alteracoes(repo, gravador.trava),
+                                    em_segundo_plano=not USAR_SQLITE)
+    try:
+        menu_principal(repo, gravador)
+    finally:
+        # Sai pela opção 9 ou por Ctrl+C: grava o que ainda estiver pendente
+        # ALTERADO: sem conseguir, as alterações vão para o resgate e o código de saída é 1
+        gravado = gravar_antes_de_sair(repo, gravador)
+        exportar_metricas()
+        if not gravado:
+            sys.exit(1)
+
+# NOVO: Nome de cada opção nas métricas (ex: 'menu.cadastrar_paciente')
+ACOES_MENU = {
+    "1": "cadastrar_paciente", "2": "realizar_agendamento", "3": "listar_pacientes",
+    "4": "listar_agendamentos", "5": "editar_paciente", "6": "alterar_status_agendamento",
+    "7": "buscar_consultas_realizadas", "8": "excluir_paciente", "9": "sair",
+    "10": "mostrar_horarios_livres", "11": "buscar_por_nome", "12": "mostrar_relatorios",
+    "13": "gerenciar_profissionais",
+}
+
+# NOVO: O laço do menu saiu do main(), que assim sempre grava o que ficou pendente
+def menu_principal(repo, gravador):
     dados_modificados = False # Flag para saber se precisa salvar
 
     while True:
+        avisar_erro_gravacao(gravador)
+        # NOVO: Outro processo gravou antes do gravador: recarrega aqui, entre as opções
+        if repo.recarregar_pendente:
+            sincronizar_com_disco(repo, gravador)
+            gravador.agendar()
+        if USAR_LEMBRETES:
+            avisar_lembretes(repo, gravador)
         print("\n◁ MENU CLÍNICA MWLTYNHO ▷\n")
         print("1 - Cadastrar Paciente")
         print("2 - Realizar Agendamento")
@@ -736,47 +3370,842 @@ def main():
         print("6 - Alterar Status do Agendamento")
         print("7 - Buscar Consultas Realizadas (Histórico)")
         print("8 - Excluir Paciente (Registro)")
+        print("10 - Próximos Horários Livres")
+        print("11 - Buscar por Nome")
+        print("12 - Relatórios")
+        print("13 - Profissionais")
         print("9 - Sair\n")
-        opcao = input("∷ Escolha uma opção: ")
+        opcao = perguntar("∷ Escolha uma opção: ")
 
         # Reseta o flag no início de cada loop
         dados_modificados = False
 
-        if opcao == "1":
-            # Passa a lista de pacientes; se retornar True, marca para salvar
-            dados_modificados = cadastrar_paciente(pacientes)
-        elif opcao == "2":
-            # Passa ambas as listas; se retornar True, marca para salvar
-            dados_modificados = realizar_agendamento(pacientes, agendamentos)
-        elif opcao == "3":
-            listar_pacientes(pacientes)
-        elif opcao == "4":
-            listar_agendamentos(agendamentos) # Agora chama o submenu
-        elif opcao == "5":
-            # ALTERADO: Passa 'agendamentos' para sincronizar nomes
-            # E agora, 'dados_modificados' SÓ será True se algo mudou
-            dados_modificados = editar_paciente(pacientes, agendamentos)
-        elif opcao == "6":
-            dados_modificados = alterar_status_agendamento(agendamentos)
-        elif opcao == "7":
-            buscar_consultas_realizadas(agendamentos)
-        elif opcao == "8":
-            dados_modificados = excluir_paciente(pacientes, agendamentos)
-        elif opcao == "9":
-            # Antes de sair, faz um último save se necessário
-            if dados_modificados:
-                salvar_dados(pacientes, agendamentos)
-                # print("(Dados pendentes salvos.)") # <-- LINHA REMOVIDA
-            print("Saindo... Até logo!")
-            break
-        else:
-            print("Opção inválida, tente novamente.\n")
+        # NOVO: Enquanto a opção roda, o gravador não mexe no repositório
+        # ALTERADO: (a não ser enquanto ela espera o usuário digitar)
+        # NOVO: Cada ação é medida (sem contar o tempo do usuário digitando)
+        with opcao_do_menu(gravador), medir(f"menu.{ACOES_MENU.get(opcao, 'opcao_invalida')}", descontar_entrada=True):
+            if opcao == "1":
+                # Passa o repositório; se retornar True, marca para salvar
+                dados_modificados = cadastrar_paciente(repo)
+            elif opcao == "2":
+                # Passa o repositório; se retornar True, marca para salvar
+                dados_modificados = realizar_agendamento(repo)
+            elif opcao == "3":
+                listar_pacientes(repo)
+            elif opcao == "4":
+                listar_agendamentos(repo) # Agora chama o submenu
+            elif opcao == "5":
+                # ALTERADO: O repositório já dá acesso aos agendamentos para sincronizar nomes
+                # E agora, 'dados_modificados' SÓ será True se algo mudou
+                dados_modificados = editar_paciente(repo)
+            elif opcao == "6":
+                dados_modificados = alterar_status_agendamento(repo)
+            elif opcao == "7":
+                buscar_consultas_realizadas(repo)
+            elif opcao == "8":
+                dados_modificados = excluir_paciente(repo)
+            elif opcao == "10":
+                mostrar_horarios_livres(repo)
+            elif opcao == "11":
+                buscar_por_nome(repo)
+            elif opcao == "12":
+                mostrar_relatorios(repo)
+            elif opcao == "13":
+                gerenciar_profissionais(repo)  # Grava o próprio arquivo de profissionais
+            elif opcao == "9":
+                # ALTERADO: O que estiver pendente é gravado pelo main() (gravador.encerrar())
+                print("Saindo... Até logo!")
+                break
+            else:
+                print("Opção inválida, tente novamente.\n")
         
         # Salva os dados APENAS se alguma função (que retorna True) modificou os dados
+        # ALTERADO: Só avisa o gravador, que grava em segundo plano
         if dados_modificados:
-            salvar_dados(pacientes, agendamentos)
-            # print("(Dados salvos no disco.)") # <-- LINHA REMOVIDA
+            gravador.agendar()
+        exportar_metricas()
+
+# NOVO: Os lembretes vencidos saem antes de cada volta ao menu
+def avisar_lembretes(repo, gravador):
+    with gravador.pausado(), gravador.trava:
+        try:
+            enviados = enviar_lembretes(repo)
+        except OSError as erro:
+            print(f"\n!! Não foi possível gravar os lembretes em {caminho_caixa_de_saida()}: {erro}")
+            return
+    if enviados:
+        print(f"\n📨 {len(enviados)} lembrete(s) de consulta enviado(s) para {caminho_caixa_de_saida()}.")
+
+# NOVO: Sair com alterações sem gravar é perdê-las: insiste algumas vezes e,
+# se não der, deixa as alterações num arquivo de resgate
+TENTATIVAS_AO_SAIR = 5
+
+def caminho_resgate():
+    """Alterações que não puderam ser gravadas ao sair (ex: clinica_dados_resgate.jsonl)."""
+    return ARQUIVO_DADOS.with_name(ARQUIVO_DADOS.stem + "_resgate.jsonl")
+
+def gravar_antes_de_sair(repo, gravador):
+    """Grava o que estiver pendente. Retorna False se foi preciso usar o arquivo de resgate."""
+    gravador.encerrar()  # Para a thread: daqui em diante agendar() grava nesta
+    falhas = 0
+    while repo.alteracoes:
+        try:
+            if repo.recarregar_pendente:
+                sincronizar_com_disco(repo, gravador)
+            gravador.agendar()
+            erro = gravador.novo_erro()
+        except Exception as falha:
+            erro = falha
+        if not repo.alteracoes or (repo.recarregar_pendente and erro is None):
+            continue
+        falhas += 1
+        print(f"\n!! Erro ao salvar os dados: {erro}. "
+              f"{len(repo.alteracoes)} alteração(ões) ainda não gravada(s).")
+        if falhas >= TENTATIVAS_AO_SAIR:
+            break
+        try:
+            perguntar(f"   Corrija o problema (espaço em disco, permissão) e tecle Enter para tentar de novo "
+                      f"(tentativa {falhas + 1} de {TENTATIVAS_AO_SAIR}; Ctrl+C desiste): ")
+        except KeyboardInterrupt:
+            break
+        except EOFError:
+            time.sleep(1)  # Sem terminal: tenta de novo sozinho (até TENTATIVAS_AO_SAIR)
+    if not repo.alteracoes:
+        return True
+    salvar_resgate(repo.alteracoes)
+    return False
+
+def salvar_resgate(alteracoes):
+    """Anexa as alterações (uma linha JSON cada, como no journal) ao arquivo de resgate."""
+    linhas = [{"resgate": datetime.now().isoformat(timespec="seconds"), "alteracoes": len(alteracoes)}]
+    linhas += alteracoes
+    texto = "".join(json.dumps(linha, ensure_ascii=False, separators=(",", ":"), default=dict) + "\n"
+                    for linha in linhas)
+    try:
+        with open(caminho_resgate(), "a", encoding="utf-8") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as erro:
+        # Nem o resgate pôde ser gravado: o terminal é o último lugar
+        print(f"\n!! Não foi possível gravar {caminho_resgate()} ({erro}). Alterações perdidas:", file=sys.stderr)
+        sys.stderr.write(texto)
+        return
+    print(f"\n!! {len(alteracoes)} alteração(ões) NÃO gravada(s) em {ARQUIVO_DADOS}; "
+          f"foram guardadas em {caminho_resgate()}.")
+
+def avisar_erro_gravacao(gravador):
+    """Mostra (uma vez) a falha da última gravação em segundo plano, se houver."""
+    erro = gravador.novo_erro()
+    if erro is not None:
+        print(f"\n!! Erro ao salvar os dados: {erro}. As alterações continuam na memória; "
+              "nova tentativa na próxima alteração e ao sair.\n")
+
+# --- Operações sem perguntas (linha de comando e servidor HTTP) ---
+
+# NOVO: As mesmas regras do menu, mas recebendo os dados prontos. Erros de
+# validação viram ValueError; registro inexistente vira NaoEncontrado.
+class NaoEncontrado(ValueError):
+    """Paciente ou agendamento que não existe."""
+
+class Conflito(ValueError):
+    """CPF já cadastrado ou horário já ocupado."""
+
+def registrar_paciente(repo, linha):
+    """Valida e cadastra um paciente. Retorna o registro guardado."""
+    paciente = validar_linha_paciente(linha)
+    if repo.buscar_paciente(paciente["CPF"]):
+        raise Conflito("já existe um paciente cadastrado com este CPF")
+    return repo.inserir_paciente(paciente)
+
+def alterar_paciente(repo, cpf, campos):
+    """Altera só os campos informados (os agendamentos 'Ativo' já leem o nome do cadastro)."""
+    paciente = repo.buscar_paciente(cpf)
+    if not paciente:
+        raise NaoEncontrado(f"paciente não cadastrado: {cpf}")
+
+    # Valida o registro inteiro com os valores novos (mesmas regras da importação)
+    validado = validar_linha_paciente({**paciente, **campos})
+    alteracoes = {
+        campo: validado[campo] for campo in campos
+        if campo in validado and campo != "CPF" and validado[campo] != paciente.get(campo)
+    }
+    if alteracoes:
+        alteracoes["UltimaModificacao"] = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
+        repo.atualizar_paciente(paciente, alteracoes)
+    return paciente
+
+def remover_paciente_cpf(repo, cpf):
+    """Exclui o registro do paciente (os agendamentos ficam no histórico)."""
+    paciente = repo.buscar_paciente(cpf)
+    if not paciente:
+        raise NaoEncontrado(f"paciente não cadastrado: {cpf}")
+    repo.remover_paciente(paciente)
+    return paciente
+
+def validar_novo_agendamento(repo, linha):
+    """Valida uma consulta nova (sem gravar). Retorna o agendamento pronto para inserir."""
+    linha = dict(linha)
+    medico = str(linha.get("Medico", "")).strip()
+    # ALTERADO: Aceita o ID do profissional (1, 2, ...) ou o nome
+    if medico.isdigit() and repo.profissionais.por_id(int(medico)):
+        linha["Medico"] = repo.profissionais.por_id(int(medico))["Nome"]
+    linha.pop("Status", None)
+    linha.pop("HoraFinal", None)  # Consulta nova é sempre 'Ativo'
+    ag = validar_linha_agendamento(linha, repo)
+    if not repo.profissionais.por_id(ag["ProfissionalID"])["Ativo"]:
+        raise ValueError(f"profissional desativado: {ag['Medico']!r}")
+    if datetime.strptime(ag["DataConsulta"], "%d/%m/%Y").date() < datetime.now().date():
+        raise ValueError("não é possível agendar em uma data passada")
+    return ag
+
+def registrar_agendamento(repo, linha, encaixe=False):
+    """Valida e marca uma consulta. Com encaixe=True aceita conflito de horário."""
+    ag = validar_novo_agendamento(repo, linha)
+    conflitos = verificar_conflitos(repo, ag["ProfissionalID"], ag["DataConsulta"], ag["HorarioInicio"])
+    if conflitos and not encaixe:
+        ids = ", ".join(str(c["ID"]) for c in conflitos)
+        raise Conflito(f"conflito de horário com o(s) agendamento(s) {ids} (use encaixe para marcar mesmo assim)")
+    return repo.inserir_agendamento(ag)
+
+def _descrever_conflitos(conflitos_por_data):
+    return "; ".join(f"{data}: agendamento(s) {', '.join(str(ag['ID']) for ag in conflitos)}"
+                     for data, conflitos in conflitos_por_data.items())
+
+# NOVO: Série recorrente: todas as datas verificadas juntas e inseridas de uma vez
+def registrar_serie(repo, linha, intervalo_dias, vezes=None, ate=None, encaixe=False, pular_conflitos=False):
+    """Marca a mesma consulta a cada 'intervalo_dias' dias. Retorna os agendamentos da série.
+
+    Datas com conflito: erro (padrão), ficam de fora (pular_conflitos=True)
+    ou entram assim mesmo (encaixe=True).
+    """
+    modelo = validar_novo_agendamento(repo, linha)
+    datas = datas_recorrentes(modelo["DataConsulta"], intervalo_dias, vezes, ate)
+    conflitos = verificar_conflitos_serie(repo, modelo["ProfissionalID"], datas, modelo["HorarioInicio"])
+    if conflitos and pular_conflitos:
+        datas = [data for data in datas if data not in conflitos]
+    elif conflitos and not encaixe:
+        raise Conflito(f"conflito de horário em {_descrever_conflitos(conflitos)} "
+                       "(use encaixe para marcar mesmo assim ou pule as datas ocupadas)")
+    if not datas:
+        raise Conflito("todas as datas da série estão ocupadas")
+    return inserir_serie(repo, modelo, datas)
+
+def cancelar_serie(repo, id_agendamento):
+    """Cancela o agendamento e as consultas 'Ativo' seguintes da mesma série."""
+    ag = repo.agendamento_por_id.get(id_agendamento)
+    if ag is None:
+        raise NaoEncontrado(f"agendamento não encontrado: {id_agendamento}")
+    cancelados = ocorrencias_seguintes(repo, ag)
+    for alvo in cancelados:
+        repo.atualizar_agendamento(alvo, {"Status": "Cancelado", "HoraFinal": "N/A"})
+    return cancelados
+
+def remarcar_agendamento(repo, id_agendamento, data, horario, serie=False, encaixe=False):
+    """Muda data e horário de uma consulta 'Ativo'. Retorna os agendamentos remarcados.
+
+    Com serie=True as consultas 'Ativo' seguintes da série andam o mesmo
+    número de dias e vão para o mesmo horário.
+    """
+    ag = repo.agendamento_por_id.get(id_agendamento)
+    if ag is None:
+        raise NaoEncontrado(f"agendamento não encontrado: {id_agendamento}")
+    if ag.get("Status") != "Ativo":
+        raise ValueError("só consultas com status 'Ativo' podem ser remarcadas")
+    data, horario = validar_data(data or ""), validar_horario(horario or "")
+    if not data or not horario:
+        raise ValueError("informe a nova data (DD/MM/AAAA) e o novo horário (HH:MM)")
+    nova_data = datetime.strptime(data, "%d/%m/%Y").date()
+    if nova_data < datetime.now().date():
+        raise ValueError("não é possível remarcar para uma data passada")
+
+    alvos = ocorrencias_seguintes(repo, ag) if serie else [ag]
+    deslocamento = nova_data - datetime.strptime(ag["DataConsulta"], "%d/%m/%Y").date()
+    novas_datas = [(datetime.strptime(alvo["DataConsulta"], "%d/%m/%Y").date() + deslocamento).strftime("%d/%m/%Y")
+                   for alvo in alvos]
+    if not encaixe and ag.get("ProfissionalID") is not None:
+        conflitos = verificar_conflitos_serie(repo, ag["ProfissionalID"], novas_datas, horario,
+                                              ignorar_ids={alvo["ID"] for alvo in alvos})
+        if conflitos:
+            raise Conflito(f"conflito de horário em {_descrever_conflitos(conflitos)} "
+                           "(use encaixe para remarcar mesmo assim)")
+    for alvo, nova in zip(alvos, novas_datas):
+        repo.atualizar_agendamento(alvo, {"DataConsulta": nova, "HorarioInicio": horario})
+    return alvos
+
+def mudar_status_agendamento(repo, id_agendamento, status, hora_final=None, encaixe=False):
+    """Altera o status (hora final obrigatória para 'Atendimento Realizado')."""
+    ag = repo.agendamento_por_id.get(id_agendamento)
+    if ag is None:
+        raise NaoEncontrado(f"agendamento não encontrado: {id_agendamento}")
+    if status not in ("Ativo", "Cancelado", "Atendimento Realizado"):
+        raise ValueError(f"status inválido: {status!r}")
+
+    if status == "Atendimento Realizado":
+        hora_final = validar_horario(hora_final or "")
+        if not hora_final:
+            raise ValueError("a hora final (HH:MM) é obrigatória para 'Atendimento Realizado'")
+        minutos_inicio = minutos_do_dia(ag["HorarioInicio"])
+        if minutos_inicio is not None and minutos_do_dia(hora_final) <= minutos_inicio:
+            raise ValueError(f"a hora final ({hora_final}) deve ser depois da hora inicial ({ag['HorarioInicio']})")
+    else:
+        hora_final = "N/A"
+        if status == "Ativo" and ag.get("ProfissionalID") is not None and ag["Status"] == "Cancelado" and not encaixe:
+            # Reativar pode chocar com alguém que pegou o horário nesse meio tempo
+            conflitos = verificar_conflitos(repo, ag["ProfissionalID"], ag["DataConsulta"], ag["HorarioInicio"], ignorar_id=ag["ID"])
+            if conflitos:
+                ids = ", ".join(str(c["ID"]) for c in conflitos)
+                raise Conflito(f"conflito de horário com o(s) agendamento(s) {ids} (use encaixe para reativar mesmo assim)")
+
+    repo.atualizar_agendamento(ag, {"Status": status, "HoraFinal": hora_final})
+    return ag
+
+# NOVO: Cadastro de profissionais (grava só o arquivo de profissionais)
+def validar_dias_atendimento(dias):
+    """'0-4', '0,2,4' ou lista de números (0 = segunda ... 6 = domingo) -> lista ordenada."""
+    if isinstance(dias, str):
+        numeros = set()
+        for parte in dias.replace(" ", "").split(","):
+            inicio, _, fim = parte.partition("-")
+            if not inicio.isdigit() or (fim and not fim.isdigit()):
+                raise ValueError(f"dias de atendimento inválidos: {dias!r} (ex: 0-4 ou 0,2,4; 0 = segunda)")
+            numeros.update(range(int(inicio), int(fim or inicio) + 1))
+        dias = numeros
+    dias = sorted(set(dias))
+    if not dias or not all(isinstance(dia, int) and 0 <= dia <= 6 for dia in dias):
+        raise ValueError("dias de atendimento vão de 0 (segunda) a 6 (domingo)")
+    return dias
+
+def _validar_expediente(abertura, fechamento):
+    abertura, fechamento = validar_horario(abertura or ""), validar_horario(fechamento or "")
+    if not abertura or not fechamento:
+        raise ValueError("horários de atendimento inválidos (HH:MM)")
+    if minutos_do_dia(fechamento) <= minutos_do_dia(abertura):
+        raise ValueError(f"o fechamento ({fechamento}) deve ser depois da abertura ({abertura})")
+    return abertura, fechamento
+
+def cadastrar_profissional(cadastro, nome, especializacao, abertura=HORARIO_ABERTURA,
+                           fechamento=HORARIO_FECHAMENTO, dias=DIAS_DE_ATENDIMENTO):
+    """Cadastra um profissional (ID novo). Retorna o registro guardado."""
+    nome, especializacao = " ".join(nome.split()), " ".join(especializacao.split())
+    if not nome or not especializacao:
+        raise ValueError("nome e especialidade são obrigatórios")
+    abertura, fechamento = _validar_expediente(abertura, fechamento)
+    dias = validar_dias_atendimento(dias)
+    with trava_dados():
+        cadastro.recarregar()  # Outro processo pode ter cadastrado alguém (o ID é o próximo livre)
+        # Mesma especialidade escrita de outro jeito ('cardiologista') fica com a grafia já usada
+        existentes = cadastro.da_especialidade(especializacao)
+        if existentes:
+            especializacao = existentes[0]["Especializacao"]
+        profissional = cadastro.adicionar(nome, especializacao, abertura, fechamento, dias)
+        cadastro.gravar()
+    return profissional
+
+def alterar_profissional(cadastro, id_profissional, campos):
+    """Altera horário de abertura/fechamento, dias de atendimento ou 'Ativo'."""
+    with trava_dados():
+        cadastro.recarregar()
+        profissional = cadastro.por_id(id_profissional)
+        if profissional is None:
+            raise NaoEncontrado(f"profissional não encontrado: {id_profissional}")
+        campos = dict(campos)
+        if "HorarioAbertura" in campos or "HorarioFechamento" in campos:
+            campos["HorarioAbertura"], campos["HorarioFechamento"] = _validar_expediente(
+                campos.get("HorarioAbertura", profissional["HorarioAbertura"]),
+                campos.get("HorarioFechamento", profissional["HorarioFechamento"]),
+            )
+        if "DiasDeAtendimento" in campos:
+            campos["DiasDeAtendimento"] = validar_dias_atendimento(campos["DiasDeAtendimento"])
+        cadastro.atualizar(profissional, campos)
+        cadastro.gravar()
+    return profissional
+
+def formatar_dias_atendimento(dias):
+    """[0, 1, 2, 3, 4] -> 'seg a sex'; [0, 2, 4] -> 'seg, qua, sex'."""
+    if len(dias) > 2 and dias == list(range(dias[0], dias[-1] + 1)):
+        return f"{DIAS_SEMANA[dias[0]]} a {DIAS_SEMANA[dias[-1]]}"
+    return ", ".join(DIAS_SEMANA[dia] for dia in dias)
+
+def filtrar_agendamentos(leitura, status=None, cpf=None, de=None, ate=None, medico=None, especializacao=None):
+    """Agendamentos em ordem de data e hora, por CPF, período ou status (pelo índice certo)."""
+    inicio = fim = None
+    if de or ate:
+        inicio, fim = para_timestamp(de or ""), para_timestamp(ate or "")
+        if inicio is None or fim is None:
+            raise ValueError("informe a data inicial e a final no formato DD/MM/AAAA")
+
+    # Escolhe o índice mais seletivo; os filtros que ele já aplica são zerados
+    if cpf:
+        agendamentos = sorted(leitura.agendamentos_do_cpf(cpf, historico=True), key=get_sort_key_agendamento)
+    elif inicio is not None:
+        agendamentos = leitura.agendamentos_entre(de, ate, medico, especializacao)
+        inicio = medico = especializacao = None
+    elif status and (medico or especializacao):
+        # ALTERADO: Pela linha do tempo do médico/especialidade, não varrendo o status inteiro
+        agendamentos = leitura.agendamentos_do_profissional(medico, especializacao, status)
+        status = medico = especializacao = None
+    elif status:
+        agendamentos = leitura.agendamentos_ordenados_por_status(status)
+        status = None
+    else:
+        raise ValueError("informe o status, o CPF ou o período")
+
+    if status or medico or especializacao or inicio is not None:
+        chave = especializacao and chave_especialidade(especializacao)
+        agendamentos = [
+            ag for ag in agendamentos
+            if (not status or ag.get("Status") == status)
+            and (not medico or ag.get("Medico") == medico)
+            and (not chave or chave_especialidade(ag["Especializacao"]) == chave)
+            and (inicio is None or inicio <= get_sort_key_agendamento(ag) < fim + 86400)
+        ]
+    return agendamentos
+
+def com_nomes_atuais(leitura, agendamentos):
+    """Agendamentos com o nome atual do cadastro (cópia só dos que mudaram de nome).
+
+    Mesma regra do RepositorioClinica.nome_exibido, para qualquer fonte de
+    leitura (no SQLite, um paciente é lido uma vez por CPF, não por agendamento).
+    """
+    nomes = {}  # CPF -> nome no cadastro (ou None)
+    for ag in agendamentos:
+        if ag.get("PacienteCadastrado") and ag.get("Status") == "Ativo":
+            cpf = ag.get("CPF")
+            if cpf not in nomes:
+                paciente = leitura.buscar_paciente(cpf)
+                nomes[cpf] = paciente.get("NomeCompleto") if paciente else None
+            if nomes[cpf] is not None and nomes[cpf] != ag.get("NomeCompleto"):
+                ag = {**ag, "NomeCompleto": nomes[cpf]}
+        yield ag
+
+def consultas_realizadas_do_cpf(leitura, cpf):
+    """Atendimentos realizados de um CPF, em ordem de data e hora."""
+    if not validar_cpf(cpf):
+        raise ValueError("CPF deve conter exatamente 11 números")
+    consultas = [ag for ag in leitura.agendamentos_do_cpf(cpf, historico=True) if ag.get("Status") == "Atendimento Realizado"]
+    return sorted(consultas, key=get_sort_key_agendamento)
+
+
+# --- Linha de comando (NOVO) ---
+
+# Para integrações e cron, prefira 'python -m projeto_cac ...': o módulo usa o
+# bytecode já compilado, e um 'paciente get' no SQLite responde em ~60 ms.
+
+def abrir_repositorio(arquivar=True):
+    """Carrega os dados e monta o repositório (para comandos que alteram algo).
+
+    ALTERADO: Com arquivar=False (comandos só de leitura) não move nada para o
+    arquivo morto: uma consulta nunca regrava o ARQUIVO_DADOS.
+    """
+    repo = montar_repositorio(carregar_dados(), abrir_arquivo_historico())
+    if arquivar:
+        arquivar_historico(repo)
+    return repo
+
+def montar_repositorio(dados, arquivo):
+    return RepositorioClinica(dados["pacientes"], dados["agendamentos"], dados.get("geracao", 0),
+                              arquivo, abrir_cadastro_profissionais(caminho_profissionais()),
+                              dados.get("removidos"))
+
+# NOVO: Comandos só de leitura não precisam montar os índices de tudo. No
+# SQLite a busca vai direto no banco (um 'paciente get' lê uma única linha).
+def abrir_leitura():
+    """Fonte de dados para consultas: o banco SQLite (sob demanda) ou o repositório."""
+    if USAR_SQLITE:
+        import armazenamento_sqlite
+        return armazenamento_sqlite.ConsultaSQLite(conexao_sqlite())
+    return abrir_repositorio(arquivar=False)
+
+def escrever_json(registro):
+    """Uma linha JSON por registro na saída (fácil de ler por outros programas)."""
+    sys.stdout.write(json.dumps(registro, ensure_ascii=False, default=dict) + "\n")
+
+def comando_json(funcao):
+    """Subcomando com saída JSON: erros de validação viram {"erro": ...} e código 1."""
+    def executar(args):
+        try:
+            # NOVO: Medido como 'cli.<comando>' (ex: cli.agendamento_add)
+            with medir("cli." + funcao.__name__.removeprefix("comando_")):
+                funcao(args)
+        except ValueError as erro:
+            escrever_json({"erro": str(erro)})
+            return 1
+        return 0
+    return executar
+
+def comando_importar(args):
+    """python projeto_cac.py importar {pacientes|agendamentos} ARQUIVO"""
+    repo = abrir_repositorio()
+    importados, rejeitados = importar_arquivo(repo, args.arquivo, args.tipo)
+    if importados:
+        persistir_alteracoes(repo)  # Um único save no final
+    print(f"✅ {importados} {args.tipo} importado(s).")
+    if rejeitados:
+        print(f"❌ {rejeitados} linha(s) rejeitada(s): veja {args.arquivo}.rejeitados.jsonl")
+
+# Opção da linha de comando -> campo do paciente
+OPCOES_PACIENTE = {
+    "nome": "NomeCompleto",
+    "nascimento": "Data de Nascimento",
+    "estado": "Estado",
+    "cidade": "Cidade",
+    "endereco": "Endereço",
+    "ddd": "DDD",
+    "celular": "Telefone",
+}
+
+@comando_json
+def comando_paciente_add(args):
+    repo = abrir_repositorio()
+    linha = {campo: getattr(args, opcao) for opcao, campo in OPCOES_PACIENTE.items()}
+    linha["CPF"] = args.cpf
+    paciente = registrar_paciente(repo, linha)
+    persistir_alteracoes(repo)
+    escrever_json(paciente)
+
+@comando_json
+def comando_paciente_get(args):
+    if USAR_SQLITE:
+        paciente = abrir_leitura().buscar_paciente(args.cpf)
+    else:
+        # No JSON o arquivo é lido de qualquer jeito; só não monta os índices
+        paciente = buscar_paciente_por_cpf(args.cpf, carregar_dados()["pacientes"])
+    if not paciente:
+        raise NaoEncontrado(f"paciente não cadastrado: {args.cpf}")
+    escrever_json(paciente)
+
+@comando_json
+def comando_paciente_edit(args):
+    repo = abrir_repositorio()
+    campos = {campo: getattr(args, opcao) for opcao, campo in OPCOES_PACIENTE.items() if getattr(args, opcao) is not None}
+    paciente = alterar_paciente(repo, args.cpf, campos)
+    persistir_alteracoes(repo)
+    escrever_json(paciente)
+
+@comando_json
+def comando_paciente_delete(args):
+    repo = abrir_repositorio()
+    paciente = remover_paciente_cpf(repo, args.cpf)
+    persistir_alteracoes(repo)
+    escrever_json(paciente)
+
+@comando_json
+def comando_agendamento_add(args):
+    repo = abrir_repositorio()
+    linha = {
+        "NomeCompleto": args.nome or "", "CPF": args.cpf, "DataConsulta": args.data,
+        "HorarioInicio": args.horario, "Medico": args.medico,
+    }
+    if args.repetir:
+        intervalo = next(dias for nome, dias in INTERVALOS_SERIE.values() if nome == args.repetir)
+        inseridos = registrar_serie(repo, linha, intervalo, args.vezes, args.ate,
+                                    encaixe=args.encaixe, pular_conflitos=args.pular_conflitos)
+    else:
+        inseridos = [registrar_agendamento(repo, linha, encaixe=args.encaixe)]
+    persistir_alteracoes(repo)  # Uma gravação só, mesmo para a série inteira
+    for ag in inseridos:
+        escrever_json(ag)
+
+@comando_json
+def comando_agendamento_list(args):
+    leitura = abrir_leitura()
+    agendamentos = filtrar_agendamentos(leitura, args.status, args.cpf, args.de, args.ate, args.medico, args.especializacao)
+    sys.stdout.writelines(json.dumps(ag, ensure_ascii=False, default=dict) + "\n"
+                          for ag in com_nomes_atuais(leitura, agendamentos))
+
+@comando_json
+def comando_agendamento_status(args):
+    repo = abrir_repositorio()
+    if args.serie:
+        if args.status != "Cancelado":
+            raise ValueError("--serie só vale para 'Cancelado' (para mudar data e horário use 'remarcar')")
+        alterados = cancelar_serie(repo, args.id)
+    else:
+        alterados = [mudar_status_agendamento(repo, args.id, args.status, args.hora_final, encaixe=args.encaixe)]
+    persistir_alteracoes(repo)
+    for ag in alterados:
+        escrever_json(ag)
+
+@comando_json
+def comando_agendamento_remarcar(args):
+    repo = abrir_repositorio()
+    remarcados = remarcar_agendamento(repo, args.id, args.data, args.horario, args.serie, args.encaixe)
+    persistir_alteracoes(repo)
+    for ag in remarcados:
+        escrever_json(ag)
+
+@comando_json
+def comando_consultas_realizadas(args):
+    for ag in consultas_realizadas_do_cpf(abrir_leitura(), args.cpf):
+        escrever_json(ag)
+
+@comando_json
+def comando_profissional_list(args):
+    for profissional in abrir_cadastro_profissionais(caminho_profissionais()):
+        if profissional["Ativo"] or args.todos:
+            escrever_json(profissional)
+
+@comando_json
+def comando_profissional_add(args):
+    escrever_json(cadastrar_profissional(
+        abrir_cadastro_profissionais(caminho_profissionais()), args.nome, args.especializacao,
+        args.abertura, args.fechamento, args.dias,
+    ))
+
+@comando_json
+def comando_profissional_edit(args):
+    campos = {campo: getattr(args, opcao) for opcao, campo in OPCOES_PROFISSIONAL.items()
+              if getattr(args, opcao) is not None}
+    if args.ativo is not None:
+        campos["Ativo"] = args.ativo == "sim"
+    escrever_json(alterar_profissional(abrir_cadastro_profissionais(caminho_profissionais()), args.id, campos))
+
+@comando_json
+def comando_relatorio(args):
+    escrever_json(relatorio_operacional(abrir_repositorio(arquivar=False), args.de, args.ate))
+
+# NOVO: Para rodar de tempos em tempos (ex: cron), com ou sem USAR_LEMBRETES
+@comando_json
+def comando_lembretes(args):
+    agora = None
+    if args.agora:
+        data, _, hora = args.agora.partition(" ")
+        agora = para_timestamp(data, hora or "00:00")
+        if agora is None:
+            raise ValueError("--agora deve ser DD/MM/AAAA HH:MM")
+    for mensagem in enviar_lembretes(abrir_repositorio(), agora):
+        escrever_json(mensagem)
+
+# NOVO: JSON para outros programas (o ARQUIVO_DADOS pode estar no formato binário)
+def comando_exportar_json(args):
+    """python projeto_cac.py exportar-json DESTINO"""
+    dados = carregar_dados()
+    destino = Path(args.destino)
+    temporario = destino.with_name(destino.name + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"geracao": dados.get("geracao", 0), "versao": VERSAO_DADOS,
+                   "pacientes": dados["pacientes"], "agendamentos": dados["agendamentos"],
+                   "removidos": dados["removidos"]},
+                  f, indent=4, ensure_ascii=False, default=dict)
+    os.replace(temporario, destino)
+    print(f"✅ {len(dados['pacientes'])} paciente(s) e {len(dados['agendamentos'])} "
+          f"agendamento(s) exportados para {destino}.")
+
+def comando_importar_json(args):
+    """python projeto_cac.py importar-json ORIGEM (substitui todos os dados)"""
+    try:
+        dados = ler_snapshot(Path(args.origem))  # Qualquer versão (migra na memória)
+    except (OSError, ValueError) as erro:
+        print(f"❌ Não foi possível ler {args.origem}: {erro}")
+        return 1
+    if USAR_SQLITE:
+        preparar_sqlite()
+    with trava_dados():
+        if USAR_SQLITE:
+            import armazenamento_sqlite
+            atuais = armazenamento_sqlite.carregar_tudo(conexao_sqlite())
+        else:
+            atuais = ler_dados_json()
+        # NOVO: Para as réplicas, tudo foi alterado nesta geração, e os CPFs que
+        # não vieram no arquivo foram excluídos
+        geracao = atuais["geracao"] + 1
+        for registro in dados["pacientes"] + dados["agendamentos"]:
+            registro["Seq"] = geracao
+        cpfs = {p["CPF"] for p in dados["pacientes"]}
+        dados["removidos"] = {cpf: seq for cpf, seq in atuais["removidos"].items() if cpf not in cpfs}
+        dados["removidos"].update((p["CPF"], geracao) for p in atuais["pacientes"] if p["CPF"] not in cpfs)
+        if USAR_SQLITE:
+            dados["geracao"] = atuais["geracao"]  # O migrar grava a seguinte
+            armazenamento_sqlite.migrar(conexao_sqlite(), dados, VERSAO_DADOS)
+        else:
+            # Geração nova: outro processo com o menu aberto relê tudo na próxima gravação
+            compactar_journal(dados["pacientes"], dados["agendamentos"], geracao, dados["removidos"])
+    print(f"✅ {len(dados['pacientes'])} paciente(s) e {len(dados['agendamentos'])} "
+          f"agendamento(s) importados de {args.origem}.")
+
+# NOVO: Réplicas (ver "Réplicas (exportação incremental)")
+def comando_exportar_alteracoes(args):
+    """python projeto_cac.py exportar-alteracoes [--desde N] [--saida ARQUIVO]"""
+    try:
+        if args.saida is None:
+            saida = sys.stdout  # JSON-lines direto na saída; os avisos (ex: migração) vão para a de erros
+            with contextlib.redirect_stdout(sys.stderr):
+                exportar_alteracoes(saida, args.desde)
+            return 0
+        destino = Path(args.saida)
+        temporario = destino.with_name(destino.name + ".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            totais = exportar_alteracoes(f, args.desde)
+        os.replace(temporario, destino)
+    except ValueError as erro:
+        print(f"❌ {erro}", file=sys.stderr)
+        return 1
+    print(f"✅ {totais['pacientes']} paciente(s), {totais['agendamentos']} agendamento(s) e "
+          f"{totais['removidos']} exclusão(ões) desde a geração {args.desde} exportados para {destino}.")
+
+def comando_aplicar_alteracoes(args):
+    """python projeto_cac.py aplicar-alteracoes ORIGEM (na réplica)"""
+    try:
+        with open(args.origem, "r", encoding="utf-8") as f:
+            cabecalho, totais = aplicar_alteracoes_replica(f)
+    except (OSError, ValueError) as erro:
+        print(f"❌ Não foi possível aplicar {args.origem}: {erro}")
+        return 1
+    print(f"✅ {totais['pacientes']} paciente(s), {totais['agendamentos']} agendamento(s) e "
+          f"{totais['removidos']} exclusão(ões) aplicados. Próxima exportação: --desde {cabecalho['ate']}")
+
+OPCOES_PROFISSIONAL = {
+    "abertura": "HorarioAbertura",
+    "fechamento": "HorarioFechamento",
+    "dias": "DiasDeAtendimento",
+}
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description=f"{NOME_CLINICA} - sem argumentos abre o menu interativo."
+    )
+    comandos = parser.add_subparsers(dest="comando")
+
+    importar = comandos.add_parser("importar", help="Importa pacientes/agendamentos de CSV ou JSON-lines")
+    importar.add_argument("tipo", choices=["pacientes", "agendamentos"])
+    importar.add_argument("arquivo")
+    importar.set_defaults(executar=comando_importar)
+
+    # NOVO: Comandos para integrações e scripts (saída em JSON-lines, sem perguntas)
+    paciente = comandos.add_parser("paciente", help="Cadastro de pacientes (saída JSON)")
+    acoes = paciente.add_subparsers(dest="acao", required=True)
+
+    add = acoes.add_parser("add", help="Cadastra um paciente")
+    add.add_argument("--cpf", required=True)
+    add.add_argument("--nome", required=True)
+    add.add_argument("--nascimento", required=True, help="DD/MM/AAAA")
+    add.add_argument("--estado", required=True, help="sigla, ex: PR")
+    add.add_argument("--cidade", required=True)
+    add.add_argument("--endereco", required=True)
+    add.add_argument("--ddd", required=True)
+    add.add_argument("--celular", required=True, help="9 dígitos começando com 9")
+    add.set_defaults(executar=comando_paciente_add)
+
+    get = acoes.add_parser("get", help="Mostra um paciente pelo CPF")
+    get.add_argument("cpf")
+    get.set_defaults(executar=comando_paciente_get)
+
+    edit = acoes.add_parser("edit", help="Altera só os campos informados")
+    edit.add_argument("cpf")
+    for opcao in OPCOES_PACIENTE:
+        edit.add_argument(f"--{opcao}")
+    edit.set_defaults(executar=comando_paciente_edit)
+
+    delete = acoes.add_parser("delete", help="Exclui o registro (os agendamentos ficam no histórico)")
+    delete.add_argument("cpf")
+    delete.set_defaults(executar=comando_paciente_delete)
+
+    agendamento = comandos.add_parser("agendamento", help="Agendamentos (saída JSON)")
+    acoes = agendamento.add_subparsers(dest="acao", required=True)
+
+    add = acoes.add_parser("add", help="Marca uma consulta")
+    add.add_argument("--cpf", required=True)
+    add.add_argument("--data", required=True, help="DD/MM/AAAA")
+    add.add_argument("--horario", required=True, help="HH:MM")
+    add.add_argument("--medico", required=True, help="nome ou ID do profissional (veja 'profissional list')")
+    add.add_argument("--nome", help="nome do paciente, se o CPF não for cadastrado")
+    add.add_argument("--encaixe", action="store_true", help="marca mesmo se houver conflito de horário")
+    add.add_argument("--repetir", choices=[nome for nome, _ in INTERVALOS_SERIE.values()],
+                     help="marca uma série recorrente a partir de --data")
+    add.add_argument("--vezes", type=int, help=f"consultas na série (no máximo {MAXIMO_CONSULTAS_SERIE})")
+    add.add_argument("--ate", help="data final da série DD/MM/AAAA")
+    add.add_argument("--pular-conflitos", action="store_true", help="deixa de fora as datas já ocupadas da série")
+    add.set_defaults(executar=comando_agendamento_add)
+
+    listar = acoes.add_parser("list", help="Lista por status, CPF ou período (ordem de data e hora)")
+    listar.add_argument("--status", choices=["Ativo", "Cancelado", "Atendimento Realizado"])
+    listar.add_argument("--cpf")
+    listar.add_argument("--de", help="data inicial DD/MM/AAAA")
+    listar.add_argument("--ate", help="data final DD/MM/AAAA")
+    listar.add_argument("--medico")
+    listar.add_argument("--especializacao", help="ex: Cardiologista (sem diferenciar acento e maiúsculas)")
+    listar.set_defaults(executar=comando_agendamento_list)
+
+    status = acoes.add_parser("status", help="Altera o status de um agendamento")
+    status.add_argument("id", type=int)
+    status.add_argument("status", choices=["Ativo", "Cancelado", "Atendimento Realizado"])
+    status.add_argument("--hora-final", help="HH:MM (obrigatória para 'Atendimento Realizado')")
+    status.add_argument("--encaixe", action="store_true", help="reativa mesmo se houver conflito de horário")
+    status.add_argument("--serie", action="store_true", help="cancela também as consultas seguintes da série")
+    status.set_defaults(executar=comando_agendamento_status)
+
+    remarcar = acoes.add_parser("remarcar", help="Muda data e horário de uma consulta 'Ativo'")
+    remarcar.add_argument("id", type=int)
+    remarcar.add_argument("--data", required=True, help="DD/MM/AAAA")
+    remarcar.add_argument("--horario", required=True, help="HH:MM")
+    remarcar.add_argument("--serie", action="store_true", help="leva junto as consultas seguintes da série")
+    remarcar.add_argument("--encaixe", action="store_true", help="remarca mesmo se houver conflito de horário")
+    remarcar.set_defaults(executar=comando_agendamento_remarcar)
+
+    profissional = comandos.add_parser("profissional", help="Cadastro de profissionais (saída JSON)")
+    acoes = profissional.add_subparsers(dest="acao", required=True)
+
+    listar = acoes.add_parser("list", help="Lista os profissionais ativos")
+    listar.add_argument("--todos", action="store_true", help="inclui os desativados")
+    listar.set_defaults(executar=comando_profissional_list)
+
+    add = acoes.add_parser("add", help="Cadastra um profissional")
+    add.add_argument("--nome", required=True)
+    add.add_argument("--especializacao", required=True)
+    add.add_argument("--abertura", default=HORARIO_ABERTURA, help=f"HH:MM (padrão: {HORARIO_ABERTURA})")
+    add.add_argument("--fechamento", default=HORARIO_FECHAMENTO, help=f"HH:MM (padrão: {HORARIO_FECHAMENTO})")
+    add.add_argument("--dias", default="0-4", help="0 = segunda ... 6 = domingo, ex: 0-4 ou 0,2,4 (padrão: 0-4)")
+    add.set_defaults(executar=comando_profissional_add)
+
+    edit = acoes.add_parser("edit", help="Altera horário, dias de atendimento ou situação")
+    edit.add_argument("id", type=int)
+    for opcao in OPCOES_PROFISSIONAL:
+        edit.add_argument(f"--{opcao}")
+    edit.add_argument("--ativo", choices=["sim", "nao"])
+    edit.set_defaults(executar=comando_profissional_edit)
+
+    consultas = comandos.add_parser("consultas", help="Consultas (saída JSON)")
+    acoes = consultas.add_subparsers(dest="acao", required=True)
+    realizadas = acoes.add_parser("realizadas", help="Atendimentos realizados de um CPF")
+    realizadas.add_argument("--cpf", required=True)
+    realizadas.set_defaults(executar=comando_consultas_realizadas)
+
+    relatorio = comandos.add_parser("relatorio", help="Ocupação, cancelamentos e duração das consultas (saída JSON)")
+    relatorio.add_argument("--de", help="data inicial DD/MM/AAAA (padrão: início dos dados)")
+    relatorio.add_argument("--ate", help="data final DD/MM/AAAA (padrão: fim dos dados)")
+    relatorio.set_defaults(executar=comando_relatorio)
+
+    lembretes = comandos.add_parser("lembretes", help="Envia os lembretes de consulta vencidos (saída JSON)")
+    lembretes.add_argument("--agora", help="DD/MM/AAAA HH:MM (padrão: agora)")
+    lembretes.set_defaults(executar=comando_lembretes)
+
+    exportar_json = comandos.add_parser("exportar-json", help="Grava todos os dados num arquivo JSON (indent=4)")
+    exportar_json.add_argument("destino")
+    exportar_json.set_defaults(executar=comando_exportar_json)
+
+    importar_json = comandos.add_parser("importar-json",
+                                        help="Substitui todos os dados pelos de um arquivo JSON (ou snapshot binário)")
+    importar_json.add_argument("origem")
+    importar_json.set_defaults(executar=comando_importar_json)
+
+    exportacao = comandos.add_parser(
+        "exportar-alteracoes", help="Alterações e exclusões depois de uma geração, para uma réplica (JSON-lines)")
+    exportacao.add_argument("--desde", type=int, default=0, help="geração que a réplica já tem (padrão: 0, tudo)")
+    exportacao.add_argument("--saida", help="arquivo de destino (padrão: a saída do programa)")
+    exportacao.set_defaults(executar=comando_exportar_alteracoes)
+
+    aplicacao = comandos.add_parser("aplicar-alteracoes", help="Aplica nesta réplica um arquivo do exportar-alteracoes")
+    aplicacao.add_argument("origem")
+    aplicacao.set_defaults(executar=comando_aplicar_alteracoes)
+    return parser
 
 # Verifica se o script está sendo executado diretamente
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        args = criar_parser().parse_args()
+        codigo = args.executar(args)
+        exportar_metricas()  # NOVO: Só com USAR_METRICAS e ARQUIVO_METRICAS
+        sys.exit(codigo)
+    else:
+        main()
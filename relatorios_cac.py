@@ -0,0 +1,261 @@
+from array import array
+from bisect import bisect_right
+from datetime import date
+
+try:
+    import numpy as np  # Opcional (pip install numpy): agrega em C, sem laço em Python
+except ImportError:
+    np = None
+
+# NOVO: Relatórios da clínica para o projeto_cac.py: ocupação por
+# profissional, taxa de cancelamento, duração das consultas e agendamentos
+# por dia e por especialidade.
+#
+# Os agendamentos viram colunas (array.array de números: dia, minuto, duração,
+# profissional, especialidade, status), montadas uma vez e atualizadas a cada
+# alteração. Com NumPy as colunas são lidas sem cópia (np.frombuffer) e cada
+# agregação é um bincount/unique; sem NumPy, uma única passada em Python.
+
+STATUS = ("Ativo", "Atendimento Realizado", "Cancelado", "Outro")
+ATIVO, REALIZADO, CANCELADO, OUTRO = range(len(STATUS))
+_CODIGO_STATUS = {nome: codigo for codigo, nome in enumerate(STATUS)}
+
+DIA_INVALIDO = -(2 ** 31)  # Data ilegível: fica fora de todos os relatórios
+SEM_DURACAO = -1
+FAIXAS_DURACAO = (15, 30, 45, 60)  # minutos: até 15, 16-30, 31-45, 46-60, mais de 60
+SEM_PROFISSIONAL = "(sem profissional)"
+SEM_ESPECIALIDADE = "(sem especialidade)"
+
+
+class ColunasAgendamentos:
+    """Visão em colunas dos agendamentos (uma linha por agendamento)."""
+
+    def __init__(self):
+        self.dia = array("l")           # dias desde 01/01/1970
+        self.minuto = array("h")        # minuto do dia do início
+        self.duracao = array("h")       # HoraFinal - HorarioInicio em minutos (ou SEM_DURACAO)
+        self.profissional = array("h")  # código em self.profissionais
+        self.especialidade = array("h") # código em self.especialidades
+        self.status = array("b")        # código em STATUS
+        self.profissionais = []
+        self.especialidades = []
+        self._codigos = ({}, {})
+        self.linha_por_id = {}
+
+    def __len__(self):
+        return len(self.dia)
+
+    def _codigo(self, qual, nome):
+        codigos, nomes = self._codigos[qual], (self.profissionais, self.especialidades)[qual]
+        if nome not in codigos:
+            codigos[nome] = len(nomes)
+            nomes.append(nome)
+        return codigos[nome]
+
+    def _valores(self, ag):
+        inicio, fim = ag.get("InicioTS"), ag.get("FimTS")
+        if inicio is None or inicio < 0:
+            return DIA_INVALIDO, 0, SEM_DURACAO, 0, 0, OUTRO
+        duracao = (fim - inicio) // 60 if fim is not None and fim > inicio else SEM_DURACAO
+        return (
+            inicio // 86400, inicio % 86400 // 60, min(duracao, 32767),
+            self._codigo(0, ag.get("Medico") or SEM_PROFISSIONAL),
+            self._codigo(1, ag.get("Especializacao") or SEM_ESPECIALIDADE),
+            _CODIGO_STATUS.get(ag.get("Status"), OUTRO),
+        )
+
+    def adicionar(self, ag):
+        self.linha_por_id[ag["ID"]] = len(self.dia)
+        for coluna, valor in zip(self._colunas(), self._valores(ag)):
+            coluna.append(valor)
+
+    def atualizar(self, ag):
+        """Regrava a linha de um agendamento alterado (status, horário...)."""
+        linha = self.linha_por_id.get(ag["ID"])
+        if linha is None:
+            self.adicionar(ag)
+            return
+        for coluna, valor in zip(self._colunas(), self._valores(ag)):
+            coluna[linha] = valor
+
+    def _colunas(self):
+        return self.dia, self.minuto, self.duracao, self.profissional, self.especialidade, self.status
+
+
+def montar_colunas(agendamentos):
+    colunas = ColunasAgendamentos()
+    for ag in agendamentos:
+        colunas.adicionar(ag)
+    return colunas
+
+def juntar_colunas(*partes):
+    """Colunas de várias fontes (ex: arquivo principal + arquivo morto) numa só."""
+    juntas = ColunasAgendamentos()
+    for parte in partes:
+        # Os códigos de profissional/especialidade de cada parte são traduzidos
+        traducao = [array("h", (juntas._codigo(qual, nome) for nome in nomes))
+                    for qual, nomes in enumerate((parte.profissionais, parte.especialidades))]
+        juntas.dia.extend(parte.dia)
+        juntas.minuto.extend(parte.minuto)
+        juntas.duracao.extend(parte.duracao)
+        juntas.profissional.extend(traducao[0][codigo] for codigo in parte.profissional)
+        juntas.especialidade.extend(traducao[1][codigo] for codigo in parte.especialidade)
+        juntas.status.extend(parte.status)
+    return juntas
+
+
+# --- Agregações (mesmo resultado com e sem NumPy) ---
+
+def _visao(coluna):
+    """A coluna como array do NumPy, sem copiar (o tamanho do 'l' muda entre sistemas)."""
+    return np.frombuffer(coluna, dtype=f"i{coluna.itemsize}")
+
+def _agregar_numpy(colunas, primeiro_dia, ultimo_dia, duracao_padrao):
+    dia = _visao(colunas.dia)
+    selecionados = (dia >= primeiro_dia) & (dia <= ultimo_dia)
+    dia = dia[selecionados]
+    status = _visao(colunas.status)[selecionados].astype(np.intp)
+    profissional = _visao(colunas.profissional)[selecionados].astype(np.intp)
+    especialidade = _visao(colunas.especialidade)[selecionados].astype(np.intp)
+    duracao = _visao(colunas.duracao)[selecionados].astype(np.int64)
+
+    total_profissionais = len(colunas.profissionais)
+    por_status = np.bincount(profissional * len(STATUS) + status,
+                             minlength=total_profissionais * len(STATUS)).reshape(total_profissionais, len(STATUS))
+    # Minutos ocupados: duração real das realizadas, a padrão das demais (cancelada não ocupa)
+    realizada = (status == REALIZADO) & (duracao > 0)
+    ocupa = status != CANCELADO
+    minutos = np.bincount(profissional[ocupa], weights=np.where(realizada, duracao, duracao_padrao)[ocupa],
+                          minlength=total_profissionais)
+    dias, por_dia = np.unique(dia, return_counts=True)
+    duracoes = np.sort(duracao[realizada])
+    faixas = np.bincount(np.searchsorted(FAIXAS_DURACAO, duracoes - 1, side="right"), minlength=len(FAIXAS_DURACAO) + 1)
+    return {
+        "por_status": por_status.tolist(),
+        "minutos": minutos.astype(np.int64).tolist(),
+        "duracao": _resumo_duracoes(duracoes, int(duracoes.sum()), faixas.tolist()),
+        "por_dia": dict(zip(dias.tolist(), por_dia.tolist())),
+        "por_especialidade": np.bincount(especialidade, minlength=len(colunas.especialidades)).tolist(),
+    }
+
+def _agregar_python(colunas, primeiro_dia, ultimo_dia, duracao_padrao):
+    por_status = [[0] * len(STATUS) for _ in colunas.profissionais]
+    minutos = [0] * len(colunas.profissionais)
+    por_especialidade = [0] * len(colunas.especialidades)
+    por_dia = {}
+    duracoes = []
+    faixas = [0] * (len(FAIXAS_DURACAO) + 1)
+    for dia, duracao, profissional, especialidade, status in zip(
+            colunas.dia, colunas.duracao, colunas.profissional, colunas.especialidade, colunas.status):
+        if not primeiro_dia <= dia <= ultimo_dia:
+            continue
+        por_status[profissional][status] += 1
+        por_especialidade[especialidade] += 1
+        por_dia[dia] = por_dia.get(dia, 0) + 1
+        if status == REALIZADO and duracao > 0:
+            duracoes.append(duracao)
+            faixas[bisect_right(FAIXAS_DURACAO, duracao - 1)] += 1
+            minutos[profissional] += duracao
+        elif status != CANCELADO:
+            minutos[profissional] += duracao_padrao
+    duracoes.sort()
+    return {"por_status": por_status, "minutos": minutos,
+            "duracao": _resumo_duracoes(duracoes, sum(duracoes), faixas),
+            "por_dia": dict(sorted(por_dia.items())), "por_especialidade": por_especialidade}
+
+def _limites(colunas):
+    """Primeiro e último dia com data válida (0, 0 se não houver nenhum)."""
+    if np is not None:
+        dias = _visao(colunas.dia)
+        dias = dias[dias != DIA_INVALIDO]
+        return (int(dias.min()), int(dias.max())) if dias.size else (0, 0)
+    menor = maior = None
+    for dia in colunas.dia:
+        if dia != DIA_INVALIDO:
+            if menor is None or dia < menor:
+                menor = dia
+            if maior is None or dia > maior:
+                maior = dia
+    return (menor, maior) if menor is not None else (0, 0)
+
+def _percentil(ordenados, fracao):
+    if not len(ordenados):
+        return None
+    return int(ordenados[min(len(ordenados) - 1, round(fracao * (len(ordenados) - 1)))])
+
+def _resumo_duracoes(ordenadas, soma, faixas):
+    nomes = [f"até {FAIXAS_DURACAO[0]}"] + [
+        f"{a + 1}-{b}" for a, b in zip(FAIXAS_DURACAO, FAIXAS_DURACAO[1:])] + [f"mais de {FAIXAS_DURACAO[-1]}"]
+    return {
+        "consultas": len(ordenadas),
+        "media": round(soma / len(ordenadas), 1) if len(ordenadas) else None,
+        "p50": _percentil(ordenadas, 0.5),
+        "p90": _percentil(ordenadas, 0.9),
+        "faixas": dict(zip(nomes, faixas)),
+    }
+
+def _data(dia):
+    return date.fromordinal(date(1970, 1, 1).toordinal() + dia).strftime("%d/%m/%Y")
+
+def _contar_dias(primeiro_dia, ultimo_dia, dias_de_atendimento):
+    # 01/01/1970 foi uma quinta-feira (weekday 3)
+    return sum(1 for dia in range(primeiro_dia, ultimo_dia + 1) if (dia + 3) % 7 in dias_de_atendimento)
+
+def gerar_relatorio(colunas, primeiro_dia=None, ultimo_dia=None, dias_de_atendimento=range(7),
+                    minutos_por_dia=24 * 60, duracao_padrao=30, expedientes=None):
+    """Todos os indicadores do período [primeiro_dia, ultimo_dia] (dias desde 1970; None = tudo).
+
+    A ocupação é o tempo marcado (consultas não canceladas) sobre o expediente
+    do período: dias de atendimento x minutos_por_dia, por profissional.
+    'expedientes' (nome -> (dias de atendimento, minutos por dia)) dá o
+    expediente de cada profissional; quem não está nele usa o da clínica.
+    """
+    if primeiro_dia is None or ultimo_dia is None:
+        menor, maior = _limites(colunas)
+        primeiro_dia = menor if primeiro_dia is None else primeiro_dia
+        ultimo_dia = maior if ultimo_dia is None else ultimo_dia
+
+    agregar = _agregar_numpy if np is not None else _agregar_python
+    brutos = agregar(colunas, primeiro_dia, ultimo_dia, duracao_padrao)
+
+    dias_uteis = _contar_dias(primeiro_dia, ultimo_dia, dias_de_atendimento)
+    expedientes = expedientes or {}
+    dias_por_semana = {}  # Profissionais com os mesmos dias contam o período uma vez só
+
+    profissionais = []
+    for codigo, nome in enumerate(colunas.profissionais):
+        contagem = brutos["por_status"][codigo]
+        total = sum(contagem)
+        if not total:
+            continue
+        if nome in expedientes:
+            dias, minutos = expedientes[nome]
+            dias = frozenset(dias)
+            if dias not in dias_por_semana:
+                dias_por_semana[dias] = _contar_dias(primeiro_dia, ultimo_dia, dias)
+            expediente = dias_por_semana[dias] * minutos
+        else:
+            expediente = dias_uteis * minutos_por_dia
+        profissionais.append({
+            "profissional": nome,
+            "agendamentos": total,
+            "realizados": contagem[REALIZADO],
+            "cancelados": contagem[CANCELADO],
+            "taxa_cancelamento": round(contagem[CANCELADO] / total, 4),
+            "minutos_ocupados": brutos["minutos"][codigo],
+            "ocupacao": round(brutos["minutos"][codigo] / expediente, 4) if expediente else None,
+        })
+
+    por_status = [sum(linha[codigo] for linha in brutos["por_status"]) for codigo in range(len(STATUS))]
+    total = sum(por_status)
+
+    return {
+        "periodo": {"de": _data(primeiro_dia), "ate": _data(ultimo_dia), "dias_de_atendimento": dias_uteis},
+        "agendamentos": total,
+        "por_status": {nome: qtd for nome, qtd in zip(STATUS, por_status) if qtd},
+        "taxa_cancelamento": round(por_status[CANCELADO] / total, 4) if total else None,
+        "profissionais": profissionais,
+        "duracao_minutos": brutos["duracao"],
+        "por_especialidade": {nome: qtd for nome, qtd in zip(colunas.especialidades, brutos["por_especialidade"]) if qtd},
+        "por_dia": {_data(dia): qtd for dia, qtd in brutos["por_dia"].items()},
+    }
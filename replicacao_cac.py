@@ -0,0 +1,102 @@
+import json
+import os
+
+# NOVO: Exportação incremental do projeto_cac.py, para manter uma réplica
+# (ex: a máquina de relatórios) sem copiar o clinica_dados.json inteiro.
+#
+# Cada registro guarda em "Seq" a geração da gravação que o alterou por
+# último, e os CPFs excluídos ficam em "removidos" (CPF -> Seq). As
+# alterações desde a geração N são os registros com Seq > N e as exclusões
+# depois de N, num arquivo JSON-lines:
+#
+#   {"desde": N, "ate": G, "versao": 3}          cabeçalho (G: geração da origem)
+#   {"paciente": {...}}                           paciente novo ou alterado
+#   {"agendamento": {...}}                        agendamento novo ou alterado
+#   {"removido": "12345678901", "Seq": 7}         paciente excluído
+#   {"fim": 3}                                    quantas linhas vieram no meio
+#
+# Um CPF nunca está ao mesmo tempo nos pacientes e nos removidos, então a
+# ordem das linhas não importa. A réplica aplica tudo numa gravação só e
+# guarda G no cursor: a próxima exportação é com --desde G. Um arquivo sem a
+# linha "fim" (cópia interrompida) é recusado inteiro.
+
+
+def _linha(valor):
+    # default=dict: aceita também os registros compactos (Paciente/Agendamento)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=dict) + "\n"
+
+
+def escrever(saida, dados, desde, versao):
+    """Grava em 'saida' (texto) as alterações de 'dados' depois da geração 'desde'.
+
+    'dados' tem o formato do carregar_dados (pode vir já filtrado, como no
+    SQLite). Retorna {"pacientes": qtd, "agendamentos": qtd, "removidos": qtd}.
+    """
+    if desde > dados["geracao"]:
+        raise ValueError(f"--desde {desde} é maior que a geração atual ({dados['geracao']}): "
+                         "os dados foram restaurados de uma cópia? Refaça a réplica com --desde 0")
+    limite = desde if desde > 0 else -1  # 0: tudo, inclusive os registros de antes do Seq (Seq 0)
+    totais = {"pacientes": 0, "agendamentos": 0, "removidos": 0}
+    saida.write(_linha({"desde": desde, "ate": dados["geracao"], "versao": versao}))
+    for paciente in dados["pacientes"]:
+        if paciente["Seq"] > limite:
+            saida.write(_linha({"paciente": paciente}))
+            totais["pacientes"] += 1
+    for ag in dados["agendamentos"]:
+        if ag["Seq"] > limite:
+            saida.write(_linha({"agendamento": ag}))
+            totais["agendamentos"] += 1
+    for cpf, seq in dados["removidos"].items():
+        if seq > limite:
+            saida.write(_linha({"removido": cpf, "Seq": seq}))
+            totais["removidos"] += 1
+    saida.write(_linha({"fim": sum(totais.values())}))
+    return totais
+
+
+def ler(arquivo):
+    """Lê um arquivo de alterações -> (cabeçalho, [alterações no formato do journal])."""
+    cabecalho, alteracoes, fim = None, [], None
+    for numero, linha in enumerate(arquivo, 1):
+        try:
+            item = json.loads(linha)
+        except json.JSONDecodeError:
+            raise ValueError(f"linha {numero} inválida ou incompleta") from None
+        if fim is not None:
+            raise ValueError(f"linha {numero} depois do fim")
+        if cabecalho is None:
+            if not isinstance(item, dict) or not {"desde", "ate", "versao"} <= item.keys():
+                raise ValueError("o arquivo não começa com o cabeçalho das alterações")
+            cabecalho = item
+        elif "paciente" in item:
+            alteracoes.append({"op": "+paciente", "registro": item["paciente"]})
+        elif "agendamento" in item:
+            alteracoes.append({"op": "+agendamento", "registro": item["agendamento"]})
+        elif "removido" in item:
+            alteracoes.append({"op": "-paciente", "cpf": item["removido"]})
+        elif "fim" in item:
+            fim = item["fim"]
+        else:
+            raise ValueError(f"linha {numero} desconhecida")
+    if cabecalho is None:
+        raise ValueError("arquivo vazio")
+    if fim != len(alteracoes):
+        raise ValueError("arquivo incompleto (sem a linha 'fim' ou com linhas faltando)")
+    return cabecalho, alteracoes
+
+
+def ler_cursor(caminho):
+    """Geração da origem que a réplica já tem (None se ela nunca recebeu nada)."""
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)["ate"]
+    except FileNotFoundError:
+        return None
+
+def gravar_cursor(caminho, ate):
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"ate": ate}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import json
+import re
+import signal
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import projeto_cac
+
+# NOVO: Servidor HTTP (asyncio, só biblioteca padrão) para todas as recepções
+# usarem os mesmos dados. Um único processo guarda o repositório na memória:
+# - leituras são respondidas direto da memória, várias ao mesmo tempo;
+# - alterações entram numa fila e um único "escritor" aplica uma por vez,
+#   gravando no disco em lote (várias alterações, um só save);
+# - a resposta de uma alteração só sai depois que ela está no disco.
+#
+# Uso: python servidor_cac.py [--host 127.0.0.1] [--porta 8080]
+#                             [--arquivo clinica_dados.json] [--journal]
+#
+#   GET    /pacientes?pagina=1&tamanho=20      POST  /agendamentos
+#   POST   /pacientes                          GET   /agendamentos?status=|cpf=|de=&ate=[&medico=|especializacao=]
+#   GET    /pacientes/{cpf}                    PATCH /agendamentos/{id}   {"Status", "HoraFinal"}
+#   PATCH  /pacientes/{cpf}                    GET   /horarios-livres?quantidade=5[&especializacao=|medico=]
+#   DELETE /pacientes/{cpf}                    GET   /saude
+#   GET    /pacientes/{cpf}/consultas  (atendimentos realizados)
+#
+# Os corpos usam os mesmos nomes de campo do clinica_dados.json. Erros voltam
+# como {"erro": ...}: 400 (dados inválidos), 404 (não existe), 409 (conflito).
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8080
+TAMANHO_LOTE_ESCRITA = 100       # alterações gravadas juntas, no máximo
+LIMITE_CORPO_BYTES = 1_000_000
+
+MOTIVOS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# --- HTTP/1.1 mínimo (com keep-alive) ---
+
+async def ler_requisicao(leitor):
+    """Lê uma requisição: (método, alvo, cabeçalhos, corpo) ou None se a conexão fechou."""
+    linha = await leitor.readline()
+    if not linha.strip():
+        return None
+    try:
+        metodo, alvo, _versao = linha.decode("latin-1").split()
+    except ValueError:
+        raise ErroHTTP(400, "linha de requisição inválida")
+
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b"\r\n", b"\n", b""):
+            break
+        nome, _, valor = linha.decode("latin-1").partition(":")
+        cabecalhos[nome.strip().lower()] = valor.strip()
+
+    try:
+        tamanho = int(cabecalhos.get("content-length") or 0)
+    except ValueError:
+        raise ErroHTTP(400, "Content-Length inválido")
+    if tamanho > LIMITE_CORPO_BYTES:
+        raise ErroHTTP(413, "corpo da requisição grande demais")
+    corpo = await leitor.readexactly(tamanho) if tamanho else b""
+    return metodo.upper(), alvo, cabecalhos, corpo
+
+def montar_resposta(status, dados, manter_conexao=True):
+    corpo = json.dumps(dados, ensure_ascii=False, default=dict).encode("utf-8")
+    cabecalho = (
+        f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(corpo)}\r\n"
+        f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n\r\n"
+    )
+    return cabecalho.encode("latin-1") + corpo
+
+def paginar(registros, parametros):
+    """Uma página de uma lista (ou VisaoAgendamentos), sem copiar o resto."""
+    try:
+        pagina = max(1, int(parametros.get("pagina", 1)))
+        tamanho = min(max(1, int(parametros.get("tamanho", projeto_cac.TAMANHO_PAGINA))), 1000)
+    except ValueError:
+        raise ErroHTTP(400, "pagina e tamanho devem ser números")
+    inicio = (pagina - 1) * tamanho
+    return {"total": len(registros), "pagina": pagina, "tamanho": tamanho,
+            "registros": registros[inicio:inicio + tamanho]}
+
+
+# --- Servidor ---
+
+class LeituraComArquivados:
+    """O repositório, mas com os agendamentos arquivados de um CPF já lidos (sem abrir partições no laço)."""
+
+    def __init__(self, repo, arquivados):
+        self.repo = repo
+        self.arquivados = arquivados
+
+    def __getattr__(self, nome):
+        return getattr(self.repo, nome)
+
+    def agendamentos_do_cpf(self, cpf, historico=False):
+        agendamentos = self.repo.agendamentos_do_cpf(cpf)
+        if historico:
+            agendamentos += self.repo.sem_duplicados(self.arquivados)
+        return agendamentos
+
+class ServidorClinica:
+    """Dono único dos dados: lê da memória e serializa as alterações numa fila."""
+
+    def __init__(self):
+        self.repo = None
+        self.fila = None
+        # Todo acesso ao disco (carga e gravações) numa única thread: a conexão
+        # SQLite, se usada, fica sempre na mesma thread que a criou
+        self.disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disco")
+        self.rotas = [
+            ("GET", r"/saude", self.saude),
+            ("GET", r"/pacientes", self.listar_pacientes),
+            ("POST", r"/pacientes", self.cadastrar_paciente),
+            ("GET", r"/pacientes/(\d{11})", self.buscar_paciente),
+            ("PATCH", r"/pacientes/(\d{11})", self.editar_paciente),
+            ("DELETE", r"/pacientes/(\d{11})", self.excluir_paciente),
+            ("GET", r"/pacientes/(\d{11})/consultas", self.consultas_realizadas),
+            ("GET", r"/agendamentos", self.listar_agendamentos),
+            ("POST", r"/agendamentos", self.agendar),
+            ("PATCH", r"/agendamentos/(\d+)", self.alterar_status),
+            ("GET", r"/horarios-livres", self.horarios_livres),
+        ]
+        self.rotas = [(metodo, re.compile(padrao + r"/?\Z"), funcao) for metodo, padrao, funcao in self.rotas]
+
+    async def iniciar(self):
+        loop = asyncio.get_running_loop()
+        self.repo = await loop.run_in_executor(self.disco, projeto_cac.abrir_repositorio)
+        # NOVO: Um arquivo morto só da thread do disco: as partições são lidas fora
+        # do laço (o do repositório fica para as leituras que o laço faz)
+        self.arquivo = await loop.run_in_executor(self.disco, projeto_cac.abrir_arquivo_historico)
+        self.fila = asyncio.Queue()
+        self.tarefa_escritor = asyncio.create_task(self.escritor())
+
+    async def encerrar(self):
+        """Espera a fila de escrita esvaziar (tudo que foi aceito vai para o disco)."""
+        await self.alterar(lambda repo: None)
+        self.tarefa_escritor.cancel()
+        self.disco.shutdown(wait=True)
+
+    async def alterar(self, operacao):
+        """Põe uma alteração na fila do escritor e espera ela chegar ao disco."""
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((operacao, futuro))
+        return await futuro
+
+    async def escritor(self):
+        """Único ponto que altera o repositório: aplica em ordem e grava em lote."""
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.fila.get()]
+            while len(lote) < TAMANHO_LOTE_ESCRITA and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+
+            resultados = []
+            for operacao, futuro in lote:
+                try:
+                    resultados.append((futuro, operacao(self.repo), None))
+                except Exception as erro:  # Um pedido inválido não derruba o escritor
+                    resultados.append((futuro, None, erro))
+
+            if self.repo.alteracoes:
+                # ALTERADO: A thread do disco só recebe cópias do lote; o repositório que
+                # o laço está lendo nunca é remontado nela, só trocado aqui, de uma vez
+                lote = self.repo.alteracoes[:]
+                self.repo.alteracoes.clear()
+                copias = [projeto_cac.copiar_alteracao(alteracao) for alteracao in lote]
+                try:
+                    geracao, novo = await loop.run_in_executor(
+                        self.disco, projeto_cac.persistir_copias, copias, self.repo.geracao)
+                except Exception as erro:
+                    # Nada do lote é confirmado, então nada dele pode ficar na memória
+                    # (senão o próximo lote gravaria junto o que os clientes ouviram que falhou)
+                    traceback.print_exc()
+                    resultados = [(futuro, None, erro) for futuro, _, _ in resultados]
+                    await self.descartar_lote()
+                else:
+                    if novo is None:
+                        self.repo.geracao = geracao
+                    else:
+                        # Outro processo gravou antes: as respostas levam o ID que foi gravado
+                        for alteracao, copia in zip(lote, copias):
+                            if alteracao["op"] == "+agendamento":
+                                alteracao["registro"]["ID"] = copia["registro"]["ID"]
+                        self.trocar_repositorio(novo)
+
+            for futuro, resultado, erro in resultados:
+                if futuro.cancelled():
+                    continue
+                if erro is not None:
+                    futuro.set_exception(erro)
+                else:
+                    futuro.set_result(resultado)
+
+    async def descartar_lote(self):
+        """Volta o repositório ao que está no disco; insiste até conseguir ler."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                novo = await loop.run_in_executor(self.disco, projeto_cac.abrir_repositorio, False)
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(1)
+            else:
+                self.trocar_repositorio(novo)
+                return
+
+    def trocar_repositorio(self, novo):
+        """Põe no lugar um repositório montado na thread do disco (só no laço, entre duas leituras)."""
+        self.repo = novo
+        if self.arquivo is not None:
+            self.disco.submit(self.arquivo.recarregar)  # Outro processo pode ter arquivado meses novos
+
+    async def atender(self, leitor, escritor):
+        """Atende uma conexão (várias requisições, se o cliente mantiver aberta)."""
+        try:
+            while True:
+                try:
+                    requisicao = await ler_requisicao(leitor)
+                except ErroHTTP as erro:
+                    escritor.write(montar_resposta(erro.status, {"erro": str(erro)}, False))
+                    break
+                if requisicao is None:
+                    break
+                metodo, alvo, cabecalhos, corpo = requisicao
+                status, dados = await self.responder(metodo, alvo, corpo)
+                manter = cabecalhos.get("connection", "").lower() != "close"
+                escritor.write(montar_resposta(status, dados, manter))
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def responder(self, metodo, alvo, corpo):
+        url = urlsplit(alvo)
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        caminho = unquote(url.path)
+        metodo_errado = False
+        for metodo_rota, padrao, funcao in self.rotas:
+            casamento = padrao.match(caminho)
+            if not casamento:
+                continue
+            if metodo_rota != metodo:
+                metodo_errado = True
+                continue
+            try:
+                dados = json.loads(corpo) if corpo else {}
+                if not isinstance(dados, dict):
+                    raise ErroHTTP(400, "o corpo deve ser um objeto JSON")
+                return await funcao(*casamento.groups(), parametros=parametros, dados=dados)
+            except json.JSONDecodeError:
+                return 400, {"erro": "corpo não é um JSON válido"}
+            except ErroHTTP as erro:
+                return erro.status, {"erro": str(erro)}
+            except projeto_cac.NaoEncontrado as erro:
+                return 404, {"erro": str(erro)}
+            except projeto_cac.Conflito as erro:
+                return 409, {"erro": str(erro)}
+            except ValueError as erro:
+                return 400, {"erro": str(erro)}
+            except Exception:
+                traceback.print_exc()
+                return 500, {"erro": "erro interno"}
+        if metodo_errado:
+            return 405, {"erro": f"método {metodo} não permitido em {caminho}"}
+        return 404, {"erro": f"rota não encontrada: {caminho}"}
+
+    # --- Leituras (direto da memória) ---
+
+    async def saude(self, parametros, dados):
+        return 200, {"pacientes": len(self.repo.pacientes), "agendamentos": len(self.repo.agendamentos),
+                     "fila_escrita": self.fila.qsize()}
+
+    async def listar_pacientes(self, parametros, dados):
+        return 200, paginar(self.repo.pacientes, parametros)
+
+    async def buscar_paciente(self, cpf, parametros, dados):
+        paciente = self.repo.buscar_paciente(cpf)
+        if not paciente:
+            raise projeto_cac.NaoEncontrado(f"paciente não cadastrado: {cpf}")
+        return 200, paciente
+
+    async def leitura_do_cpf(self, cpf):
+        """O repositório com o arquivo morto do CPF já lido na thread do disco."""
+        arquivados = []
+        if cpf and self.arquivo is not None:
+            loop = asyncio.get_running_loop()
+            arquivados = await loop.run_in_executor(self.disco, self.arquivo.agendamentos_do_cpf, cpf)
+        return LeituraComArquivados(self.repo, arquivados)
+
+    async def consultas_realizadas(self, cpf, parametros, dados):
+        return 200, projeto_cac.consultas_realizadas_do_cpf(await self.leitura_do_cpf(cpf), cpf)
+
+    async def listar_agendamentos(self, parametros, dados):
+        agendamentos = projeto_cac.filtrar_agendamentos(
+            await self.leitura_do_cpf(parametros.get("cpf")), parametros.get("status"), parametros.get("cpf"),
+            parametros.get("de"), parametros.get("ate"), parametros.get("medico"),
+            parametros.get("especializacao"),
+        )
+        pagina = paginar(agendamentos, parametros)
+        pagina["registros"] = list(projeto_cac.com_nomes_atuais(self.repo, pagina["registros"]))
+        return 200, pagina
+
+    async def horarios_livres(self, parametros, dados):
+        try:
+            quantidade = min(max(1, int(parametros.get("quantidade", 5))), 100)
+        except ValueError:
+            raise ErroHTTP(400, "quantidade deve ser um número")
+        return 200, projeto_cac.buscar_horarios_livres(
+            self.repo, quantidade, parametros.get("a_partir_de"),
+            parametros.get("especializacao"), parametros.get("medico"),
+        )
+
+    # --- Alterações (pela fila do escritor) ---
+
+    async def cadastrar_paciente(self, parametros, dados):
+        return 201, await self.alterar(lambda repo: projeto_cac.registrar_paciente(repo, dados))
+
+    async def editar_paciente(self, cpf, parametros, dados):
+        return 200, await self.alterar(lambda repo: projeto_cac.alterar_paciente(repo, cpf, dados))
+
+    async def excluir_paciente(self, cpf, parametros, dados):
+        return 200, await self.alterar(lambda repo: projeto_cac.remover_paciente_cpf(repo, cpf))
+
+    async def agendar(self, parametros, dados):
+        encaixe = bool(dados.pop("encaixe", False))
+        return 201, await self.alterar(lambda repo: projeto_cac.registrar_agendamento(repo, dados, encaixe))
+
+    async def alterar_status(self, id_agendamento, parametros, dados):
+        return 200, await self.alterar(lambda repo: projeto_cac.mudar_status_agendamento(
+            repo, int(id_agendamento), dados.get("Status"), dados.get("HoraFinal"),
+            bool(dados.get("encaixe", False)),
+        ))
+
+
+async def servir(host=HOST_PADRAO, porta=PORTA_PADRAO):
+    servidor = ServidorClinica()
+    await servidor.iniciar()
+    tcp = await asyncio.start_server(servidor.atender, host, porta)
+    print(f"🏥 {projeto_cac.NOME_CLINICA}: {len(servidor.repo.pacientes)} paciente(s), "
+          f"{len(servidor.repo.agendamentos)} agendamento(s). Ouvindo em http://{host}:{porta}", flush=True)
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, parar.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: fica só o Ctrl+C (KeyboardInterrupt)
+    async with tcp:
+        await parar.wait()
+    await servidor.encerrar()
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Servidor HTTP da clínica (um único dono dos dados).")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--arquivo", type=Path, default=projeto_cac.ARQUIVO_DADOS, help="arquivo de dados JSON")
+    parser.add_argument("--journal", action="store_true",
+                        help="grava só as alterações (journal) em vez de regravar o arquivo inteiro")
+    return parser
+
+
+if __name__ == "__main__":
+    args = criar_parser().parse_args()
+    projeto_cac.ARQUIVO_DADOS = args.arquivo
+    if args.journal:
+        projeto_cac.USAR_JOURNAL = True
+    try:
+        asyncio.run(servir(args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
+    print("Servidor encerrado.")
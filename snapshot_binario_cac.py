@@ -0,0 +1,117 @@
+import gc
+import marshal
+import struct
+import zlib
+
+# NOVO: Snapshot binário para o projeto_cac.py (ativado com
+# USAR_SNAPSHOT_BINARIO). Com o clinica_dados.json em indent=4, quase toda a
+# carga é o parser JSON passando por espaços e aspas. Aqui os mesmos
+# registros ficam assim:
+#
+#   cabeçalho (CABECALHO, 32 bytes): "CACB", formato, flags, geracao,
+#       versão dos registros, tamanho do corpo e CRC32 do corpo
+#   corpo (comprimido com zlib se a flag COMPRIMIDO estiver ligada):
+#       [8 bytes: tamanho][pacientes][8 bytes: tamanho][agendamentos]
+#       [8 bytes: tamanho][removidos]  (CPF -> Seq, a partir do formato 2)
+#
+# Cada lista vai no formato marshal (versão 4, lida em C pelo próprio Python,
+# sem parser). Antes de gravar, os textos repetidos (cidade, estado, médico,
+# status, datas, CPF e nome do paciente nos agendamentos...) são internados:
+# o marshal grava cada um uma vez só e o resto vira referência; na carga,
+# todos os registros apontam para o mesmo objeto (menos memória).
+#
+# O CRC32 pega arquivo truncado ou estragado (SnapshotCorrompido): quem
+# carrega vai para as cópias de segurança em vez de começar do zero.
+
+MAGICO = b"CACB"
+FORMATO = 2  # 2: seção dos removidos (o formato 1 tem só as duas listas)
+COMPRIMIDO = 1  # flag
+CABECALHO = struct.Struct("<4sHHqIQI")  # mágico, formato, flags, geracao, versao, tamanho, crc32
+TAMANHO = struct.Struct("<Q")
+VERSAO_MARSHAL = 4  # Fixa: lida por qualquer Python 3.4 em diante
+NIVEL_COMPRESSAO = 1  # O mais rápido (a compressão é para poupar disco, não tempo)
+
+
+class SnapshotCorrompido(ValueError):
+    """Arquivo truncado, com CRC errado ou de um formato desconhecido."""
+
+
+def eh_binario(inicio):
+    """Os primeiros bytes do arquivo são de um snapshot binário?"""
+    return inicio[:len(MAGICO)] == MAGICO
+
+def ler_cabecalho(inicio):
+    """{'geracao', 'versao'} dos primeiros bytes do arquivo, ou None se não for um snapshot binário."""
+    if not eh_binario(inicio) or len(inicio) < CABECALHO.size:
+        return None
+    _, _, _, geracao, versao, _, _ = CABECALHO.unpack_from(inicio)
+    return {"geracao": geracao, "versao": versao}
+
+
+def _internar(registros, tabela):
+    """Dicionários com os textos trocados pelo mesmo objeto de 'tabela' (no lugar)."""
+    resultado = []
+    for registro in registros:
+        if type(registro) is not dict:
+            registro = dict(registro)  # Registros compactos (Paciente/Agendamento)
+        for chave, valor in registro.items():
+            if type(valor) is str:
+                # Mesmo valor, outro objeto: o registro não muda para quem o usa
+                registro[chave] = tabela.setdefault(valor, valor)
+        resultado.append(registro)
+    return resultado
+
+def gravar(arquivo, geracao, versao, pacientes, agendamentos, removidos=None, comprimir=False):
+    """Grava o snapshot em 'arquivo' (aberto em modo binário). Retorna os bytes gravados."""
+    tabela = {}
+    secoes = [marshal.dumps(_internar(registros, tabela), VERSAO_MARSHAL)
+              for registros in (pacientes, agendamentos)]
+    secoes.append(marshal.dumps(dict(removidos or {}), VERSAO_MARSHAL))
+    corpo = b"".join(TAMANHO.pack(len(secao)) + secao for secao in secoes)
+    flags = 0
+    if comprimir:
+        corpo = zlib.compress(corpo, NIVEL_COMPRESSAO)
+        flags |= COMPRIMIDO
+    arquivo.write(CABECALHO.pack(MAGICO, FORMATO, flags, geracao, versao, len(corpo), zlib.crc32(corpo)))
+    arquivo.write(corpo)
+    return CABECALHO.size + len(corpo)
+
+def ler(arquivo):
+    """Lê o snapshot de 'arquivo' (binário) -> {'geracao', 'versao', 'pacientes', 'agendamentos', 'removidos'}."""
+    cabecalho = arquivo.read(CABECALHO.size)
+    if len(cabecalho) < CABECALHO.size or not eh_binario(cabecalho):
+        raise SnapshotCorrompido("cabeçalho incompleto")
+    _, formato, flags, geracao, versao, tamanho, crc = CABECALHO.unpack(cabecalho)
+    if formato > FORMATO:
+        raise SnapshotCorrompido(f"formato {formato} desconhecido (esta versão lê até o {FORMATO})")
+    corpo = arquivo.read(tamanho)
+    if len(corpo) != tamanho:
+        raise SnapshotCorrompido(f"arquivo truncado ({len(corpo)} de {tamanho} bytes)")
+    if zlib.crc32(corpo) != crc:
+        raise SnapshotCorrompido("CRC32 não confere")
+    if flags & COMPRIMIDO:
+        corpo = zlib.decompress(corpo)
+
+    corpo = memoryview(corpo)
+    tipos = (list, list) if formato == 1 else (list, list, dict)
+    secoes, posicao = [], 0
+    # Sem ciclos entre os registros: o coletor de lixo só atrasaria a carga
+    coletor_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        for tipo in tipos:
+            (tamanho_secao,) = TAMANHO.unpack_from(corpo, posicao)
+            posicao += TAMANHO.size
+            secao = marshal.loads(corpo[posicao:posicao + tamanho_secao])
+            if type(secao) is not tipo:
+                raise SnapshotCorrompido("seção de registros inválida")
+            secoes.append(secao)
+            posicao += tamanho_secao
+    except (struct.error, EOFError, TypeError) as erro:  # CRC certo e conteúdo errado: outro programa
+        raise SnapshotCorrompido(f"conteúdo inválido ({erro})") from None
+    finally:
+        if coletor_ligado:
+            gc.enable()
+    removidos = secoes[2] if len(secoes) > 2 else {}
+    return {"geracao": geracao, "versao": versao, "pacientes": secoes[0], "agendamentos": secoes[1],
+            "removidos": removidos}
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import projeto_cac  # noqa: E402
+
+MODOS = ("json", "journal", "binario", "sqlite")
+
+
+@pytest.fixture
+def usar_dados(monkeypatch):
+    """Aponta o projeto_cac para um arquivo de dados (e um modo de gravação); pode ser chamada de novo no mesmo teste."""
+    def usar(caminho, modo="json"):
+        monkeypatch.setattr(projeto_cac, "ARQUIVO_DADOS", Path(caminho))
+        monkeypatch.setattr(projeto_cac, "USAR_JOURNAL", modo == "journal")
+        monkeypatch.setattr(projeto_cac, "USAR_SNAPSHOT_BINARIO", modo == "binario")
+        monkeypatch.setattr(projeto_cac, "USAR_SQLITE", modo == "sqlite")
+        monkeypatch.setattr(projeto_cac, "_conexao_sqlite", None)
+    return usar
+
+
+def linha_paciente(numero, nome=None):
+    return {"NomeCompleto": nome or f"Paciente {numero}", "CPF": f"{numero:011d}",
+            "Data de Nascimento": "01/01/1990", "Estado": "SP", "Cidade": "Santos",
+            "Endereço": "Rua A", "DDD": "13", "Telefone": "912345678"}
+
+
+def linha_agendamento(numero, data="10/03/2031", horario="09:00", medico="Dr. Mwltynho"):
+    return {"CPF": f"{numero:011d}", "DataConsulta": data, "HorarioInicio": horario, "Medico": medico}
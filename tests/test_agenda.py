@@ -0,0 +1,66 @@
+import pytest
+
+import projeto_cac
+from conftest import linha_agendamento, linha_paciente
+
+
+def test_horario_livre_logo_depois_de_consulta_fora_da_grade():
+    agenda = projeto_cac.AgendaProfissionais()
+    inicio = projeto_cac.para_timestamp("10/03/2031", "08:00")
+    agenda.adicionar({"ID": 1, "ProfissionalID": 1, "Status": "Ativo",
+                      "InicioTS": inicio, "FimTS": inicio + 40 * 60})
+
+    livres = agenda.horarios_livres_no_dia(1, inicio // 86400, 30, a_partir_min=0,
+                                           abertura="08:00", fechamento="09:30")
+
+    # Passo de GRANULARIDADE_MINUTOS: 08:40 aparece (com passo de 30 min só 09:00 apareceria)
+    assert livres == list(range(8 * 60 + 40, 9 * 60 + 1, projeto_cac.GRANULARIDADE_MINUTOS))
+
+
+def test_horario_livre_comeca_na_grade_depois_do_horario_atual():
+    livres = projeto_cac.AgendaProfissionais().horarios_livres_no_dia(
+        1, 0, 30, a_partir_min=8 * 60 + 7, abertura="08:00", fechamento="09:00")
+    assert livres[0] == 8 * 60 + 10
+
+
+@pytest.mark.parametrize("opcao", ["realizar_agendamento", "mostrar_horarios_livres"])
+def test_sem_profissional_ativo_cancela_em_vez_de_pedir_numero(tmp_path, usar_dados, monkeypatch, opcao):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    for prof in repo.profissionais:
+        repo.profissionais.atualizar(prof, {"Ativo": False})
+    respostas = iter(["N", "Paciente Avulso", "12345678901", "10/03/2031"] if opcao == "realizar_agendamento" else ["2"])
+    monkeypatch.setattr(projeto_cac, "perguntar", lambda texto="": next(respostas))
+
+    assert not getattr(projeto_cac, opcao)(repo)
+    assert next(respostas, None) is None  # Não ficou pedindo o número do profissional
+    assert repo.agendamentos == []
+
+
+def test_indices_por_status_e_medico_usam_o_id_do_agendamento(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    ag = projeto_cac.registrar_agendamento(repo, linha_agendamento(1))
+
+    projeto_cac.mudar_status_agendamento(repo, ag["ID"], "Cancelado")
+
+    assert repo.agendamentos_por_status == {"Cancelado": {ag["ID"]: ag}}
+    assert repo.agendamentos_por_profissional == {ag["ProfissionalID"]: {ag["ID"]: ag}}
+    repo.reindexar()
+    assert repo.agendamentos_por_status == {"Cancelado": {ag["ID"]: ag}}
+
+
+def test_agenda_e_linhas_do_tempo_seguem_o_id_do_profissional(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    profissional = repo.profissionais.por_nome("Dr. Mwltynho")
+    # Cópia do nome diferente da do cadastro (ex: digitada à mão num arquivo antigo)
+    antigo = repo.inserir_agendamento(dict(linha_agendamento(1, horario="09:00", medico="Dr Mwltynho"),
+                                           NomeCompleto="Paciente 1", Status="Ativo",
+                                           ProfissionalID=profissional["ID"]))
+
+    with pytest.raises(projeto_cac.Conflito):
+        projeto_cac.registrar_agendamento(repo, dict(linha_agendamento(2, horario="09:15"), NomeCompleto="Paciente 2"))
+    assert repo.agendamentos_entre("10/03/2031", "10/03/2031", medico="Dr. Mwltynho") == [antigo]
+    assert repo.agendamentos_do_medico("Dr. Mwltynho") == [antigo]
@@ -0,0 +1,58 @@
+import json
+from datetime import date
+
+import arquivo_historico
+import projeto_cac
+
+
+def encerrado(numero, data, horario="09:00"):
+    return {"ID": numero, "CPF": f"{numero:011d}", "DataConsulta": data, "HorarioInicio": horario,
+            "InicioTS": projeto_cac.para_timestamp(data, horario), "Status": "Atendimento Realizado"}
+
+
+def test_arquivar_de_novo_grava_particao_nova_sem_mexer_na_antiga(tmp_path):
+    arquivo = arquivo_historico.ArquivoHistorico(tmp_path, versao=3)
+    arquivo.arquivar([encerrado(1, "10/05/2024")])
+    primeira = (tmp_path / "2024-05.json").read_bytes()
+
+    # Encerramento atrasado do mesmo mês (e uma repetição do já arquivado)
+    arquivo.arquivar([encerrado(2, "02/05/2024"), encerrado(1, "10/05/2024")])
+
+    assert (tmp_path / "2024-05.json").read_bytes() == primeira
+    assert arquivo.partes("2024-05") == ["2024-05", "2024-05.2"]
+    relido = arquivo_historico.ArquivoHistorico(tmp_path)
+    assert [ag["ID"] for ag in relido.agendamentos_dos_meses("2024-05", "2024-05")] == [2, 1]
+    assert [ag["ID"] for ag in relido.agendamentos_do_cpf("00000000002")] == [2]
+    assert relido.indice["meses"] == {"2024-05": 2}
+    assert relido.ultimo_id == 2
+
+
+def test_indice_antigo_uma_particao_por_mes(tmp_path):
+    (tmp_path / "2024-05.json").write_text(json.dumps([encerrado(1, "10/05/2024")]))
+    (tmp_path / "2024-05.cpfs.json").write_text(json.dumps(["00000000001"]))
+    (tmp_path / "indice.json").write_text(json.dumps({"ultimo_id": 1, "versao": 3, "meses": {"2024-05": 1}}))
+
+    arquivo = arquivo_historico.ArquivoHistorico(tmp_path)
+    arquivo.arquivar([encerrado(2, "20/05/2024")])
+
+    assert arquivo.partes("2024-05") == ["2024-05", "2024-05.2"]
+    assert [ag["ID"] for ag in arquivo.agendamentos_do_cpf("00000000001")] == [1]
+    assert [ag["ID"] for ag in arquivo.agendamentos_dos_meses("2024-01", "2024-12")] == [1, 2]
+
+
+def test_comando_so_de_leitura_nao_arquiva(tmp_path, usar_dados, monkeypatch):
+    usar_dados(tmp_path / "dados.json")
+    monkeypatch.setattr(projeto_cac, "USAR_ARQUIVO_MORTO", True)
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_agendamento(repo, {"NomeCompleto": "Fulano", "CPF": "00000000001", "DataConsulta": "10/05/2031",
+                                             "HorarioInicio": "09:00", "Medico": "Dr. Mwltynho"})
+    ag = repo.agendamentos[0]
+    projeto_cac.mudar_status_agendamento(repo, ag["ID"], "Cancelado")
+    projeto_cac.persistir_alteracoes(repo)
+    antes = (tmp_path / "dados.json").read_bytes()
+    # Um ano depois, a consulta cancelada é de um mês que já acabou
+    monkeypatch.setattr(projeto_cac, "date", type("Data", (date,), {"today": classmethod(lambda cls: date(2032, 5, 1))}))
+
+    assert len(projeto_cac.abrir_leitura().agendamentos) == 1
+    assert (tmp_path / "dados.json").read_bytes() == antes
+    assert not projeto_cac.abrir_repositorio().agendamentos  # Quem altera arquiva
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import projeto_cac
+from conftest import linha_agendamento, linha_paciente
+
+
+@pytest.mark.parametrize("tamanho_lote", [1, 1000])  # 1: a linha 2 já entrou no repositório
+def test_importacao_rejeita_horario_ocupado_na_agenda_e_no_proprio_arquivo(tmp_path, usar_dados, monkeypatch,
+                                                                          tamanho_lote):
+    usar_dados(tmp_path / "dados.json")
+    monkeypatch.setattr(projeto_cac, "TAMANHO_LOTE_IMPORTACAO", tamanho_lote)
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    existente = projeto_cac.registrar_agendamento(repo, linha_agendamento(1, horario="09:00"))
+    linhas = [
+        linha_agendamento(1, horario="09:10"),                           # 1: choca com o existente
+        linha_agendamento(1, horario="10:00"),                           # 2: livre
+        linha_agendamento(1, horario="10:15"),                           # 3: choca com a linha 2
+        dict(linha_agendamento(1, horario="10:20"), Status="Cancelado"),  # 4: cancelado não ocupa
+        linha_agendamento(1, horario="10:00", medico="Dra. Ana Silva"),  # 5: outro profissional
+    ]
+    arquivo = tmp_path / "agendamentos.jsonl"
+    arquivo.write_text("".join(json.dumps(linha) + "\n" for linha in linhas), encoding="utf-8")
+
+    importados, rejeitados = projeto_cac.importar_arquivo(repo, arquivo, "agendamentos")
+
+    assert (importados, rejeitados) == (3, 2)
+    rejeicoes = [json.loads(texto) for texto in
+                 (tmp_path / "agendamentos.jsonl.rejeitados.jsonl").read_text(encoding="utf-8").splitlines()]
+    # Com lote 1 a linha 2 já está na agenda e o motivo aponta o ID dela
+    linha_2 = next(ag for ag in repo.agendamentos if ag["Medico"] == "Dr. Mwltynho" and ag["HorarioInicio"] == "10:00")
+    da_linha_2 = (f"o(s) agendamento(s) {linha_2['ID']}" if tamanho_lote == 1
+                  else "a(s) linha(s) 2 deste arquivo")
+    assert [(r["linha"], r["motivo"]) for r in rejeicoes] == [
+        (1, f"conflito de horário com o(s) agendamento(s) {existente['ID']}"),
+        (3, f"conflito de horário com {da_linha_2}"),
+    ]
+    horarios = sorted(ag["HorarioInicio"] for ag in repo.agendamentos if ag["Medico"] == "Dr. Mwltynho")
+    assert horarios == ["09:00", "10:00", "10:20"]
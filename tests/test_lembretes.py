@@ -0,0 +1,32 @@
+import pytest
+
+import projeto_cac
+from conftest import MODOS, linha_agendamento, linha_paciente
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_lembretes_releem_o_disco_sem_gravar_o_que_esta_pendente(tmp_path, usar_dados, monkeypatch, modo):
+    usar_dados(tmp_path / "dados.json", modo)
+    monkeypatch.setattr(projeto_cac, "_caixa_de_saida", None)
+    inicial = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(inicial, linha_paciente(1))
+    ag = projeto_cac.registrar_agendamento(inicial, linha_agendamento(1))
+    projeto_cac.persistir_alteracoes(inicial)
+
+    menu = projeto_cac.abrir_repositorio()
+    outro = projeto_cac.abrir_repositorio()
+    projeto_cac.mudar_status_agendamento(outro, ag["ID"], "Cancelado")
+    projeto_cac.persistir_alteracoes(outro)
+    projeto_cac.registrar_paciente(menu, linha_paciente(2))  # Pendente no menu
+    geracao = projeto_cac.carregar_dados()["geracao"]
+
+    enviados = projeto_cac.enviar_lembretes(menu, ag["InicioTS"] - 24 * 3600)
+
+    assert enviados == []  # Cancelado pelo outro processo
+    assert projeto_cac.carregar_dados()["geracao"] == geracao  # Nada foi gravado
+    assert [alteracao["op"] for alteracao in menu.alteracoes] == ["+paciente"]
+    assert menu.geracao == geracao
+    projeto_cac.persistir_alteracoes(menu)
+    dados = projeto_cac.carregar_dados()
+    assert sorted(p["CPF"] for p in dados["pacientes"]) == ["00000000001", "00000000002"]
+    assert [a["Status"] for a in dados["agendamentos"]] == ["Cancelado"]
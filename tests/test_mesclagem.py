@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+
+import pytest
+
+import projeto_cac
+from conftest import MODOS, linha_agendamento, linha_paciente
+
+
+def test_mesclar_troca_id_repetido_e_acompanha_as_alteracoes():
+    dados = {"pacientes": [], "agendamentos": [{"ID": 1, "Status": "Ativo"}], "removidos": {}}
+    novo = {"ID": 1, "Status": "Ativo"}
+    alteracoes = [{"op": "+agendamento", "registro": novo},
+                  {"op": "~agendamento", "id": 1, "campos": {"Status": "Cancelado"}}]
+
+    mesclado = projeto_cac.mesclar_alteracoes(dados, alteracoes, ultimo_id_arquivado=3)
+
+    assert novo["ID"] == 4  # Nem o 1 (no disco) nem até o 3 (no arquivo morto)
+    assert {ag["ID"]: ag["Status"] for ag in mesclado["agendamentos"]} == {1: "Ativo", 4: "Cancelado"}
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_dois_processos_gravando_o_mesmo_arquivo(tmp_path, usar_dados, modo):
+    usar_dados(tmp_path / "dados.json", modo)
+    primeiro = projeto_cac.abrir_repositorio()
+    segundo = projeto_cac.abrir_repositorio()
+    inicial = primeiro.geracao
+
+    projeto_cac.registrar_paciente(primeiro, linha_paciente(1))
+    projeto_cac.registrar_agendamento(primeiro, linha_agendamento(1))
+    projeto_cac.persistir_alteracoes(primeiro)
+    # O segundo ainda tem a carga antiga: o mesmo ID para outro agendamento
+    projeto_cac.registrar_paciente(segundo, linha_paciente(2))
+    ag = projeto_cac.registrar_agendamento(segundo, linha_agendamento(2, horario="10:00"))
+    projeto_cac.persistir_alteracoes(segundo)
+    projeto_cac.mudar_status_agendamento(segundo, ag["ID"], "Cancelado")
+    projeto_cac.persistir_alteracoes(segundo)
+
+    dados = projeto_cac.carregar_dados()
+    assert sorted(p["CPF"] for p in dados["pacientes"]) == ["00000000001", "00000000002"]
+    por_cpf = {ag["CPF"]: ag for ag in dados["agendamentos"]}
+    assert len({ag["ID"] for ag in dados["agendamentos"]}) == 2
+    assert por_cpf["00000000002"]["Status"] == "Cancelado"
+    assert por_cpf["00000000001"]["Status"] == "Ativo"
+    assert dados["geracao"] == inicial + 3
+    assert sorted(ag["Seq"] for ag in dados["agendamentos"]) == [inicial + 1, inicial + 3]
+
+
+@pytest.mark.parametrize("modo", ["json", "journal", "binario"])
+def test_gravador_adia_lote_desatualizado_ate_sincronizar(tmp_path, usar_dados, modo):
+    usar_dados(tmp_path / "dados.json", modo)
+    repo = projeto_cac.abrir_repositorio()
+    gravador = projeto_cac.GravadorSegundoPlano(lambda: projeto_cac.persistir_alteracoes(repo, gravador.trava),
+                                                em_segundo_plano=False)
+    outro = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(outro, linha_paciente(1))
+    projeto_cac.persistir_alteracoes(outro)
+
+    projeto_cac.registrar_paciente(repo, linha_paciente(2))
+    gravador.agendar()
+    # Outro processo gravou antes: nada é gravado e o lote continua pendente
+    assert repo.recarregar_pendente and len(repo.alteracoes) == 1
+    assert len(projeto_cac.carregar_dados()["pacientes"]) == 1
+
+    projeto_cac.sincronizar_com_disco(repo, gravador)
+    assert {p["CPF"] for p in repo.pacientes} == {"00000000001", "00000000002"}
+    gravador.agendar()
+    assert not repo.alteracoes and not repo.recarregar_pendente and gravador.erro is None
+    dados = projeto_cac.carregar_dados()
+    assert {p["CPF"]: p["Seq"] for p in dados["pacientes"]} == {"00000000001": 1, "00000000002": 2}
+
+
+def test_falha_na_gravacao_devolve_o_lote(tmp_path, usar_dados, monkeypatch):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    gravador = projeto_cac.GravadorSegundoPlano(lambda: projeto_cac.persistir_alteracoes(repo, gravador.trava),
+                                                em_segundo_plano=False)
+    gravar_lote = projeto_cac.gravar_lote
+
+    def disco_cheio(*args):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(projeto_cac, "gravar_lote", disco_cheio)
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    gravador.agendar()
+    assert isinstance(gravador.erro, OSError) and len(repo.alteracoes) == 1
+
+    monkeypatch.setattr(projeto_cac, "gravar_lote", gravar_lote)
+    projeto_cac.gravar_antes_de_sair(repo, gravador)
+    assert not repo.alteracoes
+    assert [p["CPF"] for p in projeto_cac.carregar_dados()["pacientes"]] == ["00000000001"]
+
+
+@pytest.mark.parametrize("resposta", [EOFError, KeyboardInterrupt])
+def test_sair_com_o_disco_falhando_guarda_as_alteracoes_no_resgate(tmp_path, usar_dados, monkeypatch, resposta):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    gravador = projeto_cac.GravadorSegundoPlano(lambda: projeto_cac.persistir_alteracoes(repo, gravador.trava),
+                                                em_segundo_plano=False)
+
+    def disco_cheio(*args):
+        raise OSError("disco cheio")
+
+    perguntas = []
+
+    def sem_terminal(*args):
+        perguntas.append(args)
+        raise resposta
+
+    monkeypatch.setattr(projeto_cac, "gravar_lote", disco_cheio)
+    monkeypatch.setattr("builtins.input", sem_terminal)
+    monkeypatch.setattr(projeto_cac.time, "sleep", lambda segundos: None)
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+
+    assert projeto_cac.gravar_antes_de_sair(repo, gravador) is False
+
+    # Sem terminal tenta TENTATIVAS_AO_SAIR vezes; Ctrl+C desiste na hora
+    assert len(perguntas) == (projeto_cac.TENTATIVAS_AO_SAIR - 1 if resposta is EOFError else 1)
+    linhas = [json.loads(linha) for linha in projeto_cac.caminho_resgate().read_text(encoding="utf-8").splitlines()]
+    assert linhas[0]["alteracoes"] == 1
+    assert linhas[1]["op"] == "+paciente" and linhas[1]["registro"]["CPF"] == "00000000001"
+
+
+def test_perguntar_solta_a_trava_da_opcao_enquanto_espera_o_usuario(monkeypatch):
+    gravador = projeto_cac.GravadorSegundoPlano(lambda: None, em_segundo_plano=False)
+    livre = []
+
+    def outra_thread():
+        if gravador.trava.acquire(timeout=1):
+            gravador.trava.release()
+            livre.append(True)
+
+    def input_do_usuario(*args):
+        outra = threading.Thread(target=outra_thread)
+        outra.start()
+        outra.join()
+        return "ok"
+
+    monkeypatch.setattr("builtins.input", input_do_usuario)
+    with projeto_cac.opcao_do_menu(gravador):
+        assert input is input_do_usuario  # Nada de trocar o input() do processo
+        assert projeto_cac.perguntar("?") == "ok"
+        assert gravador.trava._is_owned()  # De volta com a trava
+    assert livre == [True]
+    assert projeto_cac.perguntar("?") == "ok"  # Fora de uma opção: só pergunta
+
+
+def test_espera_do_usuario_descontada_sem_o_tempo_de_pegar_a_trava(monkeypatch):
+    import metricas_cac
+    monkeypatch.setattr(projeto_cac, "USAR_METRICAS", True)
+    monkeypatch.setattr(metricas_cac, "COLETOR", metricas_cac.Coletor())
+    gravador = projeto_cac.GravadorSegundoPlano(lambda: None, em_segundo_plano=False)
+    segurando = threading.Event()
+
+    def outra_thread():
+        with gravador.trava:
+            segurando.set()
+            time.sleep(0.2)  # O gravador separando um lote quando o usuário termina de digitar
+
+    def input_do_usuario(*args):
+        threading.Thread(target=outra_thread).start()
+        segurando.wait()
+        return ""
+
+    monkeypatch.setattr("builtins.input", input_do_usuario)
+    with projeto_cac.opcao_do_menu(gravador), projeto_cac.medir("menu.teste", descontar_entrada=True):
+        projeto_cac.perguntar("?")
+
+    resumo = metricas_cac.COLETOR.resumo()["menu.teste"]
+    assert resumo["espera_usuario_segundos"] < 0.1
+    assert resumo["segundos"] >= 0.15  # Esperar a trava é tempo do sistema
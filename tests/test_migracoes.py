@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import migracoes_cac
+import projeto_cac
+
+
+def test_maior_inteiro_numero_cortado_entre_blocos(tmp_path, monkeypatch):
+    monkeypatch.setattr(migracoes_cac, "TAMANHO_BLOCO", 100)
+    caminho = tmp_path / "dados.json"
+    caminho.write_bytes(b" " * 30 + b'"ID": 99999, ' + b" " * 200 + b'"ID": 5}')
+    assert migracoes_cac.maior_inteiro(caminho, "ID") == 99999
+
+
+@pytest.mark.parametrize("deslocamento", range(0, 260, 3))
+def test_maior_inteiro_em_qualquer_posicao(tmp_path, monkeypatch, deslocamento):
+    monkeypatch.setattr(migracoes_cac, "TAMANHO_BLOCO", 100)
+    caminho = tmp_path / "dados.json"
+    caminho.write_bytes(b'{"ID": 7,' + b" " * deslocamento + b'"ID"  :  123456789, "IDX": 999999999999,'
+                        + b" " * 300 + b'"ID": 8}')
+    assert migracoes_cac.maior_inteiro(caminho, "ID") == 123456789
+
+
+def test_maior_inteiro_numero_no_fim_do_arquivo(tmp_path, monkeypatch):
+    monkeypatch.setattr(migracoes_cac, "TAMANHO_BLOCO", 100)
+    caminho = tmp_path / "dados.json"
+    caminho.write_bytes(b" " * 95 + b'"ID": 4321')
+    assert migracoes_cac.maior_inteiro(caminho, "ID") == 4321
+
+
+def test_migra_arquivo_da_versao_1_em_blocos_pequenos(tmp_path, monkeypatch, usar_dados):
+    monkeypatch.setattr(migracoes_cac, "TAMANHO_BLOCO", 16)
+    usar_dados(tmp_path / "dados.json")
+    antigo = {
+        "geracao": 4,
+        "pacientes": [{"NomeCompleto": "Ana Souza", "CPF": "00000000001", "DDD": 13, "Telefone": 12345678}],
+        "agendamentos": [
+            {"ID": 10, "CPF": "00000000001", "DataConsulta": "10/03/2031", "HorarioInicio": "09:00",
+             "Especialista": "Psicólogo", "Status": "Ativo"},
+            {"CPF": "00000000001", "DataConsulta": "11/03/2031", "HorarioInicio": "10:00", "Status": "Ativo"},
+        ],
+    }
+    projeto_cac.ARQUIVO_DADOS.write_text(json.dumps(antigo, indent=4), encoding="utf-8")
+
+    dados = projeto_cac.carregar_dados_json()
+
+    assert projeto_cac.versao_do_snapshot() == projeto_cac.VERSAO_DADOS
+    assert dados["geracao"] == 4
+    paciente, = dados["pacientes"]
+    assert paciente["NomeCompleto"] == "Ana Souza"
+    assert (paciente["DDD"], paciente["Telefone"], paciente["Seq"]) == ("13", "012345678", 0)
+    primeiro, segundo = dados["agendamentos"]
+    assert primeiro["Especializacao"] == "Psicólogo" and "Especialista" not in primeiro
+    assert segundo["ID"] == 11  # Depois do maior ID que já existia
+    assert segundo["InicioTS"] == projeto_cac.para_timestamp("11/03/2031", "10:00")
+    # O original fica na cópia de segurança
+    assert json.loads(projeto_cac.caminho_copia(1).read_text(encoding="utf-8")) == antigo
+
+
+def test_migra_lista_da_versao_0(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json")
+    projeto_cac.ARQUIVO_DADOS.write_text(json.dumps([{"Nome": "Bia", "Sobrenome": "Lima", "CPF": "00000000002"}]),
+                                         encoding="utf-8")
+
+    dados = projeto_cac.carregar_dados_json()
+
+    assert [(p["NomeCompleto"], p["CPF"]) for p in dados["pacientes"]] == [("Bia Lima", "00000000002")]
+    assert dados["agendamentos"] == []
+
+
+def test_migracao_mantem_os_removidos(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json")
+    projeto_cac.ARQUIVO_DADOS.write_text(json.dumps(
+        {"geracao": 2, "versao": 2, "pacientes": [], "agendamentos": [], "removidos": {"00000000003": 2}}),
+        encoding="utf-8")
+
+    assert projeto_cac.carregar_dados_json()["removidos"] == {"00000000003": 2}
+    # Na versão nova, a próxima carga não migra de novo
+    assert not projeto_cac.precisa_migrar()
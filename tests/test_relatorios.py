@@ -0,0 +1,37 @@
+import pytest
+
+import projeto_cac
+from conftest import linha_agendamento, linha_paciente
+
+
+@pytest.fixture
+def repo(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.cadastrar_profissional(repo.profissionais, "Dra. Meio Período", "Pediatra", "08:00", "12:00", "0,2")
+    for numero, horario, medico in [(1, "09:00", "Dr. Mwltynho"), (2, "10:00", "Dr. Mwltynho"),
+                                    (3, "09:00", "Dra. Meio Período"), (4, "09:00", "Dra. Ana Silva")]:
+        projeto_cac.registrar_paciente(repo, linha_paciente(numero))
+        projeto_cac.registrar_agendamento(repo, linha_agendamento(numero, horario=horario, medico=medico))
+    projeto_cac.mudar_status_agendamento(repo, repo.agendamentos[1]["ID"], "Cancelado")
+    projeto_cac.persistir_alteracoes(repo)
+    return repo
+
+
+def test_ocupacao_pelo_expediente_de_cada_profissional(repo):
+    relatorio = projeto_cac.relatorio_operacional(repo, "10/03/2031", "16/03/2031")  # Segunda a domingo
+
+    por_nome = {prof["profissional"]: prof for prof in relatorio["profissionais"]}
+    meio_periodo = por_nome["Dra. Meio Período"]
+    # Segunda e quarta, das 08:00 às 12:00 (e não os 5 dias x 10 h da clínica)
+    assert meio_periodo["ocupacao"] == round(meio_periodo["minutos_ocupados"] / (2 * 4 * 60), 4)
+    ana = por_nome["Dra. Ana Silva"]
+    assert ana["ocupacao"] == round(ana["minutos_ocupados"] / (5 * 10 * 60), 4)
+
+
+@pytest.mark.parametrize("filtro", [{"medico": "Dr. Mwltynho"}, {"especializacao": "psicólogo"}])
+def test_status_com_medico_ou_especialidade_sem_periodo(repo, filtro):
+    ativos = projeto_cac.filtrar_agendamentos(repo, "Ativo", **filtro)
+    assert [(ag["CPF"], ag["Status"]) for ag in ativos] == [("00000000001", "Ativo")]
+    cancelados = projeto_cac.filtrar_agendamentos(repo, "Cancelado", **filtro)
+    assert [ag["CPF"] for ag in cancelados] == ["00000000002"]
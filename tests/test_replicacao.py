@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+import projeto_cac
+from conftest import linha_agendamento, linha_paciente
+
+
+def sem_seq(registros, chave):
+    return {r[chave]: {campo: valor for campo, valor in r.items() if campo != "Seq"} for r in registros}
+
+
+def exportar(desde):
+    saida = io.StringIO()
+    projeto_cac.exportar_alteracoes(saida, desde)
+    saida.seek(0)
+    return saida.getvalue()
+
+
+@pytest.mark.parametrize("modo_origem,modo_replica",
+                         [("json", "json"), ("journal", "sqlite"), ("sqlite", "journal"), ("binario", "json")])
+def test_replica_recebe_so_o_que_mudou(tmp_path, usar_dados, modo_origem, modo_replica):
+    origem, replica = tmp_path / "origem.json", tmp_path / "replica.json"
+
+    usar_dados(origem, modo_origem)
+    repo = projeto_cac.abrir_repositorio()
+    for numero in (1, 2, 3):
+        projeto_cac.registrar_paciente(repo, linha_paciente(numero))
+        projeto_cac.registrar_agendamento(repo, linha_agendamento(numero, horario=f"0{numero + 6}:00"))
+    projeto_cac.persistir_alteracoes(repo)
+    primeira = exportar(0)
+
+    usar_dados(replica, modo_replica)
+    cabecalho, totais = projeto_cac.aplicar_alteracoes_replica(io.StringIO(primeira))
+    assert totais == {"pacientes": 3, "agendamentos": 3, "removidos": 0}
+
+    # Segunda rodada: alteração, exclusão e um agendamento novo
+    usar_dados(origem, modo_origem)
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.alterar_paciente(repo, "00000000001", {"Cidade": "Guarujá"})
+    projeto_cac.remover_paciente_cpf(repo, "00000000002")
+    projeto_cac.registrar_agendamento(repo, linha_agendamento(3, horario="11:00"))
+    projeto_cac.persistir_alteracoes(repo)
+    segunda = exportar(cabecalho["ate"])
+    esperado = projeto_cac.carregar_dados()
+
+    usar_dados(replica, modo_replica)
+    _, totais = projeto_cac.aplicar_alteracoes_replica(io.StringIO(segunda))
+    assert totais["removidos"] == 1 and totais["pacientes"] == 1
+    obtido = projeto_cac.carregar_dados()
+    assert sem_seq(obtido["pacientes"], "CPF") == sem_seq(esperado["pacientes"], "CPF")
+    assert sem_seq(obtido["agendamentos"], "ID") == sem_seq(esperado["agendamentos"], "ID")
+    assert list(obtido["removidos"]) == ["00000000002"]
+
+    # O mesmo arquivo de novo não muda nada
+    _, totais = projeto_cac.aplicar_alteracoes_replica(io.StringIO(segunda))
+    assert totais == {"pacientes": 0, "agendamentos": 0, "removidos": 0}
+
+
+def test_replica_recusa_lacuna_e_arquivo_incompleto(tmp_path, usar_dados):
+    usar_dados(tmp_path / "origem.json")
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    projeto_cac.persistir_alteracoes(repo)
+    projeto_cac.registrar_paciente(repo, linha_paciente(2))
+    projeto_cac.persistir_alteracoes(repo)
+    depois_da_primeira = exportar(1)
+    completo = exportar(0)
+
+    usar_dados(tmp_path / "replica.json")
+    with pytest.raises(ValueError, match="faltam as alterações"):
+        projeto_cac.aplicar_alteracoes_replica(io.StringIO(depois_da_primeira))
+    cortado = "".join(completo.splitlines(keepends=True)[:-1])
+    with pytest.raises(ValueError, match="incompleto"):
+        projeto_cac.aplicar_alteracoes_replica(io.StringIO(cortado))
+    assert not projeto_cac.ARQUIVO_DADOS.exists()
+
+    projeto_cac.aplicar_alteracoes_replica(io.StringIO(completo))
+    assert len(projeto_cac.carregar_dados()["pacientes"]) == 2
+
+
+def test_exportar_desde_maior_que_a_geracao(tmp_path, usar_dados):
+    usar_dados(tmp_path / "origem.json")
+    with pytest.raises(ValueError, match="maior que a geração"):
+        exportar(5)
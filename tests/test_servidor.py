@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+
+import arquivo_historico
+import projeto_cac
+import servidor_cac
+from conftest import MODOS, linha_agendamento, linha_paciente
+
+
+def rodar(cenario, monkeypatch):
+    asyncio.run(cenario())
+    monkeypatch.setattr(projeto_cac, "_conexao_sqlite", None)  # A do servidor ficou na thread "disco"
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_gravacao_que_falha_nao_deixa_o_lote_na_memoria(tmp_path, usar_dados, monkeypatch, modo):
+    usar_dados(tmp_path / "dados.json", modo)
+    persistir = projeto_cac.persistir_copias
+    falhas = [OSError("disco cheio")]
+
+    def persistir_falhando(copias, geracao_lida):
+        if falhas:
+            raise falhas.pop()
+        return persistir(copias, geracao_lida)
+    monkeypatch.setattr(projeto_cac, "persistir_copias", persistir_falhando)
+
+    async def cenario():
+        servidor = servidor_cac.ServidorClinica()
+        await servidor.iniciar()
+        with pytest.raises(OSError):
+            await servidor.alterar(lambda repo: projeto_cac.registrar_paciente(repo, linha_paciente(1)))
+        # Quem recebeu o erro não pode ver o paciente aparecer depois
+        assert servidor.repo.buscar_paciente("00000000001") is None
+        assert not servidor.repo.alteracoes
+        await servidor.alterar(lambda repo: projeto_cac.registrar_paciente(repo, linha_paciente(2)))
+        await servidor.encerrar()
+    rodar(cenario, monkeypatch)
+
+    assert [p["CPF"] for p in projeto_cac.carregar_dados()["pacientes"]] == ["00000000002"]
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_outro_processo_gravou_antes_troca_o_repositorio_inteiro(tmp_path, usar_dados, monkeypatch, modo):
+    usar_dados(tmp_path / "dados.json", modo)
+    outro_id = []
+
+    async def cenario():
+        servidor = servidor_cac.ServidorClinica()
+        await servidor.iniciar()
+        antigo = servidor.repo
+        await servidor.alterar(lambda repo: projeto_cac.registrar_paciente(repo, linha_paciente(1)))
+
+        def outro_processo():
+            outro = projeto_cac.abrir_repositorio()
+            projeto_cac.registrar_paciente(outro, linha_paciente(2))
+            outro_id.append(projeto_cac.registrar_agendamento(outro, linha_agendamento(2))["ID"])
+            projeto_cac.persistir_alteracoes(outro)
+        await asyncio.get_running_loop().run_in_executor(servidor.disco, outro_processo)
+
+        ag = await servidor.alterar(lambda repo: projeto_cac.registrar_agendamento(
+            repo, linha_agendamento(1, horario="10:00")))
+        assert ag["ID"] != outro_id[0]  # O mesmo ID dos dois lados: o do servidor foi trocado
+        assert servidor.repo is not antigo
+        assert servidor.repo.agendamento_por_id[ag["ID"]]["CPF"] == "00000000001"
+        assert servidor.repo.buscar_paciente("00000000002") is not None
+        # O repositório que as leituras em andamento usavam não foi remontado por baixo delas
+        assert antigo.buscar_paciente("00000000002") is None
+        await servidor.encerrar()
+    rodar(cenario, monkeypatch)
+
+    ids = sorted(ag["ID"] for ag in projeto_cac.carregar_dados()["agendamentos"])
+    assert len(set(ids)) == 2
+
+
+def test_historico_do_cpf_lido_na_thread_do_disco(tmp_path, usar_dados, monkeypatch):
+    usar_dados(tmp_path / "dados.json")
+    monkeypatch.setattr(projeto_cac, "USAR_ARQUIVO_MORTO", True)
+    antigo = dict(linha_agendamento(1, data="10/05/2024"), ID=7, Status="Atendimento Realizado",
+                  InicioTS=projeto_cac.para_timestamp("10/05/2024", "09:00"), NomeCompleto="Fulano")
+    arquivo_historico.ArquivoHistorico(projeto_cac.caminho_arquivo_morto(), projeto_cac.VERSAO_DADOS).arquivar([antigo])
+    threads = []
+
+    async def cenario():
+        servidor = servidor_cac.ServidorClinica()
+        await servidor.iniciar()
+        ler = servidor.arquivo.agendamentos_do_cpf
+
+        def ler_registrando(cpf):
+            threads.append(threading.current_thread().name)
+            return ler(cpf)
+        servidor.arquivo.agendamentos_do_cpf = ler_registrando
+        status, pagina = await servidor.listar_agendamentos({"cpf": "00000000001"}, {})
+        assert [ag["ID"] for ag in pagina["registros"]] == [7]
+        status, consultas = await servidor.consultas_realizadas("00000000001", {}, {})
+        assert [ag["ID"] for ag in consultas] == [7]
+        await servidor.encerrar()
+    rodar(cenario, monkeypatch)
+
+    assert threads and all(nome.startswith("disco") for nome in threads)
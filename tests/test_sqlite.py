@@ -0,0 +1,67 @@
+import json
+from datetime import date
+
+import pytest
+
+import armazenamento_sqlite
+import projeto_cac
+from conftest import linha_agendamento, linha_paciente
+
+
+def gravar_json(caminho, pacientes, agendamentos):
+    caminho.write_text(json.dumps({"geracao": 3, "versao": projeto_cac.VERSAO_DADOS,
+                                   "pacientes": pacientes, "agendamentos": agendamentos}), encoding="utf-8")
+
+
+def test_importacao_interrompida_nao_deixa_banco_vazio(tmp_path, usar_dados, monkeypatch):
+    usar_dados(tmp_path / "dados.json")
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    projeto_cac.persistir_alteracoes(repo)
+    usar_dados(tmp_path / "dados.json", "sqlite")
+    migrar = armazenamento_sqlite.migrar
+
+    def queda(*args):
+        raise OSError("queda no meio da importação")
+
+    monkeypatch.setattr(armazenamento_sqlite, "migrar", queda)
+    with pytest.raises(OSError):
+        projeto_cac.carregar_dados()
+    assert not projeto_cac.caminho_sqlite().exists()
+
+    # A próxima abertura importa de novo
+    monkeypatch.setattr(armazenamento_sqlite, "migrar", migrar)
+    assert [p["CPF"] for p in projeto_cac.carregar_dados()["pacientes"]] == ["00000000001"]
+
+
+def test_banco_novo_ja_nasce_na_versao_atual(tmp_path, usar_dados, capsys):
+    usar_dados(tmp_path / "dados.json", "sqlite")
+    assert projeto_cac.carregar_dados()["pacientes"] == []
+    assert armazenamento_sqlite.ler_versao(projeto_cac.conexao_sqlite()) == projeto_cac.VERSAO_DADOS
+    assert "atualizado" not in capsys.readouterr().out
+
+
+def test_menu_deixa_no_banco_as_consultas_encerradas_de_meses_passados(tmp_path, usar_dados):
+    usar_dados(tmp_path / "dados.json", "sqlite")
+    repo = projeto_cac.abrir_repositorio()
+    projeto_cac.registrar_paciente(repo, linha_paciente(1))
+    antiga = projeto_cac.registrar_agendamento(repo, linha_agendamento(1, data="05/02/2030"))
+    pendente = projeto_cac.registrar_agendamento(repo, linha_agendamento(1, data="06/02/2030"))
+    atual = projeto_cac.registrar_agendamento(repo, linha_agendamento(1, data="02/03/2030"))
+    projeto_cac.persistir_alteracoes(repo)
+    projeto_cac.mudar_status_agendamento(repo, antiga["ID"], "Atendimento Realizado", hora_final="09:30")
+    projeto_cac.mudar_status_agendamento(repo, atual["ID"], "Cancelado")
+    projeto_cac.persistir_alteracoes(repo)
+
+    historico = projeto_cac.abrir_historico_sqlite(hoje=date(2030, 3, 10))
+    dados = projeto_cac.carregar_dados(historico)
+    assert sorted(ag["ID"] for ag in dados["agendamentos"]) == [pendente["ID"], atual["ID"]]
+
+    menu = projeto_cac.RepositorioClinica(dados["pacientes"], dados["agendamentos"], dados["geracao"], historico,
+                                          removidos=dados["removidos"])
+    assert historico.meses == ["2030-02"]
+    assert [ag["ID"] for ag in menu.agendamentos_do_cpf("00000000001", historico=True)][-1] == antiga["ID"]
+    assert [ag["ID"] for ag in menu.agendamentos_entre("01/02/2030", "28/02/2030")] == [antiga["ID"], pendente["ID"]]
+    # IDs novos continuam depois dos que ficaram no banco
+    assert menu.inserir_agendamento(projeto_cac.validar_novo_agendamento(
+        menu, linha_agendamento(1, data="03/03/2030")))["ID"] == atual["ID"] + 1